@@ -0,0 +1,114 @@
+"""
+Paginación por cursor (keyset) para listados grandes.
+"""
+import base64
+import json
+from urllib import parse
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginación por cursor sobre (campo_orden, id), ambos descendentes.
+
+    En vez de OFFSET, cada página filtra "después de la última fila vista", por
+    lo que el costo de una página no depende de su profundidad. El cursor es
+    opaco para el cliente: se recibe en `next` y se devuelve tal cual.
+
+    Por compatibilidad la respuesta incluye `count`; con `?sin_total=1` se omite
+    el COUNT(*) y cada página cuesta una sola consulta por índice.
+    """
+    campo_orden = None
+    page_size = settings.REST_FRAMEWORK.get('PAGE_SIZE', 10)
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    sin_total_query_param = 'sin_total'
+    mensaje_cursor_invalido = 'Cursor inválido.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.obtener_page_size(request)
+        self.con_total = request.query_params.get(self.sin_total_query_param) not in ('1', 'true', 'True')
+        self.total = queryset.count() if self.con_total else None
+
+        posicion = self.decodificar_cursor(request)
+        if posicion is not None:
+            valor, ultimo_id = posicion
+            queryset = queryset.filter(
+                Q(**{f'{self.campo_orden}__lt': valor}) |
+                Q(**{self.campo_orden: valor, 'id__lt': ultimo_id})
+            )
+
+        filas = list(queryset.order_by(f'-{self.campo_orden}', '-id')[:self.page_size + 1])
+        self.hay_siguiente = len(filas) > self.page_size
+        self.pagina = filas[:self.page_size]
+        return self.pagina
+
+    def get_paginated_response(self, data):
+        respuesta = {}
+        if self.con_total:
+            respuesta['count'] = self.total
+        respuesta['next'] = self.obtener_siguiente()
+        respuesta['results'] = data
+        return Response(respuesta)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'count': {'type': 'integer'},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def obtener_page_size(self, request):
+        """Tamaño de página pedido por el cliente, acotado a max_page_size."""
+        try:
+            tamano = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if tamano <= 0:
+            return self.page_size
+        return min(tamano, self.max_page_size)
+
+    def obtener_siguiente(self):
+        """URL de la página siguiente, o None si esta es la última."""
+        if not self.hay_siguiente:
+            return None
+        ultima = self.pagina[-1]
+        valor = getattr(ultima, self.campo_orden)
+        cursor = json.dumps([valor.isoformat(), ultima.id])
+        cursor = base64.urlsafe_b64encode(cursor.encode()).decode()
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param, cursor
+        )
+
+    def decodificar_cursor(self, request):
+        """Retorna (valor, id) del cursor recibido, o None en la primera página."""
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            valor, ultimo_id = json.loads(base64.urlsafe_b64decode(parse.unquote(cursor).encode()))
+            valor = parse_datetime(valor)
+            ultimo_id = int(ultimo_id)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound(self.mensaje_cursor_invalido)
+        if valor is None:
+            raise NotFound(self.mensaje_cursor_invalido)
+        return valor, ultimo_id
+
+
+class ReservaKeysetPagination(KeysetPagination):
+    """Paginación de reservas por (fecha_reserva, id), de la más reciente a la más antigua."""
+    campo_orden = 'fecha_reserva'
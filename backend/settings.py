@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import sys
 from pathlib import Path
 from decouple import config
 from datetime import timedelta
@@ -28,6 +29,9 @@ SECRET_KEY = config('SECRET_KEY')  # REQUERIDO - no hay default inseguro
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = config('DEBUG', default=False, cast=bool)  # Default seguro: False
 
+# True al correr `python manage.py test`
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test'
+
 ALLOWED_HOSTS = config('ALLOWED_HOSTS', default='localhost,127.0.0.1').split(',')
 
 
@@ -53,6 +57,8 @@ INSTALLED_APPS = [
     'lista_espera',
     'notificaciones',
     'equipamiento',
+    'reportes',
+    'busqueda',
 ]
 
 MIDDLEWARE = [
@@ -90,13 +96,49 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
 # Base de datos SQLite para desarrollo
+# transaction_mode IMMEDIATE toma el lock de escritura al iniciar cada transacción,
+# así las reservas concurrentes esperan su turno (timeout) en vez de fallar con
+# "database is locked" al intentar escalar un lock de lectura.
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
     }
 }
 
+# Caché compartida entre procesos. Las versiones del catálogo y de los cupos,
+# los feeds .ics y las tablas de la lista de espera se invalidan desde
+# cualquier proceso (web, despachador del outbox, consumidor de la cola,
+# crons, worker de Celery), así que todos deben usar la misma caché:
+# - con REDIS_URL, Redis (recomendado en producción),
+# - si no, la tabla `cache_compartida` de la base de datos (la crea
+#   `python manage.py migrate`).
+# Una caché en memoria por proceso solo sirve para los tests.
+REDIS_URL = config('REDIS_URL', default='')
+if TESTING:
+    CACHES = {
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+    }
+elif REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'cache_compartida',
+            'OPTIONS': {'MAX_ENTRIES': 20000},
+        }
+    }
+
 # PostgreSQL (comentado - para producción futura)
 # DATABASES = {
 #     'default': {
@@ -213,7 +255,7 @@ CORS_ALLOWED_ORIGINS = config(
 CORS_ALLOW_CREDENTIALS = True
 
 # Email Configuration
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.smtp.EmailBackend')
 EMAIL_HOST = config('EMAIL_HOST', default='smtp.gmail.com')
 EMAIL_PORT = config('EMAIL_PORT', default=587, cast=int)
 EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=False, cast=bool)
@@ -221,15 +263,34 @@ EMAIL_USE_SSL = config('EMAIL_USE_SSL', default=False, cast=bool)
 EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
 
-# Celery Configuration (para tareas asíncronas - DESHABILITADO)
-# Descomentar cuando se implemente el envío de emails o notificaciones push
-# Requiere Redis: redis://localhost:6379/0
-# CELERY_BROKER_URL = 'redis://localhost:6379/0'
-# CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
-# CELERY_ACCEPT_CONTENT = ['json']
-# CELERY_TASK_SERIALIZER = 'json'
-# CELERY_RESULT_SERIALIZER = 'json'
-# CELERY_TIMEZONE = TIME_ZONE
+# Outbox de reservas: los efectos secundarios (notificaciones, emails, lista de
+# espera) los procesa `python manage.py despachar_eventos_reserva --continuo`.
+# Con True se despachan al confirmar cada transacción (desarrollo sin despachador).
+OUTBOX_DESPACHO_INMEDIATO = config('OUTBOX_DESPACHO_INMEDIATO', default=DEBUG, cast=bool)
+
+# Lista de espera: minutos que se retiene un cupo liberado para el primero de
+# la lista antes de pasarlo al siguiente. Con 0 el cupo se reserva directamente.
+# Las ofertas vencidas las expira `python manage.py expirar_ofertas_lista_espera --continuo`.
+LISTA_ESPERA_MINUTOS_OFERTA = config('LISTA_ESPERA_MINUTOS_OFERTA', default=0, cast=int)
+
+# Celery: el worker (`celery -A backend worker -l info`) envía los emails de
+# las notificaciones, encolados al confirmar cada transacción.
+# Requiere Redis, p. ej. CELERY_BROKER_URL=redis://localhost:6379/0
+# Sin broker no se encola nada: los emails quedan pendientes para el cron
+# `python manage.py enviar_emails_pendientes`. El modo eager (la tarea en el
+# mismo proceso, esperando al SMTP dentro de la petición) es el de los tests
+# y solo se activa fuera de ellos con CELERY_TASK_ALWAYS_EAGER=True.
+# Para probar el envío real sin Gmail: `python manage.py servidor_smtp_local`
+# con EMAIL_HOST=localhost, EMAIL_PORT=1025 y un EMAIL_HOST_USER cualquiera.
+CELERY_BROKER_URL = config('CELERY_BROKER_URL', default='')
+CELERY_TASK_ALWAYS_EAGER = config('CELERY_TASK_ALWAYS_EAGER', default=TESTING, cast=bool)
+CELERY_TASK_IGNORE_RESULT = True
+CELERY_ACCEPT_CONTENT = ['json']
+CELERY_TASK_SERIALIZER = 'json'
+CELERY_TIMEZONE = TIME_ZONE
+# Si el broker no responde, encolar no debe dejar esperando a la petición
+CELERY_BROKER_CONNECTION_TIMEOUT = 2
+CELERY_TASK_PUBLISH_RETRY_POLICY = {'max_retries': 2, 'interval_start': 0, 'interval_step': 0.5}
 
 
 # Logging Configuration
@@ -346,6 +407,12 @@ LOGGING = {
             'level': 'INFO',
             'propagate': False,
         },
+        # Logger para reportes
+        'reportes': {
+            'handlers': ['console', 'file_info'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
     'root': {
         'handlers': ['console', 'file_error'],
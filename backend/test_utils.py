@@ -0,0 +1,93 @@
+"""
+Utilidades compartidas para los tests de la API.
+"""
+from datetime import date, datetime, timedelta, time
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from clases.models import Clase
+from usuarios.models import Usuario
+
+
+def crear_socios(prefijo, cantidad):
+    """Crea socios activos de prueba."""
+    Usuario.objects.bulk_create([
+        Usuario(
+            username=f'{prefijo}{i}',
+            email=f'{prefijo}{i}@gimnasio.com',
+            rol=Usuario.SOCIO,
+            estado_membresia=Usuario.ACTIVA
+        )
+        for i in range(cantidad)
+    ])
+    return list(Usuario.objects.filter(username__startswith=prefijo).order_by('id'))
+
+
+def crear_clase(nombre, tipo, hora_inicio, cupos_totales=10, cupos_ocupados=0):
+    """Crea una clase activa de una hora para pasado mañana."""
+    hora_fin = (datetime.combine(date.min, hora_inicio) + timedelta(hours=1)).time()
+    return Clase.objects.create(
+        nombre=nombre,
+        tipo=tipo,
+        fecha=date.today() + timedelta(days=2),
+        hora_inicio=hora_inicio,
+        hora_fin=hora_fin,
+        cupos_totales=cupos_totales,
+        cupos_ocupados=cupos_ocupados,
+        estado=Clase.ACTIVA
+    )
+
+
+def crear_clase_llena():
+    """Crea una clase activa de un cupo, ya ocupado."""
+    return crear_clase('Yoga Llena', Clase.YOGA, time(10, 0), cupos_totales=1, cupos_ocupados=1)
+
+
+class PresupuestoConsultasMixin:
+    """
+    Mixin para TestCase que verifica el presupuesto de consultas SQL de un endpoint.
+
+    Un endpoint de listado cumple su presupuesto si la cantidad de consultas no
+    crece con el número de filas (sin N+1) y no supera el máximo indicado.
+    """
+
+    def contar_consultas(self, usuario, url):
+        """Ejecuta GET url autenticado como usuario y retorna (respuesta, consultas)."""
+        api = APIClient()
+        api.force_authenticate(user=usuario)
+        with CaptureQueriesContext(connection) as contexto:
+            respuesta = api.get(url)
+        self.assertEqual(respuesta.status_code, 200, f'GET {url} retornó {respuesta.status_code}')
+        return respuesta, contexto.captured_queries
+
+    def assertPresupuestoConsultas(self, usuario, url, crear_filas, presupuesto, filas=(2, 8)):
+        """
+        Falla si las consultas de GET url crecen con las filas o superan el presupuesto.
+
+        Args:
+            usuario: Usuario autenticado para la petición
+            url: Endpoint a medir
+            crear_filas: Función que recibe n y crea n filas más para el endpoint
+            presupuesto: Máximo de consultas permitido
+            filas: Cantidades de filas con las que se compara
+        """
+        mediciones = []
+        creadas = 0
+        for total in filas:
+            crear_filas(total - creadas)
+            creadas = total
+            _, consultas = self.contar_consultas(usuario, url)
+            mediciones.append(consultas)
+
+        conteos = [len(consultas) for consultas in mediciones]
+        detalle = '\n'.join(c['sql'] for c in mediciones[-1])
+        self.assertEqual(
+            len(set(conteos)), 1,
+            f'GET {url}: las consultas crecen con las filas {dict(zip(filas, conteos))}\n{detalle}'
+        )
+        self.assertLessEqual(
+            conteos[-1], presupuesto,
+            f'GET {url}: {conteos[-1]} consultas superan el presupuesto de {presupuesto}\n{detalle}'
+        )
@@ -26,21 +26,26 @@ from rest_framework_simplejwt.views import (
 
 # Importar ViewSets
 from usuarios.views import UsuarioViewSet, InstructorViewSet
-from clases.views import ClaseViewSet
-from reservas.views import ReservaViewSet
+from clases.views import ClaseViewSet, ClasePlantillaViewSet
+from reservas.views import ReservaViewSet, feed_calendario
 from lista_espera.views import ListaEsperaViewSet
 from equipamiento.views import EquipoViewSet
 from notificaciones.views import NotificacionViewSet
+from reportes.views import ReporteViewSet
+from busqueda.views import BusquedaViewSet
 
 # Configurar el router de DRF
 router = DefaultRouter()
 router.register(r'usuarios', UsuarioViewSet, basename='usuario')
 router.register(r'instructores', InstructorViewSet, basename='instructor')
 router.register(r'clases', ClaseViewSet, basename='clase')
+router.register(r'plantillas', ClasePlantillaViewSet, basename='plantilla')
 router.register(r'reservas', ReservaViewSet, basename='reserva')
 router.register(r'lista-espera', ListaEsperaViewSet, basename='lista-espera')
 router.register(r'equipos', EquipoViewSet, basename='equipo')
 router.register(r'notificaciones', NotificacionViewSet, basename='notificacion')
+router.register(r'reportes', ReporteViewSet, basename='reporte')
+router.register(r'busqueda', BusquedaViewSet, basename='busqueda')
 
 urlpatterns = [
     # Admin de Django
@@ -50,6 +55,9 @@ urlpatterns = [
     path('api/auth/login/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/auth/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     
+    # Feed iCalendar público (por token) para apps de calendario
+    path('api/calendario/<str:token>.ics', feed_calendario, name='calendario_ics'),
+    
     # API REST
     path('api/', include(router.urls)),
 ]
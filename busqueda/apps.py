@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class BusquedaConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'busqueda'
+    verbose_name = 'Búsqueda'
+    
+    def ready(self):
+        """Importa señales cuando la app está lista."""
+        import busqueda.signals  # noqa: F401
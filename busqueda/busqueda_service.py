@@ -0,0 +1,280 @@
+"""
+Servicio de búsqueda de texto completo sobre clases, instructores y equipos.
+
+Cada objeto indexable tiene un DocumentoBusqueda con su texto normalizado
+(minúsculas, sin acentos). La búsqueda usa el índice invertido del motor:
+
+- SQLite: tabla virtual FTS5 (tokenizador unicode61 sin diacríticos),
+  ordenada por bm25 con el título ponderado sobre el resto del texto.
+- PostgreSQL: columna tsvector con configuración 'spanish' e índice GIN,
+  ordenada por ts_rank (título con peso A, texto con peso B).
+- Otros motores: icontains sobre los documentos, sin ranking.
+
+Cada término de la consulta debe aparecer (AND) y se busca como prefijo,
+así "spin" encuentra "Spinning" y "clase" encuentra "clases".
+"""
+import re
+import unicodedata
+
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+from clases.models import Clase
+from equipamiento.models import Equipo
+from usuarios.models import Instructor
+from .models import DocumentoBusqueda
+
+TABLA_FTS = 'busqueda_fts'
+
+# Peso del título frente al texto en bm25 (SQLite)
+PESO_TITULO = 10.0
+
+LOTE_INDEXACION = 1000
+
+
+class Fuente:
+    """Definición de un tipo de objeto indexable."""
+
+    def __init__(self, queryset, titulo, texto, visibles):
+        """
+        Args:
+            queryset: Función que retorna el QuerySet base del modelo
+            titulo: Función objeto -> título (se muestra y pesa más en el ranking)
+            texto: Función objeto -> lista de textos adicionales a indexar
+            visibles: Función QuerySet -> QuerySet con los objetos que se muestran
+        """
+        self.queryset = queryset
+        self.titulo = titulo
+        self.texto = texto
+        self.visibles = visibles
+
+
+def _nombre_instructor(instructor):
+    return instructor.usuario.get_full_name() if instructor else ''
+
+
+FUENTES = {
+    DocumentoBusqueda.CLASE: Fuente(
+        queryset=lambda: Clase.objects.para_listado(),
+        titulo=lambda clase: clase.nombre,
+        texto=lambda clase: [
+            clase.get_tipo_display(), clase.descripcion, _nombre_instructor(clase.instructor),
+        ],
+        visibles=lambda queryset: queryset.filter(
+            estado=Clase.ACTIVA, fecha__gte=timezone.localdate()
+        ),
+    ),
+    DocumentoBusqueda.INSTRUCTOR: Fuente(
+        queryset=lambda: Instructor.objects.select_related('usuario'),
+        titulo=_nombre_instructor,
+        texto=lambda instructor: [
+            instructor.especialidades, instructor.biografia, instructor.certificaciones,
+        ],
+        visibles=lambda queryset: queryset.filter(activo=True),
+    ),
+    DocumentoBusqueda.EQUIPO: Fuente(
+        queryset=lambda: Equipo.objects.all(),
+        titulo=lambda equipo: equipo.nombre,
+        texto=lambda equipo: [
+            equipo.get_categoria_display(), equipo.marca, equipo.modelo,
+            equipo.descripcion, equipo.ubicacion,
+        ],
+        visibles=lambda queryset: queryset.filter(activo=True),
+    ),
+}
+
+
+def normalizar(texto):
+    """Minúsculas y sin acentos: 'Pilátes Básico' -> 'pilates basico'."""
+    descompuesto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c)).lower()
+
+
+def terminos(consulta):
+    """Palabras de la consulta, normalizadas; se descarta la sintaxis del motor."""
+    return re.findall(r'\w+', normalizar(consulta))
+
+
+def _documento(tipo, objeto):
+    fuente = FUENTES[tipo]
+    texto = ' '.join(parte for parte in fuente.texto(objeto) if parte)
+    return DocumentoBusqueda(
+        tipo=tipo,
+        objeto_id=objeto.pk,
+        titulo=normalizar(fuente.titulo(objeto))[:255],
+        texto=normalizar(texto),
+    )
+
+
+def indexar(tipo, objeto):
+    """Crea o actualiza el documento de un objeto (lo llaman las señales post_save)."""
+    documento = _documento(tipo, objeto)
+    DocumentoBusqueda.objects.update_or_create(
+        tipo=tipo,
+        objeto_id=objeto.pk,
+        defaults={'titulo': documento.titulo, 'texto': documento.texto},
+    )
+
+
+def indexar_objetos(tipo, objetos):
+    """
+    Reemplaza en bloque los documentos de varios objetos. Para operaciones
+    que no emiten post_save (bulk_create, update()).
+    """
+    documentos = [_documento(tipo, objeto) for objeto in objetos]
+    DocumentoBusqueda.objects.filter(
+        tipo=tipo, objeto_id__in=[documento.objeto_id for documento in documentos]
+    ).delete()
+    DocumentoBusqueda.objects.bulk_create(documentos, batch_size=LOTE_INDEXACION)
+
+
+def eliminar(tipo, objeto_id):
+    """Quita un objeto del índice."""
+    DocumentoBusqueda.objects.filter(tipo=tipo, objeto_id=objeto_id).delete()
+
+
+def reconstruir(tipos=None):
+    """
+    Regenera los documentos de los tipos indicados (todos por defecto).
+
+    Returns:
+        dict: Documentos indexados por tipo
+    """
+    indexados = {}
+    for tipo in tipos or FUENTES:
+        DocumentoBusqueda.objects.filter(tipo=tipo).delete()
+        lote = []
+        total = 0
+        for objeto in FUENTES[tipo].queryset().order_by('pk').iterator(chunk_size=LOTE_INDEXACION):
+            lote.append(_documento(tipo, objeto))
+            if len(lote) >= LOTE_INDEXACION:
+                DocumentoBusqueda.objects.bulk_create(lote)
+                total += len(lote)
+                lote = []
+        DocumentoBusqueda.objects.bulk_create(lote)
+        indexados[tipo] = total + len(lote)
+    return indexados
+
+
+def _sql_sqlite(palabras):
+    consulta = ' '.join(f'"{palabra}"*' for palabra in palabras)
+    desde = (
+        f'FROM {TABLA_FTS} JOIN busqueda_documentobusqueda d ON d.id = {TABLA_FTS}.rowid '
+        f'WHERE {TABLA_FTS} MATCH %s AND d.tipo = %s'
+    )
+    return f'-bm25({TABLA_FTS}, {PESO_TITULO}, 1.0)', desde, consulta
+
+
+def _sql_postgresql(palabras):
+    consulta = ' & '.join(f'{palabra}:*' for palabra in palabras)
+    desde = (
+        "FROM busqueda_documentobusqueda d, to_tsquery('spanish', %s) consulta "
+        "WHERE d.vector @@ consulta AND d.tipo = %s"
+    )
+    return 'ts_rank(d.vector, consulta)', desde, consulta
+
+
+SQL_BUSQUEDA = {
+    'sqlite': _sql_sqlite,
+    'postgresql': _sql_postgresql,
+}
+
+
+def _documentos_genericos(tipo, palabras):
+    filtro = Q()
+    for palabra in palabras:
+        filtro &= Q(titulo__icontains=palabra) | Q(texto__icontains=palabra)
+    return DocumentoBusqueda.objects.filter(filtro, tipo=tipo)
+
+
+def buscar_ids(tipo, consulta):
+    """
+    IDs de los objetos de un tipo que coinciden con la consulta, sin filtrar
+    los no visibles. Para listar resultados usar `filtrar`.
+
+    Returns:
+        list: Tuplas (objeto_id, puntaje), de mayor a menor puntaje;
+        None si la consulta no tiene términos buscables
+    """
+    palabras = terminos(consulta)
+    if not palabras:
+        return None
+    sql = SQL_BUSQUEDA.get(connection.vendor)
+    if sql is None:
+        ids = _documentos_genericos(tipo, palabras).values_list('objeto_id', flat=True)
+        return [(objeto_id, 0.0) for objeto_id in ids]
+
+    puntaje, desde, consulta_motor = sql(palabras)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT d.objeto_id, {puntaje} AS puntaje {desde} ORDER BY puntaje DESC',
+            [consulta_motor, tipo]
+        )
+        return cursor.fetchall()
+
+
+def filtrar(tipo, queryset, consulta):
+    """
+    Restringe un QuerySet a los objetos que coinciden con la consulta y le
+    agrega la anotación `relevancia`.
+
+    La coincidencia va como subconsulta dentro del mismo SQL que los filtros
+    del QuerySet (visibilidad, filtros de la vista), así el motor descarta los
+    no visibles antes de paginar u ordenar y no hay un tope de candidatos.
+    Para ordenar por relevancia: `.order_by('-relevancia')`.
+
+    Returns:
+        QuerySet, o None si la consulta no tiene términos buscables
+    """
+    palabras = terminos(consulta)
+    if not palabras:
+        return None
+    sql = SQL_BUSQUEDA.get(connection.vendor)
+    if sql is None:
+        ids = _documentos_genericos(tipo, palabras).values('objeto_id')
+        return queryset.filter(pk__in=ids).annotate(
+            relevancia=Value(0.0, output_field=FloatField())
+        )
+
+    puntaje, desde, consulta_motor = sql(palabras)
+    modelo = queryset.model._meta
+    columna_pk = f'{connection.ops.quote_name(modelo.db_table)}.{connection.ops.quote_name(modelo.pk.column)}'
+    parametros = [consulta_motor, tipo]
+    return queryset.filter(
+        pk__in=RawSQL(f'SELECT d.objeto_id {desde}', parametros)
+    ).annotate(
+        relevancia=RawSQL(
+            f'SELECT {puntaje} {desde} AND d.objeto_id = {columna_pk}',
+            parametros,
+            output_field=FloatField()
+        )
+    )
+
+
+def buscar(consulta, tipos=None, limite=20):
+    """
+    Búsqueda global: los objetos visibles que coinciden, de todos los tipos,
+    ordenados por puntaje.
+
+    Returns:
+        list: Diccionarios con tipo, id, titulo y puntaje
+    """
+    resultados = []
+    for tipo in tipos or FUENTES:
+        fuente = FUENTES[tipo]
+        objetos = filtrar(tipo, fuente.visibles(fuente.queryset()), consulta)
+        if objetos is None:
+            return []
+        resultados.extend(
+            {
+                'tipo': tipo,
+                'id': objeto.pk,
+                'titulo': fuente.titulo(objeto),
+                'puntaje': round(objeto.relevancia, 4),
+            }
+            for objeto in objetos.order_by('-relevancia', 'pk')[:limite]
+        )
+    resultados.sort(key=lambda resultado: -resultado['puntaje'])
+    return resultados[:limite]
@@ -0,0 +1,38 @@
+"""
+Filtro de DRF que resuelve ?search= con el índice de búsqueda.
+"""
+from rest_framework.filters import BaseFilterBackend
+
+from . import busqueda_service
+
+
+class BusquedaFilter(BaseFilterBackend):
+    """
+    Reemplaza a SearchFilter: en vez de icontains sobre cada columna, filtra
+    con el índice invertido en el mismo SQL que el resto de filtros. Si el cliente no pidió
+    ?ordering=, los resultados se ordenan por relevancia.
+
+    La vista indica el tipo de documento en `tipo_busqueda`. Debe ir después de
+    OrderingFilter en filter_backends para que el orden por relevancia no se
+    pierda con el orden por defecto de la vista.
+    """
+    search_param = 'search'
+    ordering_param = 'ordering'
+
+    def filter_queryset(self, request, queryset, view):
+        consulta = request.query_params.get(self.search_param, '')
+        resultado = busqueda_service.filtrar(view.tipo_busqueda, queryset, consulta)
+        if resultado is None:
+            return queryset
+        if request.query_params.get(self.ordering_param):
+            return resultado
+        return resultado.order_by('-relevancia', 'pk')
+
+    def get_schema_operation_parameters(self, view):
+        return [{
+            'name': self.search_param,
+            'required': False,
+            'in': 'query',
+            'description': 'Búsqueda de texto completo',
+            'schema': {'type': 'string'},
+        }]
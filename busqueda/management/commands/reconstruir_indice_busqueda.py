@@ -0,0 +1,34 @@
+"""
+Regenera el índice de búsqueda desde las tablas de clases, instructores y equipos.
+
+Las altas y cambios hechos con save() se indexan solos; este comando sirve
+para la carga inicial y para cargas masivas hechas sin señales.
+
+Uso:
+    python manage.py reconstruir_indice_busqueda
+    python manage.py reconstruir_indice_busqueda --tipo=clase --tipo=equipo
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from busqueda import busqueda_service
+from busqueda.models import DocumentoBusqueda
+
+
+class Command(BaseCommand):
+    help = 'Regenera el índice de búsqueda de texto completo'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tipo',
+            action='append',
+            choices=[tipo for tipo, _ in DocumentoBusqueda.TIPOS],
+            help='Tipo a reindexar (repetible; default: todos)'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            indexados = busqueda_service.reconstruir(options['tipo'])
+        for tipo, total in indexados.items():
+            self.stdout.write(f'{tipo}: {total} documentos')
+        self.stdout.write(self.style.SUCCESS('Índice de búsqueda reconstruido.'))
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentoBusqueda',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('clase', 'Clase'), ('instructor', 'Instructor'), ('equipo', 'Equipo')], max_length=20, verbose_name='Tipo')),
+                ('objeto_id', models.PositiveBigIntegerField(verbose_name='ID del Objeto')),
+                ('titulo', models.CharField(max_length=255, verbose_name='Título')),
+                ('texto', models.TextField(blank=True, verbose_name='Texto')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Fecha de Actualización')),
+            ],
+            options={
+                'verbose_name': 'Documento de Búsqueda',
+                'verbose_name_plural': 'Documentos de Búsqueda',
+                'constraints': [models.UniqueConstraint(fields=('tipo', 'objeto_id'), name='documento_tipo_objeto_unico')],
+            },
+        ),
+    ]
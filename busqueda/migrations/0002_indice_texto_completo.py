@@ -0,0 +1,89 @@
+# Índice invertido sobre busqueda_documentobusqueda, según el motor:
+# - SQLite: tabla virtual FTS5 con contenido externo, mantenida por triggers.
+# - PostgreSQL: columna tsvector generada ('spanish') con índice GIN.
+# En otros motores no se crea nada y la búsqueda usa icontains.
+#
+# Nota: en SQLite, una migración futura que altere la tabla de documentos la
+# recrea y elimina los triggers; habría que volver a crearlos.
+
+from django.db import migrations
+
+SQLITE_CREAR = [
+    """
+    CREATE VIRTUAL TABLE busqueda_fts USING fts5(
+        titulo, texto,
+        content='busqueda_documentobusqueda', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER busqueda_fts_insertar AFTER INSERT ON busqueda_documentobusqueda BEGIN
+        INSERT INTO busqueda_fts(rowid, titulo, texto) VALUES (new.id, new.titulo, new.texto);
+    END
+    """,
+    """
+    CREATE TRIGGER busqueda_fts_eliminar AFTER DELETE ON busqueda_documentobusqueda BEGIN
+        INSERT INTO busqueda_fts(busqueda_fts, rowid, titulo, texto)
+        VALUES ('delete', old.id, old.titulo, old.texto);
+    END
+    """,
+    """
+    CREATE TRIGGER busqueda_fts_actualizar AFTER UPDATE ON busqueda_documentobusqueda BEGIN
+        INSERT INTO busqueda_fts(busqueda_fts, rowid, titulo, texto)
+        VALUES ('delete', old.id, old.titulo, old.texto);
+        INSERT INTO busqueda_fts(rowid, titulo, texto) VALUES (new.id, new.titulo, new.texto);
+    END
+    """,
+    "INSERT INTO busqueda_fts(busqueda_fts) VALUES ('rebuild')",
+]
+
+SQLITE_ELIMINAR = [
+    'DROP TRIGGER IF EXISTS busqueda_fts_insertar',
+    'DROP TRIGGER IF EXISTS busqueda_fts_eliminar',
+    'DROP TRIGGER IF EXISTS busqueda_fts_actualizar',
+    'DROP TABLE IF EXISTS busqueda_fts',
+]
+
+POSTGRESQL_CREAR = [
+    """
+    ALTER TABLE busqueda_documentobusqueda ADD COLUMN vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('spanish', titulo), 'A') ||
+        setweight(to_tsvector('spanish', texto), 'B')
+    ) STORED
+    """,
+    'CREATE INDEX busqueda_documento_vector_idx ON busqueda_documentobusqueda USING GIN (vector)',
+]
+
+POSTGRESQL_ELIMINAR = [
+    'DROP INDEX IF EXISTS busqueda_documento_vector_idx',
+    'ALTER TABLE busqueda_documentobusqueda DROP COLUMN IF EXISTS vector',
+]
+
+SENTENCIAS = {
+    'sqlite': (SQLITE_CREAR, SQLITE_ELIMINAR),
+    'postgresql': (POSTGRESQL_CREAR, POSTGRESQL_ELIMINAR),
+}
+
+
+def crear_indice(apps, schema_editor):
+    crear, _ = SENTENCIAS.get(schema_editor.connection.vendor, ([], []))
+    for sentencia in crear:
+        schema_editor.execute(sentencia)
+
+
+def eliminar_indice(apps, schema_editor):
+    _, eliminar = SENTENCIAS.get(schema_editor.connection.vendor, ([], []))
+    for sentencia in eliminar:
+        schema_editor.execute(sentencia)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('busqueda', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice, eliminar_indice),
+    ]
@@ -0,0 +1,57 @@
+from django.db import models
+
+
+class DocumentoBusqueda(models.Model):
+    """
+    Texto indexable de una clase, instructor o equipo.
+    
+    Es la tabla de contenido del índice invertido: en SQLite la indexa una
+    tabla virtual FTS5 mantenida por triggers y en PostgreSQL una columna
+    tsvector con índice GIN (ver migración 0002). Título y texto se guardan
+    en minúsculas y sin acentos; para mostrar se usa el objeto original.
+    """
+    
+    CLASE = 'clase'
+    INSTRUCTOR = 'instructor'
+    EQUIPO = 'equipo'
+    
+    TIPOS = [
+        (CLASE, 'Clase'),
+        (INSTRUCTOR, 'Instructor'),
+        (EQUIPO, 'Equipo'),
+    ]
+    
+    tipo = models.CharField(
+        max_length=20,
+        choices=TIPOS,
+        verbose_name='Tipo'
+    )
+    
+    objeto_id = models.PositiveBigIntegerField(
+        verbose_name='ID del Objeto'
+    )
+    
+    titulo = models.CharField(
+        max_length=255,
+        verbose_name='Título'
+    )
+    
+    texto = models.TextField(
+        blank=True,
+        verbose_name='Texto'
+    )
+    
+    fecha_actualizacion = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Fecha de Actualización'
+    )
+    
+    class Meta:
+        verbose_name = 'Documento de Búsqueda'
+        verbose_name_plural = 'Documentos de Búsqueda'
+        constraints = [
+            models.UniqueConstraint(fields=['tipo', 'objeto_id'], name='documento_tipo_objeto_unico'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_tipo_display()}: {self.titulo}"
@@ -0,0 +1,28 @@
+"""
+Serializers para los parámetros de la API de búsqueda.
+"""
+from rest_framework import serializers
+
+from .models import DocumentoBusqueda
+
+MAX_RESULTADOS = 50
+
+
+class BusquedaParametrosSerializer(serializers.Serializer):
+    """
+    Parámetros de la búsqueda global.
+    `tipo` acepta varios valores separados por coma.
+    """
+    q = serializers.CharField(max_length=200)
+    tipo = serializers.CharField(required=False)
+    limite = serializers.IntegerField(min_value=1, max_value=MAX_RESULTADOS, default=20)
+
+    def validate_tipo(self, valor):
+        tipos_validos = [tipo for tipo, _ in DocumentoBusqueda.TIPOS]
+        tipos = [tipo.strip() for tipo in valor.split(',') if tipo.strip()]
+        invalidos = [tipo for tipo in tipos if tipo not in tipos_validos]
+        if invalidos:
+            raise serializers.ValidationError(
+                f'Tipos inválidos: {", ".join(invalidos)}. Válidos: {", ".join(tipos_validos)}.'
+            )
+        return tipos
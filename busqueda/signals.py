@@ -0,0 +1,52 @@
+"""
+Señales que mantienen actualizado el índice de búsqueda.
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from clases.models import Clase
+from equipamiento.models import Equipo
+from usuarios.models import Usuario, Instructor
+from .models import DocumentoBusqueda
+from . import busqueda_service
+
+TIPOS_POR_MODELO = {
+    Clase: DocumentoBusqueda.CLASE,
+    Instructor: DocumentoBusqueda.INSTRUCTOR,
+    Equipo: DocumentoBusqueda.EQUIPO,
+}
+
+
+@receiver(post_save, sender=Clase)
+@receiver(post_save, sender=Instructor)
+@receiver(post_save, sender=Equipo)
+def indexar_objeto(sender, instance, raw=False, **kwargs):
+    """Reindexa el objeto guardado."""
+    if raw:
+        return
+    busqueda_service.indexar(TIPOS_POR_MODELO[sender], instance)
+
+
+@receiver(post_delete, sender=Clase)
+@receiver(post_delete, sender=Instructor)
+@receiver(post_delete, sender=Equipo)
+def quitar_objeto(sender, instance, **kwargs):
+    """Quita del índice el objeto eliminado."""
+    busqueda_service.eliminar(TIPOS_POR_MODELO[sender], instance.pk)
+
+
+@receiver(post_save, sender=Usuario)
+def reindexar_nombre_instructor(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    El nombre del instructor se indexa en su documento y en los de sus clases:
+    si cambia, se reindexan. Los guardados parciales sin el nombre
+    (p. ej. last_login) se ignoran.
+    """
+    if raw or (update_fields is not None and not {'first_name', 'last_name'} & set(update_fields)):
+        return
+    instructor = Instructor.objects.select_related('usuario').filter(usuario=instance).first()
+    if instructor is None:
+        return
+    busqueda_service.indexar(DocumentoBusqueda.INSTRUCTOR, instructor)
+    busqueda_service.indexar_objetos(
+        DocumentoBusqueda.CLASE, Clase.objects.para_listado().filter(instructor=instructor)
+    )
@@ -0,0 +1,159 @@
+"""
+Tests unitarios para la app de búsqueda.
+"""
+from datetime import date, timedelta, time
+
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from clases.models import Clase
+from equipamiento.models import Equipo
+from usuarios.models import Usuario, Instructor
+from . import busqueda_service
+from .models import DocumentoBusqueda
+
+
+class BusquedaTest(TestCase):
+    """Tests para el índice de texto completo y su API."""
+
+    def setUp(self):
+        """Crear instructor, clases y equipos (se indexan al guardarse)."""
+        self.socio = Usuario.objects.create_user(
+            username='socio_busqueda',
+            email='socio_busqueda@gimnasio.com',
+            password='SocioPass123!',
+            rol=Usuario.SOCIO,
+            estado_membresia=Usuario.ACTIVA
+        )
+        usuario_instructor = Usuario.objects.create_user(
+            username='instructora_busqueda',
+            email='instructora_busqueda@gimnasio.com',
+            password='InstPass123!',
+            first_name='Sofía',
+            last_name='Muñoz',
+            rol=Usuario.INSTRUCTOR
+        )
+        self.instructor = Instructor.objects.create(
+            usuario=usuario_instructor,
+            especialidades='Pilates, Yoga',
+            biografia='Especialista en rehabilitación y elongación.'
+        )
+        manana = date.today() + timedelta(days=1)
+        self.pilates = Clase.objects.create(
+            nombre='Pilates Básico',
+            tipo=Clase.PILATES,
+            descripcion='Trabajo de core y postura',
+            instructor=self.instructor,
+            fecha=manana,
+            hora_inicio=time(9, 0),
+            hora_fin=time(10, 0),
+            estado=Clase.ACTIVA
+        )
+        self.yoga = Clase.objects.create(
+            nombre='Yoga Restaurativo',
+            tipo=Clase.YOGA,
+            descripcion='Sesión suave, incluye ejercicios de pilates',
+            fecha=manana,
+            hora_inicio=time(11, 0),
+            hora_fin=time(12, 0),
+            estado=Clase.ACTIVA
+        )
+        self.bicicleta = Equipo.objects.create(
+            nombre='Bicicleta Estática',
+            categoria=Equipo.CARDIO,
+            marca='Schwinn',
+            ubicacion='Sala de Cardio'
+        )
+        self.api = APIClient()
+        self.api.force_authenticate(user=self.socio)
+
+    def test_normalizar_quita_acentos(self):
+        """Test: La normalización quita acentos y pasa a minúsculas."""
+        self.assertEqual(busqueda_service.normalizar('Elongación MÚSCULOS ñandú'), 'elongacion musculos nandu')
+
+    def test_busqueda_sin_acentos_y_por_prefijo(self):
+        """Test: 'elongacion' encuentra 'elongación' y 'estat' encuentra 'Estática'."""
+        ids = [i for i, _ in busqueda_service.buscar_ids(DocumentoBusqueda.INSTRUCTOR, 'elongacion')]
+        self.assertEqual(ids, [self.instructor.id])
+        ids = [i for i, _ in busqueda_service.buscar_ids(DocumentoBusqueda.EQUIPO, 'ESTAT schwinn')]
+        self.assertEqual(ids, [self.bicicleta.id])
+
+    def test_ranking_prioriza_titulo(self):
+        """Test: Una coincidencia en el nombre pesa más que en la descripción."""
+        respuesta = self.api.get('/api/clases/', {'search': 'pilates'})
+        self.assertEqual(respuesta.status_code, 200)
+        nombres = [clase['nombre'] for clase in respuesta.json()['results']]
+        self.assertEqual(nombres, ['Pilates Básico', 'Yoga Restaurativo'])
+
+    def test_indice_se_actualiza_al_guardar_y_eliminar(self):
+        """Test: Editar o eliminar un objeto actualiza el índice."""
+        self.bicicleta.nombre = 'Remo Concept2'
+        self.bicicleta.save()
+        self.assertEqual(busqueda_service.buscar_ids(DocumentoBusqueda.EQUIPO, 'bicicleta'), [])
+        self.assertEqual(len(busqueda_service.buscar_ids(DocumentoBusqueda.EQUIPO, 'remo')), 1)
+
+        self.bicicleta.delete()
+        self.assertEqual(busqueda_service.buscar_ids(DocumentoBusqueda.EQUIPO, 'remo'), [])
+
+    def test_cambio_de_nombre_de_instructor_reindexa_sus_clases(self):
+        """Test: El nombre del instructor se busca también en sus clases."""
+        usuario = self.instructor.usuario
+        usuario.last_name = 'Contreras'
+        usuario.save()
+        ids = [i for i, _ in busqueda_service.buscar_ids(DocumentoBusqueda.CLASE, 'contreras')]
+        self.assertEqual(ids, [self.pilates.id])
+
+    def test_busqueda_global_solo_visibles(self):
+        """Test: La búsqueda global combina tipos y omite clases canceladas."""
+        respuesta = self.api.get('/api/busqueda/', {'q': 'pilates'})
+        self.assertEqual(respuesta.status_code, 200)
+        encontrados = {(r['tipo'], r['id']) for r in respuesta.json()['resultados']}
+        self.assertEqual(encontrados, {
+            ('clase', self.pilates.id), ('clase', self.yoga.id), ('instructor', self.instructor.id),
+        })
+
+        self.yoga.estado = Clase.CANCELADA
+        self.yoga.save()
+        respuesta = self.api.get('/api/busqueda/', {'q': 'pilates', 'tipo': 'clase'})
+        self.assertEqual([r['id'] for r in respuesta.json()['resultados']], [self.pilates.id])
+
+    def test_clases_no_visibles_no_desplazan_a_las_visibles(self):
+        """Test: Muchas coincidencias canceladas no dejan fuera a las clases visibles."""
+        ayer = date.today() - timedelta(days=1)
+        Clase.objects.bulk_create([
+            Clase(
+                nombre='Pilates Pilates Pasado',
+                tipo=Clase.PILATES,
+                fecha=ayer,
+                hora_inicio=time(7, 0),
+                hora_fin=time(8, 0),
+                estado=Clase.CANCELADA
+            )
+            for _ in range(1100)
+        ])
+        busqueda_service.indexar_objetos(
+            DocumentoBusqueda.CLASE, Clase.objects.filter(estado=Clase.CANCELADA)
+        )
+
+        respuesta = self.api.get('/api/clases/', {'search': 'pilates', 'futuras': 'true'})
+        self.assertEqual(respuesta.status_code, 200)
+        nombres = [clase['nombre'] for clase in respuesta.json()['results']]
+        self.assertEqual(nombres, ['Pilates Básico', 'Yoga Restaurativo'])
+
+        respuesta = self.api.get('/api/busqueda/', {'q': 'pilates', 'tipo': 'clase'})
+        self.assertEqual(
+            [r['id'] for r in respuesta.json()['resultados']], [self.pilates.id, self.yoga.id]
+        )
+
+    def test_consulta_con_sintaxis_del_motor(self):
+        """Test: Comillas y operadores de la consulta no rompen la búsqueda."""
+        respuesta = self.api.get('/api/clases/', {'search': '"pilates" (básico* -'})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()['count'], 1)
+
+    def test_reconstruir_indice(self):
+        """Test: Reconstruir regenera los documentos de todos los tipos."""
+        DocumentoBusqueda.objects.all().delete()
+        indexados = busqueda_service.reconstruir()
+        self.assertEqual(indexados, {'clase': 2, 'instructor': 1, 'equipo': 1})
+        self.assertEqual(len(busqueda_service.buscar_ids(DocumentoBusqueda.CLASE, 'postura')), 1)
@@ -0,0 +1,27 @@
+"""
+Views para la API de búsqueda.
+"""
+from rest_framework import viewsets
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from . import busqueda_service
+from .serializers import BusquedaParametrosSerializer
+
+
+class BusquedaViewSet(viewsets.ViewSet):
+    """
+    Búsqueda de texto completo en clases, instructores y equipos.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def list(self, request):
+        """
+        GET /api/busqueda/?q=texto&tipo=clase,instructor,equipo&limite=20
+        """
+        parametros = BusquedaParametrosSerializer(data=request.query_params)
+        parametros.is_valid(raise_exception=True)
+        datos = parametros.validated_data
+
+        resultados = busqueda_service.buscar(datos['q'], datos.get('tipo'), datos['limite'])
+        return Response({'q': datos['q'], 'resultados': resultados})
@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Clase
+from .models import Clase, ClasePlantilla
+from . import plantilla_service
+from .signals import clases_modificadas
 
 
 @admin.register(Clase)
@@ -21,7 +23,7 @@ class ClaseAdmin(admin.ModelAdmin):
             'fields': ('fecha', 'hora_inicio', 'hora_fin')
         }),
         ('Cupos', {
-            'fields': ('cupos_totales', 'cupos_ocupados', 'permite_lista_espera')
+            'fields': ('cupos_totales', 'cupos_ocupados', 'permite_lista_espera', 'admision_en_cola')
         }),
         ('Estado', {
             'fields': ('estado',)
@@ -43,12 +45,53 @@ class ClaseAdmin(admin.ModelAdmin):
     
     def marcar_como_completada(self, request, queryset):
         """Marca las clases seleccionadas como completadas."""
+        clases = list(queryset.values_list('id', 'fecha'))
         updated = queryset.update(estado=Clase.COMPLETADA)
+        clases_modificadas.send(sender=Clase, clases=clases)
         self.message_user(request, f'{updated} clase(s) marcada(s) como completada(s).')
     marcar_como_completada.short_description = "Marcar como completada"
     
     def marcar_como_cancelada(self, request, queryset):
-        """Marca las clases seleccionadas como canceladas."""
-        updated = queryset.update(estado=Clase.CANCELADA)
-        self.message_user(request, f'{updated} clase(s) marcada(s) como cancelada(s).')
+        """
+        Cancela las clases seleccionadas junto con sus reservas y listas de
+        espera, y avisa a los socios (ver reservas.cancelacion_service).
+        """
+        from reservas.cancelacion_service import cancelar_clases
+        
+        resultado = cancelar_clases(queryset.values_list('id', flat=True))
+        self.message_user(
+            request,
+            f"{resultado['clases']} clase(s) cancelada(s): {resultado['reservas']} reserva(s) y "
+            f"{resultado['lista_espera']} entrada(s) de lista de espera canceladas."
+        )
     marcar_como_cancelada.short_description = "Marcar como cancelada"
+
+
+@admin.register(ClasePlantilla)
+class ClasePlantillaAdmin(admin.ModelAdmin):
+    """
+    Configuración del admin para plantillas de clases recurrentes.
+    """
+    list_display = ('nombre', 'tipo', 'dia_semana', 'hora_inicio', 'hora_fin', 'instructor', 'cupos_totales', 'vigente_desde', 'vigente_hasta', 'activa')
+    list_filter = ('tipo', 'dia_semana', 'activa')
+    search_fields = ('nombre', 'descripcion', 'instructor__usuario__first_name', 'instructor__usuario__last_name')
+    readonly_fields = ('fecha_creacion', 'fecha_actualizacion')
+    
+    actions = ['generar_proximas_semanas']
+    
+    def save_model(self, request, obj, form, change):
+        """Guarda la plantilla y propaga los cambios a sus clases futuras."""
+        super().save_model(request, obj, form, change)
+        if change:
+            actualizadas = plantilla_service.propagar_cambios(obj)
+            if actualizadas:
+                self.message_user(request, f'Cambios aplicados a {actualizadas} clase(s) futura(s).')
+    
+    def generar_proximas_semanas(self, request, queryset):
+        """Genera las clases de las plantillas seleccionadas."""
+        resultado = plantilla_service.materializar(queryset.select_related('instructor__usuario'))
+        self.message_user(
+            request,
+            f"{resultado['creadas']} clase(s) creada(s), {resultado['existentes']} ya existía(n)."
+        )
+    generar_proximas_semanas.short_description = f"Generar clases ({plantilla_service.SEMANAS_POR_DEFECTO} semanas)"
@@ -5,3 +5,7 @@ class ClasesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'clases'
     verbose_name = 'Clases'
+    
+    def ready(self):
+        """Importa señales cuando la app está lista."""
+        import clases.signals  # noqa: F401
@@ -0,0 +1,155 @@
+"""
+Agregados mensuales para la vista de calendario.
+
+Los totales de cada día (clases activas, cupos libres y cantidad por tipo) se
+calculan con una sola consulta agrupada por (fecha, tipo) y se guardan en
+caché por mes y versión del catálogo. Las marcas del socio (reservado / en
+lista de espera) salen de su agenda desnormalizada, y el calendario completo
+se guarda por (mes, versión del catálogo, socio, versión de la agenda): si
+nada cambió, responder cuesta solo leer la versión de la agenda.
+
+El detalle de un día (las clases en sí) se pide aparte, al abrir ese día.
+"""
+import calendar
+from datetime import date
+
+from django.core.cache import cache
+from django.db.models import Count, Sum
+
+from .models import Clase
+from . import catalogo_service
+
+DURACION_CACHE = 10 * 60
+
+
+def rango_mes(anio, mes):
+    """Primer y último día del mes."""
+    return date(anio, mes, 1), date(anio, mes, calendar.monthrange(anio, mes)[1])
+
+
+def _calcular_agregados(primer_dia, ultimo_dia):
+    dias = {}
+    filas = Clase.objects.filter(
+        fecha__range=(primer_dia, ultimo_dia), estado=Clase.ACTIVA
+    ).values('fecha', 'tipo').annotate(
+        total=Count('id'), libres=Sum('cupos_libres')
+    ).order_by()
+    for fila in filas:
+        dia = dias.setdefault(fila['fecha'].isoformat(), {'clases': 0, 'cupos_libres': 0, 'tipos': {}})
+        dia['clases'] += fila['total']
+        dia['cupos_libres'] += fila['libres'] or 0
+        dia['tipos'][fila['tipo']] = fila['total']
+    return dias
+
+
+def agregados_mes(anio, mes):
+    """
+    Totales por día de las clases activas del mes, comunes a todos los usuarios.
+
+    Returns:
+        dict: {fecha ISO: {'clases', 'cupos_libres', 'tipos': {tipo: cantidad}}},
+        solo los días con clases
+    """
+    clave = f'clases:calendario:{anio}-{mes:02d}:{catalogo_service.obtener_version()}'
+    dias = cache.get(clave)
+    if dias is None:
+        dias = _calcular_agregados(*rango_mes(anio, mes))
+        cache.set(clave, dias, DURACION_CACHE)
+    return dias
+
+
+def version_agenda(socio):
+    """
+    Versión de la agenda del socio (0 si no es socio). Si aún no tiene agenda
+    se arma completa, así el ETag ya corresponde a la agenda que se mostrará.
+    """
+    from reservas import agenda_service
+    from reservas.models import AgendaSocio
+    from usuarios.models import Usuario
+
+    if socio.rol != Usuario.SOCIO:
+        return 0
+    version = AgendaSocio.objects.filter(socio=socio).values_list('version', flat=True).first()
+    if version is None:
+        version = agenda_service.reconstruir_agenda(socio).version
+    return version
+
+
+def _marcas_socio(socio, primer_dia, ultimo_dia):
+    """Días del rango en que el socio tiene reservas o listas de espera, según su agenda."""
+    from reservas import agenda_service
+    from reservas.models import AgendaSocio
+
+    agenda = AgendaSocio.objects.filter(socio=socio).first()
+    if agenda is None:
+        agenda = agenda_service.reconstruir_agenda(socio)
+    desde, hasta = primer_dia.isoformat(), ultimo_dia.isoformat()
+    reservas, esperas = {}, {}
+    for items, marcas in ((agenda.reservas, reservas), (agenda.listas_espera, esperas)):
+        for item in items.values():
+            if desde <= item['fecha'] <= hasta:
+                marcas.setdefault(item['fecha'], []).append(item['clase_id'])
+    return reservas, esperas
+
+
+def etag_calendario(socio, anio, mes):
+    """ETag del calendario del socio: cambia con el catálogo o con su agenda."""
+    return (
+        f'"calendario-{anio}-{mes:02d}-{socio.id}-'
+        f'{catalogo_service.obtener_version()}-{version_agenda(socio)}"'
+    )
+
+
+def calendario(socio, anio, mes, etag=None):
+    """
+    Calendario del mes para un usuario: los totales de cada día con clases y,
+    para socios, si tiene reserva o está en lista de espera ese día.
+
+    Returns:
+        dict: 'mes' (AAAA-MM) y 'dias' ({fecha ISO: datos del día})
+    """
+    from usuarios.models import Usuario
+
+    etag = etag or etag_calendario(socio, anio, mes)
+    clave = f'clases:calendario:socio:{etag}'
+    datos = cache.get(clave)
+    if datos is not None:
+        return datos
+
+    primer_dia, ultimo_dia = rango_mes(anio, mes)
+    dias = {
+        fecha: {**totales, 'reservado': False, 'en_espera': False}
+        for fecha, totales in agregados_mes(anio, mes).items()
+    }
+    if socio.rol == Usuario.SOCIO:
+        reservas, esperas = _marcas_socio(socio, primer_dia, ultimo_dia)
+        for marcas, campo in ((reservas, 'reservado'), (esperas, 'en_espera')):
+            for fecha in marcas:
+                dia = dias.setdefault(fecha, {
+                    'clases': 0, 'cupos_libres': 0, 'tipos': {}, 'reservado': False, 'en_espera': False,
+                })
+                dia[campo] = True
+
+    datos = {'mes': f'{anio}-{mes:02d}', 'dias': dict(sorted(dias.items()))}
+    cache.set(clave, datos, DURACION_CACHE)
+    return datos
+
+
+def detalle_dia(socio, fecha):
+    """
+    Clases activas de un día y los IDs de las que el socio tiene reservadas o
+    en lista de espera.
+
+    Returns:
+        tuple: (QuerySet de clases, IDs reservadas, IDs en espera)
+    """
+    from usuarios.models import Usuario
+
+    clases = Clase.objects.para_listado().filter(
+        fecha=fecha, estado=Clase.ACTIVA
+    ).order_by('hora_inicio')
+    reservas, esperas = {}, {}
+    if socio.rol == Usuario.SOCIO:
+        reservas, esperas = _marcas_socio(socio, fecha, fecha)
+    clave = fecha.isoformat()
+    return clases, reservas.get(clave, []), esperas.get(clave, [])
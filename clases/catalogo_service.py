@@ -0,0 +1,80 @@
+"""
+Caché versionada del catálogo de clases (disponibles, próxima semana).
+
+El catálogo tiene un número de versión que se incrementa al guardar o borrar
+una clase y en cada cambio de cupos. Las respuestas se guardan ya
+renderizadas bajo una clave que incluye esa versión, y la versión forma el
+ETag: un cliente que repite la consulta con If-None-Match recibe 304 sin que
+se consulte ni se serialice el catálogo.
+
+La versión vive en la caché compartida entre procesos (ver CACHES en
+settings): los cambios de cupos hechos por el despachador, el consumidor de
+la cola, los crons o el worker de Celery también invalidan el catálogo que
+sirven los procesos web. Con Redis, una consulta repetida no toca la base;
+con la caché en base de datos (sin REDIS_URL) leer la versión y el catálogo
+guardado cuesta consultas a la tabla de caché, aunque no al catálogo.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+CLAVE_VERSION = 'clases:catalogo:version'
+
+# Respaldo para cambios que no pasan por las señales (p. ej. el nombre del instructor)
+DURACION_CACHE = 10 * 60
+
+
+def obtener_version():
+    """Versión actual del catálogo; se inicializa con la hora para no repetir ETags tras reiniciar."""
+    version = cache.get(CLAVE_VERSION)
+    if version is None:
+        cache.add(CLAVE_VERSION, int(time.time() * 1000), timeout=None)
+        version = cache.get(CLAVE_VERSION)
+    return version
+
+
+def _clave_version_usada(version):
+    return f'clases:catalogo:version_usada:{version}'
+
+
+def _incrementar_version():
+    try:
+        version = cache.incr(CLAVE_VERSION)
+        # incr no es atómico en todos los backends (DatabaseCache): si otro
+        # proceso llegó a la misma versión, se toma la siguiente para que el
+        # catálogo armado entre ambos cambios no quede vigente
+        while not cache.add(_clave_version_usada(version), True, DURACION_CACHE):
+            version = cache.incr(CLAVE_VERSION)
+    except ValueError:
+        obtener_version()
+
+
+def invalidar_catalogo():
+    """Incrementa la versión del catálogo al confirmar la transacción en curso."""
+    transaction.on_commit(_incrementar_version)
+
+
+def etag_catalogo(nombre, version, host):
+    """ETag de una vista del catálogo; depende del día porque el catálogo filtra por fecha."""
+    return f'"{nombre}-{host}-{timezone.localdate().isoformat()}-{version}"'
+
+
+def obtener_catalogo(nombre, host, construir):
+    """
+    Retorna (etag, contenido) de una vista del catálogo.
+
+    Args:
+        nombre: Identificador de la vista (p. ej. 'disponibles')
+        host: Host de la petición (las URLs de imágenes son absolutas)
+        construir: Función que retorna el contenido renderizado (bytes)
+    """
+    version = obtener_version()
+    etag = etag_catalogo(nombre, version, host)
+    clave = f'clases:catalogo:{etag}'
+    contenido = cache.get(clave)
+    if contenido is None:
+        contenido = construir()
+        cache.set(clave, contenido, DURACION_CACHE)
+    return etag, contenido
@@ -0,0 +1,176 @@
+"""
+Detección de choques de horario de instructores y socios.
+
+Dos clases chocan si son el mismo día y sus horarios se solapan
+(inicio_a < fin_b y inicio_b < fin_a). Las verificaciones puntuales recorren
+solo las clases del instructor (índice instructor, fecha, hora_inicio) o las
+reservas confirmadas del socio (índice socio, estado) en esa fecha. La
+verificación en bloque arma, con una sola consulta, un índice de intervalos
+por fecha y lo consulta con búsqueda binaria y el fin máximo de cada
+prefijo. La auditoría encuentra todos los pares solapados con un único
+self-join.
+"""
+import bisect
+from collections import defaultdict
+
+from django.db import connection
+from django.utils import timezone
+
+from .models import Clase
+
+
+def _solapadas(queryset, fecha, hora_inicio, hora_fin):
+    return queryset.filter(fecha=fecha, hora_inicio__lt=hora_fin, hora_fin__gt=hora_inicio)
+
+
+def choques_instructor(instructor_id, fecha, hora_inicio, hora_fin, excluir_id=None):
+    """Clases activas del instructor que se solapan con el horario dado."""
+    clases = _solapadas(
+        Clase.objects.filter(instructor_id=instructor_id, estado=Clase.ACTIVA),
+        fecha, hora_inicio, hora_fin
+    )
+    if excluir_id:
+        clases = clases.exclude(id=excluir_id)
+    return clases.order_by('hora_inicio')
+
+
+def choques_socio(socio_id, clase):
+    """Clases activas, solapadas con `clase`, en las que el socio tiene reserva confirmada."""
+    from reservas.models import Reserva
+
+    return _solapadas(
+        Clase.objects.filter(
+            estado=Clase.ACTIVA,
+            reservas__socio_id=socio_id,
+            reservas__estado=Reserva.CONFIRMADA,
+        ).exclude(id=clase.id),
+        clase.fecha, clase.hora_inicio, clase.hora_fin
+    ).order_by('hora_inicio')
+
+
+class IndiceIntervalos:
+    """
+    Intervalos (hora_inicio, hora_fin) agrupados por fecha y ordenados por
+    inicio, con el mayor hora_fin de cada prefijo. Los intervalos guardados
+    pueden solaparse entre sí (reservas antiguas), así que un intervalo largo
+    puede cubrir a otro que empieza mucho después: al buscar un choque se
+    retrocede mientras el fin máximo del prefijo supere el inicio buscado.
+    """
+
+    def __init__(self):
+        self.inicios = defaultdict(list)
+        self.intervalos = defaultdict(list)
+        self.fines_maximos = defaultdict(list)
+
+    def agregar(self, fecha, hora_inicio, hora_fin, valor):
+        posicion = bisect.bisect(self.inicios[fecha], hora_inicio)
+        self.inicios[fecha].insert(posicion, hora_inicio)
+        intervalos = self.intervalos[fecha]
+        intervalos.insert(posicion, (hora_inicio, hora_fin, valor))
+        fines_maximos = self.fines_maximos[fecha]
+        fines_maximos.insert(posicion, hora_fin)
+        for i in range(posicion, len(intervalos)):
+            fin = intervalos[i][1]
+            fines_maximos[i] = max(fin, fines_maximos[i - 1]) if i else fin
+
+    def choque(self, fecha, hora_inicio, hora_fin):
+        """Valor de un intervalo que se solapa con el dado, o None."""
+        intervalos = self.intervalos.get(fecha)
+        if not intervalos:
+            return None
+        fines_maximos = self.fines_maximos[fecha]
+        # Los intervalos antes de `posicion` empiezan antes de hora_fin
+        posicion = bisect.bisect_left(self.inicios[fecha], hora_fin) - 1
+        while posicion >= 0 and fines_maximos[posicion] > hora_inicio:
+            _, fin, valor = intervalos[posicion]
+            if fin > hora_inicio:
+                return valor
+            posicion -= 1
+        return None
+
+
+def choques_socio_en_bloque(socio_id, clases):
+    """
+    Para reservar varias clases a la vez: {clase_id: clase con la que choca}.
+
+    Una consulta trae las reservas confirmadas del socio en esas fechas; cada
+    clase elegida se agrega al índice para detectar también choques entre ellas.
+    """
+    from reservas.models import Reserva
+
+    indice = IndiceIntervalos()
+    existentes = Clase.objects.filter(
+        estado=Clase.ACTIVA,
+        fecha__in={clase.fecha for clase in clases},
+        reservas__socio_id=socio_id,
+        reservas__estado=Reserva.CONFIRMADA,
+    ).exclude(id__in=[clase.id for clase in clases])
+    for existente in existentes:
+        indice.agregar(existente.fecha, existente.hora_inicio, existente.hora_fin, existente)
+
+    choques = {}
+    for clase in clases:
+        choque = indice.choque(clase.fecha, clase.hora_inicio, clase.hora_fin)
+        if choque is not None:
+            choques[clase.id] = choque
+        else:
+            indice.agregar(clase.fecha, clase.hora_inicio, clase.hora_fin, clase)
+    return choques
+
+
+def describir(clase):
+    """Texto corto de una clase para los mensajes de error."""
+    return f"{clase.nombre} ({clase.hora_inicio:%H:%M}-{clase.hora_fin:%H:%M})"
+
+
+def _filas(sql, parametros, columnas):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, parametros)
+        return [dict(zip(columnas, fila)) for fila in cursor.fetchall()]
+
+
+COLUMNAS_AUDITORIA = ['fecha', 'clase_a', 'inicio_a', 'fin_a', 'clase_b', 'inicio_b', 'fin_b']
+
+
+def auditar(desde=None, hasta=None):
+    """
+    Todos los pares de clases activas solapadas de un mismo instructor y de
+    reservas confirmadas solapadas de un mismo socio, desde `desde`
+    (default: hoy) hasta `hasta` (opcional).
+
+    Returns:
+        dict: 'instructores' y 'socios', listas de pares con la fecha, ambas
+        clases y sus horarios (y el instructor_id o socio_id)
+    """
+    from reservas.models import Reserva
+
+    clase = Clase._meta.db_table
+    reserva = Reserva._meta.db_table
+    desde = desde or timezone.localdate()
+    filtro_fechas = 'a.fecha >= %s' + (' AND a.fecha <= %s' if hasta else '')
+    fechas = [desde] + ([hasta] if hasta else [])
+    solape = 'b.fecha = a.fecha AND b.hora_inicio < a.hora_fin AND a.hora_inicio < b.hora_fin'
+    seleccion = 'a.fecha, a.id, a.hora_inicio, a.hora_fin, b.id, b.hora_inicio, b.hora_fin'
+
+    instructores = _filas(
+        f'SELECT a.instructor_id, {seleccion} '
+        f'FROM {clase} a JOIN {clase} b '
+        f'ON b.instructor_id = a.instructor_id AND b.id > a.id AND {solape} '
+        f'WHERE a.estado = %s AND b.estado = %s AND {filtro_fechas} '
+        f'ORDER BY a.fecha, a.instructor_id, a.hora_inicio',
+        [Clase.ACTIVA, Clase.ACTIVA, *fechas],
+        ['instructor_id'] + COLUMNAS_AUDITORIA
+    )
+    socios = _filas(
+        f'SELECT ra.socio_id, {seleccion} '
+        f'FROM {reserva} ra '
+        f'JOIN {clase} a ON a.id = ra.clase_id '
+        f'JOIN {reserva} rb ON rb.socio_id = ra.socio_id AND rb.clase_id > ra.clase_id '
+        f'JOIN {clase} b ON b.id = rb.clase_id AND {solape} '
+        f'WHERE ra.estado = %s AND rb.estado = %s AND a.estado = %s AND b.estado = %s '
+        f'AND {filtro_fechas} '
+        f'ORDER BY a.fecha, ra.socio_id, a.hora_inicio',
+        [Reserva.CONFIRMADA, Reserva.CONFIRMADA, Clase.ACTIVA, Clase.ACTIVA, *fechas],
+        ['socio_id'] + COLUMNAS_AUDITORIA
+    )
+    return {'instructores': instructores, 'socios': socios}
@@ -0,0 +1,165 @@
+"""
+Snapshot compacto de cupos para consultas frecuentes (badges de "N cupos").
+
+Los cupos se guardan en caché por día: {clase_id: [ocupados, totales, estado]},
+junto con la versión leída antes de consultarlos. Cada cambio de cupos o de
+una clase, al confirmarse la transacción:
+
+1. incrementa la versión global de cupos,
+2. guarda bajo esa versión la lista de clases cambiadas,
+3. anota esa versión como último cambio de cada día afectado y
+4. borra el snapshot de esos días (se reconstruye con una consulta por
+   índice de fecha la próxima vez que se pida).
+
+Una lectura que consultó la base antes del cambio puede volver a guardar el
+snapshot viejo después del borrado; como su versión es anterior al último
+cambio del día, se descarta y se reconstruye.
+
+Un cliente que envía since_version recibe solo las clases cambiadas desde
+esa versión. Si la consulta es muy antigua o se perdió parte del registro,
+recibe el snapshot completo (completo=True) y vuelve a empezar desde ahí.
+
+La versión y el registro de cambios viven en la caché compartida
+(settings.CACHES): todos los procesos del servidor ven la misma versión.
+"""
+import time
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Clase
+
+CLAVE_VERSION = 'clases:cupos:version'
+
+DURACION_DIA = 60
+
+# Tiempo que se conservan los cambios de cada versión para los deltas
+DURACION_CAMBIOS = 60 * 60
+
+# Versiones máximas a recorrer en un delta antes de enviar el snapshot completo
+MAX_VERSIONES_DELTA = 500
+
+
+def _clave_dia(fecha):
+    return f'clases:cupos:snapshot:{fecha}'
+
+
+def _clave_ultimo_cambio(fecha):
+    return f'clases:cupos:ultimo_cambio:{fecha}'
+
+
+def _clave_cambios(version):
+    return f'clases:cupos:cambios:{version}'
+
+
+def obtener_version():
+    """Versión actual; se inicializa con la hora para que nunca retroceda tras reiniciar."""
+    version = cache.get(CLAVE_VERSION)
+    if version is None:
+        cache.add(CLAVE_VERSION, int(time.time() * 1000), timeout=None)
+        version = cache.get(CLAVE_VERSION)
+    return version
+
+
+def registrar_cambios(clases):
+    """
+    Publica cambios de cupos al confirmar la transacción en curso.
+
+    Args:
+        clases: Pares (clase_id, fecha) de las clases modificadas
+    """
+    cambios = [(clase_id, fecha.isoformat()) for clase_id, fecha in clases]
+    if cambios:
+        transaction.on_commit(lambda: _publicar(cambios))
+
+
+def _publicar(cambios):
+    fechas = {fecha for _, fecha in cambios}
+    obtener_version()
+    try:
+        version = cache.incr(CLAVE_VERSION)
+        # incr no es atómico en todos los backends (DatabaseCache): si otro
+        # proceso ya ocupó esta versión, se toma la siguiente en vez de pisarla
+        while not cache.add(_clave_cambios(version), cambios, DURACION_CAMBIOS):
+            version = cache.incr(CLAVE_VERSION)
+    except ValueError:
+        cache.delete_many([_clave_dia(fecha) for fecha in fechas])
+        return
+    cache.set_many({_clave_ultimo_cambio(fecha): version for fecha in fechas}, DURACION_CAMBIOS)
+    cache.delete_many([_clave_dia(fecha) for fecha in fechas])
+
+
+def _dias(fechas, version):
+    """
+    Snapshot de cada día pedido; los que no están en caché, o se armaron antes
+    del último cambio del día, se leen en una consulta.
+
+    Args:
+        version: Versión leída antes de esta llamada; se guarda con los días leídos
+    """
+    claves = {fecha: _clave_dia(fecha) for fecha in fechas}
+    claves_cambio = {fecha: _clave_ultimo_cambio(fecha) for fecha in fechas}
+    en_cache = cache.get_many([*claves.values(), *claves_cambio.values()])
+    dias = {}
+    for fecha, clave in claves.items():
+        guardado = en_cache.get(clave)
+        if guardado is not None and guardado['version'] >= en_cache.get(claves_cambio[fecha], 0):
+            dias[fecha] = guardado['cupos']
+
+    faltantes = [fecha for fecha in fechas if fecha not in dias]
+    if faltantes:
+        nuevos = {fecha: {} for fecha in faltantes}
+        filas = Clase.objects.filter(fecha__in=faltantes).values_list(
+            'id', 'fecha', 'cupos_ocupados', 'cupos_totales', 'estado'
+        ).order_by()
+        for clase_id, fecha, ocupados, totales, estado in filas:
+            nuevos[fecha.isoformat()][clase_id] = [ocupados, totales, estado]
+        cache.set_many(
+            {_clave_dia(fecha): {'version': version, 'cupos': cupos} for fecha, cupos in nuevos.items()},
+            DURACION_DIA
+        )
+        dias.update(nuevos)
+    return dias
+
+
+def _cambios_desde(version_cliente, version):
+    """Pares (clase_id, fecha) cambiados después de version_cliente, o None si no se puede saber."""
+    if not 0 <= version - version_cliente <= MAX_VERSIONES_DELTA:
+        return None
+    claves = [_clave_cambios(v) for v in range(version_cliente + 1, version + 1)]
+    registros = cache.get_many(claves)
+    if len(registros) != len(claves):
+        return None
+    return [cambio for registro in registros.values() for cambio in registro]
+
+
+def snapshot(desde, hasta, since_version=None):
+    """
+    Cupos de las clases entre desde y hasta (inclusive).
+
+    Returns:
+        dict: version, completo y clases ({clase_id: [ocupados, totales, estado]}).
+        En un delta, una clase con valor None salió del rango o fue eliminada.
+    """
+    # La versión se lee antes que los datos: lo que cambie después llega en el próximo delta
+    version = obtener_version()
+    rango = [(desde + timedelta(days=dias)).isoformat() for dias in range((hasta - desde).days + 1)]
+
+    cambios = _cambios_desde(since_version, version) if since_version is not None else None
+    if cambios is None:
+        clases = {}
+        for cupos in _dias(rango, version).values():
+            clases.update(cupos)
+        return {'version': version, 'completo': True, 'clases': clases}
+
+    primer_dia, ultimo_dia = rango[0], rango[-1]
+    fechas = {fecha for _, fecha in cambios if primer_dia <= fecha <= ultimo_dia}
+    vigentes = {}
+    for cupos in _dias(sorted(fechas), version).values():
+        vigentes.update(cupos)
+    clases = {
+        clase_id: vigentes.get(clase_id)
+        for clase_id, fecha in cambios if primer_dia <= fecha <= ultimo_dia
+    }
+    return {'version': version, 'completo': False, 'clases': clases}
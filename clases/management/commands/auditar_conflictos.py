@@ -0,0 +1,60 @@
+"""
+Reporta los choques de horario existentes: instructores con dos clases activas
+solapadas y socios con reservas confirmadas en clases solapadas.
+
+Las validaciones de creación y reserva impiden nuevos choques, pero no los
+que ya existían ni los que entran por carga masiva (plantillas, admin). Todos
+los pares se obtienen con una consulta por tipo, así que puede ejecutarse a
+diario (cron).
+
+Uso:
+    python manage.py auditar_conflictos
+    python manage.py auditar_conflictos --desde=2026-03-01 --hasta=2026-03-31
+"""
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from clases import conflictos_service
+
+
+def _fecha(valor, opcion):
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f'{opcion} debe tener formato AAAA-MM-DD')
+
+
+class Command(BaseCommand):
+    help = 'Reporta los choques de horario de instructores y socios'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--desde',
+            help='Primer día a revisar (AAAA-MM-DD, default: hoy)'
+        )
+        parser.add_argument(
+            '--hasta',
+            help='Último día a revisar (AAAA-MM-DD, default: sin límite)'
+        )
+
+    def handle(self, *args, **options):
+        desde = _fecha(options['desde'], '--desde') if options['desde'] else None
+        hasta = _fecha(options['hasta'], '--hasta') if options['hasta'] else None
+
+        resultado = conflictos_service.auditar(desde=desde, hasta=hasta)
+        grupos = [('instructores', 'Instructor', 'instructor_id'), ('socios', 'Socio', 'socio_id')]
+        for grupo, titulo, clave in grupos:
+            for choque in resultado[grupo]:
+                self.stdout.write(
+                    f"{titulo} {choque[clave]} - {choque['fecha']}: "
+                    f"clase {choque['clase_a']} ({choque['inicio_a']}-{choque['fin_a']}) y "
+                    f"clase {choque['clase_b']} ({choque['inicio_b']}-{choque['fin_b']})"
+                )
+
+        total = len(resultado['instructores']) + len(resultado['socios'])
+        estilo = self.style.WARNING if total else self.style.SUCCESS
+        self.stdout.write(estilo(
+            f"{len(resultado['instructores'])} choques de instructores, "
+            f"{len(resultado['socios'])} choques de socios."
+        ))
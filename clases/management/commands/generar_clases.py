@@ -0,0 +1,49 @@
+"""
+Genera las clases de las plantillas recurrentes activas para las próximas semanas.
+
+Es idempotente: las clases ya generadas se omiten, así que puede programarse
+cada semana (cron) para mantener siempre N semanas de horario publicado.
+
+Uso:
+    python manage.py generar_clases
+    python manage.py generar_clases --semanas=12
+    python manage.py generar_clases --desde=2026-03-02 --semanas=16
+"""
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from clases import plantilla_service
+
+
+class Command(BaseCommand):
+    help = 'Genera en bloque las clases de las plantillas recurrentes activas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--semanas',
+            type=int,
+            default=plantilla_service.SEMANAS_POR_DEFECTO,
+            help=f'Semanas a generar (default: {plantilla_service.SEMANAS_POR_DEFECTO})'
+        )
+        parser.add_argument(
+            '--desde',
+            help='Primer día a generar (AAAA-MM-DD, default: hoy)'
+        )
+
+    def handle(self, *args, **options):
+        semanas = options['semanas']
+        if not 1 <= semanas <= plantilla_service.MAX_SEMANAS:
+            raise CommandError(f'--semanas debe estar entre 1 y {plantilla_service.MAX_SEMANAS}')
+        desde = None
+        if options['desde']:
+            try:
+                desde = datetime.strptime(options['desde'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('--desde debe tener formato AAAA-MM-DD')
+
+        resultado = plantilla_service.materializar(semanas=semanas, desde=desde)
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado['plantillas']} plantillas: {resultado['creadas']} clases creadas, "
+            f"{resultado['existentes']} ya existían."
+        ))
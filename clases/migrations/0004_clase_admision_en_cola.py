@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clases', '0003_add_imagen_clase'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clase',
+            name='admision_en_cola',
+            field=models.BooleanField(default=False, help_text='Encola las reservas y las otorga en orden de llegada (clases muy demandadas)', verbose_name='Admisión en Cola'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:21
+
+import django.db.models.expressions
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clases', '0004_clase_admision_en_cola'),
+        ('usuarios', '0002_instructor_certificaciones'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clase',
+            name='cupos_libres',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(models.F('cupos_totales'), '-', models.F('cupos_ocupados')), output_field=models.IntegerField(), verbose_name='Cupos Libres'),
+        ),
+        migrations.AddField(
+            model_name='clase',
+            name='ocupacion',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.comparison.Coalesce(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.Cast('cupos_ocupados', models.FloatField()), '*', models.Value(100)), '/', django.db.models.functions.comparison.NullIf('cupos_totales', 0)), 0.0, output_field=models.FloatField()), output_field=models.FloatField(), verbose_name='Ocupación (%)'),
+        ),
+        migrations.AddIndex(
+            model_name='clase',
+            index=models.Index(fields=['estado', 'cupos_libres'], name='clase_estado_libres_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='clase',
+            index=models.Index(fields=['estado', 'ocupacion'], name='clase_estado_ocupacion_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:27
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clases', '0005_clase_columnas_disponibilidad'),
+        ('usuarios', '0002_instructor_certificaciones'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClasePlantilla',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=100, verbose_name='Nombre de la Clase')),
+                ('tipo', models.CharField(choices=[('spinning', 'Spinning'), ('yoga', 'Yoga'), ('pilates', 'Pilates'), ('musculacion', 'Musculación'), ('cardio', 'Cardio')], max_length=20, verbose_name='Tipo de Clase')),
+                ('descripcion', models.TextField(blank=True, verbose_name='Descripción')),
+                ('dia_semana', models.PositiveSmallIntegerField(choices=[(0, 'Lunes'), (1, 'Martes'), (2, 'Miércoles'), (3, 'Jueves'), (4, 'Viernes'), (5, 'Sábado'), (6, 'Domingo')], verbose_name='Día de la Semana')),
+                ('hora_inicio', models.TimeField(verbose_name='Hora de Inicio')),
+                ('hora_fin', models.TimeField(verbose_name='Hora de Fin')),
+                ('vigente_desde', models.DateField(verbose_name='Vigente Desde')),
+                ('vigente_hasta', models.DateField(blank=True, help_text='Vacío: sin fecha de término', null=True, verbose_name='Vigente Hasta')),
+                ('cupos_totales', models.IntegerField(default=20, validators=[django.core.validators.MinValueValidator(1)], verbose_name='Cupos Totales')),
+                ('permite_lista_espera', models.BooleanField(default=True, verbose_name='Permite Lista de Espera')),
+                ('admision_en_cola', models.BooleanField(default=False, verbose_name='Admisión en Cola')),
+                ('activa', models.BooleanField(default=True, help_text='Las plantillas inactivas no generan clases nuevas', verbose_name='Activa')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Fecha de Actualización')),
+                ('instructor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='plantillas', to='usuarios.instructor', verbose_name='Instructor')),
+            ],
+            options={
+                'verbose_name': 'Plantilla de Clase',
+                'verbose_name_plural': 'Plantillas de Clases',
+                'ordering': ['dia_semana', 'hora_inicio'],
+            },
+        ),
+        migrations.AddField(
+            model_name='clase',
+            name='plantilla',
+            field=models.ForeignKey(blank=True, help_text='Plantilla recurrente que generó esta clase', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='clases', to='clases.claseplantilla', verbose_name='Plantilla'),
+        ),
+        migrations.AddConstraint(
+            model_name='clase',
+            constraint=models.UniqueConstraint(fields=('plantilla', 'fecha'), name='clase_plantilla_fecha_unica'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clases', '0006_claseplantilla'),
+        ('usuarios', '0002_instructor_certificaciones'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='clase',
+            index=models.Index(fields=['instructor', 'fecha', 'hora_inicio'], name='clase_instructor_horario_idx'),
+        ),
+    ]
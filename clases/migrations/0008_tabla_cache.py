@@ -0,0 +1,22 @@
+"""
+Crea la tabla de la caché compartida (settings.CACHES) si se usa la caché de
+base de datos, para que `migrate` baste al desplegar. Con Redis o en memoria
+no hace nada.
+"""
+from django.core.management import call_command
+from django.db import migrations
+
+
+def crear_tabla_cache(apps, schema_editor):
+    call_command('createcachetable', database=schema_editor.connection.alias, verbosity=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clases', '0007_clase_indice_horario_instructor'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_tabla_cache, migrations.RunPython.noop),
+    ]
@@ -1,10 +1,29 @@
 from django.db import models
+from django.db.models.functions import Cast, Coalesce, NullIf
 from django.core.validators import MinValueValidator
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from usuarios.models import Instructor
 
 
+class ClaseQuerySet(models.QuerySet):
+    """QuerySet con las optimizaciones usadas por los listados de clases."""
+    
+    def para_listado(self):
+        """Trae el instructor y su usuario en la misma consulta (ClaseSerializer)."""
+        return self.select_related('instructor__usuario')
+    
+    def con_disponibilidad(self):
+        """
+        Permite ordenar y filtrar por `cupos_disponibles` y `porcentaje_ocupacion`
+        (los nombres de la API) sobre las columnas calculadas e indexadas.
+        """
+        return self.alias(
+            cupos_disponibles=models.F('cupos_libres'),
+            porcentaje_ocupacion=models.F('ocupacion'),
+        )
+
+
 class Clase(models.Model):
     """
     Modelo para representar una clase del gimnasio.
@@ -94,6 +113,27 @@ class Clase(models.Model):
         verbose_name='Cupos Ocupados'
     )
     
+    # Columnas calculadas por la base de datos (ordenar y filtrar en SQL).
+    # En Python se usan las propiedades cupos_disponibles/porcentaje_ocupacion,
+    # que siguen siendo correctas en instancias sin guardar o recién modificadas.
+    cupos_libres = models.GeneratedField(
+        expression=models.F('cupos_totales') - models.F('cupos_ocupados'),
+        output_field=models.IntegerField(),
+        db_persist=True,
+        verbose_name='Cupos Libres'
+    )
+    
+    ocupacion = models.GeneratedField(
+        expression=Coalesce(
+            Cast('cupos_ocupados', models.FloatField()) * 100 / NullIf('cupos_totales', 0),
+            0.0,
+            output_field=models.FloatField()
+        ),
+        output_field=models.FloatField(),
+        db_persist=True,
+        verbose_name='Ocupación (%)'
+    )
+    
     # Estado
     estado = models.CharField(
         max_length=20,
@@ -108,6 +148,22 @@ class Clase(models.Model):
         verbose_name='Permite Lista de Espera'
     )
     
+    admision_en_cola = models.BooleanField(
+        default=False,
+        verbose_name='Admisión en Cola',
+        help_text='Encola las reservas y las otorga en orden de llegada (clases muy demandadas)'
+    )
+    
+    plantilla = models.ForeignKey(
+        'ClasePlantilla',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='clases',
+        verbose_name='Plantilla',
+        help_text='Plantilla recurrente que generó esta clase'
+    )
+    
     # Metadatos
     fecha_creacion = models.DateTimeField(
         auto_now_add=True,
@@ -119,6 +175,8 @@ class Clase(models.Model):
         verbose_name='Fecha de Actualización'
     )
     
+    objects = ClaseQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Clase'
         verbose_name_plural = 'Clases'
@@ -126,19 +184,46 @@ class Clase(models.Model):
         indexes = [
             models.Index(fields=['fecha', 'tipo']),
             models.Index(fields=['estado']),
+            models.Index(fields=['estado', 'cupos_libres'], name='clase_estado_libres_idx'),
+            models.Index(fields=['estado', 'ocupacion'], name='clase_estado_ocupacion_idx'),
+            # Choques de horario: clases de un instructor en un día, por hora
+            models.Index(fields=['instructor', 'fecha', 'hora_inicio'], name='clase_instructor_horario_idx'),
+        ]
+        constraints = [
+            # Una ocurrencia por plantilla y fecha: materializar es idempotente
+            models.UniqueConstraint(fields=['plantilla', 'fecha'], name='clase_plantilla_fecha_unica'),
         ]
     
     def __str__(self):
         return f"{self.nombre} - {self.get_tipo_display()} ({self.fecha} {self.hora_inicio})"
     
     def clean(self):
-        """Valida que la hora de fin sea posterior a la hora de inicio."""
+        """
+        Valida que la hora de fin sea posterior a la hora de inicio y que el
+        instructor no tenga otra clase activa en ese horario.
+        """
         super().clean()
         if self.hora_inicio and self.hora_fin:
             if self.hora_fin <= self.hora_inicio:
                 raise ValidationError({
                     'hora_fin': 'La hora de fin debe ser posterior a la hora de inicio.'
                 })
+            error = self.error_choque_instructor()
+            if error:
+                raise ValidationError({'hora_inicio': error})
+    
+    def error_choque_instructor(self):
+        """Mensaje si el instructor ya tiene una clase activa que se solapa; None si no."""
+        from .conflictos_service import choques_instructor, describir
+        
+        if self.estado != self.ACTIVA or not self.instructor_id or not self.fecha:
+            return None
+        choque = choques_instructor(
+            self.instructor_id, self.fecha, self.hora_inicio, self.hora_fin, excluir_id=self.pk
+        ).first()
+        if choque:
+            return f"El instructor ya tiene la clase {describir(choque)} en ese horario."
+        return None
     
     @property
     def cupos_disponibles(self):
@@ -158,20 +243,43 @@ class Clase(models.Model):
         return (self.cupos_ocupados / self.cupos_totales) * 100
     
     def incrementar_cupo(self):
-        """Incrementa el contador de cupos ocupados."""
-        if not self.esta_llena:
-            self.cupos_ocupados += 1
-            self.save()
-            return True
-        return False
+        """
+        Ocupa un cupo de forma atómica.
+        
+        Usa un UPDATE condicional (cupos_ocupados < cupos_totales) en vez de
+        leer-modificar-guardar, así dos reservas concurrentes nunca pueden
+        sobrevender la clase aunque ambas partan de una instancia desactualizada.
+        """
+        actualizadas = Clase.objects.filter(
+            pk=self.pk,
+            cupos_ocupados__lt=models.F('cupos_totales')
+        ).update(
+            cupos_ocupados=models.F('cupos_ocupados') + 1,
+            fecha_actualizacion=timezone.now()
+        )
+        self.refresh_from_db(fields=['cupos_ocupados', 'cupos_totales', 'cupos_libres', 'ocupacion', 'fecha_actualizacion'])
+        if actualizadas:
+            self.notificar_cambio_cupos()
+        return actualizadas == 1
     
     def liberar_cupo(self):
-        """Libera un cupo ocupado."""
-        if self.cupos_ocupados > 0:
-            self.cupos_ocupados -= 1
-            self.save()
-            return True
-        return False
+        """Libera un cupo ocupado de forma atómica."""
+        actualizadas = Clase.objects.filter(
+            pk=self.pk,
+            cupos_ocupados__gt=0
+        ).update(
+            cupos_ocupados=models.F('cupos_ocupados') - 1,
+            fecha_actualizacion=timezone.now()
+        )
+        self.refresh_from_db(fields=['cupos_ocupados', 'cupos_totales', 'cupos_libres', 'ocupacion', 'fecha_actualizacion'])
+        if actualizadas:
+            self.notificar_cambio_cupos()
+        return actualizadas == 1
+    
+    def notificar_cambio_cupos(self):
+        """Emite clases_modificadas: update() no dispara post_save."""
+        from .signals import clases_modificadas
+        clases_modificadas.send(sender=Clase, clases=[(self.pk, self.fecha)], solo_cupos=True)
     
     def puede_reservar(self):
         """Verifica si se puede reservar en esta clase."""
@@ -180,3 +288,136 @@ class Clase(models.Model):
             not self.esta_llena and
             self.fecha >= timezone.now().date()
         )
+
+
+class ClasePlantilla(models.Model):
+    """
+    Clase recurrente semanal: mismo día, horario, tipo, instructor y cupos
+    durante su período de vigencia.
+    
+    Las clases concretas se generan por adelantado con plantilla_service
+    (una fila de Clase por semana) y los cambios en la plantilla se propagan
+    a sus ocurrencias futuras.
+    """
+    
+    LUNES = 0
+    MARTES = 1
+    MIERCOLES = 2
+    JUEVES = 3
+    VIERNES = 4
+    SABADO = 5
+    DOMINGO = 6
+    
+    DIAS_SEMANA = [
+        (LUNES, 'Lunes'),
+        (MARTES, 'Martes'),
+        (MIERCOLES, 'Miércoles'),
+        (JUEVES, 'Jueves'),
+        (VIERNES, 'Viernes'),
+        (SABADO, 'Sábado'),
+        (DOMINGO, 'Domingo'),
+    ]
+    
+    nombre = models.CharField(
+        max_length=100,
+        verbose_name='Nombre de la Clase'
+    )
+    
+    tipo = models.CharField(
+        max_length=20,
+        choices=Clase.TIPOS_CLASE,
+        verbose_name='Tipo de Clase'
+    )
+    
+    descripcion = models.TextField(
+        blank=True,
+        verbose_name='Descripción'
+    )
+    
+    instructor = models.ForeignKey(
+        Instructor,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='plantillas',
+        verbose_name='Instructor'
+    )
+    
+    # Recurrencia
+    dia_semana = models.PositiveSmallIntegerField(
+        choices=DIAS_SEMANA,
+        verbose_name='Día de la Semana'
+    )
+    
+    hora_inicio = models.TimeField(
+        verbose_name='Hora de Inicio'
+    )
+    
+    hora_fin = models.TimeField(
+        verbose_name='Hora de Fin'
+    )
+    
+    vigente_desde = models.DateField(
+        verbose_name='Vigente Desde'
+    )
+    
+    vigente_hasta = models.DateField(
+        null=True,
+        blank=True,
+        verbose_name='Vigente Hasta',
+        help_text='Vacío: sin fecha de término'
+    )
+    
+    # Configuración de las clases generadas
+    cupos_totales = models.IntegerField(
+        validators=[MinValueValidator(1)],
+        default=20,
+        verbose_name='Cupos Totales'
+    )
+    
+    permite_lista_espera = models.BooleanField(
+        default=True,
+        verbose_name='Permite Lista de Espera'
+    )
+    
+    admision_en_cola = models.BooleanField(
+        default=False,
+        verbose_name='Admisión en Cola'
+    )
+    
+    activa = models.BooleanField(
+        default=True,
+        verbose_name='Activa',
+        help_text='Las plantillas inactivas no generan clases nuevas'
+    )
+    
+    # Metadatos
+    fecha_creacion = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Fecha de Creación'
+    )
+    
+    fecha_actualizacion = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Fecha de Actualización'
+    )
+    
+    class Meta:
+        verbose_name = 'Plantilla de Clase'
+        verbose_name_plural = 'Plantillas de Clases'
+        ordering = ['dia_semana', 'hora_inicio']
+    
+    def __str__(self):
+        return f"{self.nombre} - {self.get_dia_semana_display()} {self.hora_inicio}"
+    
+    def clean(self):
+        """Valida el horario y el período de vigencia."""
+        super().clean()
+        if self.hora_inicio and self.hora_fin and self.hora_fin <= self.hora_inicio:
+            raise ValidationError({
+                'hora_fin': 'La hora de fin debe ser posterior a la hora de inicio.'
+            })
+        if self.vigente_desde and self.vigente_hasta and self.vigente_hasta < self.vigente_desde:
+            raise ValidationError({
+                'vigente_hasta': 'La vigencia no puede terminar antes de comenzar.'
+            })
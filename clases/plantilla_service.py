@@ -0,0 +1,165 @@
+"""
+Servicio de plantillas de clases recurrentes.
+
+materializar() genera de una vez las clases de las próximas N semanas con
+bulk_create. Las ocurrencias ya existentes (incluidas las canceladas) se
+detectan con una sola consulta por (plantilla, fecha) y se omiten, así que
+el proceso es idempotente. Si otra ejecución concurrente inserta alguna de
+las mismas ocurrencias, la restricción única (plantilla, fecha) de Clase
+rechaza el lote y se vuelve a calcular qué falta.
+
+propagar_cambios() aplica la edición de una plantilla a sus ocurrencias
+futuras activas con bulk_update.
+"""
+import logging
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Clase, ClasePlantilla
+from .signals import clases_modificadas
+
+logger = logging.getLogger('clases')
+
+SEMANAS_POR_DEFECTO = 4
+MAX_SEMANAS = 52
+LOTE = 500
+
+# Intentos ante otra materialización que inserta las mismas ocurrencias
+MAX_INTENTOS = 3
+
+# Campos de la plantilla que se copian a cada clase generada
+CAMPOS_COPIADOS = [
+    'nombre', 'tipo', 'descripcion', 'instructor', 'hora_inicio', 'hora_fin',
+    'cupos_totales', 'permite_lista_espera', 'admision_en_cola',
+]
+
+
+def fechas_ocurrencias(plantilla, desde, hasta):
+    """Fechas entre desde y hasta (inclusive) en que corresponde la plantilla."""
+    inicio = max(desde, plantilla.vigente_desde)
+    fin = min(hasta, plantilla.vigente_hasta) if plantilla.vigente_hasta else hasta
+    fecha = inicio + timedelta(days=(plantilla.dia_semana - inicio.weekday()) % 7)
+    fechas = []
+    while fecha <= fin:
+        fechas.append(fecha)
+        fecha += timedelta(weeks=1)
+    return fechas
+
+
+def _copiar_campos(plantilla, clase):
+    for campo in CAMPOS_COPIADOS:
+        setattr(clase, campo, getattr(plantilla, campo))
+
+
+def _cambios_en_bloque(clases):
+    """bulk_create/bulk_update no emiten señales: índice de búsqueda, catálogo y reportes."""
+    from busqueda import busqueda_service
+    from busqueda.models import DocumentoBusqueda
+
+    busqueda_service.indexar_objetos(DocumentoBusqueda.CLASE, clases)
+    clases_modificadas.send(sender=Clase, clases=[(clase.pk, clase.fecha) for clase in clases])
+
+
+def _ocurrencias_nuevas(plantillas, desde, hasta):
+    """Clases sin guardar de las ocurrencias que aún no existen, y cuántas ya existían."""
+    existentes = set(
+        Clase.objects.filter(
+            plantilla__in=plantillas, fecha__range=(desde, hasta)
+        ).values_list('plantilla_id', 'fecha')
+    )
+
+    nuevas = []
+    omitidas = 0
+    for plantilla in plantillas:
+        for fecha in fechas_ocurrencias(plantilla, desde, hasta):
+            if (plantilla.id, fecha) in existentes:
+                omitidas += 1
+                continue
+            clase = Clase(plantilla=plantilla, fecha=fecha, estado=Clase.ACTIVA)
+            _copiar_campos(plantilla, clase)
+            nuevas.append(clase)
+    return nuevas, omitidas
+
+
+def materializar(plantillas=None, semanas=SEMANAS_POR_DEFECTO, desde=None):
+    """
+    Genera las clases de las plantillas activas para las próximas `semanas`.
+
+    Args:
+        plantillas: Plantillas a materializar (default: todas las activas)
+        semanas: Semanas a generar desde `desde`
+        desde: Primer día a generar (default: hoy)
+
+    Returns:
+        dict: Plantillas procesadas, clases creadas y ocurrencias que ya existían
+    """
+    desde = desde or timezone.localdate()
+    hasta = desde + timedelta(weeks=semanas, days=-1)
+    if plantillas is None:
+        plantillas = ClasePlantilla.objects.select_related('instructor__usuario').filter(activa=True)
+    plantillas = [plantilla for plantilla in plantillas if plantilla.activa]
+
+    for intento in range(1, MAX_INTENTOS + 1):
+        nuevas, omitidas = _ocurrencias_nuevas(plantillas, desde, hasta)
+        if not nuevas:
+            break
+        try:
+            with transaction.atomic():
+                Clase.objects.bulk_create(nuevas, batch_size=LOTE)
+                _cambios_en_bloque(nuevas)
+            break
+        except IntegrityError:
+            # Otra ejecución creó alguna ocurrencia entre la consulta y la inserción
+            if intento == MAX_INTENTOS:
+                raise
+            logger.info(f'Materialización concurrente detectada, reintentando ({intento}/{MAX_INTENTOS})')
+
+    logger.info(
+        f'Plantillas materializadas: {len(plantillas)} plantillas, '
+        f'{len(nuevas)} clases creadas, {omitidas} ya existentes ({desde} a {hasta})'
+    )
+    return {'plantillas': len(plantillas), 'creadas': len(nuevas), 'existentes': omitidas}
+
+
+def propagar_cambios(plantilla, desde=None):
+    """
+    Copia los datos actuales de la plantilla a sus clases activas desde `desde`
+    (default: hoy). Los cupos nunca quedan por debajo de los ya ocupados.
+
+    Returns:
+        int: Clases actualizadas
+    """
+    from reservas import agenda_service
+    from lista_espera import promocion_service
+
+    desde = desde or timezone.localdate()
+    with transaction.atomic():
+        # Bloqueadas: los cupos ocupados no cambian mientras se ajustan los totales
+        ocurrencias = list(
+            plantilla.clases.select_for_update().filter(fecha__gte=desde, estado=Clase.ACTIVA)
+        )
+        if not ocurrencias:
+            return 0
+
+        ahora = timezone.now()
+        cupos_anteriores = {clase.id: clase.cupos_totales for clase in ocurrencias}
+        for clase in ocurrencias:
+            _copiar_campos(plantilla, clase)
+            clase.cupos_totales = max(plantilla.cupos_totales, clase.cupos_ocupados)
+            clase.fecha_actualizacion = ahora
+
+        Clase.objects.bulk_update(
+            ocurrencias, CAMPOS_COPIADOS + ['fecha_actualizacion'], batch_size=LOTE
+        )
+        agenda_service.actualizar_clases_en_agendas(ocurrencias)
+        _cambios_en_bloque(ocurrencias)
+
+        # bulk_update no emite post_save: promover las listas de espera de las clases que ganaron cupos
+        for clase in ocurrencias:
+            if clase.cupos_totales > cupos_anteriores[clase.id]:
+                promocion_service.cupos_ampliados(clase)
+
+    logger.info(f'Plantilla {plantilla.id}: cambios propagados a {len(ocurrencias)} clases')
+    return len(ocurrencias)
@@ -1,8 +1,12 @@
 """
 Serializers para la app de clases.
 """
+from datetime import timedelta
+
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Clase
+from .models import Clase, ClasePlantilla
+from .plantilla_service import MAX_SEMANAS, SEMANAS_POR_DEFECTO
 from usuarios.serializers import InstructorSerializer
 
 
@@ -23,7 +27,7 @@ class ClaseSerializer(serializers.ModelSerializer):
             'instructor_nombre', 'fecha', 'hora_inicio', 'hora_fin',
             'cupos_totales', 'cupos_ocupados', 'cupos_disponibles',
             'esta_llena', 'porcentaje_ocupacion', 'estado',
-            'permite_lista_espera', 'puede_reservar',
+            'permite_lista_espera', 'admision_en_cola', 'puede_reservar',
             'fecha_creacion'
         ]
         read_only_fields = ['id', 'cupos_ocupados', 'fecha_creacion']
@@ -69,11 +73,15 @@ class ClaseDetalleSerializer(serializers.ModelSerializer):
         return obj.puede_reservar()
     
     def get_total_reservas(self, obj):
-        """Retorna el total de reservas confirmadas."""
+        """Retorna el total de reservas confirmadas (anotado por la vista si está disponible)."""
+        if hasattr(obj, 'total_reservas_confirmadas'):
+            return obj.total_reservas_confirmadas
         return obj.reservas.filter(estado='confirmada').count()
     
     def get_total_lista_espera(self, obj):
-        """Retorna el total de personas en lista de espera."""
+        """Retorna el total de personas en lista de espera (anotado por la vista si está disponible)."""
+        if hasattr(obj, 'total_lista_espera_activa'):
+            return obj.total_lista_espera_activa
         return obj.lista_espera.filter(estado='esperando').count()
 
 
@@ -86,14 +94,157 @@ class ClaseCrearSerializer(serializers.ModelSerializer):
         fields = [
             'nombre', 'tipo', 'descripcion', 'imagen', 'instructor',
             'fecha', 'hora_inicio', 'hora_fin',
-            'cupos_totales', 'estado', 'permite_lista_espera'
+            'cupos_totales', 'estado', 'permite_lista_espera', 'admision_en_cola'
         ]
     
     def validate(self, attrs):
-        """Valida que la hora de fin sea mayor que la hora de inicio."""
+        """
+        Valida que la hora de fin sea mayor que la hora de inicio y que el
+        instructor no tenga otra clase activa en ese horario. El instructor
+        puede venir en el contexto (cuando lo fija la vista, no el request).
+        """
         if attrs.get('hora_fin') and attrs.get('hora_inicio'):
             if attrs['hora_fin'] <= attrs['hora_inicio']:
                 raise serializers.ValidationError({
                     "hora_fin": "La hora de fin debe ser posterior a la hora de inicio."
                 })
+        
+        # La clase como quedaría: datos enviados sobre los actuales
+        clase = Clase(pk=self.instance.pk if self.instance else None)
+        for campo in ['instructor', 'fecha', 'hora_inicio', 'hora_fin', 'estado']:
+            valor = attrs.get(campo, getattr(self.instance, campo, None))
+            if valor is not None:
+                setattr(clase, campo, valor)
+        if self.context.get('instructor'):
+            clase.instructor = self.context['instructor']
+        if clase.hora_inicio and clase.hora_fin and clase.hora_fin > clase.hora_inicio:
+            error = clase.error_choque_instructor()
+            if error:
+                raise serializers.ValidationError({"hora_inicio": error})
+        return attrs
+
+
+class ClasePlantillaSerializer(serializers.ModelSerializer):
+    """
+    Serializer para plantillas de clases recurrentes.
+    El día de la semana no se puede cambiar: las ocurrencias ya generadas
+    quedarían en otro día (se crea otra plantilla y se desactiva esta).
+    """
+    instructor_nombre = serializers.SerializerMethodField()
+    dia_semana_display = serializers.CharField(source='get_dia_semana_display', read_only=True)
+    
+    class Meta:
+        model = ClasePlantilla
+        fields = [
+            'id', 'nombre', 'tipo', 'descripcion', 'instructor', 'instructor_nombre',
+            'dia_semana', 'dia_semana_display', 'hora_inicio', 'hora_fin',
+            'vigente_desde', 'vigente_hasta', 'cupos_totales',
+            'permite_lista_espera', 'admision_en_cola', 'activa',
+            'fecha_creacion', 'fecha_actualizacion'
+        ]
+        read_only_fields = ['id', 'fecha_creacion', 'fecha_actualizacion']
+    
+    def get_instructor_nombre(self, obj):
+        """Retorna el nombre del instructor."""
+        if obj.instructor:
+            return obj.instructor.usuario.get_full_name()
+        return None
+    
+    def validate(self, attrs):
+        """Valida horario, vigencia y que no cambie el día de la semana."""
+        instancia = self.instance
+        hora_inicio = attrs.get('hora_inicio', getattr(instancia, 'hora_inicio', None))
+        hora_fin = attrs.get('hora_fin', getattr(instancia, 'hora_fin', None))
+        if hora_inicio and hora_fin and hora_fin <= hora_inicio:
+            raise serializers.ValidationError({
+                "hora_fin": "La hora de fin debe ser posterior a la hora de inicio."
+            })
+        
+        vigente_desde = attrs.get('vigente_desde', getattr(instancia, 'vigente_desde', None))
+        vigente_hasta = attrs.get('vigente_hasta', getattr(instancia, 'vigente_hasta', None))
+        if vigente_desde and vigente_hasta and vigente_hasta < vigente_desde:
+            raise serializers.ValidationError({
+                "vigente_hasta": "La vigencia no puede terminar antes de comenzar."
+            })
+        
+        if instancia and 'dia_semana' in attrs and attrs['dia_semana'] != instancia.dia_semana:
+            raise serializers.ValidationError({
+                "dia_semana": "No se puede cambiar el día; crea otra plantilla y desactiva esta."
+            })
         return attrs
+
+
+class MaterializarSerializer(serializers.Serializer):
+    """Parámetros para generar las clases de una o más plantillas."""
+    semanas = serializers.IntegerField(
+        min_value=1, max_value=MAX_SEMANAS, default=SEMANAS_POR_DEFECTO
+    )
+    desde = serializers.DateField(required=False)
+
+
+class CuposParametrosSerializer(serializers.Serializer):
+    """
+    Parámetros del snapshot de cupos: rango de fechas (por defecto los
+    próximos 7 días, máximo MAX_DIAS_CUPOS) y versión del último snapshot.
+    """
+    MAX_DIAS_CUPOS = 31
+    
+    desde = serializers.DateField(required=False)
+    hasta = serializers.DateField(required=False)
+    since_version = serializers.IntegerField(min_value=0, required=False)
+    
+    def validate(self, data):
+        data['desde'] = data.get('desde') or timezone.localdate()
+        data['hasta'] = data.get('hasta') or data['desde'] + timedelta(days=7)
+        if data['desde'] > data['hasta']:
+            raise serializers.ValidationError('La fecha "desde" no puede ser posterior a "hasta".')
+        if (data['hasta'] - data['desde']).days >= self.MAX_DIAS_CUPOS:
+            raise serializers.ValidationError(f'El rango no puede superar {self.MAX_DIAS_CUPOS} días.')
+        return data
+
+
+class CancelarClasesSerializer(serializers.Serializer):
+    """
+    Parámetros para cancelar clases en bloque: una lista de IDs o un rango de
+    fechas (p. ej. una semana de cierre del gimnasio), más el motivo.
+    """
+    MAX_CLASES = 1000
+    
+    clases = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), max_length=MAX_CLASES, required=False
+    )
+    desde = serializers.DateField(required=False)
+    hasta = serializers.DateField(required=False)
+    motivo = serializers.CharField(max_length=200, required=False, allow_blank=True, default='')
+    
+    def validate(self, data):
+        rango = 'desde' in data or 'hasta' in data
+        if bool(data.get('clases')) == rango:
+            raise serializers.ValidationError('Indica "clases" o el rango "desde"/"hasta", no ambos.')
+        if rango:
+            if 'desde' not in data or 'hasta' not in data:
+                raise serializers.ValidationError('El rango requiere "desde" y "hasta".')
+            if data['desde'] > data['hasta']:
+                raise serializers.ValidationError('La fecha "desde" no puede ser posterior a "hasta".')
+        return data
+
+
+class CalendarioParametrosSerializer(serializers.Serializer):
+    """Mes del calendario en formato AAAA-MM (por defecto, el mes actual)."""
+    mes = serializers.RegexField(r'^\d{4}-(0[1-9]|1[0-2])$', required=False, error_messages={
+        'invalid': 'El mes debe tener formato AAAA-MM.'
+    })
+    
+    def validate(self, data):
+        if data.get('mes'):
+            anio, mes = data['mes'].split('-')
+            data['anio'], data['mes'] = int(anio), int(mes)
+        else:
+            hoy = timezone.localdate()
+            data['anio'], data['mes'] = hoy.year, hoy.month
+        return data
+
+
+class CalendarioDiaParametrosSerializer(serializers.Serializer):
+    """Día del calendario a detallar."""
+    fecha = serializers.DateField()
@@ -0,0 +1,52 @@
+"""
+Señales de cambios en las clases.
+"""
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import Signal, receiver
+from .models import Clase
+from . import catalogo_service, cupos_service
+
+# Clases o cupos modificados sin pasar por save() (UPDATE condicional, update(),
+# bulk_create de reservas). Argumentos: clases (pares (clase_id, fecha)) y
+# solo_cupos (opcional, True si lo único que cambió fueron los cupos ocupados).
+clases_modificadas = Signal()
+
+
+@receiver(pre_save, sender=Clase)
+def recordar_valores_anteriores(sender, instance, **kwargs):
+    """
+    Guarda la fecha, el estado, el instructor y los cupos totales previos de
+    la clase: si la fecha cambia, también cambió ese día; si pasa a cancelada,
+    se cancela en cascada; si cambia el instructor, cambió también el horario
+    del anterior; si ganó cupos, se promueve a la lista de espera.
+    """
+    if instance.pk:
+        anterior = Clase.objects.filter(pk=instance.pk).values_list(
+            'fecha', 'estado', 'instructor_id', 'cupos_totales'
+        ).first()
+        (
+            instance._fecha_anterior, instance._estado_anterior,
+            instance._instructor_anterior, instance._cupos_totales_anterior,
+        ) = anterior or (None, None, None, None)
+
+
+@receiver(post_save, sender=Clase)
+@receiver(post_delete, sender=Clase)
+@receiver(clases_modificadas)
+def invalidar_catalogo(sender, **kwargs):
+    """Cualquier cambio en una clase o en sus cupos invalida el catálogo."""
+    catalogo_service.invalidar_catalogo()
+
+
+@receiver(post_save, sender=Clase)
+@receiver(post_delete, sender=Clase)
+def registrar_cambio_cupos(sender, instance, **kwargs):
+    """Publica la clase guardada o eliminada en el snapshot de cupos."""
+    fechas = {instance.fecha, getattr(instance, '_fecha_anterior', None)} - {None}
+    cupos_service.registrar_cambios([(instance.pk, fecha) for fecha in fechas])
+
+
+@receiver(clases_modificadas)
+def registrar_cambio_cupos_en_bloque(sender, clases, **kwargs):
+    """Publica en el snapshot de cupos las clases cambiadas en bloque."""
+    cupos_service.registrar_cambios(clases)
@@ -1,3 +1,658 @@
+"""
+Tests unitarios para la app de clases.
+"""
+from datetime import date, timedelta, time
+from unittest import mock
+
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from reservas.models import AgendaSocio, Reserva
+from usuarios.models import Usuario, Instructor
+from . import cupos_service, plantilla_service
+from .models import Clase, ClasePlantilla
+
+
+class CatalogoCacheTest(TestCase):
+    """Tests para la caché versionada del catálogo y las respuestas 304."""
+
+    def setUp(self):
+        """Crear socio y una clase futura; empezar con la caché vacía."""
+        cache.clear()
+        self.socio = Usuario.objects.create_user(
+            username='socio_catalogo',
+            email='socio_catalogo@gimnasio.com',
+            password='SocioPass123!',
+            rol=Usuario.SOCIO,
+            estado_membresia=Usuario.ACTIVA
+        )
+        self.clase = Clase.objects.create(
+            nombre='Pilates',
+            tipo=Clase.PILATES,
+            fecha=date.today() + timedelta(days=2),
+            hora_inicio=time(9, 0),
+            hora_fin=time(10, 0),
+            cupos_totales=10,
+            estado=Clase.ACTIVA
+        )
+        self.api = APIClient()
+        self.api.force_authenticate(user=self.socio)
+
+    def test_segunda_consulta_sin_cambios_responde_304(self):
+        """Test: Con el ETag vigente no se consulta ni se serializa el catálogo."""
+        respuesta = self.api.get('/api/clases/disponibles/')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual([c['id'] for c in respuesta.json()], [self.clase.id])
+        etag = respuesta['ETag']
+
+        with self.assertNumQueries(0):
+            respuesta = self.api.get('/api/clases/disponibles/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 304)
+        self.assertEqual(respuesta['ETag'], etag)
+
+        # Sin If-None-Match se sirve el JSON guardado, también sin consultas
+        with self.assertNumQueries(0):
+            respuesta = self.api.get('/api/clases/disponibles/')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta['ETag'], etag)
+
+    def test_cambio_de_cupos_invalida_catalogo(self):
+        """Test: Reservar un cupo (UPDATE sin save) cambia el ETag y el contenido."""
+        etag = self.api.get('/api/clases/proxima_semana/')['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(self.clase.incrementar_cupo())
+
+        respuesta = self.api.get('/api/clases/proxima_semana/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotEqual(respuesta['ETag'], etag)
+        self.assertEqual(respuesta.json()[0]['cupos_ocupados'], 1)
+
+    def test_incremento_concurrente_no_repite_version(self):
+        """Test: Si otro proceso ya usó la versión siguiente, el cambio toma otra."""
+        from . import catalogo_service
+
+        version = catalogo_service.obtener_version()
+        # Otro proceso llegó a version + 1, pero su incremento se perdió
+        cache.add(catalogo_service._clave_version_usada(version + 1), True)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            catalogo_service.invalidar_catalogo()
+
+        self.assertEqual(catalogo_service.obtener_version(), version + 2)
+
+    def test_guardar_clase_invalida_catalogo(self):
+        """Test: Editar o cancelar una clase cambia el ETag de todas las vistas."""
+        etag_disponibles = self.api.get('/api/clases/disponibles/')['ETag']
+        etag_semana = self.api.get('/api/clases/proxima_semana/')['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.clase.estado = Clase.CANCELADA
+            self.clase.save()
+
+        respuesta = self.api.get('/api/clases/disponibles/', HTTP_IF_NONE_MATCH=etag_disponibles)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json(), [])
+        respuesta = self.api.get('/api/clases/proxima_semana/', HTTP_IF_NONE_MATCH=etag_semana)
+        self.assertEqual(respuesta.status_code, 200)
+
+
+class DisponibilidadSQLTest(TestCase):
+    """Tests para las columnas calculadas de disponibilidad y ocupación."""
+
+    def setUp(self):
+        """Crear socio y tres clases con distinta ocupación."""
+        self.socio = Usuario.objects.create_user(
+            username='socio_disponibilidad',
+            email='socio_disponibilidad@gimnasio.com',
+            password='SocioPass123!',
+            rol=Usuario.SOCIO,
+            estado_membresia=Usuario.ACTIVA
+        )
+        self.clases = {}
+        for nombre, totales, ocupados in [('Vacia', 10, 0), ('Media', 20, 15), ('Llena', 5, 5)]:
+            self.clases[nombre] = Clase.objects.create(
+                nombre=nombre,
+                tipo=Clase.YOGA,
+                fecha=date.today() + timedelta(days=1),
+                hora_inicio=time(8, 0),
+                hora_fin=time(9, 0),
+                cupos_totales=totales,
+                cupos_ocupados=ocupados,
+                estado=Clase.ACTIVA
+            )
+        self.api = APIClient()
+        self.api.force_authenticate(user=self.socio)
+
+    def nombres(self, **params):
+        respuesta = self.api.get('/api/clases/', params)
+        self.assertEqual(respuesta.status_code, 200)
+        return [clase['nombre'] for clase in respuesta.json()['results']]
+
+    def test_columnas_coinciden_con_propiedades(self):
+        """Test: Los valores de la base de datos coinciden con los de Python."""
+        for clase in Clase.objects.all():
+            self.assertEqual(clase.cupos_libres, clase.cupos_disponibles)
+            self.assertAlmostEqual(clase.ocupacion, clase.porcentaje_ocupacion)
+
+    def test_columnas_se_actualizan_con_cupos(self):
+        """Test: Ocupar un cupo con UPDATE condicional actualiza las columnas."""
+        clase = self.clases['Vacia']
+        clase.incrementar_cupo()
+        self.assertEqual(clase.cupos_libres, 9)
+        self.assertAlmostEqual(clase.ocupacion, 10.0)
+
+    def test_ordenar_por_cupos_disponibles(self):
+        """Test: ?ordering=-cupos_disponibles ordena en SQL."""
+        self.assertEqual(self.nombres(ordering='-cupos_disponibles'), ['Vacia', 'Media', 'Llena'])
+        self.assertEqual(self.nombres(ordering='porcentaje_ocupacion'), ['Vacia', 'Media', 'Llena'])
+
+    def test_filtros_de_cupos_y_ocupacion(self):
+        """Test: con_cupos y el rango de ocupación filtran en SQL."""
+        self.assertEqual(sorted(self.nombres(con_cupos='true')), ['Media', 'Vacia'])
+        self.assertEqual(self.nombres(ocupacion_min='50', ocupacion_max='80'), ['Media'])
+        respuesta = self.api.get('/api/clases/', {'ocupacion_min': 'mucho'})
+        self.assertEqual(respuesta.status_code, 400)
+
+
+class ClasePlantillaTest(TestCase):
+    """Tests para las plantillas recurrentes y su materialización en bloque."""
+
+    def setUp(self):
+        """Crear administrador, instructor y una plantilla de los lunes."""
+        self.admin = Usuario.objects.create_user(
+            username='admin_plantillas',
+            email='admin_plantillas@gimnasio.com',
+            password='AdminPass123!',
+            rol=Usuario.ADMINISTRADOR,
+            is_staff=True
+        )
+        usuario_instructor = Usuario.objects.create_user(
+            username='instructor_plantillas',
+            email='instructor_plantillas@gimnasio.com',
+            password='InstPass123!',
+            rol=Usuario.INSTRUCTOR
+        )
+        self.instructor = Instructor.objects.create(usuario=usuario_instructor)
+        self.hoy = date.today()
+        self.plantilla = ClasePlantilla.objects.create(
+            nombre='Spinning Lunes',
+            tipo=Clase.SPINNING,
+            instructor=self.instructor,
+            dia_semana=ClasePlantilla.LUNES,
+            hora_inicio=time(19, 0),
+            hora_fin=time(20, 0),
+            vigente_desde=self.hoy,
+            cupos_totales=12
+        )
+        self.api = APIClient()
+        self.api.force_authenticate(user=self.admin)
+
+    def test_fechas_respetan_dia_y_vigencia(self):
+        """Test: Solo se generan lunes dentro de la vigencia."""
+        self.plantilla.vigente_hasta = self.hoy + timedelta(days=20)
+        fechas = plantilla_service.fechas_ocurrencias(self.plantilla, self.hoy, self.hoy + timedelta(weeks=8))
+        self.assertTrue(all(fecha.weekday() == ClasePlantilla.LUNES for fecha in fechas))
+        self.assertTrue(all(self.hoy <= fecha <= self.plantilla.vigente_hasta for fecha in fechas))
+        self.assertEqual(len(fechas), 3)
+
+    def test_materializar_es_idempotente(self):
+        """Test: Repetir la generación no duplica clases ni regenera las canceladas."""
+        resultado = plantilla_service.materializar(semanas=6)
+        self.assertEqual(resultado['creadas'], 6)
+        clases = Clase.objects.filter(plantilla=self.plantilla)
+        self.assertEqual(clases.count(), 6)
+        self.assertTrue(all(clase.cupos_totales == 12 for clase in clases))
+
+        clases.update(estado=Clase.CANCELADA)
+        # Plantillas y ocurrencias existentes: dos consultas, ninguna escritura
+        with self.assertNumQueries(2):
+            resultado = plantilla_service.materializar(semanas=6)
+        self.assertEqual(resultado, {'plantillas': 1, 'creadas': 0, 'existentes': 6})
+
+    def test_materializar_concurrente_reintenta(self):
+        """Test: Si otra ejecución inserta una ocurrencia a mitad de camino, se reintenta sin error."""
+        copiar_campos = plantilla_service._copiar_campos
+        primera = plantilla_service.fechas_ocurrencias(self.plantilla, self.hoy, self.hoy + timedelta(weeks=3))[0]
+
+        def copiar_e_insertar_competidora(plantilla, clase):
+            copiar_campos(plantilla, clase)
+            if not Clase.objects.filter(plantilla=plantilla, fecha=primera).exists():
+                competidora = Clase(plantilla=plantilla, fecha=primera, estado=Clase.ACTIVA)
+                copiar_campos(plantilla, competidora)
+                competidora.save()
+
+        with mock.patch.object(plantilla_service, '_copiar_campos', copiar_e_insertar_competidora):
+            resultado = plantilla_service.materializar(semanas=4)
+
+        self.assertEqual(resultado, {'plantillas': 1, 'creadas': 3, 'existentes': 1})
+        self.assertEqual(Clase.objects.filter(plantilla=self.plantilla).count(), 4)
+
+    def test_plantilla_inactiva_no_genera(self):
+        """Test: Las plantillas inactivas no generan clases."""
+        self.plantilla.activa = False
+        self.plantilla.save()
+        self.assertEqual(plantilla_service.materializar(semanas=4)['creadas'], 0)
+
+    def test_clases_generadas_aparecen_en_busqueda(self):
+        """Test: Las clases creadas en bloque se indexan para la búsqueda."""
+        plantilla_service.materializar(semanas=2)
+        respuesta = self.api.get('/api/clases/', {'search': 'spinning lunes'})
+        self.assertEqual(respuesta.json()['count'], 2)
+
+    def test_editar_plantilla_propaga_a_futuras(self):
+        """Test: Editar la plantilla actualiza clases futuras y agendas, sin bajar de los cupos ocupados."""
+        plantilla_service.materializar(semanas=3)
+        proxima = Clase.objects.filter(plantilla=self.plantilla).order_by('fecha').first()
+        socio = Usuario.objects.create_user(
+            username='socio_plantillas',
+            email='socio_plantillas@gimnasio.com',
+            password='SocioPass123!',
+            rol=Usuario.SOCIO,
+            estado_membresia=Usuario.ACTIVA
+        )
+        Reserva.objects.create(socio=socio, clase=proxima)
+        Clase.objects.filter(pk=proxima.pk).update(cupos_ocupados=8)
+        pasada = Clase.objects.create(
+            nombre='Spinning Lunes', tipo=Clase.SPINNING, plantilla=self.plantilla,
+            fecha=self.hoy - timedelta(days=7), hora_inicio=time(19, 0), hora_fin=time(20, 0),
+            estado=Clase.COMPLETADA
+        )
+
+        respuesta = self.api.patch(
+            f'/api/plantillas/{self.plantilla.id}/',
+            {'hora_inicio': '18:30', 'cupos_totales': 5},
+            format='json'
+        )
+        self.assertEqual(respuesta.status_code, 200)
+
+        futuras = Clase.objects.filter(plantilla=self.plantilla, fecha__gte=self.hoy)
+        self.assertTrue(all(clase.hora_inicio == time(18, 30) for clase in futuras))
+        self.assertEqual(futuras.get(pk=proxima.pk).cupos_totales, 8)
+        self.assertEqual(futuras.exclude(pk=proxima.pk)[0].cupos_totales, 5)
+        pasada.refresh_from_db()
+        self.assertEqual(pasada.hora_inicio, time(19, 0))
+        agenda = AgendaSocio.objects.get(socio=socio)
+        self.assertEqual(list(agenda.reservas.values())[0]['hora_inicio'], '18:30:00')
+
+    def test_no_se_puede_cambiar_dia(self):
+        """Test: El día de la semana no se puede editar."""
+        respuesta = self.api.patch(
+            f'/api/plantillas/{self.plantilla.id}/', {'dia_semana': ClasePlantilla.MARTES}, format='json'
+        )
+        self.assertEqual(respuesta.status_code, 400)
+
+    def test_materializar_por_api(self):
+        """Test: El endpoint genera las semanas pedidas."""
+        respuesta = self.api.post(
+            f'/api/plantillas/{self.plantilla.id}/materializar/', {'semanas': 10}, format='json'
+        )
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()['creadas'], 10)
+
+
+class SnapshotCuposTest(TestCase):
+    """Tests para el snapshot compacto de cupos y sus deltas por versión."""
+
+    def setUp(self):
+        """Crear socio y dos clases; empezar con la caché vacía."""
+        cache.clear()
+        self.socio = Usuario.objects.create_user(
+            username='socio_cupos',
+            email='socio_cupos@gimnasio.com',
+            password='SocioPass123!',
+            rol=Usuario.SOCIO,
+            estado_membresia=Usuario.ACTIVA
+        )
+        self.manana = date.today() + timedelta(days=1)
+        self.clases = [
+            Clase.objects.create(
+                nombre=f'Cardio {hora}',
+                tipo=Clase.CARDIO,
+                fecha=self.manana,
+                hora_inicio=time(hora, 0),
+                hora_fin=time(hora + 1, 0),
+                cupos_totales=10,
+                estado=Clase.ACTIVA
+            )
+            for hora in (8, 18)
+        ]
+        self.api = APIClient()
+        self.api.force_authenticate(user=self.socio)
+
+    def consultar(self, **params):
+        respuesta = self.api.get('/api/clases/cupos/', params)
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta.json()
+
+    def test_snapshot_completo_compacto(self):
+        """Test: Sin since_version se envían todas las clases del rango."""
+        datos = self.consultar()
+        self.assertTrue(datos['completo'])
+        self.assertEqual(datos['clases'], {
+            str(clase.id): [0, 10, Clase.ACTIVA] for clase in self.clases
+        })
+
+        # El segundo pedido sale del snapshot en caché
+        with self.assertNumQueries(0):
+            self.consultar()
+
+    def test_delta_solo_clases_cambiadas(self):
+        """Test: Con since_version solo vienen las clases con cupos cambiados."""
+        version = self.consultar()['version']
+        self.assertEqual(self.consultar(since_version=version)['clases'], {})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.clases[0].incrementar_cupo()
+        datos = self.consultar(since_version=version)
+        self.assertFalse(datos['completo'])
+        self.assertGreater(datos['version'], version)
+        self.assertEqual(datos['clases'], {str(self.clases[0].id): [1, 10, Clase.ACTIVA]})
+        self.assertEqual(self.consultar(since_version=datos['version'])['clases'], {})
+
+    def test_snapshot_viejo_guardado_tras_el_cambio_se_descarta(self):
+        """Test: Un día leído antes de un cambio y guardado después no se vuelve a servir."""
+        version = self.consultar()['version']
+        fecha = self.manana.isoformat()
+        viejo = cache.get(cupos_service._clave_dia(fecha))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.clases[0].incrementar_cupo()
+        # Una lectura concurrente consultó la base antes del cambio y guarda después del borrado
+        cache.set(cupos_service._clave_dia(fecha), viejo)
+
+        datos = self.consultar()
+        self.assertGreater(datos['version'], version)
+        self.assertEqual(datos['clases'][str(self.clases[0].id)], [1, 10, Clase.ACTIVA])
+
+    def test_version_ocupada_por_otro_proceso_no_se_pisa(self):
+        """Test: Si otro proceso ya publicó en la versión siguiente, el cambio usa otra."""
+        version = self.consultar()['version']
+        otra_fecha = (self.manana + timedelta(days=1)).isoformat()
+        # Otro proceso publicó en version + 1, pero su incremento se perdió
+        cache.add(cupos_service._clave_cambios(version + 1), [(999, otra_fecha)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.clases[0].incrementar_cupo()
+
+        self.assertEqual(cupos_service.obtener_version(), version + 2)
+        self.assertEqual(cache.get(cupos_service._clave_cambios(version + 1)), [(999, otra_fecha)])
+        datos = self.consultar(since_version=version, hasta=otra_fecha)
+        self.assertFalse(datos['completo'])
+        self.assertEqual(datos['clases'], {
+            str(self.clases[0].id): [1, 10, Clase.ACTIVA], '999': None,
+        })
+
+    def test_clase_movida_fuera_del_rango(self):
+        """Test: Una clase que sale del rango llega como null en el delta."""
+        version = self.consultar()['version']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.clases[1].fecha = self.manana + timedelta(days=20)
+            self.clases[1].save()
+        datos = self.consultar(since_version=version)
+        self.assertEqual(datos['clases'], {str(self.clases[1].id): None})
+
+    def test_version_desconocida_envia_snapshot_completo(self):
+        """Test: Si el registro de cambios no alcanza, se envía el snapshot completo."""
+        datos = self.consultar(since_version=1)
+        self.assertTrue(datos['completo'])
+        self.assertEqual(len(datos['clases']), 2)
+
+    def test_rango_invalido(self):
+        """Test: El rango no puede superar el máximo de días."""
+        respuesta = self.api.get('/api/clases/cupos/', {
+            'desde': date.today().isoformat(),
+            'hasta': (date.today() + timedelta(days=60)).isoformat(),
+        })
+        self.assertEqual(respuesta.status_code, 400)
+
+
+class ConflictosHorarioTest(TestCase):
+    """Tests para la detección de choques de horario de instructores y socios."""
+
+    def setUp(self):
+        """Crear instructor, socio y una clase de 18:00 a 19:00."""
+        usuario_instructor = Usuario.objects.create_user(
+            username='instructor_choques',
+            email='instructor_choques@gimnasio.com',
+            password='InstPass123!',
+            rol=Usuario.INSTRUCTOR
+        )
+        self.instructor = Instructor.objects.create(usuario=usuario_instructor)
+        self.socio = Usuario.objects.create_user(
+            username='socio_choques',
+            email='socio_choques@gimnasio.com',
+            password='SocioPass123!',
+            rol=Usuario.SOCIO,
+            estado_membresia=Usuario.ACTIVA
+        )
+        self.manana = date.today() + timedelta(days=1)
+        self.clase = self.crear_clase('Yoga', 18)
+        self.api = APIClient()
+        self.api.force_authenticate(user=usuario_instructor)
+
+    def crear_clase(self, nombre, hora, minutos=0, fecha=None, instructor=None):
+        return Clase.objects.create(
+            nombre=nombre,
+            tipo=Clase.YOGA,
+            instructor=instructor,
+            fecha=fecha or self.manana,
+            hora_inicio=time(hora, minutos),
+            hora_fin=time(hora + 1, minutos),
+            cupos_totales=10,
+            estado=Clase.ACTIVA
+        )
+
+    def datos_clase(self, hora_inicio, hora_fin):
+        return {
+            'nombre': 'Pilates', 'tipo': Clase.PILATES, 'fecha': self.manana.isoformat(),
+            'hora_inicio': hora_inicio, 'hora_fin': hora_fin, 'cupos_totales': 10,
+        }
+
+    def test_instructor_no_puede_crear_clase_solapada(self):
+        """Test: Crear una clase que se solapa con otra del instructor da 400."""
+        self.clase.instructor = self.instructor
+        self.clase.save()
+
+        respuesta = self.api.post('/api/clases/instructor-crear/', self.datos_clase('18:30', '19:30'))
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('hora_inicio', respuesta.json())
+
+        # Termina justo cuando empieza la otra: no es choque
+        respuesta = self.api.post('/api/clases/instructor-crear/', self.datos_clase('17:00', '18:00'))
+        self.assertEqual(respuesta.status_code, 201)
+
+    def test_editar_clase_no_choca_consigo_misma(self):
+        """Test: Al editar, la propia clase no cuenta como choque; las canceladas tampoco."""
+        self.clase.instructor = self.instructor
+        self.clase.save()
+        otra = self.crear_clase('Cardio', 20, instructor=self.instructor)
+
+        respuesta = self.api.patch(
+            f'/api/clases/{self.clase.id}/instructor-actualizar/', {'hora_fin': '19:30'}
+        )
+        self.assertEqual(respuesta.status_code, 200)
+        respuesta = self.api.patch(
+            f'/api/clases/{self.clase.id}/instructor-actualizar/', {'hora_fin': '20:30'}
+        )
+        self.assertEqual(respuesta.status_code, 400)
+
+        otra.estado = Clase.CANCELADA
+        otra.save()
+        respuesta = self.api.patch(
+            f'/api/clases/{self.clase.id}/instructor-actualizar/', {'hora_fin': '20:30'}
+        )
+        self.assertEqual(respuesta.status_code, 200)
+
+    def test_socio_no_puede_reservar_clases_solapadas(self):
+        """Test: Un socio con reserva confirmada no puede reservar otra clase solapada."""
+        from reservas.reserva_service import validar_reserva
+
+        Reserva.objects.create(socio=self.socio, clase=self.clase, estado=Reserva.CONFIRMADA)
+        solapada = self.crear_clase('Spinning', 18, minutos=30)
+        siguiente = self.crear_clase('Cardio', 19)
+        otro_dia = self.crear_clase('Pilates', 18, fecha=self.manana + timedelta(days=1))
+
+        self.assertIn('horario', validar_reserva(self.socio, solapada))
+        self.assertIsNone(validar_reserva(self.socio, siguiente))
+        self.assertIsNone(validar_reserva(self.socio, otro_dia))
+
+    def test_serie_marca_semanas_con_choque(self):
+        """Test: La reserva en serie omite solo las semanas que chocan."""
+        from reservas.reserva_service import reservar_serie, SERIE_CONFLICTO, SERIE_RESERVADA
+
+        semana = self.crear_clase('Yoga', 18, fecha=self.manana + timedelta(weeks=1))
+        ocupada = self.crear_clase('Spinning', 17, minutos=30, fecha=semana.fecha)
+        Reserva.objects.create(socio=self.socio, clase=ocupada, estado=Reserva.CONFIRMADA)
+
+        resultados = reservar_serie(self.socio, self.clase, 2)
+        self.assertEqual(
+            [resultado['resultado'] for resultado in resultados], [SERIE_RESERVADA, SERIE_CONFLICTO]
+        )
+
+    def test_indice_intervalos(self):
+        """Test: El índice encuentra solapes y respeta los bordes."""
+        from .conflictos_service import IndiceIntervalos
+
+        indice = IndiceIntervalos()
+        for hora in (8, 10, 12):
+            indice.agregar(self.manana, time(hora), time(hora + 1), hora)
+        self.assertEqual(indice.choque(self.manana, time(10, 30), time(11, 30)), 10)
+        self.assertEqual(indice.choque(self.manana, time(7), time(8, 1)), 8)
+        self.assertIsNone(indice.choque(self.manana, time(9), time(10)))
+        self.assertIsNone(indice.choque(self.manana + timedelta(days=1), time(8), time(9)))
+
+    def test_indice_intervalos_con_intervalo_largo(self):
+        """Test: Un intervalo largo que cubre a otros se detecta aunque no sea vecino."""
+        from .conflictos_service import IndiceIntervalos
+
+        indice = IndiceIntervalos()
+        indice.agregar(self.manana, time(10), time(11), 'corta_1')
+        indice.agregar(self.manana, time(12), time(13), 'corta_2')
+        indice.agregar(self.manana, time(9), time(17), 'larga')
+        self.assertEqual(indice.choque(self.manana, time(14), time(15)), 'larga')
+        self.assertEqual(indice.choque(self.manana, time(12, 30), time(14)), 'corta_2')
+        self.assertIsNone(indice.choque(self.manana, time(17), time(18)))
+        self.assertIsNone(indice.choque(self.manana, time(8), time(9)))
+
+    def test_auditoria_en_una_consulta_por_tipo(self):
+        """Test: La auditoría encuentra los choques existentes con dos consultas."""
+        from .conflictos_service import auditar
+
+        self.clase.instructor = self.instructor
+        self.clase.save()
+        # Cargas masivas no validan: choques que solo la auditoría detecta
+        solapada, _ = Clase.objects.bulk_create([
+            Clase(nombre='Spinning', tipo=Clase.SPINNING, instructor=self.instructor,
+                  fecha=self.manana, hora_inicio=time(18, 30), hora_fin=time(19, 30)),
+            Clase(nombre='Cardio', tipo=Clase.CARDIO, instructor=self.instructor,
+                  fecha=self.manana, hora_inicio=time(19, 30), hora_fin=time(20, 0),
+                  estado=Clase.CANCELADA),
+        ])
+        Reserva.objects.bulk_create([
+            Reserva(socio=self.socio, clase=self.clase, estado=Reserva.CONFIRMADA),
+            Reserva(socio=self.socio, clase=solapada, estado=Reserva.CONFIRMADA),
+        ])
+
+        with self.assertNumQueries(2):
+            resultado = auditar()
+        self.assertEqual(len(resultado['instructores']), 1)
+        self.assertEqual(len(resultado['socios']), 1)
+        choque = resultado['socios'][0]
+        self.assertEqual(choque['socio_id'], self.socio.id)
+        self.assertEqual({choque['clase_a'], choque['clase_b']}, {self.clase.id, solapada.id})
+
+
+class CalendarioTest(TestCase):
+    """Tests para los agregados mensuales del calendario."""
+
+    def setUp(self):
+        """Crear socio y clases el 10 y el 12 del mes siguiente."""
+        cache.clear()
+        self.socio = Usuario.objects.create_user(
+            username='socio_calendario',
+            email='socio_calendario@gimnasio.com',
+            password='SocioPass123!',
+            rol=Usuario.SOCIO,
+            estado_membresia=Usuario.ACTIVA
+        )
+        hoy = date.today()
+        siguiente = (hoy.replace(day=1) + timedelta(days=32)).replace(day=1)
+        self.mes = siguiente.strftime('%Y-%m')
+        self.dia_10 = siguiente.replace(day=10)
+        self.dia_12 = siguiente.replace(day=12)
+        self.yoga = self.crear_clase(Clase.YOGA, self.dia_10, 8, ocupados=3)
+        self.crear_clase(Clase.YOGA, self.dia_10, 10)
+        self.crear_clase(Clase.CARDIO, self.dia_10, 12)
+        self.spinning = self.crear_clase(Clase.SPINNING, self.dia_12, 8)
+        self.crear_clase(Clase.PILATES, self.dia_12, 10, estado=Clase.CANCELADA)
+        self.api = APIClient()
+        self.api.force_authenticate(user=self.socio)
+
+    def crear_clase(self, tipo, fecha, hora, ocupados=0, estado=Clase.ACTIVA):
+        return Clase.objects.create(
+            nombre=f'{tipo} {hora}',
+            tipo=tipo,
+            fecha=fecha,
+            hora_inicio=time(hora, 0),
+            hora_fin=time(hora + 1, 0),
+            cupos_totales=10,
+            cupos_ocupados=ocupados,
+            estado=estado
+        )
+
+    def consultar(self, **headers):
+        return self.api.get('/api/clases/calendario/', {'mes': self.mes}, **headers)
+
+    def test_agregados_por_dia(self):
+        """Test: Cuenta clases activas, cupos libres y tipos, y marca los días reservados."""
+        Reserva.objects.create(socio=self.socio, clase=self.spinning, estado=Reserva.CONFIRMADA)
+
+        respuesta = self.consultar()
+        self.assertEqual(respuesta.status_code, 200)
+        dias = respuesta.json()['dias']
+        self.assertEqual(dias[self.dia_10.isoformat()], {
+            'clases': 3, 'cupos_libres': 27, 'tipos': {Clase.YOGA: 2, Clase.CARDIO: 1},
+            'reservado': False, 'en_espera': False,
+        })
+        self.assertEqual(dias[self.dia_12.isoformat()]['clases'], 1)
+        self.assertTrue(dias[self.dia_12.isoformat()]['reservado'])
+
+    def test_socio_sin_agenda_la_arma_al_consultar(self):
+        """Test: Si el socio aún no tiene agenda, se arma y sus reservas se marcan."""
+        Reserva.objects.create(socio=self.socio, clase=self.spinning, estado=Reserva.CONFIRMADA)
+        AgendaSocio.objects.filter(socio=self.socio).delete()
+
+        respuesta = self.consultar()
+        self.assertTrue(respuesta.json()['dias'][self.dia_12.isoformat()]['reservado'])
+        agenda = AgendaSocio.objects.get(socio=self.socio)
+        self.assertIn(f'-{agenda.version}"', respuesta['ETag'])
+
+    def test_cache_por_version_de_catalogo_y_agenda(self):
+        """Test: Sin cambios responde desde caché (o 304); una reserva nueva lo invalida."""
+        etag = self.consultar()['ETag']
+
+        # Solo se lee la versión de la agenda
+        with self.assertNumQueries(1):
+            self.assertEqual(self.consultar().status_code, 200)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.consultar(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Reserva.objects.create(socio=self.socio, clase=self.yoga, estado=Reserva.CONFIRMADA)
+        respuesta = self.consultar(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta.json()['dias'][self.dia_10.isoformat()]['reservado'])
+
+    def test_detalle_dia(self):
+        """Test: El detalle trae las clases activas del día y las reservadas por el socio."""
+        Reserva.objects.create(socio=self.socio, clase=self.spinning, estado=Reserva.CONFIRMADA)
+
+        respuesta = self.api.get('/api/clases/calendario/dia/', {'fecha': self.dia_12.isoformat()})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual([clase['id'] for clase in respuesta.json()['clases']], [self.spinning.id])
+        self.assertEqual(respuesta.json()['reservadas'], [self.spinning.id])
 
-# Create your tests here.
+        respuesta = self.api.get('/api/clases/calendario/', {'mes': '2026-13'})
+        self.assertEqual(respuesta.status_code, 400)
@@ -3,13 +3,23 @@ Views para la API de clases.
 """
 from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
+from django.http import HttpResponse, HttpResponseNotModified
 from django.utils import timezone
 from django.db import models
 from datetime import timedelta
-from .models import Clase
-from .serializers import ClaseSerializer, ClaseDetalleSerializer, ClaseCrearSerializer
+from busqueda.filters import BusquedaFilter
+from busqueda.models import DocumentoBusqueda
+from .models import Clase, ClasePlantilla
+from .serializers import (
+    ClaseSerializer, ClaseDetalleSerializer, ClaseCrearSerializer,
+    ClasePlantillaSerializer, MaterializarSerializer, CuposParametrosSerializer,
+    CancelarClasesSerializer, CalendarioParametrosSerializer, CalendarioDiaParametrosSerializer,
+)
+from . import calendario_service, catalogo_service, cupos_service, plantilla_service
 
 
 class ClaseViewSet(viewsets.ModelViewSet):
@@ -18,9 +28,9 @@ class ClaseViewSet(viewsets.ModelViewSet):
     """
     queryset = Clase.objects.all()
     permission_classes = [IsAuthenticated]
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['nombre', 'descripcion']
-    ordering_fields = ['fecha', 'hora_inicio', 'cupos_disponibles']
+    filter_backends = [filters.OrderingFilter, BusquedaFilter]
+    tipo_busqueda = DocumentoBusqueda.CLASE
+    ordering_fields = ['fecha', 'hora_inicio', 'cupos_disponibles', 'porcentaje_ocupacion']
     ordering = ['fecha', 'hora_inicio']
     
     def check_instructor_permission(self, clase_id):
@@ -45,7 +55,7 @@ class ClaseViewSet(viewsets.ModelViewSet):
         Retorna todas las clases sin paginación para el panel admin.
         GET /api/clases/admin-all/
         """
-        clases = Clase.objects.all().order_by('-id')
+        clases = Clase.objects.para_listado().order_by('-id')
         serializer = ClaseSerializer(clases, many=True)
         return Response(serializer.data)
     
@@ -61,7 +71,18 @@ class ClaseViewSet(viewsets.ModelViewSet):
         """
         Filtra las clases según parámetros de query.
         """
-        queryset = Clase.objects.all()
+        queryset = Clase.objects.para_listado().con_disponibilidad()
+        
+        # Los totales del detalle se calculan en la misma consulta
+        if self.action == 'retrieve':
+            queryset = queryset.annotate(
+                total_reservas_confirmadas=models.Count(
+                    'reservas', filter=models.Q(reservas__estado='confirmada'), distinct=True
+                ),
+                total_lista_espera_activa=models.Count(
+                    'lista_espera', filter=models.Q(lista_espera__estado='esperando'), distinct=True
+                ),
+            )
         
         # Filtro por rango de fechas
         fecha_desde = self.request.query_params.get('fecha_desde', None)
@@ -80,24 +101,45 @@ class ClaseViewSet(viewsets.ModelViewSet):
         # Solo clases con cupos disponibles
         con_cupos = self.request.query_params.get('con_cupos', None)
         if con_cupos == 'true':
-            queryset = queryset.filter(cupos_ocupados__lt=models.F('cupos_totales'))
+            queryset = queryset.filter(cupos_libres__gt=0)
+        
+        # Rango de ocupación (porcentaje, inclusivo)
+        ocupacion_min = self.parametro_porcentaje('ocupacion_min')
+        ocupacion_max = self.parametro_porcentaje('ocupacion_max')
+        if ocupacion_min is not None:
+            queryset = queryset.filter(ocupacion__gte=ocupacion_min)
+        if ocupacion_max is not None:
+            queryset = queryset.filter(ocupacion__lte=ocupacion_max)
         
         return queryset
     
+    def parametro_porcentaje(self, nombre):
+        """Lee un porcentaje (0-100) de los query params; None si no se envió."""
+        valor = self.request.query_params.get(nombre)
+        if valor in (None, ''):
+            return None
+        try:
+            valor = float(valor)
+        except ValueError:
+            raise ValidationError({nombre: 'Debe ser un número entre 0 y 100.'})
+        if not 0 <= valor <= 100:
+            raise ValidationError({nombre: 'Debe ser un número entre 0 y 100.'})
+        return valor
+    
     @action(detail=False, methods=['get'])
     def disponibles(self, request):
         """
         Retorna solo clases disponibles para reservar.
         GET /api/clases/disponibles/
         """
-        hoy = timezone.now().date()
-        clases = Clase.objects.filter(
-            estado=Clase.ACTIVA,
-            fecha__gte=hoy
-        ).order_by('fecha', 'hora_inicio')
+        def construir():
+            hoy = timezone.now().date()
+            return Clase.objects.para_listado().filter(
+                estado=Clase.ACTIVA,
+                fecha__gte=hoy
+            ).order_by('fecha', 'hora_inicio')
         
-        serializer = self.get_serializer(clases, many=True)
-        return Response(serializer.data)
+        return self.respuesta_catalogo('disponibles', construir)
     
     @action(detail=False, methods=['get'])
     def proxima_semana(self, request):
@@ -105,17 +147,97 @@ class ClaseViewSet(viewsets.ModelViewSet):
         Retorna clases de la próxima semana.
         GET /api/clases/proxima_semana/
         """
-        hoy = timezone.now().date()
-        proxima_semana = hoy + timedelta(days=7)
+        def construir():
+            hoy = timezone.now().date()
+            proxima_semana = hoy + timedelta(days=7)
+            return Clase.objects.para_listado().filter(
+                estado=Clase.ACTIVA,
+                fecha__gte=hoy,
+                fecha__lte=proxima_semana
+            ).order_by('fecha', 'hora_inicio')
         
-        clases = Clase.objects.filter(
-            estado=Clase.ACTIVA,
-            fecha__gte=hoy,
-            fecha__lte=proxima_semana
-        ).order_by('fecha', 'hora_inicio')
+        return self.respuesta_catalogo('proxima_semana', construir)
+    
+    @action(detail=False, methods=['get'])
+    def cupos(self, request):
+        """
+        Cupos de las clases de un rango en formato compacto, para consultas frecuentes.
+        GET /api/clases/cupos/?desde=AAAA-MM-DD&hasta=AAAA-MM-DD&since_version=N
         
-        serializer = self.get_serializer(clases, many=True)
-        return Response(serializer.data)
+        Respuesta: {"version": N, "completo": bool, "clases": {id: [ocupados, totales, estado]}}.
+        Con since_version solo vienen las clases cambiadas desde esa versión.
+        """
+        parametros = CuposParametrosSerializer(data=request.query_params)
+        parametros.is_valid(raise_exception=True)
+        return Response(cupos_service.snapshot(**parametros.validated_data))
+    
+    @action(detail=False, methods=['get'])
+    def calendario(self, request):
+        """
+        Totales por día del mes para la vista de calendario: clases, cupos
+        libres, cantidad por tipo y si el socio tiene reserva o lista de espera.
+        GET /api/clases/calendario/?mes=AAAA-MM
+        
+        Responde 304 si el cliente envía el ETag vigente (nada cambió en el
+        catálogo ni en la agenda del socio).
+        """
+        parametros = CalendarioParametrosSerializer(data=request.query_params)
+        parametros.is_valid(raise_exception=True)
+        anio, mes = parametros.validated_data['anio'], parametros.validated_data['mes']
+        
+        etag = calendario_service.etag_calendario(request.user, anio, mes)
+        if etag in request.headers.get('If-None-Match', ''):
+            respuesta = HttpResponseNotModified()
+        else:
+            respuesta = Response(calendario_service.calendario(request.user, anio, mes, etag))
+        respuesta['ETag'] = etag
+        respuesta['Cache-Control'] = 'private, no-cache'
+        return respuesta
+    
+    @action(detail=False, methods=['get'], url_path='calendario/dia')
+    def calendario_dia(self, request):
+        """
+        Detalle de un día del calendario: sus clases activas y cuáles tiene el
+        socio reservadas o en lista de espera.
+        GET /api/clases/calendario/dia/?fecha=AAAA-MM-DD
+        """
+        parametros = CalendarioDiaParametrosSerializer(data=request.query_params)
+        parametros.is_valid(raise_exception=True)
+        fecha = parametros.validated_data['fecha']
+        
+        clases, reservadas, en_espera = calendario_service.detalle_dia(request.user, fecha)
+        return Response({
+            'fecha': fecha,
+            'clases': ClaseSerializer(clases, many=True, context={'request': request}).data,
+            'reservadas': reservadas,
+            'en_espera': en_espera,
+        })
+    
+    def respuesta_catalogo(self, nombre, construir_queryset):
+        """
+        Respuesta cacheada de una vista del catálogo, con ETag.
+        
+        Si el cliente envía If-None-Match con el ETag vigente responde 304 sin
+        consultar las clases; si no, sirve el JSON ya renderizado de la caché
+        (o lo genera y lo guarda).
+        """
+        def construir():
+            serializer = self.get_serializer(construir_queryset(), many=True)
+            return JSONRenderer().render(serializer.data)
+        
+        host = self.request.get_host()
+        etag = catalogo_service.etag_catalogo(
+            nombre, catalogo_service.obtener_version(), host
+        )
+        if etag in self.request.headers.get('If-None-Match', ''):
+            respuesta = HttpResponseNotModified()
+        else:
+            etag, contenido = catalogo_service.obtener_catalogo(nombre, host, construir)
+            respuesta = HttpResponse(contenido, content_type='application/json')
+        respuesta['ETag'] = etag
+        # El cliente puede guardar la respuesta, pero debe revalidarla siempre
+        respuesta['Cache-Control'] = 'private, no-cache'
+        return respuesta
     
     @action(detail=True, methods=['get'])
     def reservas(self, request, pk=None):
@@ -130,7 +252,7 @@ class ClaseViewSet(viewsets.ModelViewSet):
         reservas = Reserva.objects.filter(
             clase=clase,
             estado=Reserva.CONFIRMADA
-        ).select_related('socio')
+        ).select_related('socio', 'clase')
         
         serializer = ReservaSerializer(reservas, many=True)
         return Response(serializer.data)
@@ -145,14 +267,54 @@ class ClaseViewSet(viewsets.ModelViewSet):
         from lista_espera.serializers import ListaEsperaSerializer
         
         clase = self.get_object()
-        lista = ListaEspera.objects.filter(
-            clase=clase,
-            estado=ListaEspera.ESPERANDO
-        ).select_related('socio').order_by('posicion')
+        lista = ListaEspera.objects.en_orden_de_llegada(clase).select_related('socio', 'clase')
         
         serializer = ListaEsperaSerializer(lista, many=True)
         return Response(serializer.data)
     
+    @action(detail=True, methods=['post'])
+    def cancelar(self, request, pk=None):
+        """
+        Cancela la clase con sus reservas y lista de espera, y avisa a los socios.
+        Solo administradores o el instructor de la clase.
+        POST /api/clases/{id}/cancelar/  {"motivo": "..."}
+        """
+        from reservas.cancelacion_service import cancelar_lote
+        from usuarios.models import Usuario
+        
+        clase = self.get_object()
+        if request.user.rol != Usuario.ADMINISTRADOR and not self.check_instructor_permission(clase.id):
+            raise PermissionDenied('No tienes permiso para cancelar esta clase')
+        if clase.estado != Clase.ACTIVA:
+            raise ValidationError({'detail': 'Solo se pueden cancelar clases activas.'})
+        
+        motivo = str(request.data.get('motivo', ''))[:200]
+        return Response(cancelar_lote([clase.id], motivo))
+    
+    @action(detail=False, methods=['post'], url_path='cancelar-lote')
+    def cancelar_lote(self, request):
+        """
+        Cancela en bloque las clases activas indicadas. Solo administradores.
+        POST /api/clases/cancelar-lote/  {"clases": [1, 2], "motivo": "..."}
+        POST /api/clases/cancelar-lote/  {"desde": "AAAA-MM-DD", "hasta": "AAAA-MM-DD"}
+        """
+        from reservas.cancelacion_service import cancelar_clases
+        from usuarios.models import Usuario
+        
+        if request.user.rol != Usuario.ADMINISTRADOR:
+            raise PermissionDenied('Solo los administradores pueden cancelar clases en bloque')
+        parametros = CancelarClasesSerializer(data=request.data)
+        parametros.is_valid(raise_exception=True)
+        datos = parametros.validated_data
+        
+        if datos.get('clases'):
+            clase_ids = datos['clases']
+        else:
+            clase_ids = Clase.objects.filter(
+                fecha__range=(datos['desde'], datos['hasta']), estado=Clase.ACTIVA
+            ).values_list('id', flat=True)
+        return Response(cancelar_clases(clase_ids, datos['motivo']))
+    
     @action(detail=False, methods=['get'])
     def por_tipo(self, request):
         """
@@ -180,7 +342,7 @@ class ClaseViewSet(viewsets.ModelViewSet):
             instructor = Instructor.objects.get(usuario=request.user)
             
             # Filtrar clases del instructor
-            clases = Clase.objects.filter(
+            clases = Clase.objects.para_listado().filter(
                 instructor=instructor
             ).order_by('-fecha', '-hora_inicio')
             
@@ -238,7 +400,7 @@ class ClaseViewSet(viewsets.ModelViewSet):
             instructor = Instructor.objects.get(usuario=request.user)
             
             # Crear clase asignando automáticamente al instructor actual
-            serializer = ClaseCrearSerializer(data=request.data)
+            serializer = ClaseCrearSerializer(data=request.data, context={'instructor': instructor})
             if serializer.is_valid():
                 serializer.save(instructor=instructor)
                 return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -249,3 +411,69 @@ class ClaseViewSet(viewsets.ModelViewSet):
                 {'detail': 'Usuario no es instructor'},
                 status=status.HTTP_403_FORBIDDEN
             )
+
+
+class ClasePlantillaViewSet(viewsets.ModelViewSet):
+    """
+    ViewSet para plantillas de clases recurrentes.
+    Los administradores gestionan todas las plantillas; los instructores, las suyas.
+    """
+    serializer_class = ClasePlantillaSerializer
+    permission_classes = [IsAuthenticated]
+    
+    def es_administrador(self):
+        """Indica si el usuario actual es administrador."""
+        from usuarios.models import Usuario
+        return self.request.user.rol == Usuario.ADMINISTRADOR
+    
+    def get_queryset(self):
+        """Todas las plantillas para administradores; las propias para instructores."""
+        queryset = ClasePlantilla.objects.select_related('instructor__usuario')
+        if self.es_administrador():
+            return queryset
+        return queryset.filter(instructor__usuario=self.request.user)
+    
+    def perform_create(self, serializer):
+        """Los instructores solo crean plantillas propias."""
+        from usuarios.models import Instructor
+        
+        if self.es_administrador():
+            serializer.save()
+            return
+        try:
+            instructor = Instructor.objects.get(usuario=self.request.user)
+        except Instructor.DoesNotExist:
+            raise PermissionDenied('Solo administradores e instructores pueden crear plantillas')
+        serializer.save(instructor=instructor)
+    
+    def perform_update(self, serializer):
+        """Guarda la plantilla y propaga los cambios a sus clases futuras."""
+        if not self.es_administrador():
+            serializer.validated_data.pop('instructor', None)
+        plantilla = serializer.save()
+        plantilla_service.propagar_cambios(plantilla)
+    
+    @action(detail=True, methods=['post'])
+    def materializar(self, request, pk=None):
+        """
+        Genera las clases de la plantilla para las próximas semanas.
+        POST /api/plantillas/{id}/materializar/  {"semanas": 4, "desde": "AAAA-MM-DD"}
+        """
+        plantilla = self.get_object()
+        parametros = MaterializarSerializer(data=request.data)
+        parametros.is_valid(raise_exception=True)
+        resultado = plantilla_service.materializar([plantilla], **parametros.validated_data)
+        return Response(resultado)
+    
+    @action(detail=False, methods=['post'], url_path='materializar-todas')
+    def materializar_todas(self, request):
+        """
+        Genera las clases de todas las plantillas activas. Solo administradores.
+        POST /api/plantillas/materializar-todas/  {"semanas": 12}
+        """
+        if not self.es_administrador():
+            raise PermissionDenied('Solo los administradores pueden generar la temporada completa')
+        parametros = MaterializarSerializer(data=request.data)
+        parametros.is_valid(raise_exception=True)
+        resultado = plantilla_service.materializar(**parametros.validated_data)
+        return Response(resultado)
@@ -3,6 +3,8 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.utils import timezone
+from busqueda.filters import BusquedaFilter
+from busqueda.models import DocumentoBusqueda
 from .models import Equipo
 from .serializers import EquipoSerializer, EquipoCreateUpdateSerializer
 
@@ -20,6 +22,8 @@ class EquipoViewSet(viewsets.ModelViewSet):
     """
     queryset = Equipo.objects.filter(activo=True)
     permission_classes = [IsAuthenticated]
+    filter_backends = [BusquedaFilter]
+    tipo_busqueda = DocumentoBusqueda.EQUIPO
     
     def get_serializer_class(self):
         if self.action in ['create', 'update', 'partial_update']:
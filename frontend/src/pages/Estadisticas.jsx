@@ -12,7 +12,7 @@ import {
   LineElement
 } from 'chart.js'
 import { Pie, Bar, Line } from 'react-chartjs-2'
-import api from '../services/api'
+import api, { obtenerTodas } from '../services/api'
 import { exportarEstadisticas } from '../utils/pdfExport'
 import { useNotifications } from '../hooks/useNotifications'
 import UserLayout from '../components/UserLayout'
@@ -39,12 +39,12 @@ export default function Estadisticas() {
 
   useEffect(() => {
     Promise.all([
-      api.get('usuarios/mis_reservas/'),
+      obtenerTodas('usuarios/mis_reservas/'),
       api.get('usuarios/me/')
     ])
-      .then(([reservasRes, usuarioRes]) => {
-        // La API puede devolver array directo o paginado
-        setReservas(reservasRes.data.results || reservasRes.data || [])
+      .then(([reservas, usuarioRes]) => {
+        // Todas las páginas: las estadísticas y el PDF cubren el historial completo
+        setReservas(reservas)
         setUsuario(usuarioRes.data)
       })
       .catch(err => {
@@ -1,6 +1,6 @@
 import { useEffect, useState } from 'react'
 import { Link } from 'react-router-dom'
-import api from '../services/api'
+import api, { obtenerTodas } from '../services/api'
 import { useNotifications } from '../hooks/useNotifications'
 import UserLayout from '../components/UserLayout'
 
@@ -32,9 +32,9 @@ export default function Perfil() {
     setLoading(true)
     Promise.all([
       api.get('usuarios/me/'),
-      api.get('usuarios/mis_reservas/')
+      obtenerTodas('usuarios/mis_reservas/')
     ])
-      .then(([userRes, reservasRes]) => {
+      .then(([userRes, reservas]) => {
         setUser(userRes.data)
         setEditData({
           first_name: userRes.data.first_name || '',
@@ -44,7 +44,6 @@ export default function Perfil() {
         })
 
         // Calcular estadísticas
-        const reservas = reservasRes.data
         const statsData = {
           total: reservas.length,
           activas: reservas.filter(r => r.estado === 'CONFIRMADA').length,
@@ -1,5 +1,5 @@
 import { useEffect, useState } from 'react'
-import api from '../services/api'
+import api, { obtenerTodas } from '../services/api'
 import { useNotifications } from '../hooks/useNotifications'
 import { useClassReminders } from '../hooks/useReminders'
 import { exportarComprobanteReserva, exportarListaReservas } from '../utils/pdfExport'
@@ -22,13 +22,13 @@ export default function Reservas() {
   async function fetchReservas() {
     setLoading(true)
     try {
-      const [reservasRes, usuarioRes, listaEsperaRes] = await Promise.all([
-        api.get('reservas/'),
+      const [reservasData, usuarioRes, listaEsperaRes] = await Promise.all([
+        obtenerTodas('reservas/'),
         api.get('usuarios/me/'),
         api.get('lista-espera/')
       ])
-      // La API devuelve un objeto paginado con 'results'
-      setReservas(reservasRes.data.results || reservasRes.data || [])
+      // La API pagina por cursor: se recorren todas las páginas
+      setReservas(reservasData)
       setUsuario(usuarioRes.data)
       setListaEspera(listaEsperaRes.data.results || listaEsperaRes.data || [])
     } catch (err) {
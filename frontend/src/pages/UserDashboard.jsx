@@ -1,6 +1,6 @@
 import { useState, useEffect } from 'react'
 import { useNavigate } from 'react-router-dom'
-import api from '../services/api'
+import api, { obtenerTodas } from '../services/api'
 import UserLayout from '../components/UserLayout'
 
 function UserDashboard() {
@@ -52,8 +52,7 @@ function UserDashboard() {
 
             // Cargar estadísticas reales del usuario
             try {
-                const reservasRes = await api.get('usuarios/mis_reservas/')
-                const reservas = reservasRes.data.results || reservasRes.data || []
+                const reservas = await obtenerTodas('usuarios/mis_reservas/')
 
                 // Calcular racha de días consecutivos
                 const reservasCompletadas = reservas.filter(r => r.estado === 'COMPLETADA')
@@ -1,6 +1,6 @@
 ﻿import { useState, useEffect, useCallback } from 'react'
 import { useNavigate } from 'react-router-dom'
-import api from '../../services/api'
+import api, { obtenerTodas } from '../../services/api'
 import AdminSidebar from './AdminSidebar'
 import './AdminSidebar.css'
 
@@ -36,16 +36,15 @@ function AdminDashboard() {
       setLoading(true)
       const hoy = new Date().toISOString().split('T')[0]
 
-      const [usersRes, clasesRes, reservasRes, instructoresRes] = await Promise.all([
+      const [usersRes, clasesRes, reservasData, instructoresRes] = await Promise.all([
         api.get('/usuarios/'),
         api.get('/clases/'),
-        api.get('/reservas/'),
+        obtenerTodas('/reservas/'),
         api.get('/instructores/')
       ])
 
       const usuariosData = usersRes.data.results || usersRes.data || []
       const clasesData = clasesRes.data.results || clasesRes.data || []
-      const reservasData = reservasRes.data.results || reservasRes.data || []
       const instructoresData = instructoresRes.data.results || instructoresRes.data || []
 
       // Filtrar datos
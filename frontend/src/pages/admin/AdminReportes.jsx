@@ -1,6 +1,6 @@
 import { useState, useEffect, useCallback } from 'react'
 import { useNavigate } from 'react-router-dom'
-import api from '../../services/api'
+import api, { obtenerTodas } from '../../services/api'
 import { Bar, Line, Pie } from 'react-chartjs-2'
 import jsPDF from 'jspdf'
 import AdminLayout from './AdminLayout'
@@ -27,13 +27,13 @@ function AdminReportes() {
     try {
       setLoading(true)
 
-      const [reservasRes, clasesRes, usuariosRes] = await Promise.all([
-        api.get('/reservas/'),
+      const [reservasData, clasesRes, usuariosRes] = await Promise.all([
+        obtenerTodas('/reservas/'),
         api.get('/clases/'),
         api.get('/usuarios/')
       ])
 
-      setReservas(reservasRes.data.results || reservasRes.data || [])
+      setReservas(reservasData)
       setClases(clasesRes.data.results || clasesRes.data || [])
       setUsuarios(usuariosRes.data.results || usuariosRes.data || [])
     } catch (error) {
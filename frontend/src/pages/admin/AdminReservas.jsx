@@ -1,6 +1,6 @@
 import { useState, useEffect, useCallback } from 'react'
 import { useNavigate } from 'react-router-dom'
-import api from '../../services/api'
+import api, { obtenerTodas } from '../../services/api'
 import Toast from '../../components/Toast'
 import AdminLayout from './AdminLayout'
 import './Admin.css'
@@ -35,8 +35,7 @@ function AdminReservas() {
     const cargarReservas = useCallback(async () => {
         try {
             setLoading(true)
-            const res = await api.get('/reservas/')
-            setReservas(res.data.results || res.data || [])
+            setReservas(await obtenerTodas('/reservas/'))
         } catch (error) {
             console.error('Error cargando reservas:', error)
             showToast('Error al cargar reservas', 'error')
@@ -177,5 +177,20 @@ api.interceptors.response.use(
   }
 )
 
-export default api
+// Obtiene todas las filas de un listado paginado por cursor siguiendo `next`.
+// Los listados de reservas entregan páginas de 10: quien calcula totales o
+// estadísticas sobre el historial completo debe recorrerlas todas.
+export const obtenerTodas = async (url, params = {}) => {
+  const filas = []
+  let respuesta = await api.get(url, { params: { page_size: 100, sin_total: 1, ...params } })
+  for (;;) {
+    const data = respuesta.data
+    // Listados sin paginar
+    if (!data?.results) return data || []
+    filas.push(...data.results)
+    if (!data.next) return filas
+    respuesta = await api.get(data.next)
+  }
+}
 
+export default api
@@ -1,5 +1,9 @@
+from collections import defaultdict
+
 from django.contrib import admin
-from .models import ListaEspera
+from clases.models import Clase
+from .models import ListaEspera, TasaCancelacion
+from . import promocion_service
 
 
 @admin.register(ListaEspera)
@@ -11,7 +15,7 @@ class ListaEsperaAdmin(admin.ModelAdmin):
     list_filter = ('estado', 'fecha_ingreso', 'notificacion_enviada', 'clase__tipo')
     search_fields = ('socio__first_name', 'socio__last_name', 'socio__email', 'clase__nombre')
     date_hierarchy = 'fecha_ingreso'
-    ordering = ('clase', 'posicion', 'fecha_ingreso')
+    ordering = ('clase', 'id')
     
     fieldsets = (
         ('Información de Lista de Espera', {
@@ -29,12 +33,21 @@ class ListaEsperaAdmin(admin.ModelAdmin):
     
     actions = ['asignar_cupos', 'cancelar_entradas']
     
+    def get_queryset(self, request):
+        """Calcula la posición de todas las filas en la misma consulta."""
+        return super().get_queryset(request).con_posicion()
+    
     def asignar_cupos(self, request, queryset):
-        """Asigna cupos disponibles a los seleccionados en lista de espera."""
+        """Asigna cupos disponibles a los seleccionados en lista de espera, en bloque por clase."""
+        seleccion = defaultdict(list)
+        for clase_id, entrada_id in queryset.filter(
+            estado=ListaEspera.ESPERANDO
+        ).values_list('clase_id', 'id'):
+            seleccion[clase_id].append(entrada_id)
+        
         count = 0
-        for entrada in queryset.filter(estado=ListaEspera.ESPERANDO):
-            if entrada.asignar_cupo():
-                count += 1
+        for clase in Clase.objects.filter(id__in=seleccion):
+            count += len(promocion_service.promover(clase, entrada_ids=seleccion[clase.id]))
         self.message_user(request, f'{count} cupo(s) asignado(s).')
     asignar_cupos.short_description = "Asignar cupos disponibles"
     
@@ -46,3 +59,20 @@ class ListaEsperaAdmin(admin.ModelAdmin):
                 count += 1
         self.message_user(request, f'{count} entrada(s) cancelada(s).')
     cancelar_entradas.short_description = "Cancelar entradas"
+
+
+@admin.register(TasaCancelacion)
+class TasaCancelacionAdmin(admin.ModelAdmin):
+    """
+    Configuración del admin para el modelo TasaCancelacion (solo lectura:
+    la tabla la recalcula el comando calcular_tasas_cancelacion).
+    """
+    list_display = ('tipo', 'dia_semana', 'hora', 'reservas', 'cancelaciones', 'no_shows', 'fecha_calculo')
+    list_filter = ('tipo', 'dia_semana')
+    ordering = ('tipo', 'dia_semana', 'hora')
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
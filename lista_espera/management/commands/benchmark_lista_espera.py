@@ -0,0 +1,235 @@
+"""
+Prueba de carga de la lista de espera con posición calculada al leer.
+
+Llena la lista de una clase con N socios y mide:
+- cuántas filas escribe la salida del primero de la lista (antes: N - 1),
+- el costo de leer la posición de una entrada y la lista completa,
+- entradas y salidas simultáneas desde varios hilos, verificando al final
+  que las posiciones queden 1..n, sin repetidos ni huecos,
+- cancelaciones simultáneas sobre una clase llena, cada una seguida de la
+  promoción de la lista de espera, verificando que nadie reciba dos
+  reservas ni se salte la cola.
+
+Uso:
+    python manage.py benchmark_lista_espera
+    python manage.py benchmark_lista_espera --entradas=5000 --hilos=40
+    python manage.py benchmark_lista_espera --cancelaciones=200
+"""
+import threading
+import time as reloj
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from clases.models import Clase
+from lista_espera.models import ListaEspera
+from reservas.models import Reserva
+from reservas.reserva_service import cancelar_reserva
+from usuarios.models import Usuario
+
+PREFIJO = 'bench_espera_'
+
+
+class Command(BaseCommand):
+    help = 'Mide escrituras y lecturas de posición en una lista de espera grande'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--entradas',
+            type=int,
+            default=1000,
+            help='Socios en la lista de espera (default: 1000)'
+        )
+        parser.add_argument(
+            '--hilos',
+            type=int,
+            default=20,
+            help='Socios que entran y salen a la vez (default: 20)'
+        )
+        parser.add_argument(
+            '--cancelaciones',
+            type=int,
+            default=100,
+            help='Reservas canceladas a la vez sobre una clase llena (default: 100)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            self.ejecutar(options['entradas'], options['hilos'])
+            self.simular_cancelaciones(options['cancelaciones'])
+        finally:
+            self.limpiar_datos()
+
+    def ejecutar(self, cantidad, hilos):
+        """Ejecuta las mediciones y reporta sus métricas."""
+        self.stdout.write(self.style.NOTICE(f'\nLista de espera de {cantidad} socios'))
+        clase, socios = self.preparar_datos(cantidad + hilos)
+        en_lista, nuevos = socios[:cantidad], socios[cantidad:]
+
+        inicio = reloj.perf_counter()
+        ListaEspera.objects.bulk_create([ListaEspera(socio=socio, clase=clase) for socio in en_lista])
+        self.stdout.write(f'  Llenado: {reloj.perf_counter() - inicio:.3f}s')
+
+        # Salida del primero de la lista: solo debe escribirse su fila
+        primera = ListaEspera.objects.en_orden_de_llegada(clase).first()
+        with CaptureQueriesContext(connection) as consultas:
+            inicio = reloj.perf_counter()
+            primera.cancelar()
+            duracion = reloj.perf_counter() - inicio
+        escrituras = [
+            consulta for consulta in consultas.captured_queries
+            if consulta['sql'].startswith('UPDATE "lista_espera_listaespera"')
+        ]
+        self.stdout.write(
+            f'  Salida del primero: {duracion * 1000:.1f} ms, '
+            f'{len(escrituras)} UPDATE sobre la lista (antes renumeraba {cantidad - 1} filas)'
+        )
+
+        ultima = ListaEspera.objects.filter(clase=clase).order_by('-id').first()
+        inicio = reloj.perf_counter()
+        posicion = ultima.posicion
+        self.stdout.write(
+            f'  Posición del último: {posicion} en {(reloj.perf_counter() - inicio) * 1000:.1f} ms'
+        )
+
+        inicio = reloj.perf_counter()
+        lista = list(ListaEspera.objects.en_orden_de_llegada(clase).values_list('posicion_actual', flat=True))
+        self.stdout.write(
+            f'  Lista completa ({len(lista)} entradas): {(reloj.perf_counter() - inicio) * 1000:.1f} ms'
+        )
+
+        self.simular_concurrencia(clase, nuevos, hilos)
+
+        posiciones = list(
+            ListaEspera.objects.en_orden_de_llegada(clase).values_list('posicion_actual', flat=True)
+        )
+        if posiciones != list(range(1, len(posiciones) + 1)):
+            raise CommandError('Posiciones repetidas o con huecos tras las operaciones simultáneas')
+        self.stdout.write(self.style.SUCCESS(f'  Posiciones consistentes: 1..{len(posiciones)}'))
+
+    def simular_concurrencia(self, clase, nuevos, hilos):
+        """Hace entrar a `hilos` socios mientras salen otros tantos de la lista."""
+        salientes = list(ListaEspera.objects.en_orden_de_llegada(clase)[:hilos])
+        barrera = threading.Barrier(len(nuevos) + len(salientes))
+
+        def operar(operacion):
+            try:
+                barrera.wait()
+                inicio = reloj.perf_counter()
+                operacion()
+                return reloj.perf_counter() - inicio
+            finally:
+                connection.close()
+
+        operaciones = [
+            (lambda socio=socio: ListaEspera.objects.create(socio=socio, clase=clase)) for socio in nuevos
+        ] + [entrada.cancelar for entrada in salientes]
+
+        inicio = reloj.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(operaciones)) as executor:
+            latencias = list(executor.map(operar, operaciones))
+        duracion = reloj.perf_counter() - inicio
+
+        self.stdout.write(
+            f'  {len(nuevos)} entradas y {len(salientes)} salidas simultáneas: {duracion:.3f}s '
+            f'(máx. {max(latencias) * 1000:.1f} ms por operación)'
+        )
+
+    def simular_cancelaciones(self, cantidad):
+        """
+        Cancela a la vez `cantidad` reservas de una clase llena con la misma
+        cantidad de socios en espera; cada hilo promueve después al siguiente.
+        """
+        self.stdout.write(self.style.NOTICE(f'\n{cantidad} cancelaciones simultáneas'))
+        clase, socios = self.preparar_datos(cantidad * 2)
+        titulares, en_espera = socios[:cantidad], socios[cantidad:]
+        Clase.objects.filter(pk=clase.pk).update(cupos_totales=cantidad, cupos_ocupados=cantidad)
+        reservas = Reserva.objects.bulk_create([
+            Reserva(socio=socio, clase=clase, estado=Reserva.CONFIRMADA) for socio in titulares
+        ])
+        ListaEspera.objects.bulk_create([ListaEspera(socio=socio, clase=clase) for socio in en_espera])
+
+        barrera = threading.Barrier(cantidad)
+
+        def cancelar_y_promover(reserva):
+            try:
+                barrera.wait()
+                inicio = reloj.perf_counter()
+                cancelar_reserva(reserva, procesar_lista_espera=False)
+                promovida = ListaEspera.procesar_siguiente_en_lista(Clase.objects.get(pk=clase.pk))
+                return promovida is not None, reloj.perf_counter() - inicio
+            finally:
+                connection.close()
+
+        inicio = reloj.perf_counter()
+        with ThreadPoolExecutor(max_workers=cantidad) as executor:
+            resultados = list(executor.map(cancelar_y_promover, reservas))
+        duracion = reloj.perf_counter() - inicio
+
+        # Los cupos que ningún hilo alcanzó a promover se reparten al final
+        pendientes = 0
+        while ListaEspera.procesar_siguiente_en_lista(clase):
+            pendientes += 1
+
+        clase.refresh_from_db()
+        confirmadas = Reserva.objects.filter(clase=clase, estado=Reserva.CONFIRMADA)
+        socios_confirmados = list(confirmadas.values_list('socio_id', flat=True))
+        asignadas = list(
+            ListaEspera.objects.filter(clase=clase, estado=ListaEspera.ASIGNADO)
+            .order_by('id').values_list('socio_id', flat=True)
+        )
+        self.stdout.write(
+            f'  Duración: {duracion:.3f}s (máx. {max(latencia for _, latencia in resultados) * 1000:.1f} ms '
+            f'por cancelación)'
+        )
+        self.stdout.write(
+            f'  Promovidos por los hilos: {sum(1 for promovida, _ in resultados if promovida)}, '
+            f'al final: {pendientes}'
+        )
+
+        if (
+            len(socios_confirmados) != len(set(socios_confirmados))
+            or clase.cupos_ocupados != len(socios_confirmados)
+            or asignadas != [socio.id for socio in en_espera[:len(asignadas)]]
+            or len(asignadas) != cantidad
+        ):
+            raise CommandError('Promociones duplicadas, saltadas o cupos inconsistentes')
+        self.stdout.write(self.style.SUCCESS(
+            f'  Sin duplicados: {len(asignadas)} socios promovidos en orden de llegada'
+        ))
+
+    def preparar_datos(self, cantidad):
+        """Crea socios y la clase llena de prueba."""
+        self.limpiar_datos()
+
+        Usuario.objects.bulk_create([
+            Usuario(
+                username=f'{PREFIJO}{i}',
+                email=f'{PREFIJO}{i}@example.com',
+                rol=Usuario.SOCIO,
+                estado_membresia=Usuario.ACTIVA
+            )
+            for i in range(cantidad)
+        ])
+        socios = list(Usuario.objects.filter(username__startswith=PREFIJO).order_by('id'))
+
+        clase = Clase.objects.create(
+            nombre=f'{PREFIJO}yoga',
+            tipo=Clase.YOGA,
+            fecha=timezone.now().date() + timedelta(days=1),
+            hora_inicio=time(7, 0),
+            hora_fin=time(8, 0),
+            cupos_totales=1,
+            cupos_ocupados=1,
+            estado=Clase.ACTIVA
+        )
+        return clase, socios
+
+    def limpiar_datos(self):
+        """Elimina los datos creados por la prueba."""
+        Clase.objects.filter(nombre__startswith=PREFIJO).delete()
+        Usuario.objects.filter(username__startswith=PREFIJO).delete()
@@ -0,0 +1,33 @@
+"""
+Recalcula las tasas históricas de cancelación y no-show por tipo de clase,
+día de la semana y hora, usadas para estimar la probabilidad de obtener cupo
+desde la lista de espera.
+
+Pensado para ejecutarse cada noche (cron); todo el historial se agrega con
+una sola consulta.
+
+Uso:
+    python manage.py calcular_tasas_cancelacion
+    python manage.py calcular_tasas_cancelacion --dias=90
+"""
+from django.core.management.base import BaseCommand
+
+from lista_espera import probabilidad_service
+
+
+class Command(BaseCommand):
+    help = 'Recalcula las tasas de cancelación usadas por la lista de espera'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias',
+            type=int,
+            default=probabilidad_service.DIAS_HISTORIAL,
+            help=f'Días de historial a considerar (default: {probabilidad_service.DIAS_HISTORIAL})'
+        )
+
+    def handle(self, *args, **options):
+        guardadas = probabilidad_service.calcular_tasas(dias=options['dias'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Tasas de cancelación recalculadas: {guardadas} combinaciones de tipo, día y hora.'
+        ))
@@ -0,0 +1,76 @@
+"""
+Expira las ofertas de cupo de la lista de espera que vencieron sin respuesta
+y ofrece esos cupos a los siguientes de la lista.
+
+Sin --continuo hace una sola pasada sobre todas las ofertas vencidas (cron).
+Con --continuo queda como demonio: agenda los vencimientos en una rueda de
+temporizadores y solo consulta la base para cargar ofertas nuevas cada
+--recarga segundos, así que una oferta vence con un retraso de a lo más
+--recarga + --resolucion segundos. Debe ejecutarse una sola instancia.
+
+Uso:
+    python manage.py expirar_ofertas_lista_espera
+    python manage.py expirar_ofertas_lista_espera --continuo
+    python manage.py expirar_ofertas_lista_espera --continuo --resolucion=0.5 --recarga=10
+"""
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from lista_espera import oferta_service
+
+
+class Command(BaseCommand):
+    help = 'Expira las ofertas de cupo vencidas y pasa los cupos al siguiente de la lista de espera'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--continuo',
+            action='store_true',
+            help='Quedarse expirando ofertas en vez de procesar una sola pasada'
+        )
+        parser.add_argument(
+            '--resolucion',
+            type=float,
+            default=1.0,
+            help='Segundos por tic de la rueda de temporizadores (default: 1)'
+        )
+        parser.add_argument(
+            '--recarga',
+            type=float,
+            default=30.0,
+            help='Segundos entre lecturas de ofertas nuevas desde la base (default: 30)'
+        )
+
+    def handle(self, *args, **options):
+        if not options['continuo']:
+            expiradas, nuevas = oferta_service.expirar_ofertas()
+            self.stdout.write(
+                self.style.SUCCESS(f'Ofertas: {expiradas} expiradas, {len(nuevas)} nuevas')
+            )
+            return
+
+        self.stdout.write(self.style.NOTICE('Vigilando ofertas de lista de espera (Ctrl+C para salir)...'))
+        rueda = oferta_service.RuedaTemporizadora(resolucion=options['resolucion'])
+        recarga = timedelta(seconds=options['recarga'])
+        proxima_carga = timezone.now()
+        try:
+            while True:
+                ahora = timezone.now()
+                if ahora >= proxima_carga:
+                    # Las que vencen antes de la próxima lectura; las demás se leen después
+                    for entrada_id, vence in oferta_service.ofertas_por_vencer(ahora + recarga):
+                        rueda.agregar(entrada_id, vence)
+                    proxima_carga = ahora + recarga
+
+                vencidas = rueda.avanzar(ahora)
+                if vencidas:
+                    _, nuevas = oferta_service.expirar_ofertas(vencidas)
+                    for entrada in nuevas:
+                        rueda.agregar(entrada.id, entrada.fecha_expiracion)
+
+                time.sleep(options['resolucion'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.SUCCESS('Vigilancia de ofertas detenida.'))
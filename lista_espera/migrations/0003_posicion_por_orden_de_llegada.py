@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clases', '0007_clase_indice_horario_instructor'),
+        ('lista_espera', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='listaespera',
+            options={'ordering': ['clase', 'id'], 'verbose_name': 'Lista de Espera', 'verbose_name_plural': 'Listas de Espera'},
+        ),
+        migrations.RemoveIndex(
+            model_name='listaespera',
+            name='lista_esper_clase_i_899a37_idx',
+        ),
+        migrations.RemoveField(
+            model_name='listaespera',
+            name='posicion',
+        ),
+        migrations.AddIndex(
+            model_name='listaespera',
+            index=models.Index(fields=['clase', 'estado', 'id'], name='lista_clase_estado_id_idx'),
+        ),
+    ]
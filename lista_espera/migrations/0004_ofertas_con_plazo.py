@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clases', '0007_clase_indice_horario_instructor'),
+        ('lista_espera', '0003_posicion_por_orden_de_llegada'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='listaespera',
+            name='estado',
+            field=models.CharField(choices=[('esperando', 'Esperando'), ('ofertado', 'Cupo Ofrecido'), ('asignado', 'Asignado'), ('expirado', 'Expirado'), ('cancelado', 'Cancelado')], default='esperando', max_length=20, verbose_name='Estado'),
+        ),
+        migrations.AddIndex(
+            model_name='listaespera',
+            index=models.Index(fields=['estado', 'fecha_expiracion'], name='lista_estado_expiracion_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lista_espera', '0004_ofertas_con_plazo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TasaCancelacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('spinning', 'Spinning'), ('yoga', 'Yoga'), ('pilates', 'Pilates'), ('musculacion', 'Musculación'), ('cardio', 'Cardio')], max_length=20, verbose_name='Tipo de Clase')),
+                ('dia_semana', models.PositiveSmallIntegerField(verbose_name='Día de la Semana (1 = lunes)')),
+                ('hora', models.PositiveSmallIntegerField(verbose_name='Hora de Inicio')),
+                ('reservas', models.PositiveIntegerField(default=0, verbose_name='Reservas Observadas')),
+                ('cancelaciones', models.PositiveIntegerField(default=0, verbose_name='Cancelaciones')),
+                ('no_shows', models.PositiveIntegerField(default=0, verbose_name='No-shows')),
+                ('fecha_calculo', models.DateTimeField(auto_now=True, verbose_name='Fecha de Cálculo')),
+            ],
+            options={
+                'verbose_name': 'Tasa de Cancelación',
+                'verbose_name_plural': 'Tasas de Cancelación',
+                'ordering': ['tipo', 'dia_semana', 'hora'],
+                'constraints': [models.UniqueConstraint(fields=('tipo', 'dia_semana', 'hora'), name='tasa_tipo_dia_hora_unica')],
+            },
+        ),
+    ]
@@ -1,27 +1,75 @@
-from django.db import models
+from django.db import connection, models, transaction
+from django.db.models import Case, Count, OuterRef, Subquery, When
+from django.db.models.functions import RowNumber
 from django.utils import timezone
 from usuarios.models import Usuario
 from clases.models import Clase
 
 
+# Entradas que procesar_siguiente_en_lista prueba antes de rendirse (sin SKIP LOCKED)
+INTENTOS_RECLAMO = 5
+
+
+class ListaEsperaQuerySet(models.QuerySet):
+    """QuerySet con las optimizaciones usadas por los listados de lista de espera."""
+    
+    def para_listado(self):
+        """Trae socio, clase e instructor en la misma consulta."""
+        return self.select_related('socio', 'clase__instructor__usuario')
+    
+    def con_posicion(self):
+        """
+        Anota `posicion_actual` de cada entrada: cuántas entradas en espera de
+        su clase llegaron antes que ella, más uno (None si ya no espera).
+        Es un conteo sobre el índice (clase, estado, id).
+        """
+        antes = self.model.objects.filter(
+            clase=OuterRef('clase'),
+            estado=self.model.ESPERANDO,
+            id__lte=OuterRef('id')
+        ).order_by().values('clase').annotate(total=Count('id')).values('total')
+        return self.annotate(posicion_actual=Case(
+            When(estado=self.model.ESPERANDO, then=Subquery(antes)),
+            default=None
+        ))
+    
+    def en_orden_de_llegada(self, clase):
+        """
+        Entradas en espera de una clase en orden de llegada, con
+        `posicion_actual` calculada por una función de ventana.
+        """
+        return self.filter(clase=clase, estado=self.model.ESPERANDO).annotate(
+            posicion_actual=models.Window(RowNumber(), order_by=models.F('id').asc())
+        ).order_by('id')
+
+
 class ListaEspera(models.Model):
     """
     Modelo para gestionar la lista de espera de clases llenas.
+    
+    El orden de llegada es el ID (secuencia creciente de la base de datos), así
+    que la posición no se guarda: se calcula al leer. Entrar o salir de la
+    lista escribe solo la fila propia, sin renumerar a los demás.
     """
     
     # Estados
     ESPERANDO = 'esperando'
+    OFERTADO = 'ofertado'
     ASIGNADO = 'asignado'
     EXPIRADO = 'expirado'
     CANCELADO = 'cancelado'
     
     ESTADOS = [
         (ESPERANDO, 'Esperando'),
+        (OFERTADO, 'Cupo Ofrecido'),
         (ASIGNADO, 'Asignado'),
         (EXPIRADO, 'Expirado'),
         (CANCELADO, 'Cancelado'),
     ]
     
+    # Entradas que siguen en la lista: esperando o con un cupo retenido
+    ESTADOS_ACTIVOS = [ESPERANDO, OFERTADO]
+    
     # Campos principales
     socio = models.ForeignKey(
         Usuario,
@@ -45,11 +93,6 @@ class ListaEspera(models.Model):
         verbose_name='Estado'
     )
     
-    posicion = models.IntegerField(
-        default=0,
-        verbose_name='Posición en la Lista'
-    )
-    
     # Timestamps
     fecha_ingreso = models.DateTimeField(
         auto_now_add=True,
@@ -79,90 +122,193 @@ class ListaEspera(models.Model):
         verbose_name='Notificación Enviada'
     )
     
+    objects = ListaEsperaQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Lista de Espera'
         verbose_name_plural = 'Listas de Espera'
-        ordering = ['clase', 'posicion', 'fecha_ingreso']
+        ordering = ['clase', 'id']
         unique_together = ['socio', 'clase']  # Un socio solo puede estar una vez en lista de espera por clase
         indexes = [
-            models.Index(fields=['clase', 'estado', 'posicion']),
+            models.Index(fields=['clase', 'estado', 'id'], name='lista_clase_estado_id_idx'),
             models.Index(fields=['socio', 'estado']),
+            # Búsqueda de ofertas vencidas
+            models.Index(fields=['estado', 'fecha_expiracion'], name='lista_estado_expiracion_idx'),
         ]
     
     def __str__(self):
-        return f"{self.socio.get_full_name()} - {self.clase.nombre} (Pos: {self.posicion})"
+        return f"{self.socio.get_full_name()} - {self.clase.nombre} ({self.get_estado_display()})"
+    
+    @property
+    def posicion(self):
+        """Posición actual en la lista (1 = siguiente en recibir cupo); None si ya no espera."""
+        if self.estado != self.ESPERANDO or self.pk is None:
+            return None
+        if getattr(self, 'posicion_actual', None) is None:
+            self.posicion_actual = ListaEspera.objects.filter(
+                clase_id=self.clase_id,
+                estado=self.ESPERANDO,
+                id__lte=self.pk
+            ).count()
+        return self.posicion_actual
+    
+    def _cambiar_estado(self, nuevo_estado, **campos):
+        """
+        Pasa la entrada de ESPERANDO a `nuevo_estado` con un UPDATE condicional.
+        
+        Si otro proceso ya la tomó (la asignó o se canceló), no se escribe nada
+        y retorna False, aunque esta instancia esté desactualizada.
+        """
+        ahora = timezone.now()
+        actualizadas = ListaEspera.objects.filter(pk=self.pk, estado=self.ESPERANDO).update(
+            estado=nuevo_estado, fecha_actualizacion=ahora, **campos
+        )
+        if not actualizadas:
+            return False
+        
+        # update() no emite post_save: actualizar la agenda a mano
+        from reservas import agenda_service
+        self.estado = nuevo_estado
+        self.fecha_actualizacion = ahora
+        for campo, valor in campos.items():
+            setattr(self, campo, valor)
+        agenda_service.registrar_entrada_espera(self)
+        return True
     
     def asignar_cupo(self):
         """
         Asigna un cupo disponible al socio en la lista de espera.
         Crea automáticamente una reserva y notifica al usuario.
+        
+        La entrada se reclama con un UPDATE condicional antes de ocupar el
+        cupo: dos procesos que asignan la misma entrada crean una sola reserva.
         """
-        from reservas.models import Reserva
-        from notificaciones.models import Notificacion
+        from reservas.reserva_service import reservar_cupo, OTORGADO
+        from reservas.outbox_service import ORIGEN_LISTA_ESPERA
         
-        if self.estado == self.ESPERANDO and not self.clase.esta_llena:
-            # Crear la reserva
-            reserva = Reserva.objects.create(
-                socio=self.socio,
-                clase=self.clase,
-                estado=Reserva.CONFIRMADA
-            )
-            
-            # Incrementar cupo en la clase
-            self.clase.incrementar_cupo()
-            
-            # Actualizar estado de lista de espera
-            self.estado = self.ASIGNADO
-            self.fecha_asignacion = timezone.now()
-            self.save()
-            
-            # Notificar al socio que fue asignado desde lista de espera
-            Notificacion.crear_notificacion_cupo_disponible(self.socio, self.clase)
+        if self.estado != self.ESPERANDO:
+            return None
+        
+        with transaction.atomic():
+            if not self._cambiar_estado(self.ASIGNADO, fecha_asignacion=timezone.now()):
+                return None
             
-            return reserva
-        return None
+            # Ocupar el cupo y crear la reserva de forma atómica; la notificación
+            # de cupo disponible la genera el despachador del outbox
+            resultado, reserva = reservar_cupo(self.socio, self.clase, origen=ORIGEN_LISTA_ESPERA)
+            if resultado != OTORGADO:
+                # Sin cupo: deshacer el reclamo, la entrada sigue esperando en su lugar
+                transaction.set_rollback(True)
+                self.estado = self.ESPERANDO
+                self.fecha_asignacion = None
+                return None
+        
+        return reserva
     
     def cancelar(self):
-        """Cancela la entrada en la lista de espera."""
+        """Cancela la entrada en la lista de espera (si tenía un cupo ofrecido, lo rechaza)."""
+        if self.estado == self.OFERTADO:
+            from .oferta_service import rechazar_oferta
+            return rechazar_oferta(self)
         if self.estado == self.ESPERANDO:
-            self.estado = self.CANCELADO
-            self.save()
-            
-            # Actualizar posiciones de los que están después
-            ListaEspera.objects.filter(
-                clase=self.clase,
-                estado=self.ESPERANDO,
-                posicion__gt=self.posicion
-            ).update(posicion=models.F('posicion') - 1)
-            
-            return True
+            return self._cambiar_estado(self.CANCELADO)
         return False
     
-    def save(self, *args, **kwargs):
-        """
-        Sobrescribe el método save para asignar la posición automáticamente.
-        """
-        if not self.pk and self.estado == self.ESPERANDO:
-            # Obtener la última posición para esta clase
-            ultima_posicion = ListaEspera.objects.filter(
-                clase=self.clase,
-                estado=self.ESPERANDO
-            ).aggregate(models.Max('posicion'))['posicion__max'] or 0
-            
-            self.posicion = ultima_posicion + 1
-        
-        super().save(*args, **kwargs)
-    
     @staticmethod
     def procesar_siguiente_en_lista(clase):
         """
         Procesa el siguiente socio en la lista de espera cuando hay un cupo disponible.
+        
+        En modo oferta (LISTA_ESPERA_MINUTOS_OFERTA > 0) el cupo no se reserva:
+        queda retenido para el socio hasta que lo acepte o venza el plazo.
+        
+        Returns:
+            Reserva creada, lista de entradas con oferta (modo oferta) o None
         """
-        siguiente = ListaEspera.objects.filter(
+        from . import oferta_service
+        
+        if oferta_service.modo_oferta():
+            return oferta_service.ofrecer_siguientes(clase)
+        
+        def hay_cupo():
+            return Clase.objects.filter(
+                pk=clase.pk, cupos_ocupados__lt=models.F('cupos_totales')
+            ).exists()
+        
+        # Otro proceso ya ocupó el cupo: no reclamar entradas en vano
+        if not hay_cupo():
+            return None
+        
+        candidatos = ListaEspera.objects.filter(
             clase=clase,
             estado=ListaEspera.ESPERANDO
-        ).order_by('posicion', 'fecha_ingreso').first()
+        ).select_related('socio', 'clase').order_by('id')
         
-        if siguiente:
-            return siguiente.asignar_cupo()
+        if connection.features.has_select_for_update_skip_locked:
+            # PostgreSQL: cada proceso bloquea la primera entrada que nadie más
+            # tiene bloqueada, así varios despachadores promueven en paralelo
+            with transaction.atomic():
+                siguiente = candidatos.select_for_update(skip_locked=True, of=('self',)).first()
+                return siguiente.asignar_cupo() if siguiente else None
+        
+        # Sin SKIP LOCKED (SQLite): el reclamo condicional de asignar_cupo
+        # decide; si otro proceso ganó la primera entrada, se prueba la siguiente
+        for siguiente in candidatos[:INTENTOS_RECLAMO]:
+            reserva = siguiente.asignar_cupo()
+            if reserva or not hay_cupo():
+                return reserva
         return None
+
+
+class TasaCancelacion(models.Model):
+    """
+    Tasas históricas de cancelación y no-show por tipo de clase, día de la
+    semana y hora de inicio. Las recalcula cada noche el comando
+    calcular_tasas_cancelacion; se usan para estimar la probabilidad de
+    obtener cupo desde la lista de espera.
+    """
+    
+    tipo = models.CharField(
+        max_length=20,
+        choices=Clase.TIPOS_CLASE,
+        verbose_name='Tipo de Clase'
+    )
+    
+    dia_semana = models.PositiveSmallIntegerField(
+        verbose_name='Día de la Semana (1 = lunes)'
+    )
+    
+    hora = models.PositiveSmallIntegerField(
+        verbose_name='Hora de Inicio'
+    )
+    
+    reservas = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Reservas Observadas'
+    )
+    
+    cancelaciones = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Cancelaciones'
+    )
+    
+    no_shows = models.PositiveIntegerField(
+        default=0,
+        verbose_name='No-shows'
+    )
+    
+    fecha_calculo = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Fecha de Cálculo'
+    )
+    
+    class Meta:
+        verbose_name = 'Tasa de Cancelación'
+        verbose_name_plural = 'Tasas de Cancelación'
+        ordering = ['tipo', 'dia_semana', 'hora']
+        constraints = [
+            models.UniqueConstraint(fields=['tipo', 'dia_semana', 'hora'], name='tasa_tipo_dia_hora_unica'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_tipo_display()} - día {self.dia_semana} {self.hora}:00 ({self.cancelaciones}/{self.reservas})"
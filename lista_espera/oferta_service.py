@@ -0,0 +1,256 @@
+"""
+Ofertas de cupo con plazo para la lista de espera.
+
+Con LISTA_ESPERA_MINUTOS_OFERTA > 0, el cupo que se libera no se reserva de
+inmediato para el primero de la lista: queda retenido para él (cuenta como
+ocupado) hasta `fecha_expiracion`, y el socio lo acepta o lo rechaza. Las
+ofertas vencidas se expiran en bloque y sus cupos pasan a los siguientes de
+la lista.
+
+El demonio `expirar_ofertas_lista_espera --continuo` agenda los vencimientos
+en una rueda de temporizadores (RuedaTemporizadora): avanza un tic por
+intervalo sin consultar la base y solo la lee para cargar las ofertas nuevas
+cada `recarga` segundos.
+"""
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from clases.models import Clase
+from clases.signals import clases_modificadas
+from .models import ListaEspera
+
+logger = logging.getLogger('lista_espera')
+
+
+def minutos_oferta():
+    """Plazo de las ofertas en minutos; 0 desactiva el modo oferta."""
+    return getattr(settings, 'LISTA_ESPERA_MINUTOS_OFERTA', 0)
+
+
+def modo_oferta():
+    return minutos_oferta() > 0
+
+
+def _vencimiento(clase, ahora):
+    """Fin del plazo de una oferta: nunca después del inicio de la clase."""
+    inicio = timezone.make_aware(datetime.combine(clase.fecha, clase.hora_inicio))
+    return min(ahora + timedelta(minutes=minutos_oferta()), inicio)
+
+
+def ofrecer_siguientes(clase, cupos=1):
+    """
+    Retiene hasta `cupos` cupos libres de la clase (None: todos) para los
+    primeros de la lista de espera y les avisa el plazo para aceptarlos.
+
+    Returns:
+        list: Entradas que recibieron la oferta
+    """
+    from notificaciones.models import Notificacion
+
+    ahora = timezone.now()
+    with transaction.atomic():
+        clase = Clase.objects.select_for_update().get(pk=clase.pk)
+        vence = _vencimiento(clase, ahora)
+        cupos = clase.cupos_disponibles if cupos is None else min(cupos, clase.cupos_disponibles)
+        if clase.estado != Clase.ACTIVA or vence <= ahora or cupos <= 0:
+            return []
+
+        entradas = list(
+            ListaEspera.objects.select_for_update().filter(
+                clase=clase, estado=ListaEspera.ESPERANDO
+            ).select_related('socio').order_by('id')[:cupos]
+        )
+        if not entradas:
+            return []
+
+        # Un solo UPDATE retiene todos los cupos ofrecidos
+        Clase.objects.filter(pk=clase.pk).update(
+            cupos_ocupados=models.F('cupos_ocupados') + len(entradas),
+            fecha_actualizacion=ahora
+        )
+        clase.notificar_cambio_cupos()
+
+        for entrada in entradas:
+            entrada.clase = clase
+            entrada.estado = ListaEspera.OFERTADO
+            entrada.fecha_expiracion = vence
+            entrada.notificacion_enviada = True
+            entrada.save()
+            Notificacion.crear_notificacion_cupo_disponible(entrada.socio, clase, vence=vence)
+
+    logger.info(
+        f'Clase {clase.id}: {len(entradas)} cupo(s) ofrecido(s) a la lista de espera '
+        f'hasta {timezone.localtime(vence):%H:%M}'
+    )
+    return entradas
+
+
+def aceptar_oferta(entrada):
+    """
+    Confirma la reserva del cupo retenido para la entrada.
+
+    Returns:
+        Reserva | None: La reserva creada, o None si la oferta ya no está vigente
+    """
+    from reservas.models import Reserva, EventoReserva
+    from reservas.outbox_service import registrar_evento, ORIGEN_OFERTA
+
+    with transaction.atomic():
+        entrada = ListaEspera.objects.select_for_update().select_related(
+            'socio', 'clase'
+        ).get(pk=entrada.pk)
+        if entrada.estado != ListaEspera.OFERTADO or entrada.fecha_expiracion <= timezone.now():
+            return None
+
+        # El cupo quedó ocupado al ofrecerlo: solo falta la reserva
+        reserva = Reserva.objects.create(
+            socio=entrada.socio,
+            clase=entrada.clase,
+            estado=Reserva.CONFIRMADA
+        )
+        registrar_evento(EventoReserva.RESERVA_CREADA, reserva, origen=ORIGEN_OFERTA)
+
+        entrada.estado = ListaEspera.ASIGNADO
+        entrada.fecha_asignacion = timezone.now()
+        entrada.save()
+
+    return reserva
+
+
+def rechazar_oferta(entrada):
+    """
+    Rechaza el cupo ofrecido: la entrada sale de la lista y el cupo se
+    ofrece al siguiente.
+
+    Returns:
+        bool: True si la oferta estaba vigente y se rechazó
+    """
+    with transaction.atomic():
+        entrada = ListaEspera.objects.select_for_update().select_related('clase').get(pk=entrada.pk)
+        if entrada.estado != ListaEspera.OFERTADO:
+            return False
+
+        entrada.estado = ListaEspera.CANCELADO
+        entrada.save()
+        entrada.clase.liberar_cupo()
+        ListaEspera.procesar_siguiente_en_lista(entrada.clase)
+
+    return True
+
+
+def ofertas_por_vencer(hasta):
+    """Pares (id, fecha_expiracion) de las ofertas vigentes que vencen hasta `hasta`."""
+    return ListaEspera.objects.filter(
+        estado=ListaEspera.OFERTADO, fecha_expiracion__lte=hasta
+    ).values_list('id', 'fecha_expiracion')
+
+
+def expirar_ofertas(entrada_ids=None):
+    """
+    Expira en bloque las ofertas vencidas, libera sus cupos y los ofrece a
+    los siguientes de cada lista.
+
+    Args:
+        entrada_ids: Revisar solo estas ofertas (las que la rueda dio por
+            vencidas); None revisa todas
+
+    Returns:
+        tuple: (cantidad expirada, entradas con oferta nueva)
+    """
+    from reservas import agenda_service
+
+    ahora = timezone.now()
+    with transaction.atomic():
+        vencidas = ListaEspera.objects.select_for_update().filter(
+            estado=ListaEspera.OFERTADO, fecha_expiracion__lte=ahora
+        )
+        if entrada_ids is not None:
+            vencidas = vencidas.filter(id__in=entrada_ids)
+        vencidas = list(vencidas.values_list('id', 'socio_id', 'clase_id'))
+        if not vencidas:
+            return 0, []
+
+        ListaEspera.objects.filter(id__in=[entrada_id for entrada_id, _, _ in vencidas]).update(
+            estado=ListaEspera.EXPIRADO, fecha_actualizacion=ahora
+        )
+        # update() no emite señales: agendas en bloque
+        agenda_service.quitar_en_bloque(
+            entradas=[(entrada_id, socio_id) for entrada_id, socio_id, _ in vencidas]
+        )
+
+        liberados = Counter(clase_id for _, _, clase_id in vencidas)
+        clases = list(Clase.objects.select_for_update().filter(id__in=liberados))
+        for clase in clases:
+            Clase.objects.filter(pk=clase.pk).update(
+                cupos_ocupados=Greatest(
+                    models.F('cupos_ocupados') - liberados[clase.id], 0
+                ),
+                fecha_actualizacion=ahora
+            )
+        clases_modificadas.send(
+            sender=Clase, clases=[(clase.id, clase.fecha) for clase in clases], solo_cupos=True
+        )
+
+        nuevas = []
+        for clase in clases:
+            nuevas.extend(ofrecer_siguientes(clase, liberados[clase.id]))
+
+    logger.info(f'{len(vencidas)} oferta(s) de lista de espera expirada(s), {len(nuevas)} nueva(s)')
+    return len(vencidas), nuevas
+
+
+class RuedaTemporizadora:
+    """
+    Rueda de temporizadores para los vencimientos de las ofertas.
+
+    Cada vencimiento se guarda en la ranura de su tic (`resolucion` segundos);
+    una vuelta cubre `ranuras` tics y los vencimientos más lejanos esperan en
+    su ranura las vueltas que les falten. Agregar o quitar es O(1) y avanzar
+    solo recorre las ranuras de los tics transcurridos.
+    """
+
+    def __init__(self, resolucion=1.0, ranuras=512, ahora=None):
+        self.resolucion = resolucion
+        self.ranuras = [{} for _ in range(ranuras)]
+        self.tics = {}
+        self.tic_actual = self._tic(ahora or timezone.now())
+
+    def _tic(self, momento):
+        return int(momento.timestamp() // self.resolucion)
+
+    def __len__(self):
+        return len(self.tics)
+
+    def agregar(self, clave, vence):
+        """Agenda (o reprograma) el vencimiento de `clave`; los ya vencidos van al tic actual."""
+        tic = max(self._tic(vence), self.tic_actual)
+        anterior = self.tics.get(clave)
+        if anterior is not None:
+            self.ranuras[anterior % len(self.ranuras)].pop(clave, None)
+        self.ranuras[tic % len(self.ranuras)][clave] = tic
+        self.tics[clave] = tic
+
+    def avanzar(self, ahora):
+        """
+        Avanza la rueda hasta `ahora`.
+
+        Returns:
+            list: Claves cuyo tic ya terminó (vencidas hace a lo más un tic)
+        """
+        tic_final = self._tic(ahora)
+        vencidas = []
+        # Más de una vuelta no visita ranuras nuevas
+        for tic in range(self.tic_actual, min(tic_final, self.tic_actual + len(self.ranuras))):
+            ranura = self.ranuras[tic % len(self.ranuras)]
+            for clave in [clave for clave, tic_clave in ranura.items() if tic_clave < tic_final]:
+                del ranura[clave]
+                del self.tics[clave]
+                vencidas.append(clave)
+        self.tic_actual = max(self.tic_actual, tic_final)
+        return vencidas
@@ -0,0 +1,134 @@
+"""
+Probabilidad de obtener cupo desde la lista de espera.
+
+Cada noche se agregan en la base de datos las reservas de las clases ya
+dictadas por (tipo, día de la semana, hora) y se guardan en TasaCancelacion.
+Las lecturas usan una tabla en caché {(tipo, día, hora): tasa}, así que
+estimar la probabilidad de una entrada no hace consultas.
+
+La probabilidad supone que cada una de las n reservas confirmadas de la
+clase se cancela de forma independiente con la tasa histórica p: quien está
+en la posición k obtiene cupo si se cancelan al menos k, P(Bin(n, p) >= k).
+Los no-show no liberan cupos para la lista, así que solo se informan.
+"""
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+from django.db.models.functions import ExtractHour, ExtractIsoWeekDay
+from django.utils import timezone
+
+from .models import TasaCancelacion
+
+CLAVE_CACHE = 'lista_espera:tasas_cancelacion'
+DURACION_CACHE = 24 * 60 * 60
+
+# Historial considerado al recalcular las tasas
+DIAS_HISTORIAL = 180
+
+# Peso (en reservas) de la tasa del tipo de clase sobre la de cada horario:
+# los horarios con poco historial se acercan a la tasa de su tipo
+PESO_TIPO = 20
+
+
+def calcular_tasas(dias=DIAS_HISTORIAL):
+    """
+    Recalcula la tabla de tasas con una sola consulta agrupada sobre las
+    reservas de las clases dictadas en los últimos `dias` días. Las clases
+    canceladas por el gimnasio no cuentan: sus reservas se cancelan en
+    cascada y no dicen nada de cuántos socios liberan su cupo.
+
+    Returns:
+        int: Combinaciones (tipo, día, hora) guardadas
+    """
+    from clases.models import Clase
+    from reservas.models import Reserva
+
+    hoy = timezone.localdate()
+    filas = Reserva.objects.filter(
+        clase__fecha__gte=hoy - timedelta(days=dias), clase__fecha__lt=hoy
+    ).exclude(
+        clase__estado=Clase.CANCELADA
+    ).values(
+        'clase__tipo',
+        dia=ExtractIsoWeekDay('clase__fecha'),
+        hora=ExtractHour('clase__hora_inicio'),
+    ).annotate(
+        total=Count('id'),
+        canceladas=Count('id', filter=Q(estado=Reserva.CANCELADA)),
+        ausentes=Count('id', filter=Q(estado=Reserva.NOSHOW)),
+    ).order_by()
+
+    tasas = [
+        TasaCancelacion(
+            tipo=fila['clase__tipo'],
+            dia_semana=fila['dia'],
+            hora=fila['hora'],
+            reservas=fila['total'],
+            cancelaciones=fila['canceladas'],
+            no_shows=fila['ausentes'],
+        )
+        for fila in filas
+    ]
+    with transaction.atomic():
+        TasaCancelacion.objects.all().delete()
+        TasaCancelacion.objects.bulk_create(tasas)
+        transaction.on_commit(lambda: cache.delete(CLAVE_CACHE))
+    return len(tasas)
+
+
+def tabla_tasas():
+    """
+    Tasa de cancelación suavizada por (tipo, día, hora) y por tipo, desde la
+    caché o desde TasaCancelacion (una consulta).
+    """
+    tabla = cache.get(CLAVE_CACHE)
+    if tabla is not None:
+        return tabla
+
+    filas = list(TasaCancelacion.objects.values_list('tipo', 'dia_semana', 'hora', 'reservas', 'cancelaciones'))
+    por_tipo = defaultdict(lambda: [0, 0])
+    for tipo, _, _, reservas, cancelaciones in filas:
+        por_tipo[tipo][0] += reservas
+        por_tipo[tipo][1] += cancelaciones
+
+    tabla = {tipo: cancelaciones / reservas for tipo, (reservas, cancelaciones) in por_tipo.items() if reservas}
+    for tipo, dia, hora, reservas, cancelaciones in filas:
+        previa = tabla.get(tipo, 0)
+        tabla[(tipo, dia, hora)] = (cancelaciones + PESO_TIPO * previa) / (reservas + PESO_TIPO)
+
+    cache.set(CLAVE_CACHE, tabla, DURACION_CACHE)
+    return tabla
+
+
+def tasa_cancelacion(clase, tabla=None):
+    """Tasa histórica del horario de la clase (o de su tipo); None sin historial."""
+    tabla = tabla if tabla is not None else tabla_tasas()
+    clave = (clase.tipo, clase.fecha.isoweekday(), clase.hora_inicio.hour)
+    return tabla.get(clave, tabla.get(clase.tipo))
+
+
+def probabilidad_cupo(entrada, tabla=None):
+    """
+    Probabilidad de que la entrada obtenga cupo antes de la clase.
+
+    Returns:
+        float | None: Entre 0 y 1, redondeada a 2 decimales; None si la
+        entrada ya no espera o no hay historial para estimarla
+    """
+    posicion = entrada.posicion
+    if posicion is None:
+        return None
+    p = tasa_cancelacion(entrada.clase, tabla)
+    if p is None:
+        return None
+
+    n = entrada.clase.cupos_ocupados
+    if posicion > n:
+        return 0.0
+    # P(Bin(n, p) >= k) = 1 - P(Bin(n, p) <= k - 1)
+    acumulada = sum(math.comb(n, j) * p ** j * (1 - p) ** (n - j) for j in range(posicion))
+    return round(max(0.0, 1 - acumulada), 2)
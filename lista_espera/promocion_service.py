@@ -0,0 +1,93 @@
+"""
+Promoción en bloque de la lista de espera.
+
+Cuando una clase gana cupos (se suben sus cupos totales desde la API, el
+admin o una plantilla), los cupos nuevos se reparten de una vez entre los
+primeros de la lista: una transacción con un solo UPDATE del contador de
+cupos, las reservas con bulk_create, las entradas marcadas como asignadas
+con un UPDATE y las notificaciones de cupo disponible con bulk_create.
+"""
+import logging
+
+from django.db import models, transaction
+from django.utils import timezone
+
+from clases.models import Clase
+from clases.signals import clases_modificadas
+from .models import ListaEspera
+from . import oferta_service
+
+logger = logging.getLogger('lista_espera')
+
+
+def promover(clase, entrada_ids=None):
+    """
+    Reserva los cupos libres de la clase para los primeros de la lista de
+    espera, en orden de llegada.
+
+    Args:
+        clase: Instancia de Clase
+        entrada_ids: Promover solo estas entradas (p. ej. las elegidas en el
+            admin); None considera toda la lista
+
+    Returns:
+        list: Reservas creadas
+    """
+    from notificaciones.models import Notificacion
+    from reservas.models import Reserva
+    from reservas import agenda_service
+
+    ahora = timezone.now()
+    with transaction.atomic():
+        # Bloqueada: los cupos libres no cambian mientras se reparten
+        clase = Clase.objects.select_for_update().select_related('instructor__usuario').get(pk=clase.pk)
+        if not clase.puede_reservar():
+            return []
+
+        entradas = ListaEspera.objects.select_for_update().filter(
+            clase=clase, estado=ListaEspera.ESPERANDO
+        )
+        if entrada_ids is not None:
+            entradas = entradas.filter(id__in=entrada_ids)
+        entradas = list(entradas.select_related('socio').order_by('id')[:clase.cupos_disponibles])
+        if not entradas:
+            return []
+
+        Clase.objects.filter(pk=clase.pk).update(
+            cupos_ocupados=models.F('cupos_ocupados') + len(entradas),
+            fecha_actualizacion=ahora
+        )
+        reservas = Reserva.objects.bulk_create([
+            Reserva(socio=entrada.socio, clase=clase, estado=Reserva.CONFIRMADA)
+            for entrada in entradas
+        ])
+        ListaEspera.objects.filter(id__in=[entrada.id for entrada in entradas]).update(
+            estado=ListaEspera.ASIGNADO, fecha_asignacion=ahora, fecha_actualizacion=ahora
+        )
+
+        # bulk_create y update() no emiten señales: agendas y cupos en bloque
+        agenda_service.promover_en_bloque(
+            reservas, [(entrada.id, entrada.socio_id) for entrada in entradas]
+        )
+        clases_modificadas.send(sender=Clase, clases=[(clase.id, clase.fecha)], solo_cupos=True)
+
+        Notificacion.objects.bulk_create([
+            Notificacion.construir_notificacion_cupo_disponible(entrada.socio, clase, reservado=True)
+            for entrada in entradas
+        ])
+
+    logger.info(f'Clase {clase.id}: {len(reservas)} socio(s) promovido(s) desde la lista de espera')
+    return reservas
+
+
+def cupos_ampliados(clase):
+    """
+    Reparte los cupos que ganó una clase: en modo oferta se retienen para los
+    primeros de la lista; si no, se reservan directamente.
+
+    Returns:
+        list: Reservas creadas o entradas con oferta
+    """
+    if oferta_service.modo_oferta():
+        return oferta_service.ofrecer_siguientes(clase, cupos=None)
+    return promover(clase)
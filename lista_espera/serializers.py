@@ -38,11 +38,12 @@ class ListaEsperaDetalleSerializer(serializers.ModelSerializer):
     """
     socio = UsuarioSerializer(read_only=True)
     clase = ClaseSerializer(read_only=True)
+    probabilidad_cupo = serializers.SerializerMethodField()
     
     class Meta:
         model = ListaEspera
         fields = [
-            'id', 'socio', 'clase', 'posicion', 'estado',
+            'id', 'socio', 'clase', 'posicion', 'probabilidad_cupo', 'estado',
             'fecha_ingreso', 'fecha_asignacion', 'fecha_expiracion',
             'fecha_actualizacion', 'notificacion_enviada'
         ]
@@ -50,6 +51,17 @@ class ListaEsperaDetalleSerializer(serializers.ModelSerializer):
             'id', 'posicion', 'fecha_ingreso', 'fecha_asignacion',
             'fecha_expiracion', 'fecha_actualizacion'
         ]
+    
+    def get_probabilidad_cupo(self, obj):
+        """
+        Probabilidad estimada de obtener cupo. La tabla de tasas se lee de la
+        caché una vez por respuesta y se comparte entre las entradas (con la
+        caché en base de datos cada lectura es una consulta).
+        """
+        from .probabilidad_service import probabilidad_cupo, tabla_tasas
+        if 'tabla_tasas' not in self.context:
+            self.context['tabla_tasas'] = tabla_tasas()
+        return probabilidad_cupo(obj, self.context['tabla_tasas'])
 
 
 class ListaEsperaCrearSerializer(serializers.ModelSerializer):
@@ -93,6 +105,8 @@ class ListaEsperaCrearSerializer(serializers.ModelSerializer):
         if entrada_existente:
             if entrada_existente.estado == ListaEspera.ESPERANDO:
                 raise serializers.ValidationError("Ya estás en la lista de espera de esta clase.")
+            elif entrada_existente.estado == ListaEspera.OFERTADO:
+                raise serializers.ValidationError("Ya tienes un cupo ofrecido en esta clase. Acéptalo o recházalo.")
             else:
                 # Si existe pero con otro estado (cancelado, asignado, etc.), eliminarla
                 entrada_existente.delete()
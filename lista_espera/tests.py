@@ -1,3 +1,531 @@
-from django.test import TestCase
+from datetime import date, timedelta, time
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from backend.test_utils import PresupuestoConsultasMixin, crear_clase_llena, crear_socios
+from clases.models import Clase
+from notificaciones.models import Notificacion
+from reservas.models import Reserva
+from reservas.agenda_service import reconstruir_agenda
+from reservas.outbox_service import despachar_eventos
+from reservas.reserva_service import cancelar_reserva, reservar_cupo
+from usuarios.models import Usuario
+from .models import ListaEspera, TasaCancelacion
+from .oferta_service import RuedaTemporizadora, aceptar_oferta, expirar_ofertas
+from .probabilidad_service import calcular_tasas, probabilidad_cupo
+from .promocion_service import promover
+
+
+class PosicionListaEsperaTest(TestCase):
+    """Tests para la posición calculada por orden de llegada."""
+
+    def setUp(self):
+        """Crear datos de prueba."""
+        self.clase = crear_clase_llena()
+        self.socios = crear_socios('espera_', 5)
+        self.entradas = [
+            ListaEspera.objects.create(socio=socio, clase=self.clase) for socio in self.socios
+        ]
+
+    def test_posicion_por_orden_de_llegada(self):
+        """Test: La posición es el orden de llegada entre las entradas en espera."""
+        self.assertEqual([entrada.posicion for entrada in self.entradas], [1, 2, 3, 4, 5])
+
+    def test_cancelar_no_reescribe_las_demas_entradas(self):
+        """Test: Salir de la lista escribe solo la fila propia y los siguientes avanzan."""
+        antes = dict(ListaEspera.objects.values_list('id', 'fecha_actualizacion'))
+
+        self.assertTrue(self.entradas[1].cancelar())
+
+        despues = dict(ListaEspera.objects.values_list('id', 'fecha_actualizacion'))
+        modificadas = [entrada_id for entrada_id in antes if antes[entrada_id] != despues[entrada_id]]
+        self.assertEqual(modificadas, [self.entradas[1].id])
+
+        posiciones = dict(ListaEspera.objects.con_posicion().values_list('id', 'posicion_actual'))
+        self.assertEqual(
+            [posiciones[entrada.id] for entrada in self.entradas], [1, None, 2, 3, 4]
+        )
+
+    def test_reingreso_va_al_final(self):
+        """Test: Quien vuelve a la lista tras cancelar queda al final."""
+        self.entradas[0].cancelar()
+        self.entradas[0].delete()
+        entrada = ListaEspera.objects.create(socio=self.socios[0], clase=self.clase)
+
+        self.assertEqual(entrada.posicion, 5)
+        self.assertEqual(ListaEspera.objects.get(pk=self.entradas[1].pk).posicion, 1)
+
+    def test_ventana_y_conteo_coinciden(self):
+        """Test: La función de ventana y el conteo por índice dan las mismas posiciones."""
+        self.entradas[2].cancelar()
+        por_ventana = [
+            (entrada.id, entrada.posicion_actual)
+            for entrada in ListaEspera.objects.en_orden_de_llegada(self.clase)
+        ]
+        por_conteo = list(
+            ListaEspera.objects.filter(clase=self.clase, estado=ListaEspera.ESPERANDO)
+            .con_posicion().order_by('id').values_list('id', 'posicion_actual')
+        )
+        self.assertEqual(por_ventana, por_conteo)
+        self.assertEqual([posicion for _, posicion in por_ventana], [1, 2, 3, 4])
+
+    def test_siguiente_en_lista_es_el_primero_en_llegar(self):
+        """Test: El cupo liberado se asigna a la entrada más antigua en espera."""
+        self.entradas[0].cancelar()
+        self.clase.cupos_ocupados = 0
+        self.clase.save()
+
+        reserva = ListaEspera.procesar_siguiente_en_lista(self.clase)
+
+        self.assertEqual(reserva.socio, self.socios[1])
+        self.assertEqual(ListaEspera.objects.get(pk=self.entradas[2].pk).posicion, 1)
+
+    def test_listado_de_la_clase_con_consultas_constantes(self):
+        """Test: El listado de la clase calcula todas las posiciones en una consulta."""
+        admin = Usuario.objects.create_user(
+            username='admin_espera',
+            email='admin_espera@gimnasio.com',
+            password='AdminPass123!',
+            rol=Usuario.ADMINISTRADOR
+        )
+        api = APIClient()
+        api.force_authenticate(user=admin)
+
+        with self.assertNumQueries(2):
+            respuesta = api.get(f'/api/clases/{self.clase.id}/lista_espera/')
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual([item['posicion'] for item in respuesta.data], [1, 2, 3, 4, 5])
+
+
+class IngresoConcurrenteListaEsperaTest(TestCase):
+    """Tests para ingresos y salidas intercalados en la lista de espera."""
+
+    def setUp(self):
+        """Crear datos de prueba."""
+        self.clase = crear_clase_llena()
+        self.previos = crear_socios('previo_', 3)
+        self.nuevos = crear_socios('simultaneo_', 3)
+        self.entradas = [
+            ListaEspera.objects.create(socio=socio, clase=self.clase) for socio in self.previos
+        ]
+
+    def test_ingresos_intercalados_no_repiten_posiciones(self):
+        """Test: Entradas armadas antes de que las otras se guarden no comparten posición."""
+        # Con la posición guardada, todas leían el mismo máximo antes de insertar
+        pendientes = [ListaEspera(socio=socio, clase=self.clase) for socio in self.nuevos]
+        for entrada in pendientes:
+            entrada.save()
+
+        self.assertEqual([entrada.posicion for entrada in pendientes], [4, 5, 6])
+
+    def test_salidas_durante_ingresos_no_dejan_huecos(self):
+        """Test: Cancelar mientras otros entran deja las posiciones 1..n sin huecos."""
+        pendientes = [ListaEspera(socio=socio, clase=self.clase) for socio in self.nuevos]
+        for entrada, pendiente in zip(self.entradas, pendientes):
+            # Instancia leída antes de que otra salida la afecte
+            ListaEspera.objects.get(pk=entrada.pk).cancelar()
+            pendiente.save()
+
+        lista = list(ListaEspera.objects.en_orden_de_llegada(self.clase))
+        self.assertEqual([entrada.socio_id for entrada in lista], [socio.id for socio in self.nuevos])
+        self.assertEqual([entrada.posicion_actual for entrada in lista], [1, 2, 3])
+
+
+@override_settings(LISTA_ESPERA_MINUTOS_OFERTA=15)
+class OfertaCupoTest(TestCase):
+    """Tests para las ofertas de cupo con plazo."""
+
+    def setUp(self):
+        """Crear datos de prueba."""
+        self.clase = crear_clase_llena()
+        self.clase.cupos_ocupados = 0
+        self.clase.save()
+        self.titular, self.primero, self.segundo = crear_socios('oferta_', 3)
+        _, self.reserva = reservar_cupo(self.titular, self.clase)
+        self.entradas = [
+            ListaEspera.objects.create(socio=socio, clase=self.clase) for socio in (self.primero, self.segundo)
+        ]
+
+    def liberar_cupo(self):
+        """Cancela la reserva del titular y despacha sus efectos."""
+        with self.captureOnCommitCallbacks(execute=True):
+            cancelar_reserva(self.reserva)
+            despachar_eventos()
+        return [ListaEspera.objects.get(pk=entrada.pk) for entrada in self.entradas]
+
+    def test_cupo_liberado_queda_retenido_para_el_primero(self):
+        """Test: El cupo se ofrece al primero con plazo y sigue contando como ocupado."""
+        primera, segunda = self.liberar_cupo()
+
+        self.assertEqual(primera.estado, ListaEspera.OFERTADO)
+        self.assertAlmostEqual(
+            primera.fecha_expiracion, timezone.now() + timedelta(minutes=15), delta=timedelta(seconds=5)
+        )
+        self.assertEqual(segunda.estado, ListaEspera.ESPERANDO)
+        self.assertEqual(segunda.posicion, 1)
+        self.clase.refresh_from_db()
+        self.assertEqual(self.clase.cupos_ocupados, 1)
+        self.assertFalse(Reserva.objects.filter(socio=self.primero).exists())
+        notificacion = Notificacion.objects.get(usuario=self.primero, tipo=Notificacion.CUPO_DISPONIBLE)
+        self.assertIn('vence', notificacion.datos_adicionales)
+
+    def test_aceptar_confirma_la_reserva(self):
+        """Test: Aceptar crea la reserva sin ocupar un segundo cupo."""
+        primera, _ = self.liberar_cupo()
+        api = APIClient()
+        api.force_authenticate(user=self.primero)
+
+        respuesta = api.post(f'/api/lista-espera/{primera.id}/aceptar/')
+
+        self.assertEqual(respuesta.status_code, 201)
+        primera.refresh_from_db()
+        self.assertEqual(primera.estado, ListaEspera.ASIGNADO)
+        self.assertTrue(
+            Reserva.objects.filter(socio=self.primero, clase=self.clase, estado=Reserva.CONFIRMADA).exists()
+        )
+        self.clase.refresh_from_db()
+        self.assertEqual(self.clase.cupos_ocupados, 1)
+
+    def test_rechazar_ofrece_el_cupo_al_siguiente(self):
+        """Test: Rechazar saca al socio de la lista y el cupo pasa al siguiente."""
+        primera, _ = self.liberar_cupo()
+
+        self.assertTrue(primera.cancelar())
+
+        self.assertEqual(ListaEspera.objects.get(pk=primera.pk).estado, ListaEspera.CANCELADO)
+        self.assertEqual(ListaEspera.objects.get(pk=self.entradas[1].pk).estado, ListaEspera.OFERTADO)
+        self.clase.refresh_from_db()
+        self.assertEqual(self.clase.cupos_ocupados, 1)
+
+    def test_oferta_vencida_pasa_al_siguiente(self):
+        """Test: Las ofertas vencidas se expiran en bloque y el cupo se ofrece al siguiente."""
+        primera, _ = self.liberar_cupo()
+        ListaEspera.objects.filter(pk=primera.pk).update(
+            fecha_expiracion=timezone.now() - timedelta(seconds=1)
+        )
+
+        expiradas, nuevas = expirar_ofertas()
+
+        self.assertEqual(expiradas, 1)
+        self.assertEqual([entrada.socio for entrada in nuevas], [self.segundo])
+        self.assertEqual(ListaEspera.objects.get(pk=primera.pk).estado, ListaEspera.EXPIRADO)
+        self.assertIsNone(aceptar_oferta(primera))
+        self.clase.refresh_from_db()
+        self.assertEqual(self.clase.cupos_ocupados, 1)
+
+    def test_oferta_vigente_no_expira(self):
+        """Test: Una oferta dentro de plazo no se toca."""
+        self.liberar_cupo()
+        self.assertEqual(expirar_ofertas(), (0, []))
+
+
+class RuedaTemporizadoraTest(TestCase):
+    """Tests para la rueda de temporizadores de vencimientos."""
+
+    def test_avanzar_entrega_solo_los_vencidos(self):
+        """Test: Cada clave sale una sola vez, cuando su tic ya terminó, aun tras varias vueltas."""
+        inicio = timezone.now()
+        rueda = RuedaTemporizadora(resolucion=1, ranuras=8, ahora=inicio)
+        rueda.agregar('pasada', inicio - timedelta(seconds=30))
+        rueda.agregar('pronto', inicio + timedelta(seconds=3))
+        rueda.agregar('lejos', inicio + timedelta(seconds=20))
+        rueda.agregar('reprogramada', inicio + timedelta(seconds=2))
+        rueda.agregar('reprogramada', inicio + timedelta(seconds=40))
+
+        self.assertEqual(rueda.avanzar(inicio), [])
+        self.assertEqual(rueda.avanzar(inicio + timedelta(seconds=2)), ['pasada'])
+        self.assertEqual(rueda.avanzar(inicio + timedelta(seconds=5)), ['pronto'])
+        self.assertEqual(rueda.avanzar(inicio + timedelta(seconds=22)), ['lejos'])
+        self.assertEqual(len(rueda), 1)
+        self.assertEqual(rueda.avanzar(inicio + timedelta(seconds=60)), ['reprogramada'])
+        self.assertEqual(len(rueda), 0)
+
+
+class PromocionListaEsperaTest(TestCase):
+    """Tests para la promoción en bloque cuando una clase gana cupos."""
+
+    def setUp(self):
+        """Crear datos de prueba."""
+        self.clase = crear_clase_llena()
+        self.socios = crear_socios('promocion_', 10)
+        self.entradas = [
+            ListaEspera.objects.create(socio=socio, clase=self.clase) for socio in self.socios
+        ]
+
+    def test_subir_cupos_promueve_a_los_primeros(self):
+        """Test: Subir los cupos totales reserva los cupos nuevos para los primeros de la lista."""
+        self.clase.cupos_totales = 3
+        self.clase.save()
+
+        estados = [ListaEspera.objects.get(pk=entrada.pk).estado for entrada in self.entradas[:3]]
+        self.assertEqual(estados, [ListaEspera.ASIGNADO, ListaEspera.ASIGNADO, ListaEspera.ESPERANDO])
+        self.assertEqual(
+            set(Reserva.objects.filter(clase=self.clase, estado=Reserva.CONFIRMADA).values_list('socio_id', flat=True)),
+            {self.socios[0].id, self.socios[1].id}
+        )
+        self.clase.refresh_from_db()
+        self.assertEqual(self.clase.cupos_ocupados, 3)
+        self.assertEqual(
+            Notificacion.objects.filter(tipo=Notificacion.CUPO_DISPONIBLE, usuario__in=self.socios[:2]).count(), 2
+        )
+        self.assertEqual(ListaEspera.objects.get(pk=self.entradas[2].pk).posicion, 1)
+
+        agenda = reconstruir_agenda(self.socios[0])
+        self.assertEqual(len(agenda.reservas), 1)
+        self.assertEqual(agenda.listas_espera, {})
+
+    def test_consultas_no_crecen_con_los_promovidos(self):
+        """Test: Promover 2 u 8 socios cuesta las mismas consultas."""
+        consultas = []
+        for cupos in (3, 11):
+            Clase.objects.filter(pk=self.clase.pk).update(cupos_totales=cupos)
+            with CaptureQueriesContext(connection) as capturadas:
+                promover(self.clase)
+            consultas.append(len(capturadas))
+
+        self.assertEqual(consultas[0], consultas[1])
+        self.assertEqual(
+            ListaEspera.objects.filter(clase=self.clase, estado=ListaEspera.ASIGNADO).count(), 10
+        )
+
+    def test_promover_solo_las_entradas_elegidas(self):
+        """Test: Con entradas elegidas (admin) solo ellas reciben cupo."""
+        Clase.objects.filter(pk=self.clase.pk).update(cupos_totales=5)
+
+        reservas = promover(self.clase, entrada_ids=[self.entradas[4].id, self.entradas[7].id])
+
+        self.assertEqual({reserva.socio_id for reserva in reservas}, {self.socios[4].id, self.socios[7].id})
+        self.assertEqual(ListaEspera.objects.get(pk=self.entradas[0].pk).estado, ListaEspera.ESPERANDO)
+
+    @override_settings(LISTA_ESPERA_MINUTOS_OFERTA=15)
+    def test_modo_oferta_retiene_los_cupos_nuevos(self):
+        """Test: En modo oferta los cupos nuevos se ofrecen en vez de reservarse."""
+        self.clase.cupos_totales = 3
+        self.clase.save()
+
+        self.assertEqual(
+            ListaEspera.objects.filter(clase=self.clase, estado=ListaEspera.OFERTADO).count(), 2
+        )
+        self.assertFalse(Reserva.objects.filter(clase=self.clase).exists())
+
+
+class ReclamoConcurrenteTest(TestCase):
+    """Tests para el reclamo atómico de la primera entrada de la lista."""
+
+    CANCELACIONES = 100
+
+    def setUp(self):
+        """Crear datos de prueba."""
+        self.clase = crear_clase_llena()
+        self.socios = crear_socios('reclamo_', 2)
+        self.entradas = [
+            ListaEspera.objects.create(socio=socio, clase=self.clase) for socio in self.socios
+        ]
+
+    def liberar_cupos(self, cantidad):
+        Clase.objects.filter(pk=self.clase.pk).update(cupos_totales=1 + cantidad)
+
+    def test_instancias_desactualizadas_no_duplican_la_promocion(self):
+        """Test: Dos procesos que leyeron la misma primera entrada crean una sola reserva."""
+        self.liberar_cupos(2)
+        copia1 = ListaEspera.objects.get(pk=self.entradas[0].pk)
+        copia2 = ListaEspera.objects.get(pk=self.entradas[0].pk)
+
+        self.assertIsNotNone(copia1.asignar_cupo())
+        self.assertIsNone(copia2.asignar_cupo())
+
+        self.assertEqual(Reserva.objects.filter(socio=self.socios[0], clase=self.clase).count(), 1)
+        self.clase.refresh_from_db()
+        self.assertEqual(self.clase.cupos_ocupados, 2)
+
+    def test_cancelar_una_entrada_ya_asignada_no_la_pisa(self):
+        """Test: Una cancelación con la instancia desactualizada no deshace la asignación."""
+        self.liberar_cupos(1)
+        copia = ListaEspera.objects.get(pk=self.entradas[0].pk)
+        self.entradas[0].asignar_cupo()
+
+        self.assertFalse(copia.cancelar())
+        self.assertEqual(ListaEspera.objects.get(pk=copia.pk).estado, ListaEspera.ASIGNADO)
+
+    def test_sin_cupo_la_entrada_conserva_su_lugar(self):
+        """Test: Si la clase se llenó, el reclamo se deshace y la entrada sigue primera."""
+        self.assertIsNone(self.entradas[0].asignar_cupo())
+
+        entrada = ListaEspera.objects.get(pk=self.entradas[0].pk)
+        self.assertEqual(entrada.estado, ListaEspera.ESPERANDO)
+        self.assertEqual(entrada.posicion, 1)
+        self.assertEqual(reconstruir_agenda(self.socios[0]).listas_espera.keys(), {str(entrada.id)})
+
+    def test_skip_locked_asigna_la_primera_libre(self):
+        """Test: Con SKIP LOCKED disponible se promueve la primera entrada no bloqueada."""
+        self.liberar_cupos(1)
+        with mock.patch.object(connection.features, 'has_select_for_update_skip_locked', True):
+            reserva = ListaEspera.procesar_siguiente_en_lista(self.clase)
+
+        self.assertEqual(reserva.socio, self.socios[0])
+
+    def test_cien_cancelaciones_promueven_una_vez_a_cada_uno(self):
+        """Test: 100 cancelaciones, cada una procesada por dos despachadores, promueven en orden y sin duplicados."""
+        titulares = crear_socios('titular_', self.CANCELACIONES)
+        esperando = crear_socios('cola_', self.CANCELACIONES)
+        clase = Clase.objects.create(
+            nombre='Spinning Estrés',
+            tipo=Clase.SPINNING,
+            fecha=date.today() + timedelta(days=3),
+            hora_inicio=time(18, 0),
+            hora_fin=time(19, 0),
+            cupos_totales=self.CANCELACIONES,
+            estado=Clase.ACTIVA
+        )
+        reservas = [reservar_cupo(socio, clase)[1] for socio in titulares]
+        for socio in esperando:
+            ListaEspera.objects.create(socio=socio, clase=clase)
+
+        promovidos = []
+        for reserva in reservas:
+            cancelar_reserva(reserva, procesar_lista_espera=False)
+            for _ in range(2):
+                promovida = ListaEspera.procesar_siguiente_en_lista(clase)
+                if promovida:
+                    promovidos.append(promovida.socio_id)
+
+        self.assertEqual(promovidos, [socio.id for socio in esperando])
+        confirmadas = Reserva.objects.filter(clase=clase, estado=Reserva.CONFIRMADA)
+        self.assertEqual(confirmadas.count(), self.CANCELACIONES)
+        self.assertEqual(
+            confirmadas.values('socio').distinct().count(), self.CANCELACIONES
+        )
+        clase.refresh_from_db()
+        self.assertEqual(clase.cupos_ocupados, self.CANCELACIONES)
+        self.assertFalse(ListaEspera.objects.filter(clase=clase, estado=ListaEspera.ESPERANDO).exists())
+
+
+class ProbabilidadCupoTest(PresupuestoConsultasMixin, TestCase):
+    """Tests para la probabilidad de obtener cupo desde la lista de espera."""
+
+    def setUp(self):
+        """Crear historial de reservas y una clase futura llena."""
+        cache.clear()
+        socios = crear_socios('historial_', 5)
+        estados = [
+            Reserva.CANCELADA, Reserva.CANCELADA, Reserva.NOSHOW, Reserva.COMPLETADA, Reserva.COMPLETADA
+        ]
+        for semanas in (1, 2):
+            pasada = Clase.objects.create(
+                nombre='Yoga Matinal',
+                tipo=Clase.YOGA,
+                fecha=date.today() - timedelta(weeks=semanas),
+                hora_inicio=time(10, 0),
+                hora_fin=time(11, 0),
+                cupos_totales=5,
+                estado=Clase.ACTIVA
+            )
+            for socio, estado in zip(socios, estados):
+                Reserva.objects.create(socio=socio, clase=pasada, estado=estado)
+
+        self.clase = Clase.objects.create(
+            nombre='Yoga Matinal',
+            tipo=Clase.YOGA,
+            fecha=date.today() + timedelta(weeks=1),
+            hora_inicio=time(10, 0),
+            hora_fin=time(11, 0),
+            cupos_totales=5,
+            cupos_ocupados=5,
+            estado=Clase.ACTIVA
+        )
+        self.socios = crear_socios('probable_', 2)
+        self.entradas = [
+            ListaEspera.objects.create(socio=socio, clase=self.clase) for socio in self.socios
+        ]
+
+    def calcular(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return calcular_tasas()
+
+    def test_tasas_por_tipo_dia_y_hora(self):
+        """Test: Las reservas del historial se agregan por tipo, día de la semana y hora."""
+        self.assertEqual(self.calcular(), 1)
+
+        tasa = TasaCancelacion.objects.get()
+        self.assertEqual(
+            (tasa.tipo, tasa.dia_semana, tasa.hora), (Clase.YOGA, self.clase.fecha.isoweekday(), 10)
+        )
+        self.assertEqual((tasa.reservas, tasa.cancelaciones, tasa.no_shows), (10, 4, 2))
+
+    def test_clases_canceladas_no_cuentan(self):
+        """Test: Las reservas canceladas en cascada por una clase cancelada no suben la tasa."""
+        cancelada = Clase.objects.create(
+            nombre='Yoga Matinal',
+            tipo=Clase.YOGA,
+            fecha=date.today() - timedelta(weeks=3),
+            hora_inicio=time(10, 0),
+            hora_fin=time(11, 0),
+            cupos_totales=5,
+            estado=Clase.CANCELADA
+        )
+        for socio in crear_socios('cascada_', 5):
+            Reserva.objects.create(socio=socio, clase=cancelada, estado=Reserva.CANCELADA)
+
+        self.calcular()
+        tasa = TasaCancelacion.objects.get()
+        self.assertEqual((tasa.reservas, tasa.cancelaciones, tasa.no_shows), (10, 4, 2))
+
+    def test_probabilidad_por_posicion(self):
+        """Test: La probabilidad es P(al menos k cancelaciones entre las reservas de la clase)."""
+        self.calcular()
+
+        # Tasa 0.4 con 5 reservas: 1 - 0.6^5 y 1 - (0.6^5 + 5 * 0.4 * 0.6^4)
+        self.assertEqual([probabilidad_cupo(entrada) for entrada in self.entradas], [0.92, 0.66])
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'cache_pruebas_tasas',
+    }})
+    def test_tabla_de_tasas_una_vez_por_respuesta_con_cache_en_base(self):
+        """Test: Con la caché en base de datos, la tabla de tasas no se lee por cada entrada."""
+        call_command('createcachetable')
+        self.calcular()
+        socio = self.socios[1]
+
+        def crear_entradas(cantidad):
+            for _ in range(cantidad):
+                clase = Clase.objects.create(
+                    nombre='Yoga Matinal', tipo=Clase.YOGA,
+                    fecha=self.clase.fecha + timedelta(weeks=Clase.objects.count()),
+                    hora_inicio=time(10, 0), hora_fin=time(11, 0),
+                    cupos_totales=5, cupos_ocupados=5, estado=Clase.ACTIVA
+                )
+                ListaEspera.objects.create(socio=socio, clase=clase)
+
+        # La primera petición crea en la caché el contador del throttle
+        self.contar_consultas(socio, '/api/lista-espera/activas/')
+        # Throttle (6 consultas a la tabla de caché), entradas y tabla de tasas
+        self.assertPresupuestoConsultas(
+            socio, '/api/lista-espera/activas/', crear_entradas, presupuesto=8
+        )
+
+    def test_serializer_sin_consultas_por_entrada(self):
+        """Test: La API entrega la probabilidad leyendo la tabla de tasas una sola vez."""
+        self.calcular()
+        api = APIClient()
+        api.force_authenticate(user=self.socios[1])
+
+        respuesta = api.get('/api/lista-espera/activas/')
+        with self.assertNumQueries(1):
+            api.get('/api/lista-espera/activas/')
+
+        self.assertEqual(respuesta.data[0]['probabilidad_cupo'], 0.66)
+
+    def test_sin_historial_no_hay_estimacion(self):
+        """Test: Sin historial del tipo de clase la probabilidad es None."""
+        self.calcular()
+        self.clase.tipo = Clase.SPINNING
+        self.assertIsNone(probabilidad_cupo(self.entradas[0]))
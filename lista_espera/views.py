@@ -20,7 +20,9 @@ class ListaEsperaViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         """Retorna las listas de espera del usuario actual."""
-        return ListaEspera.objects.filter(socio=self.request.user).order_by('-fecha_ingreso')
+        return ListaEspera.objects.para_listado().filter(
+            socio=self.request.user
+        ).con_posicion().order_by('-fecha_ingreso')
     
     def get_serializer_class(self):
         """Retorna el serializer apropiado según la acción."""
@@ -68,12 +70,47 @@ class ListaEsperaViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
     
+    @action(detail=True, methods=['post'])
+    def aceptar(self, request, pk=None):
+        """
+        Acepta el cupo ofrecido y confirma la reserva.
+        POST /api/lista-espera/{id}/aceptar/
+        """
+        from reservas.serializers import ReservaSerializer
+        from .oferta_service import aceptar_oferta
+        
+        reserva = aceptar_oferta(self.get_object())
+        if reserva is None:
+            return Response(
+                {'error': 'La oferta de cupo ya no está vigente.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response({
+            'message': 'Cupo aceptado. Tu reserva está confirmada.',
+            'reserva': ReservaSerializer(reserva).data
+        }, status=status.HTTP_201_CREATED)
+    
+    @action(detail=True, methods=['post'])
+    def rechazar(self, request, pk=None):
+        """
+        Rechaza el cupo ofrecido; pasa al siguiente de la lista.
+        POST /api/lista-espera/{id}/rechazar/
+        """
+        from .oferta_service import rechazar_oferta
+        
+        if not rechazar_oferta(self.get_object()):
+            return Response(
+                {'error': 'La oferta de cupo ya no está vigente.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response({'message': 'Cupo rechazado. Saliste de la lista de espera.'})
+    
     @action(detail=False, methods=['get'])
     def activas(self, request):
         """
-        Retorna solo las listas de espera activas del usuario.
+        Retorna solo las listas de espera activas del usuario (incluye cupos ofrecidos).
         GET /api/lista_espera/activas/
         """
-        listas = self.get_queryset().filter(estado=ListaEspera.ESPERANDO).order_by('posicion')
+        listas = self.get_queryset().filter(estado__in=ListaEspera.ESTADOS_ACTIVOS).order_by('id')
         serializer = ListaEsperaDetalleSerializer(listas, many=True)
         return Response(serializer.data)
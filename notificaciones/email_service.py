@@ -1,21 +1,33 @@
 """
 Servicio de envío de emails para notificaciones.
+
+Los emails no se envían dentro de la petición que crea la notificación: se
+encolan al confirmar la transacción (encolar_emails) y los envía el worker de
+Celery (notificaciones.tasks). Sin broker configurado, o si no se pudo
+encolar, la notificación queda pendiente para el envío por lotes
+(enviar_emails_pendientes). Con CELERY_TASK_ALWAYS_EAGER (tests, o activado
+explícitamente) la tarea se ejecuta en el mismo proceso.
 """
 import logging
-from django.core.mail import send_mail, EmailMultiAlternatives
+from django.core.mail import send_mail, EmailMultiAlternatives, get_connection
 from django.conf import settings
+from django.db import transaction
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 
 logger = logging.getLogger(__name__)
 
+# Emails enviados por cada conexión SMTP en el envío de pendientes
+LOTE_EMAILS = 50
+
 
-def enviar_email_notificacion(notificacion):
+def enviar_email_notificacion(notificacion, connection=None):
     """
     Envía un email basado en una notificación.
     
     Args:
         notificacion: Instancia del modelo Notificacion
+        connection: Conexión de email ya abierta para reutilizar (opcional)
         
     Returns:
         bool: True si se envió correctamente, False si falló
@@ -70,7 +82,8 @@ def enviar_email_notificacion(notificacion):
                 subject=subject,
                 body=text_content,
                 from_email=from_email,
-                to=to_email
+                to=to_email,
+                connection=connection
             )
             email.attach_alternative(html_content, "text/html")
             email.send(fail_silently=False)
@@ -80,7 +93,8 @@ def enviar_email_notificacion(notificacion):
                 message=text_content,
                 from_email=from_email,
                 recipient_list=to_email,
-                fail_silently=False
+                fail_silently=False,
+                connection=connection
             )
         
         # Marcar como enviada
@@ -100,10 +114,55 @@ def enviar_email_notificacion(notificacion):
         return False
 
 
-def enviar_emails_pendientes():
+def _conexion_abierta():
+    """Conexión SMTP abierta para un lote, o None si no se pudo abrir."""
+    conexion = get_connection()
+    try:
+        conexion.open()
+    except Exception as e:
+        logger.warning(f"No se pudo abrir la conexión de email para el lote: {e}")
+        return None
+    return conexion
+
+
+def _enviar_en_lotes(notificaciones, lote=LOTE_EMAILS):
+    """
+    Envía las notificaciones dadas; cada lote de `lote` emails comparte una
+    conexión SMTP, en vez de abrir una por email.
+
+    Returns:
+        tuple: (enviados, notificaciones fallidas)
+    """
+    enviados = 0
+    fallidas = []
+
+    for inicio in range(0, len(notificaciones), lote):
+        conexion = _conexion_abierta() if settings.EMAIL_HOST_USER else None
+        try:
+            for notificacion in notificaciones[inicio:inicio + lote]:
+                if enviar_email_notificacion(notificacion, connection=conexion):
+                    enviados += 1
+                else:
+                    fallidas.append(notificacion)
+        finally:
+            if conexion is not None:
+                conexion.close()
+
+    return enviados, fallidas
+
+
+def enviar_emails_pendientes(lote=LOTE_EMAILS, creadas_antes=None):
     """
     Envía todos los emails de notificaciones pendientes.
     
+    Cada lote de `lote` emails comparte una conexión SMTP, en vez de abrir
+    una por email (p. ej. los avisos de una cancelación de clases).
+    
+    Args:
+        lote: Emails por conexión SMTP
+        creadas_antes: Solo las notificaciones creadas antes de este momento
+            (deja al worker las recién encoladas)
+    
     Returns:
         tuple: (enviados, fallidos)
     """
@@ -112,19 +171,70 @@ def enviar_emails_pendientes():
     pendientes = Notificacion.objects.filter(
         estado=Notificacion.PENDIENTE,
         canal=Notificacion.EMAIL
-    ).select_related('usuario')
+    )
+    if creadas_antes is not None:
+        pendientes = pendientes.filter(fecha_creacion__lt=creadas_antes)
+    pendientes = list(pendientes.select_related('usuario').order_by('id'))
     
-    enviados = 0
-    fallidos = 0
+    enviados, fallidas = _enviar_en_lotes(pendientes, lote)
     
-    for notificacion in pendientes:
-        if enviar_email_notificacion(notificacion):
-            enviados += 1
-        else:
-            fallidos += 1
+    logger.info(f"Emails pendientes procesados: {enviados} enviados, {len(fallidas)} fallidos")
+    return enviados, len(fallidas)
+
+
+def enviar_emails_notificaciones(notificacion_ids, reintento=False):
+    """
+    Envía los emails de estas notificaciones (tarea del worker). Las que ya
+    se enviaron, por ejemplo desde enviar_emails_pendientes, se omiten.
+    
+    Args:
+        notificacion_ids: IDs de notificaciones con canal EMAIL
+        reintento: Incluir también las que fallaron en un intento anterior
+    
+    Returns:
+        tuple: (enviados, IDs de las fallidas)
+    """
+    from .models import Notificacion
     
-    logger.info(f"Emails pendientes procesados: {enviados} enviados, {fallidos} fallidos")
-    return enviados, fallidos
+    estados = [Notificacion.PENDIENTE]
+    if reintento:
+        estados.append(Notificacion.FALLIDA)
+    notificaciones = list(Notificacion.objects.filter(
+        id__in=notificacion_ids,
+        estado__in=estados,
+        canal=Notificacion.EMAIL
+    ).select_related('usuario').order_by('id'))
+    
+    enviados, fallidas = _enviar_en_lotes(notificaciones)
+    return enviados, [notificacion.id for notificacion in fallidas]
+
+
+def _encolar(notificacion_ids):
+    from .tasks import enviar_emails
+    
+    if not settings.CELERY_BROKER_URL and not settings.CELERY_TASK_ALWAYS_EAGER:
+        # Sin worker: el envío por lotes los toma, la petición no espera al SMTP
+        logger.debug(f"Sin broker de Celery: {len(notificacion_ids)} email(s) quedan pendientes")
+        return
+    try:
+        enviar_emails.delay(notificacion_ids)
+    except Exception as e:
+        # Broker caído: quedan pendientes para enviar_emails_pendientes
+        logger.warning(
+            f"No se pudo encolar el envío de {len(notificacion_ids)} email(s), "
+            f"quedan pendientes: {e}"
+        )
+
+
+def encolar_emails(notificacion_ids):
+    """
+    Encola el envío de los emails de estas notificaciones al confirmar la
+    transacción en curso: el worker no ve notificaciones sin confirmar y un
+    rollback no envía nada.
+    """
+    notificacion_ids = list(notificacion_ids)
+    if notificacion_ids:
+        transaction.on_commit(lambda: _encolar(notificacion_ids))
 
 
 def reintentar_emails_fallidos(max_intentos=3):
@@ -5,8 +5,17 @@ Uso:
     python manage.py enviar_emails_pendientes
     python manage.py enviar_emails_pendientes --reintentar
     python manage.py enviar_emails_pendientes --max-intentos=5
+    python manage.py enviar_emails_pendientes --antiguedad=10
+
+Con el worker de Celery corriendo, los emails se envían al crearse; este
+comando queda como respaldo para los que no se pudieron encolar. Con
+--antiguedad solo toma los pendientes con más de esos minutos, para no
+competir con el worker por los recién encolados.
 """
+from datetime import timedelta
+
 from django.core.management.base import BaseCommand
+from django.utils import timezone
 from notificaciones.email_service import (
     enviar_emails_pendientes,
     reintentar_emails_fallidos
@@ -28,12 +37,21 @@ class Command(BaseCommand):
             default=3,
             help='Número máximo de intentos para emails fallidos (default: 3)'
         )
+        parser.add_argument(
+            '--antiguedad',
+            type=int,
+            default=0,
+            help='Solo enviar pendientes creados hace más de estos minutos (default: 0, todos)'
+        )
     
     def handle(self, *args, **options):
         self.stdout.write(self.style.NOTICE('Procesando emails pendientes...'))
         
         # Enviar pendientes
-        enviados, fallidos = enviar_emails_pendientes()
+        creadas_antes = None
+        if options['antiguedad']:
+            creadas_antes = timezone.now() - timedelta(minutes=options['antiguedad'])
+        enviados, fallidos = enviar_emails_pendientes(creadas_antes=creadas_antes)
         
         self.stdout.write(
             self.style.SUCCESS(f'Emails pendientes: {enviados} enviados, {fallidos} fallidos')
@@ -0,0 +1,137 @@
+"""
+Servidor SMTP local que recibe los emails y los muestra en consola, sin
+entregarlos. Sirve para verificar el envío real (worker o modo eager) sin
+usar Gmail; con --demora simula un servidor lento.
+
+Uso:
+    python manage.py servidor_smtp_local
+    python manage.py servidor_smtp_local --puerto=1025 --demora=3
+
+Y en el .env del backend:
+    EMAIL_HOST=localhost
+    EMAIL_PORT=1025
+    EMAIL_HOST_USER=gimnasio@localhost
+"""
+import socketserver
+import time
+from email import message_from_bytes, policy
+
+from django.core.management.base import BaseCommand
+
+
+class ManejadorSMTP(socketserver.StreamRequestHandler):
+    """Diálogo SMTP mínimo: lo justo para que smtplib entregue un mensaje."""
+
+    def _responder(self, linea):
+        self.wfile.write(f'{linea}\r\n'.encode('ascii'))
+
+    def _leer_datos(self):
+        lineas = []
+        while True:
+            linea = self.rfile.readline()
+            if not linea or linea == b'.\r\n':
+                return b''.join(lineas)
+            # Quitar el punto de relleno de las líneas que empiezan con '.'
+            if linea.startswith(b'..'):
+                linea = linea[1:]
+            lineas.append(linea.replace(b'\r\n', b'\n'))
+
+    def handle(self):
+        self._responder('220 localhost Servidor SMTP local')
+        remitente, destinatarios = None, []
+        while True:
+            linea = self.rfile.readline()
+            if not linea:
+                return
+            comando = linea.decode('utf-8', 'replace').strip()
+            verbo = comando[:4].upper()
+
+            if verbo in ('HELO', 'EHLO'):
+                self._responder('250 localhost')
+            elif verbo == 'MAIL':
+                remitente, destinatarios = comando.split(':', 1)[1].strip(), []
+                self._responder('250 OK')
+            elif verbo == 'RCPT':
+                destinatarios.append(comando.split(':', 1)[1].strip())
+                self._responder('250 OK')
+            elif verbo == 'DATA':
+                self._responder('354 Terminar con <CRLF>.<CRLF>')
+                datos = self._leer_datos()
+                if self.server.demora:
+                    time.sleep(self.server.demora)
+                self.server.recibir(remitente, destinatarios, message_from_bytes(datos, policy=policy.default))
+                self._responder('250 OK')
+            elif verbo in ('RSET', 'NOOP'):
+                if verbo == 'RSET':
+                    remitente, destinatarios = None, []
+                self._responder('250 OK')
+            elif verbo == 'QUIT':
+                self._responder('221 Hasta luego')
+                return
+            else:
+                self._responder('502 Comando no implementado')
+
+
+class ServidorSMTPLocal(socketserver.ThreadingTCPServer):
+    """
+    Guarda en `mensajes` cada email recibido como (remitente, destinatarios,
+    mensaje) y llama a `al_recibir` con la misma tupla.
+    """
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, direccion, demora=0, al_recibir=None):
+        super().__init__(direccion, ManejadorSMTP)
+        self.demora = demora
+        self.al_recibir = al_recibir
+        self.mensajes = []
+
+    def recibir(self, remitente, destinatarios, mensaje):
+        self.mensajes.append((remitente, destinatarios, mensaje))
+        if self.al_recibir:
+            self.al_recibir(remitente, destinatarios, mensaje)
+
+
+class Command(BaseCommand):
+    help = 'Levanta un servidor SMTP local que muestra los emails recibidos sin entregarlos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--host',
+            default='localhost',
+            help='Dirección donde escuchar (default: localhost)'
+        )
+        parser.add_argument(
+            '--puerto',
+            type=int,
+            default=1025,
+            help='Puerto donde escuchar (default: 1025)'
+        )
+        parser.add_argument(
+            '--demora',
+            type=float,
+            default=0,
+            help='Segundos que tarda en aceptar cada email, para simular un servidor lento'
+        )
+
+    def _mostrar(self, remitente, destinatarios, mensaje):
+        self.stdout.write(
+            f'{remitente} -> {", ".join(destinatarios)}: {mensaje["Subject"]}'
+        )
+
+    def handle(self, *args, **options):
+        servidor = ServidorSMTPLocal(
+            (options['host'], options['puerto']),
+            demora=options['demora'],
+            al_recibir=self._mostrar
+        )
+        self.stdout.write(self.style.NOTICE(
+            f'Servidor SMTP local en {options["host"]}:{options["puerto"]} (Ctrl+C para salir)...'
+        ))
+        try:
+            servidor.serve_forever()
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.SUCCESS('Servidor SMTP local detenido.'))
+        finally:
+            servidor.server_close()
@@ -183,22 +183,121 @@ class Notificacion(models.Model):
         )
     
     @staticmethod
-    def crear_notificacion_cupo_disponible(socio, clase):
-        """Crea una notificación de cupo disponible."""
-        return Notificacion.objects.create(
+    def construir_advertencia_noshow(socio, clase, noshow_mes):
+        """
+        Construye (sin guardar) la advertencia de un no-show registrado.
+        El mensaje depende de cuántos no-shows lleva el socio en el mes.
+        """
+        mensaje = f"Se registró tu inasistencia a {clase.nombre}."
+        if noshow_mes >= socio.MAX_NOSHOW_MES:
+            mensaje += f" Tu cuenta ha sido suspendida temporalmente por {socio.DIAS_BLOQUEO_NOSHOW} días."
+        elif noshow_mes == socio.MAX_NOSHOW_MES - 1:
+            mensaje += f" ADVERTENCIA: Un no-show más y serás bloqueado por {socio.DIAS_BLOQUEO_NOSHOW} días."
+        
+        return Notificacion(
             usuario=socio,
-            tipo=Notificacion.CUPO_DISPONIBLE,
-            canal=Notificacion.PUSH,
-            titulo=f'Cupo disponible - {clase.nombre}',
-            mensaje=f'¡Hay un cupo disponible para {clase.nombre} el {clase.fecha}! Reserva ahora.',
+            tipo=Notificacion.OTROS,
+            titulo='⚠️ No-Show Registrado',
+            mensaje=mensaje,
             datos_adicionales={
                 'clase_id': clase.id,
                 'clase_nombre': clase.nombre,
                 'fecha': str(clase.fecha),
-                'hora': str(clase.hora_inicio)
+                'noshow_mes': noshow_mes
             }
         )
     
+    @staticmethod
+    def construir_notificaciones_clase_cancelada(clase, socio_ids, espera_ids, motivo=''):
+        """
+        Construye (sin guardar) los avisos de una clase cancelada: un email
+        pendiente para cada socio con reserva, un aviso de sistema para cada
+        socio en lista de espera y otro para el instructor.
+        Pensado para guardarse con bulk_create.
+        """
+        datos = {
+            'clase_id': clase.id,
+            'clase_nombre': clase.nombre,
+            'fecha': str(clase.fecha),
+            'hora': str(clase.hora_inicio),
+            'motivo': motivo,
+        }
+        titulo = f'Clase cancelada - {clase.nombre}'
+        mensaje = f'La clase {clase.nombre} del {clase.fecha} a las {clase.hora_inicio} ha sido cancelada.'
+        if motivo:
+            mensaje += f' Motivo: {motivo}'
+        
+        notificaciones = [
+            Notificacion(
+                usuario_id=socio_id,
+                tipo=Notificacion.CLASE_CANCELADA,
+                canal=Notificacion.EMAIL,
+                titulo=titulo,
+                mensaje=mensaje + ' Tu reserva fue cancelada.',
+                datos_adicionales=datos
+            )
+            for socio_id in socio_ids
+        ] + [
+            Notificacion(
+                usuario_id=socio_id,
+                tipo=Notificacion.CLASE_CANCELADA,
+                canal=Notificacion.SISTEMA,
+                titulo=titulo,
+                mensaje=mensaje + ' Saliste de la lista de espera.',
+                datos_adicionales=datos
+            )
+            for socio_id in espera_ids
+        ]
+        if clase.instructor and clase.instructor.usuario_id:
+            notificaciones.append(Notificacion(
+                usuario_id=clase.instructor.usuario_id,
+                tipo=Notificacion.CLASE_CANCELADA,
+                canal=Notificacion.SISTEMA,
+                titulo=titulo,
+                mensaje=mensaje + f' Se cancelaron {len(socio_ids)} reservas.',
+                datos_adicionales=datos
+            ))
+        return notificaciones
+    
+    @staticmethod
+    def crear_notificacion_cupo_disponible(socio, clase, vence=None):
+        """Crea una notificación de cupo disponible."""
+        notificacion = Notificacion.construir_notificacion_cupo_disponible(socio, clase, vence)
+        notificacion.save()
+        return notificacion
+    
+    @staticmethod
+    def construir_notificacion_cupo_disponible(socio, clase, vence=None, reservado=False):
+        """
+        Construye (sin guardar) la notificación de cupo disponible; para
+        promociones en bloque se guarda con bulk_create.
+        Con `vence`, el cupo está retenido para el socio hasta esa hora; con
+        `reservado`, el cupo ya se reservó a su nombre.
+        """
+        mensaje = f'¡Hay un cupo disponible para {clase.nombre} el {clase.fecha}! Reserva ahora.'
+        datos = {
+            'clase_id': clase.id,
+            'clase_nombre': clase.nombre,
+            'fecha': str(clase.fecha),
+            'hora': str(clase.hora_inicio)
+        }
+        if vence:
+            mensaje = (
+                f'¡Se liberó un cupo para {clase.nombre} el {clase.fecha}! Está reservado para ti '
+                f'hasta las {timezone.localtime(vence):%H:%M}: acéptalo desde tu lista de espera.'
+            )
+            datos['vence'] = vence.isoformat()
+        elif reservado:
+            mensaje = f'¡Se liberó un cupo para {clase.nombre} el {clase.fecha}! Tu reserva quedó confirmada.'
+        return Notificacion(
+            usuario=socio,
+            tipo=Notificacion.CUPO_DISPONIBLE,
+            canal=Notificacion.PUSH,
+            titulo=f'Cupo disponible - {clase.nombre}',
+            mensaje=mensaje,
+            datos_adicionales=datos
+        )
+    
     @staticmethod
     def notificar_instructor_nueva_reserva(clase, socio):
         """Notifica al instructor cuando hay una nueva reserva en su clase."""
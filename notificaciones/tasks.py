@@ -0,0 +1,38 @@
+"""
+Tareas de Celery de las notificaciones.
+
+El worker (`celery -A backend worker -l info`) envía los emails fuera de la
+petición que creó la notificación, así una reserva no espera el diálogo SMTP
+ni falla si el servidor de correo no responde.
+"""
+import logging
+
+from celery import shared_task
+
+from . import email_service
+
+logger = logging.getLogger(__name__)
+
+# Reintentos de los emails fallidos y espera antes del primero (se duplica en cada uno)
+MAX_REINTENTOS = 3
+ESPERA_REINTENTO = 60
+
+
+@shared_task(bind=True, max_retries=MAX_REINTENTOS, ignore_result=True)
+def enviar_emails(self, notificacion_ids):
+    """
+    Envía los emails de las notificaciones indicadas compartiendo una conexión
+    SMTP por lote y reintenta las fallidas con espera creciente. En modo eager
+    no se reintenta: los reintentos bloquearían la petición; las fallidas
+    quedan para `enviar_emails_pendientes --reintentar`.
+    """
+    enviados, fallidas = email_service.enviar_emails_notificaciones(
+        notificacion_ids, reintento=self.request.retries > 0
+    )
+    logger.info(f'Worker de emails: {enviados} enviados, {len(fallidas)} fallidos')
+
+    if fallidas and not self.request.is_eager and self.request.retries < self.max_retries:
+        raise self.retry(
+            args=[fallidas], countdown=ESPERA_REINTENTO * 2 ** self.request.retries
+        )
+    return enviados
@@ -1,3 +1,170 @@
-from django.test import TestCase
+import smtplib
+import threading
+from datetime import time
+from unittest import mock
 
-# Create your tests here.
+from django.core import mail
+from django.test import TestCase, override_settings
+
+from backend.test_utils import crear_clase, crear_socios
+from clases.models import Clase
+from reservas.cancelacion_service import cancelar_clases
+from reservas.models import Reserva
+from .email_service import enviar_emails_pendientes
+from .management.commands.servidor_smtp_local import ServidorSMTPLocal
+from .models import Notificacion
+
+
+@override_settings(EMAIL_HOST_USER='gimnasio@gimnasio.com')
+class EnvioEmailAsincronoTest(TestCase):
+    """Tests para el envío de emails fuera de la petición (worker de Celery)."""
+
+    def setUp(self):
+        """Crear datos de prueba."""
+        self.socio = crear_socios('email_', 1)[0]
+        self.clase = crear_clase('Spinning Emails', Clase.SPINNING, time(18, 0))
+
+    def test_no_envia_dentro_de_la_transaccion(self):
+        """Test: El email se envía recién al confirmar la transacción (modo eager)."""
+        with self.captureOnCommitCallbacks() as callbacks:
+            notificacion = Notificacion.crear_notificacion_reserva(self.socio, self.clase)
+            self.assertEqual(len(mail.outbox), 0)
+
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, [self.socio.email])
+        notificacion.refresh_from_db()
+        self.assertEqual(notificacion.estado, Notificacion.ENVIADA)
+
+    def test_con_worker_solo_encola(self):
+        """Test: Con broker la petición solo encola el id; no habla SMTP."""
+        with mock.patch('notificaciones.tasks.enviar_emails.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                notificacion = Notificacion.crear_notificacion_reserva(self.socio, self.clase)
+
+        delay.assert_called_once_with([notificacion.id])
+        self.assertEqual(len(mail.outbox), 0)
+        notificacion.refresh_from_db()
+        self.assertEqual(notificacion.estado, Notificacion.PENDIENTE)
+
+    def test_broker_caido_deja_pendiente(self):
+        """Test: Si no se puede encolar, la notificación queda para el envío por lotes."""
+        with mock.patch('notificaciones.tasks.enviar_emails.delay', side_effect=ConnectionError('sin broker')):
+            with self.captureOnCommitCallbacks(execute=True):
+                notificacion = Notificacion.crear_notificacion_reserva(self.socio, self.clase)
+
+        notificacion.refresh_from_db()
+        self.assertEqual(notificacion.estado, Notificacion.PENDIENTE)
+
+        self.assertEqual(enviar_emails_pendientes(), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+
+    @override_settings(CELERY_BROKER_URL='', CELERY_TASK_ALWAYS_EAGER=False)
+    def test_sin_broker_queda_para_el_envio_por_lotes(self):
+        """Test: Sin broker ni modo eager la petición no envía; el cron lo hace después."""
+        with mock.patch('notificaciones.tasks.enviar_emails.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                notificacion = Notificacion.crear_notificacion_reserva(self.socio, self.clase)
+
+        delay.assert_not_called()
+        self.assertEqual(len(mail.outbox), 0)
+        notificacion.refresh_from_db()
+        self.assertEqual(notificacion.estado, Notificacion.PENDIENTE)
+
+        self.assertEqual(enviar_emails_pendientes(), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_no_reenvia_notificaciones_ya_enviadas(self):
+        """Test: Si el envío por lotes ganó al worker, la tarea no duplica el email."""
+        with mock.patch('notificaciones.tasks.enviar_emails.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                notificacion = Notificacion.crear_notificacion_reserva(self.socio, self.clase)
+        enviar_emails_pendientes()
+
+        from .tasks import enviar_emails
+        enviar_emails.apply(args=delay.call_args.args)
+
+        self.assertEqual(len(mail.outbox), 1)
+        notificacion.refresh_from_db()
+        self.assertEqual(notificacion.estado, Notificacion.ENVIADA)
+
+    def test_canal_sistema_no_encola(self):
+        """Test: Las notificaciones que no son por email no pasan por el worker."""
+        with mock.patch('notificaciones.tasks.enviar_emails.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                Notificacion.objects.create(
+                    usuario=self.socio,
+                    tipo=Notificacion.RESERVA_CONFIRMADA,
+                    canal=Notificacion.SISTEMA,
+                    titulo='Aviso',
+                    mensaje='Solo en la app'
+                )
+
+        delay.assert_not_called()
+
+    def test_cancelacion_encola_avisos_en_una_tarea(self):
+        """Test: Los avisos creados con bulk_create al cancelar se encolan juntos."""
+        socios = crear_socios('cancel_email_', 3)
+        Reserva.objects.bulk_create([
+            Reserva(socio=socio, clase=self.clase, estado=Reserva.CONFIRMADA) for socio in socios
+        ])
+
+        with mock.patch('notificaciones.tasks.enviar_emails.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                cancelar_clases([self.clase.id], motivo='Mantención')
+
+        avisos = Notificacion.objects.filter(
+            tipo=Notificacion.CLASE_CANCELADA, canal=Notificacion.EMAIL
+        ).values_list('id', flat=True)
+        delay.assert_called_once()
+        self.assertCountEqual(delay.call_args.args[0], avisos)
+        self.assertEqual(len(avisos), 3)
+
+
+class ServidorSMTPLocalTest(TestCase):
+    """Tests para el servidor SMTP local de verificación."""
+
+    def setUp(self):
+        """Levantar el servidor en un puerto libre."""
+        self.servidor = ServidorSMTPLocal(('127.0.0.1', 0))
+        self.hilo = threading.Thread(target=self.servidor.serve_forever, daemon=True)
+        self.hilo.start()
+        self.puerto = self.servidor.server_address[1]
+
+    def tearDown(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+    def test_recibe_mensaje_con_smtplib(self):
+        """Test: Acepta el diálogo de smtplib y guarda el mensaje."""
+        with smtplib.SMTP('127.0.0.1', self.puerto) as smtp:
+            smtp.sendmail('a@gimnasio.com', ['b@gimnasio.com'], 'Subject: Hola\r\n\r\n.linea\r\nFin\r\n')
+
+        remitente, destinatarios, mensaje = self.servidor.mensajes[0]
+        self.assertEqual(remitente, '<a@gimnasio.com>')
+        self.assertEqual(destinatarios, ['<b@gimnasio.com>'])
+        self.assertEqual(mensaje['Subject'], 'Hola')
+        self.assertEqual(mensaje.get_content(), '.linea\nFin\n')
+
+    def test_envio_de_notificacion_por_smtp(self):
+        """Test: Una notificación llega al servidor con el backend SMTP real."""
+        socio = crear_socios('smtp_', 1)[0]
+        with override_settings(
+            EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+            EMAIL_HOST='127.0.0.1',
+            EMAIL_PORT=self.puerto,
+            EMAIL_HOST_USER='gimnasio@localhost',
+            EMAIL_HOST_PASSWORD='',
+            EMAIL_USE_TLS=False,
+            EMAIL_USE_SSL=False,
+        ):
+            with self.captureOnCommitCallbacks(execute=True):
+                notificacion = Notificacion.crear_notificacion_reserva(socio, crear_clase('Spinning Emails', Clase.SPINNING, time(18, 0)))
+
+        notificacion.refresh_from_db()
+        self.assertEqual(notificacion.estado, Notificacion.ENVIADA)
+        _, destinatarios, mensaje = self.servidor.mensajes[0]
+        self.assertEqual(destinatarios, [f'<{socio.email}>'])
+        self.assertEqual(mensaje['Subject'], notificacion.titulo)
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class ReportesConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'reportes'
+    verbose_name = 'Reportes'
+    
+    def ready(self):
+        """Importa señales cuando la app está lista."""
+        import reportes.signals  # noqa: F401
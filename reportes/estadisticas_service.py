@@ -0,0 +1,277 @@
+"""
+Servicio de reportes agregados: ocupación, asistencia y cancelaciones.
+
+Todas las métricas se calculan con GROUP BY en la base de datos y se guardan
+en caché por (reporte, dimensión, rango). Cada mes tiene un número de versión
+que forma parte de la clave; cualquier cambio en reservas, clases o listas de
+espera de un mes incrementa su versión y deja obsoletos solo los reportes
+cuyo rango incluye ese mes.
+"""
+from datetime import datetime
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import ExtractHour, ExtractIsoWeekDay, TruncHour
+from django.utils import timezone
+
+from clases.models import Clase
+from lista_espera.models import ListaEspera
+from reservas.models import Reserva
+
+# Segundos que un reporte permanece en caché aunque no cambie su período
+DURACION_CACHE = 60 * 60
+
+# Dimensiones de agrupación: nombre -> campos de Clase que forman la clave
+DIMENSIONES_OCUPACION = {
+    'clase': ['nombre', 'tipo'],
+    'tipo': ['tipo'],
+    'instructor': ['instructor_id', 'instructor__usuario__first_name', 'instructor__usuario__last_name'],
+    'hora_semana': ['dia_semana', 'hora'],
+}
+DIMENSIONES_ASISTENCIA = {'general': [], **DIMENSIONES_OCUPACION}
+
+# Tramos de anticipación de las cancelaciones, en horas: (etiqueta, desde, hasta)
+TRAMOS_CANCELACION = [
+    ('menos_de_2h', None, 2),
+    ('2h_a_6h', 2, 6),
+    ('6h_a_24h', 6, 24),
+    ('1_a_3_dias', 24, 72),
+    ('mas_de_3_dias', 72, None),
+]
+
+
+def _clave_version(anio, mes):
+    return f'reportes:version:{anio}-{mes:02d}'
+
+
+def _meses(desde, hasta):
+    """Lista de (año, mes) entre dos fechas, inclusive."""
+    meses = []
+    anio, mes = desde.year, desde.month
+    while (anio, mes) <= (hasta.year, hasta.month):
+        meses.append((anio, mes))
+        anio, mes = (anio + 1, 1) if mes == 12 else (anio, mes + 1)
+    return meses
+
+
+def invalidar_fechas(fechas):
+    """
+    Marca como modificados los meses de las fechas dadas.
+
+    Lo llaman las señales de Reserva, Clase y ListaEspera, y explícitamente las
+    operaciones en bloque (update/bulk_create) que no emiten señales. Las
+    versiones se incrementan al confirmar la transacción, para que ningún
+    reporte se recalcule con datos aún no confirmados.
+    """
+    meses = {(fecha.year, fecha.month) for fecha in fechas if fecha}
+    if meses:
+        transaction.on_commit(lambda: _incrementar_versiones(meses))
+
+
+def _incrementar_versiones(meses):
+    for anio, mes in meses:
+        clave = _clave_version(anio, mes)
+        # add() no pisa un valor existente; incr() es atómico en los backends de caché
+        cache.add(clave, 0, timeout=None)
+        try:
+            cache.incr(clave)
+        except ValueError:
+            cache.set(clave, 1, timeout=None)
+
+
+def _en_cache(reporte, dimension, desde, hasta, calcular):
+    """Retorna el reporte desde la caché o lo calcula y lo guarda."""
+    claves = [_clave_version(anio, mes) for anio, mes in _meses(desde, hasta)]
+    versiones = cache.get_many(claves)
+    firma = '.'.join(str(versiones.get(clave, 0)) for clave in claves)
+    clave = f'reportes:{reporte}:{dimension}:{desde.isoformat()}:{hasta.isoformat()}:{firma}'
+
+    resultado = cache.get(clave)
+    if resultado is None:
+        resultado = {
+            'reporte': reporte,
+            'dimension': dimension,
+            'desde': desde,
+            'hasta': hasta,
+            'resultados': calcular(),
+            'generado': timezone.now(),
+        }
+        cache.set(clave, resultado, DURACION_CACHE)
+    return resultado
+
+
+def _porcentaje(parte, total):
+    return round(parte * 100 / total, 1) if total else None
+
+
+def _anotar_hora_semana(queryset, prefijo=''):
+    """Agrega día de la semana (1 = lunes) y hora de inicio de la clase."""
+    return queryset.annotate(
+        dia_semana=ExtractIsoWeekDay(f'{prefijo}fecha'),
+        hora=ExtractHour(f'{prefijo}hora_inicio'),
+    )
+
+
+def _agrupar(queryset, campos, prefijo, **agregados):
+    """
+    GROUP BY sobre los campos de la dimensión (con prefijo hacia Clase).
+    Retorna {clave: fila} con la clave como tupla de valores.
+    """
+    if 'dia_semana' in campos:
+        queryset = _anotar_hora_semana(queryset, prefijo)
+        columnas = campos
+    else:
+        columnas = [f'{prefijo}{campo}' for campo in campos]
+
+    if not columnas:
+        return {(): queryset.aggregate(**agregados)}
+
+    filas = queryset.values(*columnas).annotate(**agregados).order_by(*columnas)
+    return {tuple(fila[columna] for columna in columnas): fila for fila in filas}
+
+
+def _describir_clave(campos, clave):
+    """Convierte la clave de agrupación en campos legibles para la respuesta."""
+    datos = dict(zip(campos, clave))
+    if 'instructor_id' in datos:
+        nombre = f"{datos.pop('instructor__usuario__first_name') or ''} " \
+                 f"{datos.pop('instructor__usuario__last_name') or ''}".strip()
+        datos['instructor_nombre'] = nombre or None
+    return datos
+
+
+def ocupacion(dimension, desde, hasta):
+    """
+    Ocupación de las clases no canceladas del rango agrupada por dimensión:
+    cupos ocupados / totales y demanda en lista de espera.
+    """
+    def calcular():
+        campos = DIMENSIONES_OCUPACION[dimension]
+        clases = Clase.objects.filter(fecha__range=(desde, hasta)).exclude(estado=Clase.CANCELADA)
+        grupos = _agrupar(
+            clases, campos, '',
+            clases=Count('id'),
+            cupos_totales=Sum('cupos_totales'),
+            cupos_ocupados=Sum('cupos_ocupados'),
+        )
+        esperas = _agrupar(
+            ListaEspera.objects.filter(
+                clase__fecha__range=(desde, hasta)
+            ).exclude(clase__estado=Clase.CANCELADA),
+            campos, 'clase__',
+            en_espera=Count('id'),
+        )
+
+        resultados = []
+        for clave, fila in grupos.items():
+            resultados.append({
+                **_describir_clave(campos, clave),
+                'clases': fila['clases'],
+                'cupos_totales': fila['cupos_totales'],
+                'cupos_ocupados': fila['cupos_ocupados'],
+                'ocupacion': _porcentaje(fila['cupos_ocupados'], fila['cupos_totales']),
+                'lista_espera': esperas.get(clave, {}).get('en_espera', 0),
+            })
+        return resultados
+
+    return _en_cache('ocupacion', dimension, desde, hasta, calcular)
+
+
+def asistencia(dimension, desde, hasta):
+    """
+    Reservas por estado para las clases del rango, con la tasa de asistencia
+    (completadas / (completadas + no-shows)) y la tasa de no-show. Las clases
+    canceladas por el gimnasio no cuentan: sus reservas se cancelan en cascada.
+    """
+    def calcular():
+        campos = DIMENSIONES_ASISTENCIA[dimension]
+        grupos = _agrupar(
+            Reserva.objects.filter(clase__fecha__range=(desde, hasta)).exclude(
+                clase__estado=Clase.CANCELADA
+            ),
+            campos, 'clase__',
+            total=Count('id'),
+            completadas=Count('id', filter=Q(estado=Reserva.COMPLETADA)),
+            noshow=Count('id', filter=Q(estado=Reserva.NOSHOW)),
+            canceladas=Count('id', filter=Q(estado=Reserva.CANCELADA)),
+            confirmadas=Count('id', filter=Q(estado=Reserva.CONFIRMADA)),
+        )
+
+        resultados = []
+        for clave, fila in grupos.items():
+            asistidas = fila['completadas'] + fila['noshow']
+            resultados.append({
+                **_describir_clave(campos, clave),
+                'total': fila['total'],
+                'completadas': fila['completadas'],
+                'noshow': fila['noshow'],
+                'canceladas': fila['canceladas'],
+                'confirmadas': fila['confirmadas'],
+                'tasa_asistencia': _porcentaje(fila['completadas'], asistidas),
+                'tasa_noshow': _porcentaje(fila['noshow'], asistidas),
+            })
+        return resultados
+
+    return _en_cache('asistencia', dimension, desde, hasta, calcular)
+
+
+def cancelaciones(desde, hasta):
+    """
+    Distribución de la anticipación con que los socios cancelan sus reservas
+    (sin las canceladas en cascada al cancelar la clase).
+
+    Las cancelaciones se agrupan en SQL por (inicio de la clase, hora de
+    cancelación); la anticipación de cada grupo se calcula a partir de esa
+    clave, con resolución de una hora.
+    """
+    def calcular():
+        grupos = Reserva.objects.filter(
+            estado=Reserva.CANCELADA,
+            fecha_cancelacion__isnull=False,
+            clase__fecha__range=(desde, hasta),
+        ).exclude(
+            clase__estado=Clase.CANCELADA
+        ).annotate(
+            hora_cancelacion=TruncHour('fecha_cancelacion')
+        ).values(
+            'clase__fecha', 'clase__hora_inicio', 'hora_cancelacion'
+        ).annotate(total=Count('id')).order_by()
+
+        tramos = {etiqueta: 0 for etiqueta, _, _ in TRAMOS_CANCELACION}
+        anticipaciones = []
+        for grupo in grupos:
+            inicio_clase = timezone.make_aware(
+                datetime.combine(grupo['clase__fecha'], grupo['clase__hora_inicio'])
+            )
+            horas = max(0.0, (inicio_clase - grupo['hora_cancelacion']).total_seconds() / 3600)
+            anticipaciones.append((horas, grupo['total']))
+            for etiqueta, minimo, maximo in TRAMOS_CANCELACION:
+                if (minimo is None or horas >= minimo) and (maximo is None or horas < maximo):
+                    tramos[etiqueta] += grupo['total']
+                    break
+
+        total = sum(cantidad for _, cantidad in anticipaciones)
+        mediana = None
+        if total:
+            acumulado = 0
+            for horas, cantidad in sorted(anticipaciones):
+                acumulado += cantidad
+                if acumulado * 2 >= total:
+                    mediana = round(horas, 1)
+                    break
+
+        return {
+            'total': total,
+            'anticipacion_promedio_horas': round(
+                sum(horas * cantidad for horas, cantidad in anticipaciones) / total, 1
+            ) if total else None,
+            'anticipacion_mediana_horas': mediana,
+            'tramos': [
+                {'tramo': etiqueta, 'cantidad': tramos[etiqueta]}
+                for etiqueta, _, _ in TRAMOS_CANCELACION
+            ],
+        }
+
+    return _en_cache('cancelaciones', 'general', desde, hasta, calcular)
+
@@ -0,0 +1,161 @@
+"""
+Servicio de exportación de datos en streaming (CSV o NDJSON).
+
+Las filas se leen con values_list().iterator(), sin instanciar modelos ni
+cargar el resultado completo, y se escriben en bloques: la memoria usada no
+depende de la cantidad de filas exportadas.
+"""
+import csv
+import json
+from datetime import date, datetime, time
+
+from clases.models import Clase
+from reservas.models import Reserva
+from usuarios.models import Usuario
+
+CSV = 'csv'
+NDJSON = 'ndjson'
+FORMATOS = {
+    CSV: 'text/csv; charset=utf-8',
+    NDJSON: 'application/x-ndjson',
+}
+
+# Filas leídas por viaje a la base de datos y filas por bloque escrito
+TAMANO_LOTE = 2000
+FILAS_POR_BLOQUE = 500
+
+
+class Exportacion:
+    """Definición de un recurso exportable."""
+
+    def __init__(self, queryset, columnas, campo_fecha, campo_estado, estados):
+        """
+        Args:
+            queryset: Función que retorna el QuerySet base
+            columnas: Campos (lookups de values_list) en el orden de salida
+            campo_fecha: Campo DateField/DateTimeField filtrado por desde/hasta
+            campo_estado: Campo filtrado por estado
+            estados: Valores válidos de estado
+        """
+        self.queryset = queryset
+        self.columnas = columnas
+        self.campo_fecha = campo_fecha
+        self.campo_estado = campo_estado
+        self.estados = estados
+
+
+EXPORTACIONES = {
+    # Reservas filtradas por la fecha de la clase
+    'reservas': Exportacion(
+        queryset=lambda: Reserva.objects.all(),
+        columnas=[
+            'id', 'socio_id', 'socio__username', 'clase_id', 'clase__nombre', 'clase__tipo',
+            'clase__fecha', 'clase__hora_inicio', 'estado', 'fecha_reserva', 'fecha_cancelacion',
+        ],
+        campo_fecha='clase__fecha',
+        campo_estado='estado',
+        estados=[valor for valor, _ in Reserva.ESTADOS],
+    ),
+    'clases': Exportacion(
+        queryset=lambda: Clase.objects.all(),
+        columnas=[
+            'id', 'nombre', 'tipo', 'instructor_id', 'instructor__usuario__username', 'fecha',
+            'hora_inicio', 'hora_fin', 'cupos_totales', 'cupos_ocupados', 'estado',
+        ],
+        campo_fecha='fecha',
+        campo_estado='estado',
+        estados=[valor for valor, _ in Clase.ESTADOS],
+    ),
+    # Socios filtrados por fecha de alta
+    'socios': Exportacion(
+        queryset=lambda: Usuario.objects.filter(rol=Usuario.SOCIO),
+        columnas=[
+            'id', 'username', 'email', 'first_name', 'last_name', 'estado_membresia',
+            'fecha_inicio_membresia', 'fecha_fin_membresia', 'total_noshow', 'bloqueado_hasta',
+            'fecha_creacion',
+        ],
+        campo_fecha='fecha_creacion__date',
+        campo_estado='estado_membresia',
+        estados=[valor for valor, _ in Usuario.ESTADOS_MEMBRESIA],
+    ),
+}
+
+
+def filtrar(exportacion, desde=None, hasta=None, estados=None):
+    """
+    Aplica los filtros de rango de fechas (inclusivo) y estado.
+
+    Returns:
+        QuerySet de tuplas con las columnas de la exportación, ordenado por id
+    """
+    queryset = exportacion.queryset()
+    if desde:
+        queryset = queryset.filter(**{f'{exportacion.campo_fecha}__gte': desde})
+    if hasta:
+        queryset = queryset.filter(**{f'{exportacion.campo_fecha}__lte': hasta})
+    if estados:
+        queryset = queryset.filter(**{f'{exportacion.campo_estado}__in': estados})
+    return queryset.order_by('id').values_list(*exportacion.columnas)
+
+
+def _valor(valor):
+    """Convierte fechas y horas a ISO 8601 para CSV y JSON."""
+    if isinstance(valor, (date, datetime, time)):
+        return valor.isoformat()
+    return valor
+
+
+class _Buffer:
+    """Pseudo-archivo para csv.writer: retorna la línea en vez de guardarla."""
+
+    def write(self, valor):
+        return valor
+
+
+def _filas(filas):
+    for fila in filas:
+        yield [_valor(valor) for valor in fila]
+
+
+def generar_csv(columnas, filas):
+    """Genera el CSV en bloques de FILAS_POR_BLOQUE líneas, con encabezado."""
+    escritor = csv.writer(_Buffer())
+    yield escritor.writerow(columnas)
+    bloque = []
+    for fila in _filas(filas):
+        bloque.append(escritor.writerow(fila))
+        if len(bloque) >= FILAS_POR_BLOQUE:
+            yield ''.join(bloque)
+            bloque = []
+    if bloque:
+        yield ''.join(bloque)
+
+
+def generar_ndjson(columnas, filas):
+    """Genera un objeto JSON por línea, en bloques de FILAS_POR_BLOQUE líneas."""
+    bloque = []
+    for fila in _filas(filas):
+        bloque.append(json.dumps(dict(zip(columnas, fila)), ensure_ascii=False) + '\n')
+        if len(bloque) >= FILAS_POR_BLOQUE:
+            yield ''.join(bloque)
+            bloque = []
+    if bloque:
+        yield ''.join(bloque)
+
+
+def exportar(recurso, formato=CSV, desde=None, hasta=None, estados=None):
+    """
+    Retorna un generador con el contenido de la exportación.
+
+    Args:
+        recurso: Clave de EXPORTACIONES
+        formato: CSV o NDJSON
+        desde, hasta: Rango de fechas inclusivo (date o None)
+        estados: Lista de estados a incluir (None = todos)
+    """
+    exportacion = EXPORTACIONES[recurso]
+    filas = filtrar(exportacion, desde, hasta, estados).iterator(chunk_size=TAMANO_LOTE)
+    columnas = [columna.replace('__', '_') for columna in exportacion.columnas]
+    if formato == NDJSON:
+        return generar_ndjson(columnas, filas)
+    return generar_csv(columnas, filas)
@@ -0,0 +1,177 @@
+"""
+Benchmark de la exportación en streaming de reservas.
+
+Genera N reservas de prueba (1.000.000 por defecto), las exporta a través de
+GET /api/reportes/exportar/reservas/ y reporta duración, filas/segundo y bytes
+generados. Con --medir-memoria reporta además el pico de memoria Python durante
+la exportación (tracemalloc hace más lenta la medición de tiempo).
+
+Uso:
+    python manage.py benchmark_exportacion
+    python manage.py benchmark_exportacion --filas=200000 --formato=ndjson
+    python manage.py benchmark_exportacion --conservar --medir-memoria
+"""
+import time as reloj
+import tracemalloc
+from datetime import timedelta, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from clases.models import Clase
+from reservas.models import Reserva
+from usuarios.models import Usuario
+
+PREFIJO = 'bench_export_'
+SOCIOS = 1000
+CLASES = 1000
+LOTE_INSERCION = 10000
+
+
+class Command(BaseCommand):
+    help = 'Exporta N reservas en streaming y mide tiempo y memoria'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--filas',
+            type=int,
+            default=1_000_000,
+            help='Reservas a exportar (default: 1000000)'
+        )
+        parser.add_argument(
+            '--formato',
+            choices=['csv', 'ndjson'],
+            default='csv',
+            help='Formato de salida (default: csv)'
+        )
+        parser.add_argument(
+            '--medir-memoria',
+            action='store_true',
+            help='Medir el pico de memoria Python con tracemalloc'
+        )
+        parser.add_argument(
+            '--conservar',
+            action='store_true',
+            help='No eliminar los datos de prueba al terminar (se reutilizan en la siguiente ejecución)'
+        )
+
+    def handle(self, *args, **options):
+        filas = options['filas']
+        formato = options['formato']
+
+        clases = self.preparar_datos(filas)
+
+        admin = Usuario.objects.create_user(
+            username=f'{PREFIJO}admin',
+            email=f'{PREFIJO}admin@example.com',
+            rol=Usuario.ADMINISTRADOR,
+            is_staff=True
+        )
+        api = APIClient(SERVER_NAME='localhost')
+        api.force_authenticate(user=admin)
+
+        # Exportar solo el rango de fechas de las clases de prueba
+        desde = min(clase.fecha for clase in clases)
+        hasta = max(clase.fecha for clase in clases)
+
+        try:
+            self.stdout.write(self.style.NOTICE(f'Exportando {filas} reservas en {formato}...'))
+            if options['medir_memoria']:
+                tracemalloc.start()
+            inicio = reloj.perf_counter()
+            respuesta = api.get(
+                '/api/reportes/exportar/reservas/',
+                {'formato': formato, 'desde': desde.isoformat(), 'hasta': hasta.isoformat()}
+            )
+            if respuesta.status_code != 200:
+                raise CommandError(f'La exportación retornó {respuesta.status_code}')
+
+            total_bytes = 0
+            lineas = 0
+            for bloque in respuesta.streaming_content:
+                total_bytes += len(bloque)
+                lineas += bloque.count(b'\n')
+            duracion = reloj.perf_counter() - inicio
+            if options['medir_memoria']:
+                _, pico = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+        finally:
+            admin.delete()
+            if not options['conservar']:
+                self.limpiar_datos()
+
+        exportadas = lineas - 1 if formato == 'csv' else lineas
+        self.stdout.write(f'Filas exportadas: {exportadas}')
+        self.stdout.write(f'Duración: {duracion:.2f}s ({exportadas / duracion:,.0f} filas/s)')
+        self.stdout.write(f'Tamaño: {total_bytes / 1024 / 1024:.1f} MB')
+        if options['medir_memoria']:
+            self.stdout.write(f'Pico de memoria Python: {pico / 1024 / 1024:.1f} MB')
+
+        if exportadas != filas:
+            raise CommandError(f'Se esperaban {filas} filas y se exportaron {exportadas}')
+        self.stdout.write(self.style.SUCCESS('Exportación completa.'))
+
+    def preparar_datos(self, filas):
+        """Crea socios, clases y reservas de prueba, o reutiliza las existentes."""
+        clases = list(Clase.objects.filter(nombre__startswith=PREFIJO))
+        existentes = Reserva.objects.filter(clase__nombre__startswith=PREFIJO).count()
+        if clases and existentes == filas:
+            self.stdout.write(f'Reutilizando {existentes} reservas de prueba.')
+            return clases
+
+        self.limpiar_datos()
+        self.stdout.write(self.style.NOTICE(f'Creando {filas} reservas de prueba...'))
+
+        Usuario.objects.bulk_create([
+            Usuario(
+                username=f'{PREFIJO}{i}',
+                email=f'{PREFIJO}{i}@example.com',
+                rol=Usuario.SOCIO,
+                estado_membresia=Usuario.ACTIVA
+            )
+            for i in range(SOCIOS)
+        ])
+        socios_ids = list(
+            Usuario.objects.filter(username__startswith=PREFIJO).values_list('id', flat=True)
+        )
+
+        hoy = timezone.now().date()
+        Clase.objects.bulk_create([
+            Clase(
+                nombre=f'{PREFIJO}{i}',
+                tipo=Clase.SPINNING,
+                fecha=hoy - timedelta(days=i % 365),
+                hora_inicio=time(7 + i % 12, 0),
+                hora_fin=time(8 + i % 12, 0),
+                cupos_totales=filas // CLASES + 1,
+                estado=Clase.COMPLETADA
+            )
+            for i in range(CLASES)
+        ])
+        clases = list(Clase.objects.filter(nombre__startswith=PREFIJO))
+
+        estados = [Reserva.COMPLETADA, Reserva.COMPLETADA, Reserva.NOSHOW, Reserva.CANCELADA]
+        inicio = reloj.perf_counter()
+        for desde in range(0, filas, LOTE_INSERCION):
+            Reserva.objects.bulk_create([
+                Reserva(
+                    socio_id=socios_ids[i % len(socios_ids)],
+                    clase_id=clases[i % len(clases)].id,
+                    estado=estados[i % len(estados)]
+                )
+                for i in range(desde, min(desde + LOTE_INSERCION, filas))
+            ])
+        self.stdout.write(f'Datos creados en {reloj.perf_counter() - inicio:.1f}s')
+        return clases
+
+    def limpiar_datos(self):
+        """Elimina los datos creados por el benchmark, las reservas en lotes."""
+        reservas = Reserva.objects.filter(clase__nombre__startswith=PREFIJO)
+        while True:
+            ids = list(reservas.values_list('id', flat=True)[:LOTE_INSERCION])
+            if not ids:
+                break
+            Reserva.objects.filter(id__in=ids).delete()
+        Clase.objects.filter(nombre__startswith=PREFIJO).delete()
+        Usuario.objects.filter(username__startswith=PREFIJO).delete()
@@ -0,0 +1,77 @@
+"""
+Serializers para los parámetros de la API de reportes.
+"""
+from datetime import timedelta
+
+from django.utils import timezone
+from rest_framework import serializers
+
+from .exportacion_service import FORMATOS, CSV
+
+# Rango por defecto y máximo de un reporte agregado, en días
+DIAS_POR_DEFECTO = 30
+MAX_DIAS_REPORTE = 366 * 3
+
+
+class RangoFechasSerializer(serializers.Serializer):
+    """Rango de fechas inclusivo recibido por query string."""
+    desde = serializers.DateField(required=False)
+    hasta = serializers.DateField(required=False)
+
+    def validate(self, data):
+        if data.get('desde') and data.get('hasta') and data['desde'] > data['hasta']:
+            raise serializers.ValidationError('La fecha "desde" no puede ser posterior a "hasta".')
+        return data
+
+
+class ExportacionParametrosSerializer(RangoFechasSerializer):
+    """
+    Parámetros de una exportación.
+    `estado` acepta varios valores separados por coma.
+    """
+    formato = serializers.ChoiceField(choices=list(FORMATOS), default=CSV)
+    estado = serializers.CharField(required=False)
+
+    def validate(self, data):
+        data = super().validate(data)
+        estados_validos = self.context['estados']
+        if data.get('estado'):
+            estados = [estado.strip() for estado in data['estado'].split(',') if estado.strip()]
+            invalidos = [estado for estado in estados if estado not in estados_validos]
+            if invalidos:
+                raise serializers.ValidationError({
+                    'estado': f'Estados no válidos: {", ".join(invalidos)}. '
+                              f'Opciones: {", ".join(estados_validos)}.'
+                })
+            data['estados'] = estados
+        return data
+
+
+class ReporteParametrosSerializer(RangoFechasSerializer):
+    """
+    Parámetros de un reporte agregado.
+    Sin rango se usan los últimos DIAS_POR_DEFECTO días; las dimensiones
+    válidas llegan por contexto (la primera es la dimensión por defecto).
+    """
+    dimension = serializers.CharField(required=False)
+
+    def validate(self, data):
+        data = super().validate(data)
+        dimensiones = self.context['dimensiones']
+        dimension = data.get('dimension', dimensiones[0])
+        if dimension not in dimensiones:
+            raise serializers.ValidationError({
+                'dimension': f'Dimensión no válida. Opciones: {", ".join(dimensiones)}.'
+            })
+        data['dimension'] = dimension
+
+        # Completar el rango: por defecto termina hoy y abarca DIAS_POR_DEFECTO días
+        if 'hasta' not in data:
+            data['hasta'] = max(timezone.localdate(), data.get('desde', timezone.localdate()))
+        if 'desde' not in data:
+            data['desde'] = data['hasta'] - timedelta(days=DIAS_POR_DEFECTO)
+        if (data['hasta'] - data['desde']).days > MAX_DIAS_REPORTE:
+            raise serializers.ValidationError(
+                f'El rango no puede superar {MAX_DIAS_REPORTE} días.'
+            )
+        return data
@@ -0,0 +1,42 @@
+"""
+Señales que invalidan la caché de reportes del mes afectado.
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from clases.models import Clase
+from clases.signals import clases_modificadas
+from lista_espera.models import ListaEspera
+from reservas.models import Reserva
+from .estadisticas_service import invalidar_fechas
+
+
+def _fecha_clase(instance):
+    """Fecha de la clase de una reserva o entrada de lista de espera."""
+    if type(instance).clase.is_cached(instance):
+        return instance.clase.fecha
+    return Clase.objects.filter(pk=instance.clase_id).values_list('fecha', flat=True).first()
+
+
+@receiver(post_save, sender=Reserva)
+@receiver(post_delete, sender=Reserva)
+@receiver(post_save, sender=ListaEspera)
+@receiver(post_delete, sender=ListaEspera)
+def invalidar_reportes_por_reserva(sender, instance, **kwargs):
+    """Una reserva o entrada de lista de espera cambió: invalida el mes de su clase."""
+    invalidar_fechas([_fecha_clase(instance)])
+
+
+@receiver(post_save, sender=Clase)
+@receiver(post_delete, sender=Clase)
+def invalidar_reportes_por_clase(sender, instance, **kwargs):
+    """
+    Una clase cambió: invalida su mes (y el anterior si se movió de fecha;
+    _fecha_anterior la guarda el pre_save de clases.signals).
+    """
+    invalidar_fechas([instance.fecha, getattr(instance, '_fecha_anterior', None)])
+
+
+@receiver(clases_modificadas)
+def invalidar_reportes_por_cambio_en_bloque(sender, clases, **kwargs):
+    """Clases o cupos cambiados con update()/bulk_create: invalida sus meses."""
+    invalidar_fechas([fecha for _, fecha in clases])
@@ -0,0 +1,238 @@
+"""
+Tests unitarios para la app de reportes.
+"""
+import csv
+import io
+import json
+from datetime import date, datetime, timedelta, time
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from clases.models import Clase
+from lista_espera.models import ListaEspera
+from reservas.models import Reserva
+from usuarios.models import Usuario, Instructor
+
+
+class ExportacionTest(TestCase):
+    """Tests para las exportaciones en streaming."""
+
+    def setUp(self):
+        """Crear admin, socio y reservas en dos fechas."""
+        self.admin = Usuario.objects.create_user(
+            username='admin_export',
+            email='admin_export@gimnasio.com',
+            password='AdminPass123!',
+            rol=Usuario.ADMINISTRADOR,
+            is_staff=True
+        )
+        self.socio = Usuario.objects.create_user(
+            username='socio_export',
+            email='socio_export@gimnasio.com',
+            password='SocioPass123!',
+            rol=Usuario.SOCIO,
+            estado_membresia=Usuario.ACTIVA
+        )
+        self.hoy = date.today()
+        for dias, estado in [(-2, Reserva.COMPLETADA), (-2, Reserva.NOSHOW), (3, Reserva.CONFIRMADA)]:
+            clase = Clase.objects.create(
+                nombre='Spinning',
+                tipo=Clase.SPINNING,
+                fecha=self.hoy + timedelta(days=dias),
+                hora_inicio=time(7, 0),
+                hora_fin=time(8, 0),
+                cupos_totales=10,
+                estado=Clase.ACTIVA
+            )
+            Reserva.objects.create(socio=self.socio, clase=clase, estado=estado)
+        self.api = APIClient()
+        self.api.force_authenticate(user=self.admin)
+
+    def descargar(self, url, **params):
+        respuesta = self.api.get(url, params)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta.streaming)
+        return b''.join(respuesta.streaming_content).decode()
+
+    def test_csv_con_filtros(self):
+        """Test: El CSV respeta el rango de fechas y los estados pedidos."""
+        contenido = self.descargar(
+            '/api/reportes/exportar/reservas/',
+            hasta=self.hoy.isoformat(),
+            estado='completada,noshow'
+        )
+        filas = list(csv.DictReader(io.StringIO(contenido)))
+        self.assertEqual(len(filas), 2)
+        self.assertEqual({fila['estado'] for fila in filas}, {'completada', 'noshow'})
+        self.assertEqual(filas[0]['socio_username'], 'socio_export')
+
+    def test_ndjson(self):
+        """Test: En NDJSON cada línea es un objeto JSON."""
+        contenido = self.descargar(
+            '/api/reportes/exportar/clases/', formato='ndjson', desde=self.hoy.isoformat()
+        )
+        filas = [json.loads(linea) for linea in contenido.splitlines()]
+        self.assertEqual(len(filas), 1)
+        self.assertEqual(filas[0]['fecha'], (self.hoy + timedelta(days=3)).isoformat())
+
+    def test_parametros_invalidos(self):
+        """Test: Estados desconocidos o rangos invertidos retornan 400."""
+        url = '/api/reportes/exportar/socios/'
+        self.assertEqual(self.api.get(url, {'estado': 'inexistente'}).status_code, 400)
+        self.assertEqual(
+            self.api.get(url, {'desde': '2025-02-01', 'hasta': '2025-01-01'}).status_code, 400
+        )
+
+    def test_solo_administradores(self):
+        """Test: Un socio no puede exportar."""
+        api = APIClient()
+        api.force_authenticate(user=self.socio)
+        self.assertEqual(api.get('/api/reportes/exportar/reservas/').status_code, 403)
+
+
+class ReportesAgregadosTest(TestCase):
+    """Tests para los reportes agregados y su caché."""
+
+    def setUp(self):
+        """Crear clases de dos tipos en un lunes pasado, con reservas en distintos estados."""
+        cache.clear()
+        self.admin = Usuario.objects.create_user(
+            username='admin_reportes',
+            email='admin_reportes@gimnasio.com',
+            password='AdminPass123!',
+            rol=Usuario.ADMINISTRADOR,
+            is_staff=True
+        )
+        self.instructor = Instructor.objects.create(
+            usuario=Usuario.objects.create_user(
+                username='inst_reportes',
+                email='inst_reportes@gimnasio.com',
+                first_name='Ana',
+                last_name='Pérez',
+                rol=Usuario.INSTRUCTOR
+            )
+        )
+        self.socios = [
+            Usuario.objects.create_user(
+                username=f'socio_reportes_{i}',
+                email=f'socio_reportes_{i}@gimnasio.com',
+                rol=Usuario.SOCIO,
+                estado_membresia=Usuario.ACTIVA
+            )
+            for i in range(4)
+        ]
+        hoy = date.today()
+        self.lunes = hoy - timedelta(days=hoy.weekday() + 7)
+        self.yoga = self.crear_clase(Clase.YOGA, cupos_totales=4, cupos_ocupados=4)
+        self.spinning = self.crear_clase(Clase.SPINNING, cupos_totales=10, cupos_ocupados=1)
+
+        for socio, estado in zip(self.socios, [
+            Reserva.COMPLETADA, Reserva.COMPLETADA, Reserva.COMPLETADA, Reserva.NOSHOW
+        ]):
+            Reserva.objects.create(socio=socio, clase=self.yoga, estado=estado)
+        ListaEspera.objects.create(socio=self.socios[0], clase=self.spinning)
+
+        self.api = APIClient()
+        self.api.force_authenticate(user=self.admin)
+        self.rango = {'desde': self.lunes.isoformat(), 'hasta': self.lunes.isoformat()}
+
+    def crear_clase(self, tipo, cupos_totales, cupos_ocupados):
+        return Clase.objects.create(
+            nombre=tipo.title(),
+            tipo=tipo,
+            instructor=self.instructor,
+            fecha=self.lunes,
+            hora_inicio=time(18, 0),
+            hora_fin=time(19, 0),
+            cupos_totales=cupos_totales,
+            cupos_ocupados=cupos_ocupados,
+            estado=Clase.COMPLETADA
+        )
+
+    def obtener(self, reporte, **params):
+        respuesta = self.api.get(f'/api/reportes/{reporte}/', {**self.rango, **params})
+        self.assertEqual(respuesta.status_code, 200, respuesta.data)
+        return respuesta.data['resultados']
+
+    def test_ocupacion_por_dimension(self):
+        """Test: La ocupación se agrupa por tipo, instructor y hora de la semana."""
+        por_tipo = {fila['tipo']: fila for fila in self.obtener('ocupacion', dimension='tipo')}
+        self.assertEqual(por_tipo['yoga']['ocupacion'], 100.0)
+        self.assertEqual(por_tipo['spinning']['ocupacion'], 10.0)
+        self.assertEqual(por_tipo['spinning']['lista_espera'], 1)
+
+        [instructor] = self.obtener('ocupacion', dimension='instructor')
+        self.assertEqual(instructor['instructor_nombre'], 'Ana Pérez')
+        self.assertEqual((instructor['cupos_ocupados'], instructor['cupos_totales']), (5, 14))
+
+        [franja] = self.obtener('ocupacion', dimension='hora_semana')
+        self.assertEqual((franja['dia_semana'], franja['hora'], franja['clases']), (1, 18, 2))
+
+    def test_asistencia_y_noshow(self):
+        """Test: Las tasas de asistencia y no-show se calculan sobre reservas asistidas."""
+        [general] = self.obtener('asistencia')
+        self.assertEqual(general['completadas'], 3)
+        self.assertEqual(general['noshow'], 1)
+        self.assertEqual(general['tasa_asistencia'], 75.0)
+        self.assertEqual(general['tasa_noshow'], 25.0)
+
+    def test_anticipacion_cancelaciones(self):
+        """Test: Las cancelaciones se clasifican por horas de anticipación."""
+        inicio = timezone.make_aware(datetime.combine(self.lunes, time(18, 0)))
+        for socio, horas in zip(self.socios[:2], [1, 48]):
+            reserva = Reserva.objects.create(socio=socio, clase=self.spinning, estado=Reserva.CANCELADA)
+            Reserva.objects.filter(pk=reserva.pk).update(
+                fecha_cancelacion=inicio - timedelta(hours=horas)
+            )
+
+        resultado = self.obtener('cancelaciones')
+        tramos = {tramo['tramo']: tramo['cantidad'] for tramo in resultado['tramos']}
+        self.assertEqual(resultado['total'], 2)
+        self.assertEqual(tramos['menos_de_2h'], 1)
+        self.assertEqual(tramos['1_a_3_dias'], 1)
+        self.assertEqual(resultado['anticipacion_promedio_horas'], 24.5)
+
+    def test_clase_cancelada_no_cambia_los_reportes(self):
+        """Test: Las reservas canceladas en cascada por el gimnasio no cuentan como cancelaciones."""
+        from reservas.cancelacion_service import cancelar_clases
+
+        asistencia = self.obtener('asistencia')
+        cancelaciones = self.obtener('cancelaciones')
+
+        pilates = Clase.objects.create(
+            nombre='Pilates', tipo=Clase.PILATES, instructor=self.instructor, fecha=self.lunes,
+            hora_inicio=time(9, 0), hora_fin=time(10, 0), cupos_totales=5, estado=Clase.ACTIVA
+        )
+        for socio in self.socios[:3]:
+            Reserva.objects.create(socio=socio, clase=pilates, estado=Reserva.CONFIRMADA)
+        with self.captureOnCommitCallbacks(execute=True):
+            cancelar_clases([pilates.id], motivo='Mantención')
+
+        self.assertEqual(self.obtener('asistencia'), asistencia)
+        self.assertEqual(self.obtener('cancelaciones')['total'], cancelaciones['total'])
+
+    def test_cache_se_invalida_por_periodo(self):
+        """Test: El reporte se sirve desde caché hasta que cambia su mes."""
+        self.obtener('asistencia')
+        with self.assertNumQueries(0):
+            self.api.get('/api/reportes/asistencia/', self.rango)
+
+        # Un cambio en otro mes no invalida el reporte
+        with self.captureOnCommitCallbacks(execute=True):
+            Clase.objects.create(
+                nombre='Futura', tipo=Clase.CARDIO, fecha=self.lunes + timedelta(days=400),
+                hora_inicio=time(9, 0), hora_fin=time(10, 0), cupos_totales=5
+            )
+        self.assertEqual(self.obtener('asistencia')[0]['noshow'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Reserva.objects.create(socio=self.socios[1], clase=self.spinning, estado=Reserva.NOSHOW)
+        self.assertEqual(self.obtener('asistencia')[0]['noshow'], 2)
+
+    def test_dimension_invalida(self):
+        """Test: Una dimensión desconocida retorna 400."""
+        respuesta = self.api.get('/api/reportes/ocupacion/', {'dimension': 'color'})
+        self.assertEqual(respuesta.status_code, 400)
@@ -0,0 +1,98 @@
+"""
+Views para la API de reportes de administración.
+"""
+import logging
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from . import estadisticas_service, exportacion_service
+from .serializers import ExportacionParametrosSerializer, ReporteParametrosSerializer
+
+# Logger para este módulo
+logger = logging.getLogger('reportes')
+
+
+class ReporteViewSet(viewsets.ViewSet):
+    """
+    ViewSet de exportaciones y reportes agregados. Solo para administradores.
+    """
+    permission_classes = [IsAdminUser]
+
+    @action(
+        detail=False,
+        methods=['get'],
+        url_path=r'exportar/(?P<recurso>reservas|clases|socios)'
+    )
+    def exportar(self, request, recurso=None):
+        """
+        Exporta reservas, clases o socios en streaming.
+        GET /api/reportes/exportar/{reservas|clases|socios}/?formato=csv|ndjson&desde=AAAA-MM-DD&hasta=AAAA-MM-DD&estado=a,b
+        """
+        exportacion = exportacion_service.EXPORTACIONES[recurso]
+        parametros = ExportacionParametrosSerializer(
+            data=request.query_params, context={'estados': exportacion.estados}
+        )
+        parametros.is_valid(raise_exception=True)
+        datos = parametros.validated_data
+        formato = datos['formato']
+
+        contenido = exportacion_service.exportar(
+            recurso,
+            formato=formato,
+            desde=datos.get('desde'),
+            hasta=datos.get('hasta'),
+            estados=datos.get('estados'),
+        )
+
+        respuesta = StreamingHttpResponse(
+            contenido, content_type=exportacion_service.FORMATOS[formato]
+        )
+        nombre = f'{recurso}_{timezone.now():%Y%m%d_%H%M%S}.{formato}'
+        respuesta['Content-Disposition'] = f'attachment; filename="{nombre}"'
+
+        logger.info(f'Admin {request.user.username} exportó {recurso} en formato {formato}')
+        return respuesta
+
+    def parametros_reporte(self, request, dimensiones):
+        """Valida rango de fechas y dimensión de un reporte agregado."""
+        parametros = ReporteParametrosSerializer(
+            data=request.query_params, context={'dimensiones': list(dimensiones)}
+        )
+        parametros.is_valid(raise_exception=True)
+        return parametros.validated_data
+
+    @action(detail=False, methods=['get'])
+    def ocupacion(self, request):
+        """
+        Ocupación de cupos y demanda en lista de espera.
+        GET /api/reportes/ocupacion/?dimension=clase|tipo|instructor|hora_semana&desde=...&hasta=...
+        """
+        datos = self.parametros_reporte(request, estadisticas_service.DIMENSIONES_OCUPACION)
+        return Response(estadisticas_service.ocupacion(
+            datos['dimension'], datos['desde'], datos['hasta']
+        ))
+
+    @action(detail=False, methods=['get'])
+    def asistencia(self, request):
+        """
+        Asistencia vs no-show de las reservas.
+        GET /api/reportes/asistencia/?dimension=general|clase|tipo|instructor|hora_semana&desde=...&hasta=...
+        """
+        datos = self.parametros_reporte(request, estadisticas_service.DIMENSIONES_ASISTENCIA)
+        return Response(estadisticas_service.asistencia(
+            datos['dimension'], datos['desde'], datos['hasta']
+        ))
+
+    @action(detail=False, methods=['get'])
+    def cancelaciones(self, request):
+        """
+        Anticipación con que se cancelan las reservas.
+        GET /api/reportes/cancelaciones/?desde=...&hasta=...
+        """
+        datos = self.parametros_reporte(request, ['general'])
+        return Response(estadisticas_service.cancelaciones(datos['desde'], datos['hasta']))
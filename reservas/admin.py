@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Reserva
+from .models import Reserva, SolicitudReserva, EventoReserva, SuscripcionCalendario
 
 
 @admin.register(Reserva)
@@ -61,3 +61,37 @@ class ReservaAdmin(admin.ModelAdmin):
                 count += 1
         self.message_user(request, f'{count} reserva(s) marcada(s) como completada(s).')
     marcar_completada.short_description = "Marcar como completada"
+
+
+@admin.register(SolicitudReserva)
+class SolicitudReservaAdmin(admin.ModelAdmin):
+    """
+    Configuración del admin para los tickets de reserva encolados.
+    """
+    list_display = ('id', 'socio', 'clase', 'estado', 'fecha_solicitud', 'fecha_procesada')
+    list_filter = ('estado', 'fecha_solicitud')
+    search_fields = ('socio__username', 'socio__email', 'clase__nombre')
+    ordering = ('-id',)
+    readonly_fields = ('reserva', 'fecha_solicitud', 'fecha_procesada')
+
+
+@admin.register(EventoReserva)
+class EventoReservaAdmin(admin.ModelAdmin):
+    """
+    Configuración del admin para el outbox de eventos de reserva.
+    """
+    list_display = ('id', 'tipo', 'reserva', 'estado', 'intentos', 'fecha_creacion', 'fecha_procesado')
+    list_filter = ('tipo', 'estado', 'fecha_creacion')
+    search_fields = ('reserva__socio__username', 'reserva__clase__nombre')
+    ordering = ('-id',)
+    readonly_fields = ('reserva', 'datos', 'intentos', 'error', 'fecha_creacion', 'fecha_procesado')
+
+
+@admin.register(SuscripcionCalendario)
+class SuscripcionCalendarioAdmin(admin.ModelAdmin):
+    """
+    Configuración del admin para los tokens de los feeds de calendario.
+    """
+    list_display = ('usuario', 'fecha_creacion')
+    search_fields = ('usuario__username', 'usuario__email')
+    readonly_fields = ('token', 'fecha_creacion')
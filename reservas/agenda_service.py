@@ -0,0 +1,289 @@
+"""
+Servicio de mantenimiento de la agenda desnormalizada de cada socio.
+
+Cada cambio de estado de una Reserva o ListaEspera actualiza solo la entrada
+afectada dentro de AgendaSocio, en vez de recalcular la agenda completa.
+Cada cambio de una agenda descarta también el feed .ics del socio.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+from .models import AgendaSocio, Reserva
+from . import ics_service
+
+
+def datos_clase(clase):
+    """Datos de la clase que se guardan dentro de la agenda."""
+    instructor = clase.instructor
+    return {
+        'clase_id': clase.id,
+        'clase_nombre': clase.nombre,
+        'tipo': clase.tipo,
+        'fecha': clase.fecha.isoformat(),
+        'hora_inicio': clase.hora_inicio.isoformat(),
+        'hora_fin': clase.hora_fin.isoformat(),
+        'estado_clase': clase.estado,
+        'instructor_nombre': instructor.usuario.get_full_name() if instructor else None,
+    }
+
+
+def _es_futura(clase):
+    return clase.fecha >= timezone.now().date()
+
+
+def _item_reserva(reserva):
+    return {'id': reserva.id, **datos_clase(reserva.clase)}
+
+
+def _item_espera(entrada):
+    vence = entrada.fecha_expiracion.isoformat() if entrada.fecha_expiracion else None
+    return {'id': entrada.id, 'estado': entrada.estado, 'oferta_vence': vence, **datos_clase(entrada.clase)}
+
+
+def _modificar_agenda(socio_id, cambio, crear=True):
+    """
+    Aplica `cambio(agenda)` sobre la agenda del socio bajo bloqueo de fila.
+    `cambio` retorna True si modificó algo. Si el socio aún no tiene agenda se
+    arma completa en vez de aplicar el cambio; con crear=False no se crea
+    (p. ej. durante el borrado en cascada de un socio).
+    """
+    with transaction.atomic():
+        agenda = AgendaSocio.objects.select_for_update().filter(socio_id=socio_id).first()
+        if agenda is None:
+            # Una agenda nueva se arma completa: el socio puede tener reservas
+            # anteriores a ella. Se lee de la base, que ya incluye este cambio.
+            if crear:
+                _reconstruir(socio_id)
+            return
+        if cambio(agenda):
+            agenda.version += 1
+            agenda.save()
+            ics_service.invalidar_socios([socio_id])
+
+
+def registrar_reservas(socio_id, reservas):
+    """Actualiza en la agenda del socio las entradas de las reservas dadas."""
+    def cambio(agenda):
+        modificada = False
+        for reserva in reservas:
+            clave = str(reserva.id)
+            if reserva.estado == Reserva.CONFIRMADA and _es_futura(reserva.clase):
+                agenda.reservas[clave] = _item_reserva(reserva)
+                modificada = True
+            elif clave in agenda.reservas:
+                del agenda.reservas[clave]
+                modificada = True
+        return modificada
+
+    _modificar_agenda(socio_id, cambio)
+
+
+def registrar_reserva(reserva):
+    """Actualiza la agenda tras un cambio de estado de una reserva."""
+    registrar_reservas(reserva.socio_id, [reserva])
+
+
+def quitar_reservas(socio_id, reserva_ids):
+    """Quita reservas de la agenda (eliminadas o actualizadas en bloque)."""
+    def cambio(agenda):
+        claves = [str(reserva_id) for reserva_id in reserva_ids if str(reserva_id) in agenda.reservas]
+        for clave in claves:
+            del agenda.reservas[clave]
+        return bool(claves)
+
+    _modificar_agenda(socio_id, cambio, crear=False)
+
+
+def quitar_en_bloque(reservas=(), entradas=()):
+    """
+    Quita reservas y entradas de lista de espera de muchas agendas a la vez
+    (p. ej. al cancelar clases): bloquea las agendas en una consulta y las
+    guarda con un solo bulk_update.
+
+    Args:
+        reservas: Pares (reserva_id, socio_id)
+        entradas: Pares (entrada_id, socio_id)
+    """
+    claves = defaultdict(lambda: ([], []))
+    for reserva_id, socio_id in reservas:
+        claves[socio_id][0].append(str(reserva_id))
+    for entrada_id, socio_id in entradas:
+        claves[socio_id][1].append(str(entrada_id))
+    if not claves:
+        return
+
+    ahora = timezone.now()
+    modificadas = []
+    with transaction.atomic():
+        for agenda in AgendaSocio.objects.select_for_update().filter(socio_id__in=claves):
+            reserva_claves, entrada_claves = claves[agenda.socio_id]
+            quitadas = [agenda.reservas.pop(clave, None) for clave in reserva_claves]
+            quitadas += [agenda.listas_espera.pop(clave, None) for clave in entrada_claves]
+            if any(item is not None for item in quitadas):
+                agenda.version += 1
+                agenda.fecha_actualizacion = ahora
+                modificadas.append(agenda)
+        AgendaSocio.objects.bulk_update(
+            modificadas, ['reservas', 'listas_espera', 'version', 'fecha_actualizacion'], batch_size=500
+        )
+        ics_service.invalidar_socios([agenda.socio_id for agenda in modificadas])
+
+
+def promover_en_bloque(reservas, entradas):
+    """
+    Refleja una promoción en bloque desde la lista de espera: agrega las
+    reservas nuevas y quita las entradas de espera de cada agenda, con un
+    solo bulk_update. Las agendas que aún no existen se arman completas en
+    su primera lectura.
+
+    Args:
+        reservas: Reservas creadas (con su clase cargada)
+        entradas: Pares (entrada_id, socio_id)
+    """
+    cambios = defaultdict(lambda: ([], []))
+    for reserva in reservas:
+        cambios[reserva.socio_id][0].append(reserva)
+    for entrada_id, socio_id in entradas:
+        cambios[socio_id][1].append(str(entrada_id))
+    if not cambios:
+        return
+
+    ahora = timezone.now()
+    with transaction.atomic():
+        agendas = list(AgendaSocio.objects.select_for_update().filter(socio_id__in=cambios))
+        for agenda in agendas:
+            nuevas, entrada_claves = cambios[agenda.socio_id]
+            for reserva in nuevas:
+                agenda.reservas[str(reserva.id)] = _item_reserva(reserva)
+            for clave in entrada_claves:
+                agenda.listas_espera.pop(clave, None)
+            agenda.version += 1
+            agenda.fecha_actualizacion = ahora
+        AgendaSocio.objects.bulk_update(
+            agendas, ['reservas', 'listas_espera', 'version', 'fecha_actualizacion'], batch_size=500
+        )
+        ics_service.invalidar_socios([agenda.socio_id for agenda in agendas])
+
+
+def registrar_entrada_espera(entrada):
+    """Actualiza la agenda tras un cambio de estado en la lista de espera."""
+    from lista_espera.models import ListaEspera
+
+    def cambio(agenda):
+        clave = str(entrada.id)
+        if entrada.estado in ListaEspera.ESTADOS_ACTIVOS and _es_futura(entrada.clase):
+            agenda.listas_espera[clave] = _item_espera(entrada)
+            return True
+        if clave in agenda.listas_espera:
+            del agenda.listas_espera[clave]
+            return True
+        return False
+
+    _modificar_agenda(entrada.socio_id, cambio)
+
+
+def quitar_entrada_espera(socio_id, entrada_id):
+    """Quita una entrada de lista de espera eliminada."""
+    def cambio(agenda):
+        return agenda.listas_espera.pop(str(entrada_id), None) is not None
+
+    _modificar_agenda(socio_id, cambio, crear=False)
+
+
+def actualizar_clase_en_agendas(clase):
+    """
+    Refresca los datos embebidos de una clase (nombre, horario, estado) en las
+    agendas de los socios que la tienen reservada o están en su lista de espera.
+    """
+    actualizar_clases_en_agendas([clase])
+
+
+def actualizar_clases_en_agendas(clases):
+    """Versión en bloque de actualizar_clase_en_agendas (p. ej. tras bulk_update)."""
+    from lista_espera.models import ListaEspera
+
+    datos = {clase.id: datos_clase(clase) for clase in clases}
+    socios = set(
+        Reserva.objects.filter(clase_id__in=datos, estado=Reserva.CONFIRMADA).values_list('socio_id', flat=True)
+    ) | set(
+        ListaEspera.objects.filter(
+            clase_id__in=datos, estado__in=ListaEspera.ESTADOS_ACTIVOS
+        ).values_list('socio_id', flat=True)
+    )
+    if not socios:
+        return
+
+    with transaction.atomic():
+        for agenda in AgendaSocio.objects.select_for_update().filter(socio_id__in=socios):
+            for items in (agenda.reservas, agenda.listas_espera):
+                for item in items.values():
+                    if item['clase_id'] in datos:
+                        item.update(datos[item['clase_id']])
+            agenda.version += 1
+            agenda.save()
+        ics_service.invalidar_socios(socios)
+
+
+def _reconstruir(socio_id):
+    from lista_espera.models import ListaEspera
+
+    hoy = timezone.now().date()
+    reservas = Reserva.objects.para_listado().filter(
+        socio_id=socio_id, estado=Reserva.CONFIRMADA, clase__fecha__gte=hoy
+    )
+    entradas = ListaEspera.objects.para_listado().filter(
+        socio_id=socio_id, estado__in=ListaEspera.ESTADOS_ACTIVOS, clase__fecha__gte=hoy
+    )
+
+    with transaction.atomic():
+        agenda, _ = AgendaSocio.objects.select_for_update().get_or_create(socio_id=socio_id)
+        agenda.reservas = {str(r.id): _item_reserva(r) for r in reservas}
+        agenda.listas_espera = {str(e.id): _item_espera(e) for e in entradas}
+        agenda.version += 1
+        agenda.save()
+        ics_service.invalidar_socios([socio_id])
+    return agenda
+
+
+def reconstruir_agenda(socio):
+    """Recalcula la agenda completa de un socio desde Reserva y ListaEspera."""
+    return _reconstruir(socio.id)
+
+
+def obtener_agenda(socio):
+    """
+    Retorna la agenda del socio lista para serializar.
+
+    Costo constante: la fila de AgendaSocio más, si hay listas de espera, una
+    consulta por clave primaria que calcula las posiciones actuales.
+    """
+    from lista_espera.models import ListaEspera
+
+    agenda = AgendaSocio.objects.filter(socio=socio).first()
+    if agenda is None:
+        agenda = reconstruir_agenda(socio)
+
+    hoy = timezone.now().date().isoformat()
+    reservas = sorted(
+        (item for item in agenda.reservas.values() if item['fecha'] >= hoy),
+        key=lambda item: (item['fecha'], item['hora_inicio'])
+    )
+    listas = sorted(
+        (item for item in agenda.listas_espera.values() if item['fecha'] >= hoy),
+        key=lambda item: (item['fecha'], item['hora_inicio'])
+    )
+
+    if listas:
+        posiciones = dict(
+            ListaEspera.objects.filter(id__in=[item['id'] for item in listas])
+            .con_posicion().values_list('id', 'posicion_actual')
+        )
+        listas = [{**item, 'posicion': posiciones.get(item['id'])} for item in listas]
+
+    return {
+        'version': agenda.version,
+        'proximas_reservas': reservas,
+        'listas_espera': listas,
+        'fecha_actualizacion': agenda.fecha_actualizacion,
+    }
@@ -5,3 +5,7 @@ class ReservasConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'reservas'
     verbose_name = 'Reservas'
+    
+    def ready(self):
+        """Importa señales cuando la app está lista."""
+        import reservas.signals  # noqa: F401
@@ -0,0 +1,152 @@
+"""
+Servicio de cancelación de clases en cascada.
+
+Cancelar una clase cancela en bloque sus reservas confirmadas y su lista de
+espera, libera los cupos, quita las entradas de las agendas con un solo
+bulk_update y crea los avisos CLASE_CANCELADA con bulk_create. bulk_create no
+emite post_save: los avisos por email de cada lote se encolan juntos para el
+worker, que los envía compartiendo la conexión SMTP.
+
+Cada lote de clases se cancela en su propia transacción y solo se procesan las
+clases aún activas, así que repetir la cancelación no duplica avisos.
+"""
+import logging
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from clases.models import Clase
+from clases.signals import clases_modificadas
+from .models import Reserva
+from . import agenda_service
+
+logger = logging.getLogger('reservas')
+
+LOTE = 100
+
+
+def _cascada(clases, motivo):
+    """
+    Cancela reservas y lista de espera de clases ya bloqueadas y marcadas
+    como canceladas, y construye sus avisos.
+
+    Args:
+        clases: Diccionario {clase_id: Clase}
+
+    Returns:
+        dict: Conteo de reservas, entradas de espera y notificaciones
+    """
+    from lista_espera.models import ListaEspera
+    from notificaciones.models import Notificacion
+    from notificaciones.email_service import encolar_emails
+
+    ahora = timezone.now()
+    reservas = list(
+        Reserva.objects.filter(clase_id__in=clases, estado=Reserva.CONFIRMADA)
+        .values_list('id', 'socio_id', 'clase_id')
+    )
+    entradas = list(
+        ListaEspera.objects.filter(clase_id__in=clases, estado__in=ListaEspera.ESTADOS_ACTIVOS)
+        .values_list('id', 'socio_id', 'clase_id')
+    )
+
+    canceladas = Reserva.objects.filter(
+        id__in=[reserva_id for reserva_id, _, _ in reservas], estado=Reserva.CONFIRMADA
+    ).update(estado=Reserva.CANCELADA, fecha_cancelacion=ahora, fecha_actualizacion=ahora)
+    ListaEspera.objects.filter(
+        id__in=[entrada_id for entrada_id, _, _ in entradas], estado__in=ListaEspera.ESTADOS_ACTIVOS
+    ).update(estado=ListaEspera.CANCELADO, fecha_actualizacion=ahora)
+
+    # update() no emite señales: agendas en bloque
+    agenda_service.quitar_en_bloque(
+        reservas=[(reserva_id, socio_id) for reserva_id, socio_id, _ in reservas],
+        entradas=[(entrada_id, socio_id) for entrada_id, socio_id, _ in entradas],
+    )
+
+    socios_por_clase = defaultdict(list)
+    for _, socio_id, clase_id in reservas:
+        socios_por_clase[clase_id].append(socio_id)
+    espera_por_clase = defaultdict(list)
+    for _, socio_id, clase_id in entradas:
+        espera_por_clase[clase_id].append(socio_id)
+
+    notificaciones = []
+    for clase_id, clase in clases.items():
+        notificaciones.extend(Notificacion.construir_notificaciones_clase_cancelada(
+            clase, socios_por_clase[clase_id], espera_por_clase[clase_id], motivo
+        ))
+    Notificacion.objects.bulk_create(notificaciones, batch_size=500)
+    encolar_emails(n.id for n in notificaciones if n.canal == Notificacion.EMAIL)
+
+    return {
+        'reservas': canceladas,
+        'lista_espera': len(entradas),
+        'notificaciones': len(notificaciones),
+    }
+
+
+def cancelar_lote(clase_ids, motivo=''):
+    """
+    Cancela un lote de clases activas en una sola transacción.
+
+    Returns:
+        dict: Conteo de clases, reservas, entradas de espera y notificaciones
+    """
+    with transaction.atomic():
+        # Bloquear las clases; las que ya no estén activas no se tocan
+        clases = {
+            clase.id: clase
+            for clase in Clase.objects.select_for_update().select_related('instructor').filter(
+                id__in=clase_ids, estado=Clase.ACTIVA
+            )
+        }
+        if not clases:
+            return {'clases': 0, 'reservas': 0, 'lista_espera': 0, 'notificaciones': 0}
+
+        Clase.objects.filter(id__in=clases).update(
+            estado=Clase.CANCELADA, cupos_ocupados=0, fecha_actualizacion=timezone.now()
+        )
+        resultado = _cascada(clases, motivo)
+        clases_modificadas.send(sender=Clase, clases=[(clase.id, clase.fecha) for clase in clases.values()])
+
+    return {'clases': len(clases), **resultado}
+
+
+def cancelar_clases(clase_ids, motivo='', lote=LOTE):
+    """
+    Cancela todas las clases indicadas, en lotes de `lote` clases.
+
+    Returns:
+        dict: Totales acumulados de todos los lotes
+    """
+    clase_ids = list(clase_ids)
+    totales = Counter()
+    for inicio in range(0, len(clase_ids), lote):
+        resultado = cancelar_lote(clase_ids[inicio:inicio + lote], motivo)
+        totales.update(resultado)
+        logger.info(
+            f'Cancelación de clases: lote de {resultado["clases"]} clases, '
+            f'{resultado["reservas"]} reservas y {resultado["lista_espera"]} '
+            f'entradas de espera canceladas'
+        )
+
+    return {clave: totales[clave] for clave in ('clases', 'reservas', 'lista_espera', 'notificaciones')}
+
+
+def cancelar_en_cascada(clase, motivo=''):
+    """
+    Completa la cancelación de una clase que ya se guardó como cancelada con
+    save() (formulario del admin, edición por la API).
+    """
+    with transaction.atomic():
+        Clase.objects.filter(pk=clase.pk).update(cupos_ocupados=0)
+        clase.cupos_ocupados = 0
+        resultado = _cascada({clase.id: clase}, motivo)
+        clases_modificadas.send(sender=Clase, clases=[(clase.id, clase.fecha)])
+
+    logger.info(
+        f'Clase {clase.id} cancelada: {resultado["reservas"]} reservas y '
+        f'{resultado["lista_espera"]} entradas de espera canceladas'
+    )
+    return resultado
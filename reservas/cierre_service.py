@@ -0,0 +1,155 @@
+"""
+Servicio de cierre por lotes de las clases terminadas.
+
+Al cerrar una clase, las reservas que siguen confirmadas se marcan en bloque
+(por defecto como no-show), los contadores de no-show de los socios se
+incrementan con F(), los socios que alcanzan el límite mensual se bloquean con
+un solo UPDATE y las advertencias se crean con bulk_create.
+
+Cada lote de clases se cierra en su propia transacción y una clase cerrada
+deja de estar ACTIVA, así que el proceso es idempotente y, si se interrumpe,
+basta con volver a ejecutarlo para continuar desde el primer lote pendiente.
+"""
+import logging
+from collections import Counter
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from clases.models import Clase
+from clases.signals import clases_modificadas
+from usuarios.models import Usuario
+from .models import Reserva
+from . import agenda_service
+
+logger = logging.getLogger('reservas')
+
+
+def clases_terminadas(hasta, desde=None):
+    """
+    Clases activas cuyo horario terminó antes de `hasta` (y, si se indica,
+    después de `desde`). Las horas de las clases son locales.
+    """
+    hasta = timezone.localtime(hasta)
+    filtro = Q(fecha__lt=hasta.date()) | Q(fecha=hasta.date(), hora_fin__lte=hasta.time())
+    if desde:
+        desde = timezone.localtime(desde)
+        filtro &= Q(fecha__gt=desde.date()) | Q(fecha=desde.date(), hora_fin__gte=desde.time())
+    return Clase.objects.filter(filtro, estado=Clase.ACTIVA).order_by('fecha', 'hora_fin', 'id')
+
+
+def cerrar_lote(clase_ids, estado_pendientes=Reserva.NOSHOW):
+    """
+    Cierra un lote de clases en una sola transacción.
+
+    Args:
+        clase_ids: IDs de las clases a cerrar
+        estado_pendientes: Estado para las reservas aún confirmadas
+            (Reserva.NOSHOW o Reserva.COMPLETADA)
+
+    Returns:
+        dict: Conteo de clases, reservas marcadas, socios bloqueados y advertencias
+    """
+    from notificaciones.models import Notificacion
+
+    with transaction.atomic():
+        # Bloquear las clases; las que ya no estén activas las cerró otra ejecución
+        clases = {
+            clase.id: clase
+            for clase in Clase.objects.select_for_update().filter(id__in=clase_ids, estado=Clase.ACTIVA)
+        }
+        if not clases:
+            return {'clases': 0, 'reservas': 0, 'bloqueados': 0, 'advertencias': 0}
+
+        pendientes = Reserva.objects.filter(clase_id__in=clases, estado=Reserva.CONFIRMADA)
+        filas = list(
+            pendientes.order_by('clase__fecha', 'clase__hora_inicio', 'id')
+            .values_list('id', 'socio_id', 'clase_id')
+        )
+        marcadas = Reserva.objects.filter(
+            id__in=[reserva_id for reserva_id, _, _ in filas],
+            estado=Reserva.CONFIRMADA
+        ).update(estado=estado_pendientes, fecha_actualizacion=timezone.now())
+
+        bloqueados = 0
+        advertencias = []
+        if estado_pendientes == Reserva.NOSHOW and filas:
+            noshows_por_socio = Counter(socio_id for _, socio_id, _ in filas)
+
+            # Un UPDATE con F() por cada cantidad distinta de no-shows en el lote
+            socios_por_cantidad = {}
+            for socio_id, cantidad in noshows_por_socio.items():
+                socios_por_cantidad.setdefault(cantidad, []).append(socio_id)
+            for cantidad, socio_ids in socios_por_cantidad.items():
+                Usuario.objects.filter(id__in=socio_ids).update(
+                    total_noshow=F('total_noshow') + cantidad,
+                    noshow_mes_actual=F('noshow_mes_actual') + cantidad
+                )
+
+            bloqueados = Usuario.objects.filter(
+                id__in=noshows_por_socio,
+                noshow_mes_actual__gte=Usuario.MAX_NOSHOW_MES
+            ).update(
+                bloqueado_hasta=timezone.now() + timedelta(days=Usuario.DIAS_BLOQUEO_NOSHOW),
+                estado_membresia=Usuario.SUSPENDIDA
+            )
+
+            # Una advertencia por reserva, en orden de las clases, con el
+            # contador que tenía el socio tras cada no-show del lote
+            socios = Usuario.objects.in_bulk(list(noshows_por_socio))
+            contadores = {
+                socio_id: socios[socio_id].noshow_mes_actual - cantidad
+                for socio_id, cantidad in noshows_por_socio.items()
+            }
+            for _, socio_id, clase_id in filas:
+                contadores[socio_id] += 1
+                advertencias.append(Notificacion.construir_advertencia_noshow(
+                    socios[socio_id], clases[clase_id], contadores[socio_id]
+                ))
+            Notificacion.objects.bulk_create(advertencias)
+
+        Clase.objects.filter(id__in=clases).update(
+            estado=Clase.COMPLETADA, fecha_actualizacion=timezone.now()
+        )
+
+        # update() no emite señales: actualizar agenda, reportes y catálogo aparte
+        reservas_por_socio = {}
+        for reserva_id, socio_id, _ in filas:
+            reservas_por_socio.setdefault(socio_id, []).append(reserva_id)
+        for socio_id, reserva_ids in reservas_por_socio.items():
+            agenda_service.quitar_reservas(socio_id, reserva_ids)
+        clases_modificadas.send(sender=Clase, clases=[(clase.id, clase.fecha) for clase in clases.values()])
+
+    return {
+        'clases': len(clases),
+        'reservas': marcadas,
+        'bloqueados': bloqueados,
+        'advertencias': len(advertencias),
+    }
+
+
+def cerrar_clases_terminadas(hasta=None, desde=None, estado_pendientes=Reserva.NOSHOW, lote=100):
+    """
+    Cierra todas las clases terminadas en la ventana, en lotes de `lote` clases.
+
+    Returns:
+        dict: Totales acumulados de todos los lotes
+    """
+    hasta = hasta or timezone.now()
+    totales = Counter()
+
+    # Los IDs se toman al inicio: una clase que termina durante el proceso
+    # queda para la siguiente ejecución
+    clase_ids = list(clases_terminadas(hasta, desde).values_list('id', flat=True))
+    for inicio in range(0, len(clase_ids), lote):
+        resultado = cerrar_lote(clase_ids[inicio:inicio + lote], estado_pendientes)
+        totales.update(resultado)
+        logger.info(
+            f'Cierre de clases: lote de {resultado["clases"]} clases, '
+            f'{resultado["reservas"]} reservas marcadas como {estado_pendientes}, '
+            f'{resultado["bloqueados"]} socios bloqueados'
+        )
+
+    return {clave: totales[clave] for clave in ('clases', 'reservas', 'bloqueados', 'advertencias')}
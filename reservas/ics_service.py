@@ -0,0 +1,202 @@
+"""
+Feeds iCalendar (.ics) del horario de socios e instructores.
+
+Cada usuario tiene un token secreto (SuscripcionCalendario) que forma la URL
+del feed; las apps de calendario la consultan cada pocos minutos sin
+autenticarse. Para que esas consultas no lleguen a la base de datos:
+
+- el token se resuelve al dueño del feed desde la caché compartida, y se
+  vuelve a validar contra la base cada DURACION_TOKEN segundos,
+- el feed se guarda ya generado, con su ETag y fecha de modificación,
+- solo se invalida el feed de los dueños afectados: el de un socio cuando
+  cambia su agenda (sus reservas o las clases que reservó) y el de un
+  instructor cuando cambian sus clases. Se regenera en la siguiente consulta.
+"""
+import hashlib
+import secrets
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from clases.models import Clase
+from .models import Reserva, SuscripcionCalendario
+
+SOCIO = 'socio'
+INSTRUCTOR = 'instructor'
+
+# Respaldo para cambios que no invalidan el feed (p. ej. el nombre del instructor)
+DURACION_FEED = 24 * 60 * 60
+
+# Un token se vuelve a validar contra la base cada tantos segundos: acota el
+# tiempo que una URL regenerada podría seguir respondiendo si una consulta
+# concurrente la dejó en caché justo antes del cambio
+DURACION_TOKEN = 10 * 60
+
+# Días hacia atrás que se incluyen en el feed
+DIAS_HISTORIAL = 30
+
+DOMINIO_UID = 'gimnasio-energia-total'
+
+
+def _clave_token(token):
+    return f'reservas:ics:token:{token}'
+
+
+def _clave_feed(tipo, duenio_id):
+    return f'reservas:ics:feed:{tipo}:{duenio_id}'
+
+
+def obtener_suscripcion(usuario, regenerar=False):
+    """Suscripción del usuario (se crea la primera vez); regenerar invalida la URL anterior."""
+    suscripcion = SuscripcionCalendario.objects.filter(usuario=usuario).first()
+    if suscripcion and not regenerar:
+        return suscripcion
+    if suscripcion:
+        clave_anterior = _clave_token(suscripcion.token)
+        suscripcion.token = secrets.token_urlsafe(32)
+        suscripcion.save(update_fields=['token'])
+        # La caché es compartida (settings.CACHES): la URL anterior deja de valer en todos los procesos
+        transaction.on_commit(lambda: cache.delete(clave_anterior))
+        return suscripcion
+    return SuscripcionCalendario.objects.create(usuario=usuario, token=secrets.token_urlsafe(32))
+
+
+def _resolver_token(token):
+    """(tipo, dueño) del feed: usuario_id para socios, instructor_id para instructores."""
+    from usuarios.models import Instructor
+
+    duenio = cache.get(_clave_token(token))
+    if duenio is not None:
+        return tuple(duenio) if duenio else None
+
+    suscripcion = SuscripcionCalendario.objects.filter(token=token).first()
+    duenio = ()
+    if suscripcion:
+        instructor_id = Instructor.objects.filter(
+            usuario_id=suscripcion.usuario_id
+        ).values_list('id', flat=True).first()
+        duenio = (INSTRUCTOR, instructor_id) if instructor_id else (SOCIO, suscripcion.usuario_id)
+    # Los tokens inválidos también se recuerdan: no consultan la base en cada sondeo
+    cache.set(_clave_token(token), duenio, DURACION_TOKEN)
+    return duenio or None
+
+
+def invalidar_socios(socio_ids):
+    """Descarta los feeds de estos socios al confirmar la transacción en curso."""
+    claves = [_clave_feed(SOCIO, socio_id) for socio_id in set(socio_ids)]
+    if claves:
+        transaction.on_commit(lambda: cache.delete_many(claves))
+
+
+def invalidar_instructores(instructor_ids):
+    """Descarta los feeds de estos instructores al confirmar la transacción en curso."""
+    claves = [_clave_feed(INSTRUCTOR, instructor_id) for instructor_id in set(instructor_ids) - {None}]
+    if claves:
+        transaction.on_commit(lambda: cache.delete_many(claves))
+
+
+def _escapar(texto):
+    return (
+        str(texto).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+    )
+
+
+def _plegar(linea):
+    """Corta las líneas en 75 octetos como pide RFC 5545 (continuación con un espacio)."""
+    partes = []
+    actual = ''
+    for caracter in linea:
+        if len((actual + caracter).encode('utf-8')) > 75:
+            partes.append(actual)
+            actual = ' '
+        actual += caracter
+    partes.append(actual)
+    return '\r\n'.join(partes)
+
+
+def _utc(momento):
+    return momento.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _evento(uid, clase):
+    # Las horas de las clases son locales; el feed las publica en UTC.
+    # DTSTAMP usa la última modificación de la clase para que regenerar
+    # un feed sin cambios produzca el mismo contenido (y el mismo ETag).
+    inicio = timezone.make_aware(datetime.combine(clase.fecha, clase.hora_inicio))
+    fin = timezone.make_aware(datetime.combine(clase.fecha, clase.hora_fin))
+    instructor = clase.instructor.usuario.get_full_name() if clase.instructor else ''
+    return [
+        'BEGIN:VEVENT',
+        f'UID:{uid}@{DOMINIO_UID}',
+        f'DTSTAMP:{_utc(clase.fecha_actualizacion)}',
+        f'DTSTART:{_utc(inicio)}',
+        f'DTEND:{_utc(fin)}',
+        f'SUMMARY:{_escapar(clase.nombre)}',
+        f'DESCRIPTION:{_escapar(" - ".join(filter(None, [clase.get_tipo_display(), instructor])))}',
+        f'STATUS:{"CANCELLED" if clase.estado == Clase.CANCELADA else "CONFIRMED"}',
+        f'LAST-MODIFIED:{_utc(clase.fecha_actualizacion)}',
+        'END:VEVENT',
+    ]
+
+
+def _calendario(nombre, eventos):
+    lineas = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:-//{DOMINIO_UID}//Horario//ES',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{_escapar(nombre)}',
+    ]
+    for evento in eventos:
+        lineas.extend(evento)
+    lineas.append('END:VCALENDAR')
+    return ('\r\n'.join(_plegar(linea) for linea in lineas) + '\r\n').encode('utf-8')
+
+
+def generar_feed(tipo, duenio_id):
+    """Contenido .ics del horario: reservas del socio o clases del instructor."""
+    desde = timezone.localdate() - timedelta(days=DIAS_HISTORIAL)
+
+    if tipo == SOCIO:
+        reservas = Reserva.objects.filter(
+            socio_id=duenio_id,
+            estado__in=[Reserva.CONFIRMADA, Reserva.COMPLETADA],
+            clase__fecha__gte=desde,
+        ).select_related('clase__instructor__usuario').order_by('clase__fecha', 'clase__hora_inicio')
+        eventos = [_evento(f'reserva-{reserva.id}', reserva.clase) for reserva in reservas]
+        return _calendario('Mis clases', eventos)
+
+    clases = Clase.objects.filter(
+        instructor_id=duenio_id, fecha__gte=desde
+    ).select_related('instructor__usuario').order_by('fecha', 'hora_inicio')
+    eventos = [_evento(f'clase-{clase.id}', clase) for clase in clases]
+    return _calendario('Clases que dicto', eventos)
+
+
+def obtener_feed(token):
+    """
+    Feed del token, desde la caché o regenerado si su dueño tuvo cambios.
+
+    Returns:
+        dict | None: 'contenido' (bytes), 'etag' y 'modificado' (datetime);
+        None si el token no existe
+    """
+    duenio = _resolver_token(token)
+    if duenio is None:
+        return None
+
+    clave = _clave_feed(*duenio)
+    feed = cache.get(clave)
+    if feed is None:
+        contenido = generar_feed(*duenio)
+        feed = {
+            'contenido': contenido,
+            # El ETag depende del contenido: regenerar sin cambios no obliga a descargar de nuevo
+            'etag': f'"{hashlib.md5(contenido, usedforsecurity=False).hexdigest()}"',
+            'modificado': timezone.now(),
+        }
+        cache.set(clave, feed, DURACION_FEED)
+    return feed
@@ -0,0 +1,170 @@
+"""
+Prueba de carga para el escenario de "tormenta de reservas".
+
+Simula N socios que envían POST /api/reservas/ a la vez sobre una misma clase
+y reporta latencia p50/p99 y throughput, con y sin admisión en cola.
+
+Uso:
+    python manage.py benchmark_admision
+    python manage.py benchmark_admision --clientes=300 --cupos=40
+    python manage.py benchmark_admision --modo=cola
+"""
+import threading
+import time as reloj
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from clases.models import Clase
+from reservas.models import Reserva, SolicitudReserva
+from reservas.reserva_service import procesar_solicitudes
+from usuarios.models import Usuario
+
+PREFIJO = 'bench_admision_'
+
+
+def percentil(valores, p):
+    """Percentil por rango más cercano sobre una lista de valores."""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = max(0, int(round(p / 100 * len(ordenados))) - 1)
+    return ordenados[indice]
+
+
+class Command(BaseCommand):
+    help = 'Mide latencia p50/p99 y throughput de POST /api/reservas/ en una tormenta de reservas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clientes',
+            type=int,
+            default=200,
+            help='Número de socios concurrentes (default: 200)'
+        )
+        parser.add_argument(
+            '--cupos',
+            type=int,
+            default=30,
+            help='Cupos totales de la clase (default: 30)'
+        )
+        parser.add_argument(
+            '--modo',
+            choices=['directo', 'cola', 'ambos'],
+            default='ambos',
+            help='Escenario a medir (default: ambos)'
+        )
+
+    def handle(self, *args, **options):
+        modos = ['directo', 'cola'] if options['modo'] == 'ambos' else [options['modo']]
+
+        # Evitar SMTP real durante la prueba
+        with override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend'):
+            try:
+                for modo in modos:
+                    self.ejecutar_escenario(modo, options['clientes'], options['cupos'])
+            finally:
+                self.limpiar_datos()
+
+    def ejecutar_escenario(self, modo, clientes, cupos):
+        """Ejecuta una tormenta de reservas y reporta sus métricas."""
+        self.stdout.write(self.style.NOTICE(f'\nEscenario: {modo} ({clientes} socios, {cupos} cupos)'))
+        clase, socios = self.preparar_datos(clientes, cupos, admision_en_cola=(modo == 'cola'))
+
+        barrera = threading.Barrier(clientes)
+        detener_consumidor = threading.Event()
+
+        def consumidor():
+            try:
+                while not detener_consumidor.is_set():
+                    otorgadas, rechazadas = procesar_solicitudes()
+                    if not otorgadas and not rechazadas:
+                        reloj.sleep(0.05)
+            finally:
+                connection.close()
+
+        def cliente(socio):
+            api = APIClient(SERVER_NAME='localhost')
+            api.force_authenticate(user=socio)
+            try:
+                barrera.wait()
+                inicio = reloj.perf_counter()
+                respuesta = api.post('/api/reservas/', {'clase': clase.id}, format='json')
+                return respuesta.status_code, reloj.perf_counter() - inicio
+            finally:
+                connection.close()
+
+        hilo_consumidor = None
+        if modo == 'cola':
+            hilo_consumidor = threading.Thread(target=consumidor, daemon=True)
+            hilo_consumidor.start()
+
+        inicio = reloj.perf_counter()
+        with ThreadPoolExecutor(max_workers=clientes) as executor:
+            resultados = list(executor.map(cliente, socios))
+        duracion_respuestas = reloj.perf_counter() - inicio
+
+        if hilo_consumidor:
+            # Esperar a que el consumidor resuelva todos los tickets
+            while SolicitudReserva.objects.filter(
+                clase=clase, estado=SolicitudReserva.PENDIENTE
+            ).exists():
+                reloj.sleep(0.05)
+            detener_consumidor.set()
+            hilo_consumidor.join()
+        duracion_total = reloj.perf_counter() - inicio
+
+        latencias = [latencia * 1000 for _, latencia in resultados]
+        codigos = {}
+        for codigo, _ in resultados:
+            codigos[codigo] = codigos.get(codigo, 0) + 1
+
+        clase.refresh_from_db()
+        confirmadas = Reserva.objects.filter(clase=clase, estado=Reserva.CONFIRMADA).count()
+
+        self.stdout.write(f'  Latencia p50: {percentil(latencias, 50):.1f} ms')
+        self.stdout.write(f'  Latencia p99: {percentil(latencias, 99):.1f} ms')
+        self.stdout.write(f'  Throughput de respuestas: {clientes / duracion_respuestas:.1f} req/s')
+        self.stdout.write(f'  Tiempo hasta cupos resueltos: {duracion_total:.3f}s')
+        self.stdout.write(f'  Códigos HTTP: {dict(sorted(codigos.items()))}')
+        self.stdout.write(f'  Reservas confirmadas: {confirmadas} / {clase.cupos_totales}')
+
+        if confirmadas != clase.cupos_ocupados or confirmadas > clase.cupos_totales:
+            raise CommandError('Contadores inconsistentes tras la tormenta de reservas')
+
+    def preparar_datos(self, clientes, cupos, admision_en_cola):
+        """Crea socios y la clase de prueba."""
+        self.limpiar_datos()
+
+        Usuario.objects.bulk_create([
+            Usuario(
+                username=f'{PREFIJO}{i}',
+                email=f'{PREFIJO}{i}@example.com',
+                rol=Usuario.SOCIO,
+                estado_membresia=Usuario.ACTIVA
+            )
+            for i in range(clientes)
+        ])
+        socios = list(Usuario.objects.filter(username__startswith=PREFIJO))
+
+        clase = Clase.objects.create(
+            nombre=f'{PREFIJO}spinning',
+            tipo=Clase.SPINNING,
+            fecha=timezone.now().date() + timedelta(days=1),
+            hora_inicio=time(7, 0),
+            hora_fin=time(8, 0),
+            cupos_totales=cupos,
+            estado=Clase.ACTIVA,
+            admision_en_cola=admision_en_cola
+        )
+        return clase, socios
+
+    def limpiar_datos(self):
+        """Elimina los datos creados por la prueba."""
+        Clase.objects.filter(nombre__startswith=PREFIJO).delete()
+        Usuario.objects.filter(username__startswith=PREFIJO).delete()
@@ -0,0 +1,143 @@
+"""
+Benchmark de concurrencia para la asignación de cupos.
+
+Lanza N clientes en paralelo contra una misma clase y verifica que nunca se
+sobrevenda: las reservas confirmadas deben coincidir exactamente con
+cupos_ocupados y no superar cupos_totales.
+
+Uso:
+    python manage.py benchmark_cupos
+    python manage.py benchmark_cupos --clientes=200 --cupos=50
+    python manage.py benchmark_cupos --conservar
+"""
+import threading
+import time as reloj
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from clases.models import Clase
+from reservas.models import Reserva
+from reservas.reserva_service import reservar_cupo_por_id, OTORGADO, LLENO
+from usuarios.models import Usuario
+
+PREFIJO = 'bench_cupos_'
+
+
+class Command(BaseCommand):
+    help = 'Mide reservas/segundo con clientes concurrentes sobre una clase y verifica que no haya sobreventa'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clientes',
+            type=int,
+            default=200,
+            help='Número de clientes concurrentes (default: 200)'
+        )
+        parser.add_argument(
+            '--cupos',
+            type=int,
+            default=50,
+            help='Cupos totales de la clase de prueba (default: 50)'
+        )
+        parser.add_argument(
+            '--conservar',
+            action='store_true',
+            help='No eliminar los datos de prueba al terminar'
+        )
+
+    def handle(self, *args, **options):
+        clientes = options['clientes']
+        cupos = options['cupos']
+
+        self.stdout.write(self.style.NOTICE(
+            f'Preparando {clientes} socios y una clase con {cupos} cupos...'
+        ))
+        clase, socios_ids = self.preparar_datos(clientes, cupos)
+
+        barrera = threading.Barrier(clientes)
+
+        def cliente(socio_id):
+            try:
+                # Todos los hilos parten a la vez para maximizar la contención
+                barrera.wait()
+                inicio = reloj.perf_counter()
+                resultado, _ = reservar_cupo_por_id(socio_id, clase.id)
+                return resultado, reloj.perf_counter() - inicio
+            except Exception as e:
+                return f'error: {e}', 0.0
+            finally:
+                connection.close()
+
+        inicio = reloj.perf_counter()
+        with ThreadPoolExecutor(max_workers=clientes) as executor:
+            resultados = list(executor.map(cliente, socios_ids))
+        duracion = reloj.perf_counter() - inicio
+
+        otorgados = sum(1 for r, _ in resultados if r == OTORGADO)
+        llenos = sum(1 for r, _ in resultados if r == LLENO)
+        errores = [r for r, _ in resultados if r not in (OTORGADO, LLENO)]
+
+        clase.refresh_from_db()
+        confirmadas = Reserva.objects.filter(clase=clase, estado=Reserva.CONFIRMADA).count()
+
+        self.stdout.write(f'Duración total: {duracion:.3f}s')
+        self.stdout.write(f'Solicitudes/seg: {clientes / duracion:.1f}')
+        self.stdout.write(f'Reservas otorgadas/seg: {otorgados / duracion:.1f}')
+        self.stdout.write(f'Otorgados: {otorgados} | Llenos: {llenos} | Errores: {len(errores)}')
+        self.stdout.write(
+            f'cupos_ocupados={clase.cupos_ocupados} | reservas confirmadas={confirmadas} '
+            f'| cupos_totales={clase.cupos_totales}'
+        )
+
+        sobreventa = (
+            confirmadas > clase.cupos_totales or
+            confirmadas != clase.cupos_ocupados or
+            confirmadas != otorgados
+        )
+
+        if not options['conservar']:
+            self.limpiar_datos()
+
+        if errores:
+            raise CommandError(f'{len(errores)} solicitudes fallaron. Primera: {errores[0]}')
+        if sobreventa:
+            raise CommandError('Se detectó sobreventa o contadores inconsistentes')
+
+        self.stdout.write(self.style.SUCCESS('Sin sobreventa: contadores consistentes.'))
+
+    def preparar_datos(self, clientes, cupos):
+        """Crea los socios y la clase de prueba."""
+        self.limpiar_datos()
+
+        Usuario.objects.bulk_create([
+            Usuario(
+                username=f'{PREFIJO}{i}',
+                email=f'{PREFIJO}{i}@example.com',
+                rol=Usuario.SOCIO,
+                estado_membresia=Usuario.ACTIVA
+            )
+            for i in range(clientes)
+        ])
+        socios_ids = list(
+            Usuario.objects.filter(username__startswith=PREFIJO).values_list('id', flat=True)
+        )
+
+        clase = Clase.objects.create(
+            nombre=f'{PREFIJO}clase',
+            tipo=Clase.SPINNING,
+            fecha=timezone.now().date() + timedelta(days=1),
+            hora_inicio=time(7, 0),
+            hora_fin=time(8, 0),
+            cupos_totales=cupos,
+            estado=Clase.ACTIVA
+        )
+        return clase, socios_ids
+
+    def limpiar_datos(self):
+        """Elimina los datos creados por el benchmark."""
+        Clase.objects.filter(nombre__startswith=PREFIJO).delete()
+        Usuario.objects.filter(username__startswith=PREFIJO).delete()
@@ -0,0 +1,83 @@
+"""
+Cierre por lotes de las clases terminadas: marca las reservas pendientes,
+actualiza contadores de no-show, aplica bloqueos y crea las advertencias.
+
+Es idempotente: puede programarse cada hora (cron) y re-ejecutarse tras una
+interrupción sin duplicar no-shows ni notificaciones.
+
+Uso:
+    python manage.py cerrar_clases
+    python manage.py cerrar_clases --gracia=60
+    python manage.py cerrar_clases --desde=2025-01-01 --pendientes=completada
+    python manage.py cerrar_clases --simular
+"""
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from reservas.cierre_service import cerrar_clases_terminadas, clases_terminadas
+from reservas.models import Reserva
+
+
+class Command(BaseCommand):
+    help = 'Cierra en lote las clases terminadas y registra asistencia y no-shows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--gracia',
+            type=int,
+            default=30,
+            help='Minutos tras el fin de la clase antes de cerrarla, para pasar lista (default: 30)'
+        )
+        parser.add_argument(
+            '--desde',
+            help='Cerrar solo clases terminadas desde esta fecha (AAAA-MM-DD)'
+        )
+        parser.add_argument(
+            '--pendientes',
+            choices=[Reserva.NOSHOW, Reserva.COMPLETADA],
+            default=Reserva.NOSHOW,
+            help='Estado para las reservas que siguen confirmadas (default: noshow)'
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=100,
+            help='Clases por transacción (default: 100)'
+        )
+        parser.add_argument(
+            '--simular',
+            action='store_true',
+            help='Solo mostrar cuántas clases y reservas se cerrarían'
+        )
+
+    def handle(self, *args, **options):
+        hasta = timezone.now() - timedelta(minutes=options['gracia'])
+        desde = None
+        if options['desde']:
+            try:
+                desde = timezone.make_aware(datetime.strptime(options['desde'], '%Y-%m-%d'))
+            except ValueError:
+                raise CommandError('--desde debe tener el formato AAAA-MM-DD')
+
+        if options['simular']:
+            clases = clases_terminadas(hasta, desde)
+            reservas = Reserva.objects.filter(clase__in=clases, estado=Reserva.CONFIRMADA).count()
+            self.stdout.write(
+                f'Se cerrarían {clases.count()} clases con {reservas} reservas pendientes.'
+            )
+            return
+
+        totales = cerrar_clases_terminadas(
+            hasta=hasta,
+            desde=desde,
+            estado_pendientes=options['pendientes'],
+            lote=options['lote']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Clases cerradas: {totales["clases"]} | '
+            f'Reservas marcadas como {options["pendientes"]}: {totales["reservas"]} | '
+            f'Socios bloqueados: {totales["bloqueados"]} | '
+            f'Advertencias: {totales["advertencias"]}'
+        ))
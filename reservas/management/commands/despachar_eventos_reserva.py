@@ -0,0 +1,57 @@
+"""
+Despachador del outbox de reservas (EventoReserva).
+
+Genera las notificaciones, emails y promociones de lista de espera de las
+reservas creadas y canceladas. Cada evento se reclama antes de procesarlo,
+así que varias instancias no duplican efectos (aunque el orden de creación
+solo se respeta dentro de cada una).
+
+Uso:
+    python manage.py despachar_eventos_reserva
+    python manage.py despachar_eventos_reserva --continuo
+    python manage.py despachar_eventos_reserva --continuo --intervalo=0.2
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from reservas.outbox_service import despachar_eventos
+
+
+class Command(BaseCommand):
+    help = 'Despacha los efectos secundarios pendientes de las reservas (outbox)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--continuo',
+            action='store_true',
+            help='Quedarse despachando en vez de procesar una sola pasada'
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=0.5,
+            help='Segundos de espera cuando no hay eventos pendientes (default: 0.5)'
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=100,
+            help='Máximo de eventos por pasada (default: 100)'
+        )
+
+    def handle(self, *args, **options):
+        if not options['continuo']:
+            procesados, fallidos = despachar_eventos(limite=options['lote'])
+            self.stdout.write(
+                self.style.SUCCESS(f'Eventos: {procesados} procesados, {fallidos} con error')
+            )
+            return
+
+        self.stdout.write(self.style.NOTICE('Despachando eventos de reserva (Ctrl+C para salir)...'))
+        try:
+            while True:
+                procesados, fallidos = despachar_eventos(limite=options['lote'])
+                if not procesados and not fallidos:
+                    time.sleep(options['intervalo'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.SUCCESS('Despachador detenido.'))
@@ -0,0 +1,55 @@
+"""
+Consumidor de la cola de solicitudes de reserva (admisión en cola).
+
+Debe ejecutarse una sola instancia: el orden de llegada se garantiza porque
+un único consumidor otorga los cupos.
+
+Uso:
+    python manage.py procesar_solicitudes_reserva
+    python manage.py procesar_solicitudes_reserva --continuo
+    python manage.py procesar_solicitudes_reserva --continuo --intervalo=0.2
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from reservas.reserva_service import procesar_solicitudes
+
+
+class Command(BaseCommand):
+    help = 'Otorga los cupos de las solicitudes de reserva encoladas en orden de llegada'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--continuo',
+            action='store_true',
+            help='Quedarse escuchando la cola en vez de procesar una sola pasada'
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=0.5,
+            help='Segundos de espera cuando la cola está vacía (default: 0.5)'
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=500,
+            help='Máximo de solicitudes por pasada (default: 500)'
+        )
+
+    def handle(self, *args, **options):
+        if not options['continuo']:
+            otorgadas, rechazadas = procesar_solicitudes(limite=options['lote'])
+            self.stdout.write(
+                self.style.SUCCESS(f'Solicitudes: {otorgadas} otorgadas, {rechazadas} rechazadas')
+            )
+            return
+
+        self.stdout.write(self.style.NOTICE('Escuchando la cola de solicitudes (Ctrl+C para salir)...'))
+        try:
+            while True:
+                otorgadas, rechazadas = procesar_solicitudes(limite=options['lote'])
+                if not otorgadas and not rechazadas:
+                    time.sleep(options['intervalo'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.SUCCESS('Consumidor detenido.'))
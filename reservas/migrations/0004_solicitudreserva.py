@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clases', '0004_clase_admision_en_cola'),
+        ('reservas', '0003_alter_reserva_unique_together'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SolicitudReserva',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('otorgada', 'Otorgada'), ('rechazada', 'Rechazada')], default='pendiente', max_length=20, verbose_name='Estado')),
+                ('notas', models.TextField(blank=True, verbose_name='Notas')),
+                ('motivo_rechazo', models.CharField(blank=True, max_length=200, verbose_name='Motivo de Rechazo')),
+                ('fecha_solicitud', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Solicitud')),
+                ('fecha_procesada', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de Procesamiento')),
+                ('clase', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='solicitudes_reserva', to='clases.clase', verbose_name='Clase')),
+                ('reserva', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='solicitud', to='reservas.reserva', verbose_name='Reserva')),
+                ('socio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='solicitudes_reserva', to=settings.AUTH_USER_MODEL, verbose_name='Socio')),
+            ],
+            options={
+                'verbose_name': 'Solicitud de Reserva',
+                'verbose_name_plural': 'Solicitudes de Reserva',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['estado', 'clase', 'id'], name='reservas_so_estado_1628da_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('estado', 'pendiente')), fields=('socio', 'clase'), name='solicitud_pendiente_unica')],
+            },
+        ),
+    ]
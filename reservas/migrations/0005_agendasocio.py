@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservas', '0004_solicitudreserva'),
+        ('usuarios', '0002_instructor_certificaciones'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AgendaSocio',
+            fields=[
+                ('socio', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='agenda', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Socio')),
+                ('reservas', models.JSONField(default=dict, help_text='Reservas confirmadas futuras indexadas por ID de reserva', verbose_name='Próximas Reservas')),
+                ('listas_espera', models.JSONField(default=dict, help_text='Entradas activas en lista de espera indexadas por ID de entrada', verbose_name='Listas de Espera')),
+                ('version', models.PositiveIntegerField(default=0, verbose_name='Versión')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Fecha de Actualización')),
+            ],
+            options={
+                'verbose_name': 'Agenda de Socio',
+                'verbose_name_plural': 'Agendas de Socios',
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clases', '0004_clase_admision_en_cola'),
+        ('reservas', '0005_agendasocio'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='reserva',
+            name='reservas_re_fecha_r_286145_idx',
+        ),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['fecha_reserva', 'id'], name='reserva_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['socio', 'fecha_reserva', 'id'], name='reserva_socio_fecha_id_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservas', '0006_reserva_indices_cursor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoReserva',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('reserva_creada', 'Reserva Creada'), ('reserva_cancelada', 'Reserva Cancelada')], max_length=30, verbose_name='Tipo')),
+                ('datos', models.JSONField(blank=True, default=dict, verbose_name='Datos')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('procesado', 'Procesado'), ('fallido', 'Fallido')], default='pendiente', max_length=20, verbose_name='Estado')),
+                ('intentos', models.PositiveIntegerField(default=0, verbose_name='Intentos')),
+                ('error', models.TextField(blank=True, verbose_name='Último Error')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('fecha_procesado', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de Procesado')),
+                ('reserva', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='eventos', to='reservas.reserva', verbose_name='Reserva')),
+            ],
+            options={
+                'verbose_name': 'Evento de Reserva',
+                'verbose_name_plural': 'Eventos de Reserva',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['estado', 'id'], name='reservas_ev_estado_19abba_idx')],
+            },
+        ),
+    ]
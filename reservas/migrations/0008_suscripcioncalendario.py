@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:47
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservas', '0007_eventoreserva'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SuscripcionCalendario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=64, unique=True, verbose_name='Token')),
+                ('fecha_creacion', models.DateTimeField(auto_now=True, verbose_name='Fecha de Creación')),
+                ('usuario', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='suscripcion_calendario', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Suscripción de Calendario',
+                'verbose_name_plural': 'Suscripciones de Calendario',
+            },
+        ),
+    ]
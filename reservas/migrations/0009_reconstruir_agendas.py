@@ -0,0 +1,26 @@
+"""
+Descarta las agendas guardadas para que se vuelvan a armar completas.
+
+Antes, el primer cambio de un socio creaba su agenda vacía y solo agregaba
+ese cambio: las reservas y listas de espera anteriores no aparecían. La
+agenda es un modelo de lectura derivado de Reserva y ListaEspera, así que
+basta con borrarla; agenda_service la reconstruye en la siguiente lectura o
+en el siguiente cambio del socio.
+"""
+from django.db import migrations
+
+
+def descartar_agendas(apps, schema_editor):
+    AgendaSocio = apps.get_model('reservas', 'AgendaSocio')
+    AgendaSocio.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservas', '0008_suscripcioncalendario'),
+    ]
+
+    operations = [
+        migrations.RunPython(descartar_agendas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservas', '0009_reconstruir_agendas'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='suscripcioncalendario',
+            name='fecha_creacion',
+            field=models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación'),
+        ),
+    ]
@@ -5,6 +5,17 @@ from usuarios.models import Usuario
 from clases.models import Clase
 
 
+class ReservaQuerySet(models.QuerySet):
+    """QuerySet con las optimizaciones usadas por los listados de reservas."""
+    
+    def para_listado(self):
+        """
+        Trae socio, clase e instructor en la misma consulta.
+        Cubre ReservaSerializer, ReservaDetalleSerializer y puede_cancelar().
+        """
+        return self.select_related('socio', 'clase__instructor__usuario')
+
+
 class Reserva(models.Model):
     """
     Modelo para representar una reserva de clase.
@@ -74,6 +85,8 @@ class Reserva(models.Model):
         verbose_name='Notificación Enviada'
     )
     
+    objects = ReservaQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Reserva'
         verbose_name_plural = 'Reservas'
@@ -83,7 +96,9 @@ class Reserva(models.Model):
         indexes = [
             models.Index(fields=['socio', 'estado']),
             models.Index(fields=['clase', 'estado']),
-            models.Index(fields=['fecha_reserva']),
+            # Paginación por cursor: (fecha_reserva, id) global y por socio
+            models.Index(fields=['fecha_reserva', 'id'], name='reserva_fecha_id_idx'),
+            models.Index(fields=['socio', 'fecha_reserva', 'id'], name='reserva_socio_fecha_id_idx'),
         ]
     
     def __str__(self):
@@ -150,3 +165,264 @@ class Reserva(models.Model):
         
         # Verificar que aún hay tiempo
         return timezone.now() < tiempo_minimo
+
+
+class SolicitudReserva(models.Model):
+    """
+    Ticket de una solicitud de reserva encolada.
+    
+    Se usa en clases con admisión en cola: la solicitud se registra al instante
+    y un único consumidor otorga los cupos en orden de llegada.
+    """
+    
+    # Estados de la solicitud
+    PENDIENTE = 'pendiente'
+    OTORGADA = 'otorgada'
+    RECHAZADA = 'rechazada'
+    
+    ESTADOS = [
+        (PENDIENTE, 'Pendiente'),
+        (OTORGADA, 'Otorgada'),
+        (RECHAZADA, 'Rechazada'),
+    ]
+    
+    socio = models.ForeignKey(
+        Usuario,
+        on_delete=models.CASCADE,
+        related_name='solicitudes_reserva',
+        verbose_name='Socio'
+    )
+    
+    clase = models.ForeignKey(
+        Clase,
+        on_delete=models.CASCADE,
+        related_name='solicitudes_reserva',
+        verbose_name='Clase'
+    )
+    
+    estado = models.CharField(
+        max_length=20,
+        choices=ESTADOS,
+        default=PENDIENTE,
+        verbose_name='Estado'
+    )
+    
+    reserva = models.OneToOneField(
+        Reserva,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='solicitud',
+        verbose_name='Reserva'
+    )
+    
+    notas = models.TextField(
+        blank=True,
+        verbose_name='Notas'
+    )
+    
+    motivo_rechazo = models.CharField(
+        max_length=200,
+        blank=True,
+        verbose_name='Motivo de Rechazo'
+    )
+    
+    # Timestamps
+    fecha_solicitud = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Fecha de Solicitud'
+    )
+    
+    fecha_procesada = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Fecha de Procesamiento'
+    )
+    
+    class Meta:
+        verbose_name = 'Solicitud de Reserva'
+        verbose_name_plural = 'Solicitudes de Reserva'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['estado', 'clase', 'id']),
+        ]
+        constraints = [
+            # Un socio solo puede tener un ticket pendiente por clase
+            models.UniqueConstraint(
+                fields=['socio', 'clase'],
+                condition=models.Q(estado='pendiente'),
+                name='solicitud_pendiente_unica'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"Solicitud #{self.id} - {self.socio.username} - {self.clase.nombre} ({self.get_estado_display()})"
+
+
+class AgendaSocio(models.Model):
+    """
+    Modelo de lectura desnormalizado con la agenda de un socio:
+    sus próximas reservas confirmadas y sus listas de espera activas.
+    
+    Se actualiza de forma incremental en cada cambio de estado de Reserva o
+    ListaEspera (ver agenda_service), así leer la agenda es una sola búsqueda
+    por clave primaria sin importar el largo del historial.
+    """
+    socio = models.OneToOneField(
+        Usuario,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='agenda',
+        verbose_name='Socio'
+    )
+    
+    reservas = models.JSONField(
+        default=dict,
+        verbose_name='Próximas Reservas',
+        help_text='Reservas confirmadas futuras indexadas por ID de reserva'
+    )
+    
+    listas_espera = models.JSONField(
+        default=dict,
+        verbose_name='Listas de Espera',
+        help_text='Entradas activas en lista de espera indexadas por ID de entrada'
+    )
+    
+    version = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Versión'
+    )
+    
+    fecha_actualizacion = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Fecha de Actualización'
+    )
+    
+    class Meta:
+        verbose_name = 'Agenda de Socio'
+        verbose_name_plural = 'Agendas de Socios'
+    
+    def __str__(self):
+        return f"Agenda de {self.socio.username} (v{self.version})"
+
+
+class EventoReserva(models.Model):
+    """
+    Outbox de efectos secundarios de las reservas.
+    
+    Se escribe en la misma transacción que el cambio de cupo; el despachador
+    (outbox_service.despachar_eventos) lo procesa después y genera las
+    notificaciones, los emails y la promoción de la lista de espera.
+    """
+    
+    # Tipos de evento
+    RESERVA_CREADA = 'reserva_creada'
+    RESERVA_CANCELADA = 'reserva_cancelada'
+    
+    TIPOS = [
+        (RESERVA_CREADA, 'Reserva Creada'),
+        (RESERVA_CANCELADA, 'Reserva Cancelada'),
+    ]
+    
+    # Estados del evento
+    PENDIENTE = 'pendiente'
+    PROCESADO = 'procesado'
+    FALLIDO = 'fallido'
+    
+    ESTADOS = [
+        (PENDIENTE, 'Pendiente'),
+        (PROCESADO, 'Procesado'),
+        (FALLIDO, 'Fallido'),
+    ]
+    
+    tipo = models.CharField(
+        max_length=30,
+        choices=TIPOS,
+        verbose_name='Tipo'
+    )
+    
+    reserva = models.ForeignKey(
+        Reserva,
+        on_delete=models.CASCADE,
+        related_name='eventos',
+        verbose_name='Reserva'
+    )
+    
+    datos = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name='Datos'
+    )
+    
+    estado = models.CharField(
+        max_length=20,
+        choices=ESTADOS,
+        default=PENDIENTE,
+        verbose_name='Estado'
+    )
+    
+    intentos = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Intentos'
+    )
+    
+    error = models.TextField(
+        blank=True,
+        verbose_name='Último Error'
+    )
+    
+    fecha_creacion = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Fecha de Creación'
+    )
+    
+    fecha_procesado = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Fecha de Procesado'
+    )
+    
+    class Meta:
+        verbose_name = 'Evento de Reserva'
+        verbose_name_plural = 'Eventos de Reserva'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['estado', 'id']),
+        ]
+    
+    def __str__(self):
+        return f"Evento #{self.id} - {self.get_tipo_display()} - Reserva #{self.reserva_id} ({self.get_estado_display()})"
+
+
+class SuscripcionCalendario(models.Model):
+    """
+    Token secreto de la URL del feed iCalendar (.ics) de un usuario.
+    
+    Las apps de calendario consultan el feed sin autenticarse; quien tenga la
+    URL ve el horario, así que el usuario puede regenerar el token para
+    invalidar la URL anterior.
+    """
+    usuario = models.OneToOneField(
+        Usuario,
+        on_delete=models.CASCADE,
+        related_name='suscripcion_calendario',
+        verbose_name='Usuario'
+    )
+    
+    token = models.CharField(
+        max_length=64,
+        unique=True,
+        verbose_name='Token'
+    )
+    
+    fecha_creacion = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Fecha de Creación'
+    )
+    
+    class Meta:
+        verbose_name = 'Suscripción de Calendario'
+        verbose_name_plural = 'Suscripciones de Calendario'
+    
+    def __str__(self):
+        return f"Calendario de {self.usuario.username}"
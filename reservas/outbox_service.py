@@ -0,0 +1,135 @@
+"""
+Outbox de efectos secundarios de las reservas.
+
+Las operaciones que cambian cupos registran un EventoReserva en la misma
+transacción; el despachador procesa los eventos después, fuera de la
+petición: notificaciones, emails y promoción de la lista de espera. Así una
+reserva o cancelación solo paga la escritura del cupo.
+"""
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import EventoReserva
+
+logger = logging.getLogger('reservas')
+
+# Origen de una reserva creada
+ORIGEN_DIRECTA = 'directa'
+ORIGEN_COLA = 'cola'
+ORIGEN_LISTA_ESPERA = 'lista_espera'
+ORIGEN_OFERTA = 'oferta'  # Cupo de lista de espera aceptado por el socio
+
+# Intentos antes de dejar un evento como FALLIDO
+MAX_INTENTOS = 5
+
+
+def registrar_evento(tipo, reserva, **datos):
+    """
+    Registra un evento en el outbox. Debe llamarse dentro de la transacción
+    que cambia el cupo, para que el evento exista si y solo si el cambio se
+    confirma.
+
+    Con OUTBOX_DESPACHO_INMEDIATO=True (desarrollo, sin despachador corriendo)
+    el evento se despacha al confirmar la transacción que lo registró.
+    """
+    evento = EventoReserva.objects.create(tipo=tipo, reserva=reserva, datos=datos)
+    if getattr(settings, 'OUTBOX_DESPACHO_INMEDIATO', False):
+        transaction.on_commit(lambda: despachar_eventos(evento_ids=[evento.id]))
+    return evento
+
+
+def registrar_eventos(tipo, reservas, **datos):
+    """
+    Registra un evento por reserva con un solo INSERT, para las operaciones en
+    bloque (reserva en serie). Mismas reglas que registrar_evento.
+    """
+    eventos = EventoReserva.objects.bulk_create([
+        EventoReserva(tipo=tipo, reserva=reserva, datos=datos) for reserva in reservas
+    ])
+    if eventos and getattr(settings, 'OUTBOX_DESPACHO_INMEDIATO', False):
+        evento_ids = [evento.id for evento in eventos]
+        transaction.on_commit(lambda: despachar_eventos(evento_ids=evento_ids))
+    return eventos
+
+
+def _reserva_creada(evento):
+    """Notifica al socio y al instructor de una reserva nueva."""
+    from notificaciones.models import Notificacion
+    from .reserva_service import notificar_reserva_creada
+
+    reserva = evento.reserva
+    if evento.datos.get('origen') == ORIGEN_LISTA_ESPERA:
+        Notificacion.crear_notificacion_cupo_disponible(reserva.socio, reserva.clase)
+    else:
+        notificar_reserva_creada(reserva)
+
+
+def _reserva_cancelada(evento):
+    """Notifica al instructor y ofrece el cupo liberado a la lista de espera."""
+    from lista_espera.models import ListaEspera
+    from notificaciones.models import Notificacion
+
+    reserva = evento.reserva
+    Notificacion.notificar_instructor_cancelacion(clase=reserva.clase, socio=reserva.socio)
+    if evento.datos.get('procesar_lista_espera'):
+        ListaEspera.procesar_siguiente_en_lista(reserva.clase)
+
+
+MANEJADORES = {
+    EventoReserva.RESERVA_CREADA: _reserva_creada,
+    EventoReserva.RESERVA_CANCELADA: _reserva_cancelada,
+}
+
+
+def despachar_eventos(limite=100, evento_ids=None):
+    """
+    Procesa los eventos pendientes en orden de creación.
+
+    Cada evento se reclama con un UPDATE condicional (PENDIENTE -> PROCESADO)
+    dentro de la misma transacción que ejecuta su manejador: si otro
+    despachador ya lo tomó, el UPDATE no afecta filas y el evento se salta,
+    así que varios despachadores (o el despacho inmediato de varias
+    peticiones) no duplican notificaciones. Si el manejador falla, el
+    rollback devuelve el evento a PENDIENTE y se reintenta en la siguiente
+    pasada hasta MAX_INTENTOS veces; luego queda como FALLIDO.
+
+    Args:
+        limite: Máximo de eventos a procesar en esta pasada
+        evento_ids: Procesar solo estos eventos (despacho inmediato)
+
+    Returns:
+        tuple: (procesados, fallidos)
+    """
+    pendientes = EventoReserva.objects.filter(estado=EventoReserva.PENDIENTE)
+    if evento_ids is not None:
+        pendientes = pendientes.filter(id__in=evento_ids)
+    pendientes = pendientes.select_related(
+        'reserva__socio', 'reserva__clase__instructor__usuario'
+    ).order_by('id')[:limite]
+
+    procesados = 0
+    fallidos = 0
+    for evento in pendientes:
+        try:
+            with transaction.atomic():
+                reclamado = EventoReserva.objects.filter(
+                    pk=evento.pk, estado=EventoReserva.PENDIENTE
+                ).update(estado=EventoReserva.PROCESADO, fecha_procesado=timezone.now())
+                if not reclamado:
+                    continue
+                MANEJADORES[evento.tipo](evento)
+            procesados += 1
+        except Exception as e:
+            intentos = evento.intentos + 1
+            EventoReserva.objects.filter(pk=evento.pk, estado=EventoReserva.PENDIENTE).update(
+                intentos=intentos,
+                error=str(e),
+                estado=EventoReserva.FALLIDO if intentos >= MAX_INTENTOS else EventoReserva.PENDIENTE
+            )
+            fallidos += 1
+            logger.error(f'Error despachando evento #{evento.id} ({evento.tipo}): {e}')
+
+    return procesados, fallidos
@@ -0,0 +1,352 @@
+"""
+Servicio de asignación de cupos y creación de reservas.
+"""
+import logging
+from datetime import timedelta
+from django.db import models, transaction, IntegrityError
+from django.utils import timezone
+from clases import conflictos_service
+from clases.models import Clase
+from clases.signals import clases_modificadas
+from .models import Reserva, SolicitudReserva, EventoReserva
+from . import agenda_service
+from .outbox_service import registrar_evento, registrar_eventos, ORIGEN_DIRECTA, ORIGEN_COLA
+
+logger = logging.getLogger('reservas')
+
+# Resultados posibles de una asignación
+OTORGADO = 'otorgado'
+LLENO = 'lleno'
+
+# Resultados por fecha de una reserva en serie
+SERIE_RESERVADA = 'reservada'
+SERIE_LLENA = 'llena'
+SERIE_DUPLICADA = 'duplicada'
+SERIE_NO_DISPONIBLE = 'no_disponible'
+SERIE_SIN_CLASE = 'sin_clase'
+SERIE_CONFLICTO = 'conflicto'
+
+MENSAJE_CLASE_LLENA = "La clase está llena. Puedes agregarte a la lista de espera."
+
+
+def validar_socio(socio):
+    """
+    Reglas de reserva que dependen solo del socio.
+
+    Returns:
+        str | None: Mensaje de error, o None si el socio puede reservar
+    """
+    if socio.rol != socio.SOCIO:
+        return "Solo los socios pueden hacer reservas."
+    
+    if not socio.puede_reservar():
+        if socio.esta_bloqueado():
+            return f"Tu cuenta está bloqueada hasta {socio.bloqueado_hasta} por exceso de no-shows."
+        return "Tu membresía no está activa."
+    
+    return None
+
+
+def validar_reserva(socio, clase):
+    """
+    Ejecuta las reglas de negocio para reservar una clase.
+
+    Returns:
+        str | None: Mensaje de error, o None si la reserva es válida
+    """
+    # Verificar que el usuario sea socio y pueda reservar
+    error = validar_socio(socio)
+    if error:
+        return error
+    
+    # Verificar que la clase pueda recibir reservas
+    if not clase.puede_reservar():
+        if clase.esta_llena:
+            return MENSAJE_CLASE_LLENA
+        return "Esta clase no está disponible para reservas."
+    
+    # Verificar que no exista una reserva activa previa (solo CONFIRMADA)
+    if Reserva.objects.filter(socio=socio, clase=clase, estado=Reserva.CONFIRMADA).exists():
+        return "Ya tienes una reserva para esta clase."
+    
+    # Verificar que no tenga otra clase reservada en el mismo horario
+    choque = conflictos_service.choques_socio(socio.id, clase).first()
+    if choque:
+        return f"Ya tienes reservada la clase {conflictos_service.describir(choque)} en ese horario."
+    
+    return None
+
+
+def notificar_reserva_creada(reserva):
+    """Crea las notificaciones de una reserva nueva para el socio y el instructor."""
+    from notificaciones.models import Notificacion
+    
+    Notificacion.crear_notificacion_reserva(
+        socio=reserva.socio,
+        clase=reserva.clase,
+        tipo=Notificacion.RESERVA_CONFIRMADA
+    )
+    notif_instructor = Notificacion.notificar_instructor_nueva_reserva(
+        clase=reserva.clase,
+        socio=reserva.socio
+    )
+    if not notif_instructor:
+        logger.warning(
+            f'No se pudo crear notificación para el instructor de la clase {reserva.clase.id}'
+        )
+
+
+def reservar_cupo(socio, clase, notas='', origen=ORIGEN_DIRECTA):
+    """
+    Ocupa un cupo y crea la reserva en una sola transacción.
+
+    El cupo se toma con un UPDATE condicional sobre la fila de la clase, por lo
+    que el resultado es definitivo aun con muchas solicitudes concurrentes:
+    o se otorga el cupo y existe la reserva, o la clase estaba llena y no se
+    escribe nada. Las notificaciones quedan en el outbox (EventoReserva).
+
+    Args:
+        socio: Usuario que reserva
+        clase: Instancia de Clase
+        notas: Notas opcionales de la reserva
+        origen: Quién originó la reserva (directa, cola o lista_espera)
+
+    Returns:
+        tuple: (resultado, reserva) donde resultado es OTORGADO o LLENO
+    """
+    with transaction.atomic():
+        if not clase.incrementar_cupo():
+            logger.info(
+                f'Cupo denegado: clase {clase.id} llena para usuario {socio.id}'
+            )
+            return LLENO, None
+
+        reserva = Reserva.objects.create(
+            socio=socio,
+            clase=clase,
+            estado=Reserva.CONFIRMADA,
+            notas=notas
+        )
+        registrar_evento(EventoReserva.RESERVA_CREADA, reserva, origen=origen)
+
+    return OTORGADO, reserva
+
+
+def cancelar_reserva(reserva, procesar_lista_espera=True):
+    """
+    Cancela la reserva y libera su cupo en una sola transacción.
+
+    La notificación al instructor y la promoción de la lista de espera quedan
+    en el outbox para el despachador.
+
+    Returns:
+        bool: True si la reserva se canceló
+    """
+    with transaction.atomic():
+        if not reserva.cancelar():
+            return False
+        registrar_evento(
+            EventoReserva.RESERVA_CANCELADA,
+            reserva,
+            procesar_lista_espera=procesar_lista_espera
+        )
+    return True
+
+
+def reservar_cupo_por_id(socio_id, clase_id, notas=''):
+    """
+    Variante de reservar_cupo que trabaja solo con IDs.
+    Útil para workers y benchmarks que no comparten instancias entre hilos.
+    """
+    from usuarios.models import Usuario
+
+    socio = Usuario.objects.get(pk=socio_id)
+    clase = Clase.objects.get(pk=clase_id)
+    return reservar_cupo(socio, clase, notas=notas)
+
+
+def reservar_serie(socio, clase_base, semanas):
+    """
+    Reserva la misma clase semanal durante varias semanas.
+
+    Busca todas las ocurrencias (mismo nombre, tipo y hora, cada 7 días desde
+    clase_base) en una sola consulta, las valida en bloque y crea todas las
+    reservas e incrementos de cupo en una única transacción. Como las demás
+    reservas, registra un evento RESERVA_CREADA por reserva en el outbox
+    (un solo INSERT); las notificaciones las crea el despachador.
+
+    Args:
+        socio: Usuario que reserva (ya validado con validar_socio)
+        clase_base: Primera clase de la serie
+        semanas: Cantidad de semanas a reservar
+
+    Returns:
+        list: Un dict por fecha con 'fecha', 'clase' y 'resultado'
+    """
+    fechas = [clase_base.fecha + timedelta(weeks=i) for i in range(semanas)]
+    hoy = timezone.now().date()
+    
+    with transaction.atomic():
+        # Una sola consulta para todas las ocurrencias, con las filas bloqueadas
+        ocurrencias = {}
+        for clase in Clase.objects.select_for_update().filter(
+            nombre=clase_base.nombre,
+            tipo=clase_base.tipo,
+            hora_inicio=clase_base.hora_inicio,
+            fecha__in=fechas
+        ).select_related('instructor__usuario').order_by('fecha', 'id'):
+            ocurrencias.setdefault(clase.fecha, clase)
+        
+        ya_reservadas = set(
+            Reserva.objects.filter(
+                socio=socio,
+                clase__in=ocurrencias.values(),
+                estado=Reserva.CONFIRMADA
+            ).values_list('clase_id', flat=True)
+        )
+        
+        # Choques con otras reservas del socio, en una sola consulta
+        choques = conflictos_service.choques_socio_en_bloque(socio.id, [
+            clase for clase in ocurrencias.values()
+            if clase.id not in ya_reservadas and clase.estado == Clase.ACTIVA
+        ])
+        
+        resultados = []
+        a_reservar = []
+        for fecha in fechas:
+            clase = ocurrencias.get(fecha)
+            if clase is None:
+                resultado = SERIE_SIN_CLASE
+            elif clase.id in ya_reservadas:
+                resultado = SERIE_DUPLICADA
+            elif clase.estado != Clase.ACTIVA or clase.fecha < hoy:
+                resultado = SERIE_NO_DISPONIBLE
+            elif clase.esta_llena:
+                resultado = SERIE_LLENA
+            elif clase.id in choques:
+                resultado = SERIE_CONFLICTO
+            else:
+                resultado = SERIE_RESERVADA
+                a_reservar.append(clase)
+            resultados.append({
+                'fecha': fecha,
+                'clase': clase.id if clase else None,
+                'resultado': resultado,
+            })
+        
+        if a_reservar:
+            # Un único UPDATE para todos los cupos; las filas están bloqueadas,
+            # así que cada clase elegida todavía tiene cupo
+            actualizadas = Clase.objects.filter(
+                id__in=[clase.id for clase in a_reservar],
+                cupos_ocupados__lt=models.F('cupos_totales')
+            ).update(
+                cupos_ocupados=models.F('cupos_ocupados') + 1,
+                fecha_actualizacion=timezone.now()
+            )
+            if actualizadas != len(a_reservar):
+                raise IntegrityError('Los cupos cambiaron durante la reserva en serie')
+            
+            reservas = Reserva.objects.bulk_create([
+                Reserva(socio=socio, clase=clase, estado=Reserva.CONFIRMADA)
+                for clase in a_reservar
+            ])
+            
+            # bulk_create no emite post_save: actualizar la agenda en una sola escritura
+            agenda_service.registrar_reservas(socio.id, reservas)
+            clases_modificadas.send(
+                sender=Clase, clases=[(clase.id, clase.fecha) for clase in a_reservar], solo_cupos=True
+            )
+            registrar_eventos(EventoReserva.RESERVA_CREADA, reservas, origen=ORIGEN_DIRECTA)
+    
+    logger.info(
+        f'Reserva en serie: Usuario {socio.username} (ID: {socio.id}) reservó '
+        f'{len(a_reservar)} de {semanas} semanas de {clase_base.nombre}'
+    )
+    return resultados
+
+
+def encolar_solicitud(socio, clase, notas=''):
+    """
+    Registra una solicitud de reserva para una clase con admisión en cola.
+
+    Solo escribe el ticket; la validación y la asignación del cupo las hace el
+    consumidor (procesar_solicitudes). Si el socio ya tiene un ticket pendiente
+    para la clase, se devuelve ese mismo ticket.
+
+    Returns:
+        SolicitudReserva: Ticket pendiente del socio
+    """
+    try:
+        with transaction.atomic():
+            return SolicitudReserva.objects.create(socio=socio, clase=clase, notas=notas)
+    except IntegrityError:
+        return SolicitudReserva.objects.get(
+            socio=socio, clase=clase, estado=SolicitudReserva.PENDIENTE
+        )
+
+
+def procesar_solicitudes(limite=500):
+    """
+    Procesa los tickets pendientes en orden de llegada.
+
+    Debe ejecutarse desde un único consumidor. Cuando una clase se llena, el
+    resto de sus tickets pendientes se rechaza con un solo UPDATE.
+
+    Args:
+        limite: Máximo de tickets a procesar en esta pasada
+
+    Returns:
+        tuple: (otorgadas, rechazadas)
+    """
+    pendientes = SolicitudReserva.objects.filter(
+        estado=SolicitudReserva.PENDIENTE
+    ).select_related('socio', 'clase').order_by('id')[:limite]
+    
+    otorgadas = 0
+    rechazadas = 0
+    clases_llenas = set()
+    
+    for solicitud in pendientes:
+        if solicitud.clase_id in clases_llenas:
+            continue
+        
+        clase = solicitud.clase
+        clase.refresh_from_db()
+        
+        error = validar_reserva(solicitud.socio, clase)
+        if error is None:
+            resultado, reserva = reservar_cupo(
+                solicitud.socio, clase, notas=solicitud.notas, origen=ORIGEN_COLA
+            )
+            if resultado == OTORGADO:
+                solicitud.estado = SolicitudReserva.OTORGADA
+                solicitud.reserva = reserva
+                solicitud.fecha_procesada = timezone.now()
+                solicitud.save(update_fields=['estado', 'reserva', 'fecha_procesada'])
+                otorgadas += 1
+                continue
+            error = MENSAJE_CLASE_LLENA
+        
+        solicitud.estado = SolicitudReserva.RECHAZADA
+        solicitud.motivo_rechazo = error
+        solicitud.fecha_procesada = timezone.now()
+        solicitud.save(update_fields=['estado', 'motivo_rechazo', 'fecha_procesada'])
+        rechazadas += 1
+        
+        if clase.esta_llena:
+            # Rechazar en bloque todo lo que queda en cola para esta clase. El
+            # motivo es el cupo: `error` puede ser propio de este socio.
+            rechazadas += SolicitudReserva.objects.filter(
+                clase=clase,
+                estado=SolicitudReserva.PENDIENTE
+            ).update(
+                estado=SolicitudReserva.RECHAZADA,
+                motivo_rechazo=MENSAJE_CLASE_LLENA,
+                fecha_procesada=timezone.now()
+            )
+            clases_llenas.add(clase.id)
+    
+    if otorgadas or rechazadas:
+        logger.info(f'Cola de reservas procesada: {otorgadas} otorgadas, {rechazadas} rechazadas')
+    return otorgadas, rechazadas
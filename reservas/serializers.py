@@ -2,10 +2,16 @@
 Serializers para la app de reservas.
 """
 from rest_framework import serializers
-from .models import Reserva
+from .models import Reserva, SolicitudReserva
+from .reserva_service import reservar_cupo, validar_reserva, validar_socio, LLENO
+from backend.custom_exceptions import CuposAgotadosException
+from clases.models import Clase
 from clases.serializers import ClaseSerializer
 from usuarios.serializers import UsuarioSerializer
 
+# Máximo de semanas que se pueden reservar de una vez
+MAX_SEMANAS_SERIE = 26
+
 
 class ReservaSerializer(serializers.ModelSerializer):
     """
@@ -70,52 +76,65 @@ class ReservaCrearSerializer(serializers.ModelSerializer):
     def validate(self, attrs):
         """Valida que se pueda crear la reserva."""
         request = self.context.get('request')
-        socio = request.user
-        clase = attrs.get('clase')
-        
-        # Verificar que el usuario sea socio
-        if socio.rol != socio.SOCIO:
-            raise serializers.ValidationError("Solo los socios pueden hacer reservas.")
-        
-        # Verificar que el socio pueda reservar
-        if not socio.puede_reservar():
-            if socio.esta_bloqueado():
-                raise serializers.ValidationError(
-                    f"Tu cuenta está bloqueada hasta {socio.bloqueado_hasta} por exceso de no-shows."
-                )
-            else:
-                raise serializers.ValidationError("Tu membresía no está activa.")
         
-        # Verificar que la clase pueda recibir reservas
-        if not clase.puede_reservar():
-            if clase.esta_llena:
-                raise serializers.ValidationError(
-                    "La clase está llena. Puedes agregarte a la lista de espera."
-                )
-            else:
-                raise serializers.ValidationError("Esta clase no está disponible para reservas.")
-        
-        # Verificar que no exista una reserva activa previa (solo CONFIRMADA)
-        if Reserva.objects.filter(socio=socio, clase=clase, estado=Reserva.CONFIRMADA).exists():
-            raise serializers.ValidationError("Ya tienes una reserva para esta clase.")
+        error = validar_reserva(request.user, attrs.get('clase'))
+        if error:
+            raise serializers.ValidationError(error)
         
         return attrs
     
     def create(self, validated_data):
-        """Crea la reserva e incrementa el cupo."""
+        """Ocupa el cupo y crea la reserva en una sola transacción."""
         request = self.context.get('request')
-        validated_data['socio'] = request.user
         
-        reserva = Reserva.objects.create(**validated_data)
+        resultado, reserva = reservar_cupo(
+            request.user,
+            validated_data['clase'],
+            notas=validated_data.get('notas', '')
+        )
         
-        # Incrementar cupo en la clase
-        reserva.clase.incrementar_cupo()
+        # Otro socio tomó el último cupo entre la validación y la escritura
+        if resultado == LLENO:
+            raise CuposAgotadosException(
+                'La clase está llena. Puedes agregarte a la lista de espera.'
+            )
         
         return reserva
 
 
+class ReservaSerieSerializer(serializers.Serializer):
+    """
+    Serializer para reservar la misma clase semanal durante varias semanas.
+    """
+    clase = serializers.PrimaryKeyRelatedField(queryset=Clase.objects.all())
+    semanas = serializers.IntegerField(min_value=1, max_value=MAX_SEMANAS_SERIE)
+    
+    def validate(self, attrs):
+        """Valida las reglas del socio una sola vez para toda la serie."""
+        request = self.context.get('request')
+        
+        error = validar_socio(request.user)
+        if error:
+            raise serializers.ValidationError(error)
+        
+        return attrs
+
+
 class ReservaCancelarSerializer(serializers.Serializer):
     """
     Serializer para cancelar reservas.
     """
     motivo = serializers.CharField(required=False, allow_blank=True)
+
+
+class SolicitudReservaSerializer(serializers.ModelSerializer):
+    """
+    Serializer para los tickets de reserva encolados.
+    """
+    class Meta:
+        model = SolicitudReserva
+        fields = [
+            'id', 'clase', 'estado', 'reserva', 'motivo_rechazo',
+            'fecha_solicitud', 'fecha_procesada'
+        ]
+        read_only_fields = fields
@@ -0,0 +1,91 @@
+"""
+Señales que mantienen actualizada la agenda desnormalizada de los socios,
+que cancelan en cascada las reservas de una clase cancelada, que promueven
+la lista de espera de una clase que ganó cupos y que invalidan los feeds de
+calendario de los instructores.
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from clases.models import Clase
+from clases.signals import clases_modificadas
+from lista_espera.models import ListaEspera
+from .models import Reserva
+from . import agenda_service, cancelacion_service, ics_service
+
+
+@receiver(post_save, sender=Reserva)
+def actualizar_agenda_reserva(sender, instance, **kwargs):
+    """Refleja en la agenda cualquier cambio de estado de una reserva."""
+    agenda_service.registrar_reserva(instance)
+
+
+@receiver(post_delete, sender=Reserva)
+def quitar_reserva_de_agenda(sender, instance, **kwargs):
+    """Quita de la agenda una reserva eliminada (solo las confirmadas están en ella)."""
+    if instance.estado == Reserva.CONFIRMADA:
+        agenda_service.quitar_reservas(instance.socio_id, [instance.id])
+
+
+@receiver(post_save, sender=ListaEspera)
+def actualizar_agenda_lista_espera(sender, instance, **kwargs):
+    """Refleja en la agenda cualquier cambio de estado en la lista de espera."""
+    agenda_service.registrar_entrada_espera(instance)
+
+
+@receiver(post_delete, sender=ListaEspera)
+def quitar_lista_espera_de_agenda(sender, instance, **kwargs):
+    """Quita de la agenda una entrada de lista de espera eliminada (solo las activas están en ella)."""
+    if instance.estado in ListaEspera.ESTADOS_ACTIVOS:
+        agenda_service.quitar_entrada_espera(instance.socio_id, instance.id)
+
+
+@receiver(post_save, sender=Clase)
+def actualizar_clase_en_agendas(sender, instance, created, **kwargs):
+    """Refresca nombre, horario y estado de una clase editada en las agendas."""
+    if not created:
+        agenda_service.actualizar_clase_en_agendas(instance)
+
+
+@receiver(post_save, sender=Clase)
+def cancelar_reservas_de_clase(sender, instance, created, **kwargs):
+    """Una clase activa guardada como cancelada cancela sus reservas y su lista de espera."""
+    if (
+        not created
+        and instance.estado == Clase.CANCELADA
+        and getattr(instance, '_estado_anterior', None) == Clase.ACTIVA
+    ):
+        cancelacion_service.cancelar_en_cascada(instance)
+
+
+@receiver(post_save, sender=Clase)
+def promover_lista_espera(sender, instance, created, **kwargs):
+    """Los cupos nuevos de una clase activa van a los primeros de su lista de espera."""
+    from lista_espera import promocion_service
+
+    anterior = getattr(instance, '_cupos_totales_anterior', None)
+    if (
+        not created
+        and instance.estado == Clase.ACTIVA
+        and anterior is not None
+        and instance.cupos_totales > anterior
+    ):
+        promocion_service.cupos_ampliados(instance)
+
+
+@receiver(post_save, sender=Clase)
+@receiver(post_delete, sender=Clase)
+def invalidar_feed_instructor(sender, instance, **kwargs):
+    """La clase cambió: el feed de su instructor (y del anterior, si cambió) se regenera."""
+    ics_service.invalidar_instructores(
+        [instance.instructor_id, getattr(instance, '_instructor_anterior', None)]
+    )
+
+
+@receiver(clases_modificadas)
+def invalidar_feeds_instructores_en_bloque(sender, clases, solo_cupos=False, **kwargs):
+    """Clases cambiadas en bloque; los cambios de cupos no aparecen en el feed."""
+    if solo_cupos or not clases:
+        return
+    ics_service.invalidar_instructores(
+        Clase.objects.filter(id__in=[clase_id for clase_id, _ in clases]).values_list('instructor_id', flat=True)
+    )
@@ -1,12 +1,16 @@
 """
 Tests unitarios para la app de reservas.
 """
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from backend.test_utils import PresupuestoConsultasMixin
 from django.utils import timezone
 from datetime import timedelta, time, date
 from usuarios.models import Usuario, Instructor
 from clases.models import Clase
-from .models import Reserva
+from .models import Reserva, SuscripcionCalendario
 
 
 class ReservaModelTest(TestCase):
@@ -174,3 +178,946 @@ class ReservaDuplicadaTest(TestCase):
         
         self.assertIsNotNone(reserva2.id)
         self.assertEqual(reserva2.estado, Reserva.CONFIRMADA)
+
+
+class AsignacionCupoAtomicaTest(TestCase):
+    """Tests para la asignación atómica de cupos."""
+    
+    def setUp(self):
+        """Crear datos de prueba."""
+        self.socio1 = Usuario.objects.create_user(
+            username='socio_a',
+            email='socio_a@gimnasio.com',
+            password='SocioPass123!',
+            rol=Usuario.SOCIO,
+            estado_membresia=Usuario.ACTIVA
+        )
+        self.socio2 = Usuario.objects.create_user(
+            username='socio_b',
+            email='socio_b@gimnasio.com',
+            password='SocioPass123!',
+            rol=Usuario.SOCIO,
+            estado_membresia=Usuario.ACTIVA
+        )
+        self.clase = Clase.objects.create(
+            nombre='Spinning Último Cupo',
+            tipo=Clase.SPINNING,
+            fecha=date.today() + timedelta(days=1),
+            hora_inicio=time(18, 0),
+            hora_fin=time(19, 0),
+            cupos_totales=1,
+            cupos_ocupados=0,
+            estado=Clase.ACTIVA
+        )
+    
+    def test_instancias_desactualizadas_no_sobrevenden(self):
+        """Test: Dos instancias leídas antes de reservar no pueden tomar el mismo último cupo."""
+        copia1 = Clase.objects.get(pk=self.clase.pk)
+        copia2 = Clase.objects.get(pk=self.clase.pk)
+        
+        self.assertTrue(copia1.incrementar_cupo())
+        self.assertFalse(copia2.incrementar_cupo())
+        
+        self.clase.refresh_from_db()
+        self.assertEqual(self.clase.cupos_ocupados, 1)
+    
+    def test_liberar_cupo_no_baja_de_cero(self):
+        """Test: Liberar un cupo en una clase vacía no deja el contador negativo."""
+        self.assertFalse(self.clase.liberar_cupo())
+        self.clase.refresh_from_db()
+        self.assertEqual(self.clase.cupos_ocupados, 0)
+    
+    def test_reservar_cupo_otorgado_y_lleno(self):
+        """Test: El servicio reporta OTORGADO y luego LLENO sin crear reservas extra."""
+        from .reserva_service import reservar_cupo, OTORGADO, LLENO
+        
+        resultado1, reserva1 = reservar_cupo(self.socio1, Clase.objects.get(pk=self.clase.pk))
+        resultado2, reserva2 = reservar_cupo(self.socio2, Clase.objects.get(pk=self.clase.pk))
+        
+        self.assertEqual(resultado1, OTORGADO)
+        self.assertIsNotNone(reserva1)
+        self.assertEqual(resultado2, LLENO)
+        self.assertIsNone(reserva2)
+        self.assertEqual(
+            Reserva.objects.filter(clase=self.clase, estado=Reserva.CONFIRMADA).count(), 1
+        )
+
+
+class AdmisionEnColaTest(TestCase):
+    """Tests para la admisión en cola de reservas."""
+    
+    def setUp(self):
+        """Crear datos de prueba."""
+        self.socios = [
+            Usuario.objects.create_user(
+                username=f'socio_cola_{i}',
+                email=f'cola{i}@gimnasio.com',
+                password='SocioPass123!',
+                rol=Usuario.SOCIO,
+                estado_membresia=Usuario.ACTIVA
+            )
+            for i in range(3)
+        ]
+        self.clase = Clase.objects.create(
+            nombre='Spinning Estreno',
+            tipo=Clase.SPINNING,
+            fecha=date.today() + timedelta(days=1),
+            hora_inicio=time(7, 0),
+            hora_fin=time(8, 0),
+            cupos_totales=2,
+            estado=Clase.ACTIVA,
+            admision_en_cola=True
+        )
+    
+    def test_cupos_en_orden_de_llegada(self):
+        """Test: El consumidor otorga los cupos en orden de llegada y rechaza el resto."""
+        from .models import SolicitudReserva
+        from .reserva_service import encolar_solicitud, procesar_solicitudes
+        
+        tickets = [encolar_solicitud(socio, self.clase) for socio in self.socios]
+        
+        otorgadas, rechazadas = procesar_solicitudes()
+        
+        self.assertEqual((otorgadas, rechazadas), (2, 1))
+        estados = [
+            SolicitudReserva.objects.get(pk=t.pk).estado for t in tickets
+        ]
+        self.assertEqual(estados, [
+            SolicitudReserva.OTORGADA,
+            SolicitudReserva.OTORGADA,
+            SolicitudReserva.RECHAZADA,
+        ])
+        self.clase.refresh_from_db()
+        self.assertEqual(self.clase.cupos_ocupados, 2)
+    
+    def test_ticket_pendiente_duplicado(self):
+        """Test: Encolar dos veces devuelve el mismo ticket pendiente."""
+        from .reserva_service import encolar_solicitud
+        
+        ticket1 = encolar_solicitud(self.socios[0], self.clase)
+        ticket2 = encolar_solicitud(self.socios[0], self.clase)
+
+        self.assertEqual(ticket1.pk, ticket2.pk)
+
+    def test_rechazo_en_bloque_con_motivo_de_cupo(self):
+        """Test: Al llenarse la clase, los demás tickets no heredan el motivo propio de un socio."""
+        from .models import SolicitudReserva
+        from .reserva_service import MENSAJE_CLASE_LLENA, encolar_solicitud, procesar_solicitudes
+
+        Clase.objects.filter(pk=self.clase.pk).update(cupos_ocupados=2)
+        inactivo = self.socios[0]
+        tickets = [encolar_solicitud(socio, self.clase) for socio in self.socios]
+        Usuario.objects.filter(pk=inactivo.pk).update(estado_membresia=Usuario.INACTIVA)
+
+        self.assertEqual(procesar_solicitudes(), (0, 3))
+
+        motivos = [SolicitudReserva.objects.get(pk=t.pk).motivo_rechazo for t in tickets]
+        self.assertEqual(motivos, ["Tu membresía no está activa."] + [MENSAJE_CLASE_LLENA] * 2)
+
+    def test_ticket_pendiente_responde_202_con_retry_after(self):
+        """Test: La consulta de un ticket pendiente no espera: 202 con Retry-After."""
+        from .reserva_service import encolar_solicitud, procesar_solicitudes
+        from .views import REINTENTO_SOLICITUD
+
+        ticket = encolar_solicitud(self.socios[0], self.clase)
+        cliente = APIClient()
+        cliente.force_authenticate(user=self.socios[0])
+        url = f'/api/reservas/solicitudes/{ticket.pk}/'
+
+        respuesta = cliente.get(url, {'esperar': 10})
+        self.assertEqual(respuesta.status_code, 202)
+        self.assertEqual(respuesta['Retry-After'], str(REINTENTO_SOLICITUD))
+
+        procesar_solicitudes()
+        respuesta = cliente.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotIn('Retry-After', respuesta)
+
+
+class ReservaSerieTest(TestCase):
+    """Tests para la reserva de una clase semanal en serie."""
+    
+    def setUp(self):
+        """Crear una serie semanal con una semana llena y otra sin clase."""
+        self.socio = Usuario.objects.create_user(
+            username='socio_serie',
+            email='serie@gimnasio.com',
+            password='SocioPass123!',
+            rol=Usuario.SOCIO,
+            estado_membresia=Usuario.ACTIVA
+        )
+        inicio = date.today() + timedelta(days=1)
+        self.clases = [
+            Clase.objects.create(
+                nombre='Yoga Martes',
+                tipo=Clase.YOGA,
+                fecha=inicio + timedelta(weeks=semana),
+                hora_inicio=time(19, 0),
+                hora_fin=time(20, 0),
+                cupos_totales=1,
+                cupos_ocupados=cupos_ocupados,
+                estado=Clase.ACTIVA
+            )
+            for semana, cupos_ocupados in [(0, 0), (1, 1), (3, 0)]
+        ]
+    
+    def test_resultados_por_fecha(self):
+        """Test: Cada fecha de la serie reporta su propio resultado."""
+        from .reserva_service import reservar_serie
+        
+        resultados = reservar_serie(self.socio, self.clases[0], semanas=4)
+        
+        self.assertEqual(
+            [r['resultado'] for r in resultados],
+            ['reservada', 'llena', 'sin_clase', 'reservada']
+        )
+        self.assertEqual(
+            Reserva.objects.filter(socio=self.socio, estado=Reserva.CONFIRMADA).count(), 2
+        )
+        self.clases[0].refresh_from_db()
+        self.assertEqual(self.clases[0].cupos_ocupados, 1)
+    
+    def test_serie_repetida_marca_duplicadas(self):
+        """Test: Repetir la serie no duplica reservas ni cupos."""
+        from .reserva_service import reservar_serie
+        
+        reservar_serie(self.socio, self.clases[0], semanas=4)
+        resultados = reservar_serie(self.socio, self.clases[0], semanas=4)
+        
+        self.assertEqual(resultados[0]['resultado'], 'duplicada')
+        self.assertEqual(resultados[3]['resultado'], 'duplicada')
+        self.clases[2].refresh_from_db()
+        self.assertEqual(self.clases[2].cupos_ocupados, 1)
+
+
+    def test_serie_registra_eventos_en_el_outbox(self):
+        """Test: La serie registra un RESERVA_CREADA por reserva; las notificaciones las crea el despachador."""
+        from notificaciones.models import Notificacion
+        from .models import EventoReserva
+        from .outbox_service import despachar_eventos
+        from .reserva_service import reservar_serie
+        
+        reservar_serie(self.socio, self.clases[0], semanas=4)
+        
+        eventos = EventoReserva.objects.filter(tipo=EventoReserva.RESERVA_CREADA)
+        self.assertCountEqual(
+            eventos.values_list('reserva__clase_id', flat=True), [self.clases[0].id, self.clases[2].id]
+        )
+        self.assertFalse(Notificacion.objects.filter(usuario=self.socio).exists())
+        
+        self.assertEqual(despachar_eventos(), (2, 0))
+        self.assertEqual(
+            Notificacion.objects.filter(usuario=self.socio, tipo=Notificacion.RESERVA_CONFIRMADA).count(), 2
+        )
+
+
+class ReservaPresupuestoConsultasTest(PresupuestoConsultasMixin, TestCase):
+    """Tests de presupuesto de consultas para los listados de reservas."""
+    
+    def setUp(self):
+        """Crear socio, admin e instructor."""
+        self.socio = Usuario.objects.create_user(
+            username='socio_listado',
+            email='listado@gimnasio.com',
+            password='SocioPass123!',
+            rol=Usuario.SOCIO,
+            estado_membresia=Usuario.ACTIVA
+        )
+        self.admin = Usuario.objects.create_user(
+            username='admin_listado',
+            email='admin_listado@gimnasio.com',
+            password='AdminPass123!',
+            rol=Usuario.ADMINISTRADOR,
+            is_staff=True
+        )
+        self.instructor = Instructor.objects.create(
+            usuario=Usuario.objects.create_user(
+                username='inst_listado',
+                email='inst_listado@gimnasio.com',
+                password='InstPass123!',
+                rol=Usuario.INSTRUCTOR
+            )
+        )
+        self.dias = 0
+    
+    def crear_reservas(self, n):
+        """Crea n reservas confirmadas del socio, cada una en una clase distinta."""
+        for _ in range(n):
+            self.dias += 1
+            clase = Clase.objects.create(
+                nombre=f'Pilates {self.dias}',
+                tipo=Clase.PILATES,
+                instructor=self.instructor,
+                fecha=date.today() + timedelta(days=self.dias),
+                hora_inicio=time(9, 0),
+                hora_fin=time(10, 0),
+                cupos_totales=10,
+                cupos_ocupados=1,
+                estado=Clase.ACTIVA
+            )
+            Reserva.objects.create(socio=self.socio, clase=clase, estado=Reserva.CONFIRMADA)
+    
+    def test_listados_del_socio(self):
+        """Test: Los listados del socio no crecen en consultas con el número de reservas."""
+        for url in [
+            '/api/reservas/',
+            '/api/reservas/activas/',
+            '/api/reservas/proximas/',
+            '/api/reservas/historial/',
+            '/api/usuarios/mis_reservas/',
+        ]:
+            with self.subTest(url=url):
+                Reserva.objects.all().delete()
+                self.assertPresupuestoConsultas(self.socio, url, self.crear_reservas, presupuesto=2)
+    
+    def test_listado_admin(self):
+        """Test: El listado de administración no crece en consultas con el número de reservas."""
+        self.assertPresupuestoConsultas(
+            self.admin, '/api/reservas/', self.crear_reservas, presupuesto=2
+        )
+
+
+class AgendaSocioTest(TestCase):
+    """Tests para el modelo de lectura AgendaSocio."""
+    
+    def setUp(self):
+        """Crear socio y clases futuras."""
+        self.socio = Usuario.objects.create_user(
+            username='socio_agenda',
+            email='agenda@gimnasio.com',
+            password='SocioPass123!',
+            rol=Usuario.SOCIO,
+            estado_membresia=Usuario.ACTIVA
+        )
+        self.clases = [
+            Clase.objects.create(
+                nombre=f'Cardio {i}',
+                tipo=Clase.CARDIO,
+                fecha=date.today() + timedelta(days=i + 1),
+                hora_inicio=time(8, 0),
+                hora_fin=time(9, 0),
+                cupos_totales=5,
+                estado=Clase.ACTIVA
+            )
+            for i in range(3)
+        ]
+    
+    def test_transiciones_actualizan_agenda(self):
+        """Test: Crear, cancelar y completar reservas se refleja en la agenda."""
+        from .agenda_service import obtener_agenda
+        
+        reservas = [
+            Reserva.objects.create(socio=self.socio, clase=clase, estado=Reserva.CONFIRMADA)
+            for clase in self.clases
+        ]
+        self.assertEqual(len(obtener_agenda(self.socio)['proximas_reservas']), 3)
+        
+        reservas[0].cancelar()
+        reservas[1].marcar_completada()
+        
+        agenda = obtener_agenda(self.socio)
+        self.assertEqual(
+            [r['id'] for r in agenda['proximas_reservas']], [reservas[2].id]
+        )
+    
+    def test_lectura_en_consultas_constantes(self):
+        """Test: Leer la agenda cuesta lo mismo con 1 o con muchas reservas en el historial."""
+        from .agenda_service import obtener_agenda
+        
+        Reserva.objects.create(socio=self.socio, clase=self.clases[0], estado=Reserva.CONFIRMADA)
+        obtener_agenda(self.socio)
+        for _ in range(20):
+            Reserva.objects.create(socio=self.socio, clase=self.clases[1], estado=Reserva.COMPLETADA)
+        
+        with self.assertNumQueries(1):
+            agenda = obtener_agenda(self.socio)
+        self.assertEqual(len(agenda['proximas_reservas']), 1)
+    
+    def test_cambio_de_horario_se_propaga(self):
+        """Test: Editar el horario de una clase actualiza la agenda de sus socios."""
+        from .agenda_service import obtener_agenda
+        
+        Reserva.objects.create(socio=self.socio, clase=self.clases[0], estado=Reserva.CONFIRMADA)
+        self.clases[0].hora_inicio = time(7, 0)
+        self.clases[0].save()
+        
+        agenda = obtener_agenda(self.socio)
+        self.assertEqual(agenda['proximas_reservas'][0]['hora_inicio'], '07:00:00')
+
+    def test_primer_cambio_arma_la_agenda_completa(self):
+        """Test: La agenda creada por un cambio incluye las reservas anteriores a ella."""
+        from .agenda_service import obtener_agenda
+        from .models import AgendaSocio
+
+        # Reservas hechas antes de que existiera la agenda (sin señales)
+        anteriores = Reserva.objects.bulk_create([
+            Reserva(socio=self.socio, clase=clase, estado=Reserva.CONFIRMADA)
+            for clase in self.clases[:2]
+        ])
+        self.assertFalse(AgendaSocio.objects.filter(socio=self.socio).exists())
+
+        nueva = Reserva.objects.create(socio=self.socio, clase=self.clases[2], estado=Reserva.CONFIRMADA)
+
+        agenda = obtener_agenda(self.socio)
+        self.assertEqual(
+            [r['id'] for r in agenda['proximas_reservas']],
+            [anteriores[0].id, anteriores[1].id, nueva.id]
+        )
+
+
+class PaginacionCursorTest(TestCase):
+    """Tests para la paginación por cursor de historial y listados de reservas."""
+    
+    def setUp(self):
+        """Crear socio con 25 reservas, varias con la misma fecha_reserva."""
+        self.socio = Usuario.objects.create_user(
+            username='socio_cursor',
+            email='cursor@gimnasio.com',
+            password='SocioPass123!',
+            rol=Usuario.SOCIO,
+            estado_membresia=Usuario.ACTIVA
+        )
+        clase = Clase.objects.create(
+            nombre='Yoga',
+            tipo=Clase.YOGA,
+            fecha=date.today() + timedelta(days=1),
+            hora_inicio=time(9, 0),
+            hora_fin=time(10, 0),
+            cupos_totales=30,
+            estado=Clase.ACTIVA
+        )
+        reservas = [
+            Reserva.objects.create(socio=self.socio, clase=clase, estado=Reserva.CANCELADA)
+            for _ in range(25)
+        ]
+        # Empates en fecha_reserva: el id desempata el orden
+        Reserva.objects.filter(id__in=[r.id for r in reservas[5:15]]).update(
+            fecha_reserva=reservas[5].fecha_reserva
+        )
+        self.ids_esperados = list(
+            Reserva.objects.order_by('-fecha_reserva', '-id').values_list('id', flat=True)
+        )
+        self.api = APIClient()
+        self.api.force_authenticate(user=self.socio)
+    
+    def recorrer(self, url):
+        """Recorre todas las páginas siguiendo `next` y retorna (ids, páginas)."""
+        ids = []
+        paginas = []
+        while url:
+            respuesta = self.api.get(url)
+            self.assertEqual(respuesta.status_code, 200)
+            paginas.append(respuesta.data)
+            ids.extend(r['id'] for r in respuesta.data['results'])
+            url = respuesta.data['next']
+        return ids, paginas
+    
+    def test_recorrido_completo_sin_duplicados(self):
+        """Test: Recorrer el historial devuelve cada reserva una vez, en orden."""
+        for url in ['/api/reservas/historial/?page_size=4', '/api/usuarios/mis_reservas/?page_size=4']:
+            with self.subTest(url=url):
+                ids, paginas = self.recorrer(url)
+                self.assertEqual(ids, self.ids_esperados)
+                self.assertEqual(len(paginas), 7)
+                self.assertEqual(paginas[0]['count'], 25)
+    
+    def test_modo_sin_total(self):
+        """Test: Con sin_total=1 no se ejecuta COUNT(*) y la página cuesta lo mismo en profundidad."""
+        ids, paginas = self.recorrer('/api/reservas/?page_size=10&sin_total=1')
+        self.assertEqual(ids, self.ids_esperados)
+        self.assertNotIn('count', paginas[0])
+        
+        with CaptureQueriesContext(connection) as contexto:
+            self.api.get(paginas[0]['next'])
+        self.assertFalse(any('COUNT' in q['sql'] for q in contexto.captured_queries))
+    
+    def test_cursor_invalido(self):
+        """Test: Un cursor manipulado retorna 404."""
+        respuesta = self.api.get('/api/reservas/historial/?cursor=no-es-un-cursor')
+        self.assertEqual(respuesta.status_code, 404)
+
+
+class CierreClasesTest(TestCase):
+    """Tests para el cierre por lotes de clases terminadas."""
+    
+    def setUp(self):
+        """Crear dos clases terminadas ayer y una futura con reservas confirmadas."""
+        self.reincidente = Usuario.objects.create_user(
+            username='socio_reincidente',
+            email='reincidente@gimnasio.com',
+            rol=Usuario.SOCIO,
+            estado_membresia=Usuario.ACTIVA,
+            noshow_mes_actual=2,
+            total_noshow=5
+        )
+        self.socio = Usuario.objects.create_user(
+            username='socio_cierre',
+            email='cierre@gimnasio.com',
+            rol=Usuario.SOCIO,
+            estado_membresia=Usuario.ACTIVA
+        )
+        ayer = date.today() - timedelta(days=1)
+        self.clases = [
+            Clase.objects.create(
+                nombre=f'Funcional {i}',
+                tipo=Clase.CARDIO,
+                fecha=ayer,
+                hora_inicio=time(8 + i, 0),
+                hora_fin=time(9 + i, 0),
+                cupos_totales=10,
+                estado=Clase.ACTIVA
+            )
+            for i in range(2)
+        ]
+        self.futura = Clase.objects.create(
+            nombre='Funcional futura',
+            tipo=Clase.CARDIO,
+            fecha=date.today() + timedelta(days=1),
+            hora_inicio=time(8, 0),
+            hora_fin=time(9, 0),
+            cupos_totales=10,
+            estado=Clase.ACTIVA
+        )
+        Reserva.objects.create(socio=self.reincidente, clase=self.clases[0], estado=Reserva.CONFIRMADA)
+        Reserva.objects.create(socio=self.socio, clase=self.clases[0], estado=Reserva.COMPLETADA)
+        Reserva.objects.create(socio=self.socio, clase=self.clases[1], estado=Reserva.CONFIRMADA)
+        self.reserva_futura = Reserva.objects.create(
+            socio=self.socio, clase=self.futura, estado=Reserva.CONFIRMADA
+        )
+    
+    def test_cierre_idempotente(self):
+        """Test: Cierra solo lo terminado, aplica contadores y bloqueo, y no repite al re-ejecutar."""
+        from notificaciones.models import Notificacion
+        from .cierre_service import cerrar_clases_terminadas
+        
+        totales = cerrar_clases_terminadas()
+        self.assertEqual(totales, {'clases': 2, 'reservas': 2, 'bloqueados': 1, 'advertencias': 2})
+        
+        self.reincidente.refresh_from_db()
+        self.socio.refresh_from_db()
+        self.assertEqual((self.reincidente.total_noshow, self.reincidente.noshow_mes_actual), (6, 3))
+        self.assertTrue(self.reincidente.esta_bloqueado())
+        self.assertEqual(self.reincidente.estado_membresia, Usuario.SUSPENDIDA)
+        self.assertEqual(self.socio.noshow_mes_actual, 1)
+        self.assertFalse(self.socio.esta_bloqueado())
+        self.assertIn('suspendida', Notificacion.objects.get(usuario=self.reincidente).mensaje)
+        
+        self.reserva_futura.refresh_from_db()
+        self.assertEqual(self.reserva_futura.estado, Reserva.CONFIRMADA)
+        
+        # Re-ejecutar no cambia nada
+        self.assertEqual(
+            cerrar_clases_terminadas(),
+            {'clases': 0, 'reservas': 0, 'bloqueados': 0, 'advertencias': 0}
+        )
+        self.socio.refresh_from_db()
+        self.assertEqual(self.socio.noshow_mes_actual, 1)
+        self.assertEqual(Notificacion.objects.count(), 2)
+    
+    def test_reanudable_tras_fallo(self):
+        """Test: Si un lote falla, los anteriores quedan cerrados y re-ejecutar completa el resto."""
+        from unittest import mock
+        from notificaciones.models import Notificacion
+        from .cierre_service import cerrar_clases_terminadas
+        
+        # El primer lote se completa; el segundo falla al crear sus advertencias
+        with mock.patch.object(
+            Notificacion.objects, 'bulk_create', side_effect=[[], RuntimeError('caída')]
+        ):
+            with self.assertRaises(RuntimeError):
+                cerrar_clases_terminadas(lote=1)
+        
+        self.assertEqual(Clase.objects.filter(estado=Clase.COMPLETADA).count(), 1)
+        self.socio.refresh_from_db()
+        self.assertEqual(self.socio.noshow_mes_actual, 0)
+        
+        totales = cerrar_clases_terminadas(lote=1)
+        self.assertEqual(totales['clases'], 1)
+        self.socio.refresh_from_db()
+        self.assertEqual(self.socio.noshow_mes_actual, 1)
+
+    def test_advertencias_con_contador_de_cada_noshow(self):
+        """Test: Varios no-shows del mismo socio en un lote avisan 1/3, 2/3 y 3/3."""
+        from notificaciones.models import Notificacion
+        from .cierre_service import cerrar_clases_terminadas
+
+        tercera = Clase.objects.create(
+            nombre='Funcional 2',
+            tipo=Clase.CARDIO,
+            fecha=date.today() - timedelta(days=2),
+            hora_inicio=time(8, 0),
+            hora_fin=time(9, 0),
+            cupos_totales=10,
+            estado=Clase.ACTIVA
+        )
+        Reserva.objects.create(socio=self.socio, clase=tercera, estado=Reserva.CONFIRMADA)
+        Reserva.objects.create(socio=self.socio, clase=self.clases[0], estado=Reserva.CONFIRMADA)
+
+        cerrar_clases_terminadas()
+
+        advertencias = Notificacion.objects.filter(usuario=self.socio).order_by('id')
+        self.assertEqual(
+            [(a.datos_adicionales['clase_id'], a.datos_adicionales['noshow_mes']) for a in advertencias],
+            [(tercera.id, 1), (self.clases[0].id, 2), (self.clases[1].id, 3)]
+        )
+        self.assertIn('ADVERTENCIA', advertencias[1].mensaje)
+        self.assertIn('suspendida', advertencias[2].mensaje)
+
+
+class OutboxReservaTest(TestCase):
+    """Tests para el outbox de efectos secundarios de las reservas."""
+    
+    def setUp(self):
+        """Crear instructor, dos socios y una clase de un cupo."""
+        self.instructor = Instructor.objects.create(
+            usuario=Usuario.objects.create_user(
+                username='inst_outbox',
+                email='inst_outbox@gimnasio.com',
+                rol=Usuario.INSTRUCTOR
+            )
+        )
+        self.socio, self.en_espera = [
+            Usuario.objects.create_user(
+                username=f'socio_outbox_{i}',
+                email=f'outbox{i}@gimnasio.com',
+                rol=Usuario.SOCIO,
+                estado_membresia=Usuario.ACTIVA
+            )
+            for i in range(2)
+        ]
+        self.clase = Clase.objects.create(
+            nombre='Yoga Outbox',
+            tipo=Clase.YOGA,
+            instructor=self.instructor,
+            fecha=date.today() + timedelta(days=2),
+            hora_inicio=time(10, 0),
+            hora_fin=time(11, 0),
+            cupos_totales=1,
+            estado=Clase.ACTIVA
+        )
+        self.api = APIClient()
+        self.api.force_authenticate(user=self.socio)
+    
+    def test_reserva_solo_escribe_cupo_y_evento(self):
+        """Test: Reservar no crea notificaciones en la petición; el despachador las crea después."""
+        from notificaciones.models import Notificacion
+        from .models import EventoReserva
+        from .outbox_service import despachar_eventos
+        
+        respuesta = self.api.post('/api/reservas/', {'clase': self.clase.id}, format='json')
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertFalse(Notificacion.objects.exists())
+        evento = EventoReserva.objects.get()
+        self.assertEqual(evento.tipo, EventoReserva.RESERVA_CREADA)
+        
+        self.assertEqual(despachar_eventos(), (1, 0))
+        self.assertEqual(
+            set(Notificacion.objects.values_list('usuario_id', flat=True)),
+            {self.socio.id, self.instructor.usuario_id}
+        )
+        evento.refresh_from_db()
+        self.assertEqual(evento.estado, EventoReserva.PROCESADO)
+        self.assertEqual(despachar_eventos(), (0, 0))
+    
+    def test_cancelacion_promueve_lista_espera_al_despachar(self):
+        """Test: La lista de espera se procesa en el despachador, no en la cancelación."""
+        from lista_espera.models import ListaEspera
+        from notificaciones.models import Notificacion
+        from .outbox_service import despachar_eventos
+        from .reserva_service import reservar_cupo
+        
+        _, reserva = reservar_cupo(self.socio, self.clase)
+        entrada = ListaEspera.objects.create(socio=self.en_espera, clase=self.clase)
+        despachar_eventos()
+        
+        respuesta = self.api.post(f'/api/reservas/{reserva.id}/cancelar/')
+        self.assertEqual(respuesta.status_code, 200)
+        entrada.refresh_from_db()
+        self.assertEqual(entrada.estado, ListaEspera.ESPERANDO)
+        
+        # Cancelación -> promoción (que registra su propio evento) -> aviso de cupo
+        self.assertEqual(despachar_eventos(), (1, 0))
+        entrada.refresh_from_db()
+        self.assertEqual(entrada.estado, ListaEspera.ASIGNADO)
+        self.assertEqual(despachar_eventos(), (1, 0))
+        self.assertTrue(Notificacion.objects.filter(
+            usuario=self.en_espera, tipo=Notificacion.CUPO_DISPONIBLE
+        ).exists())
+    
+    def test_evento_fallido_se_reintenta(self):
+        """Test: Un evento que falla se reintenta hasta MAX_INTENTOS y luego queda FALLIDO."""
+        from unittest import mock
+        from . import outbox_service
+        from .models import EventoReserva
+        from .reserva_service import reservar_cupo
+        
+        reservar_cupo(self.socio, self.clase)
+        with mock.patch.dict(outbox_service.MANEJADORES, {
+            EventoReserva.RESERVA_CREADA: mock.Mock(side_effect=RuntimeError('SMTP caído'))
+        }):
+            for _ in range(outbox_service.MAX_INTENTOS):
+                self.assertEqual(outbox_service.despachar_eventos(), (0, 1))
+        
+        evento = EventoReserva.objects.get()
+        self.assertEqual(evento.estado, EventoReserva.FALLIDO)
+        self.assertEqual(evento.error, 'SMTP caído')
+        self.assertEqual(outbox_service.despachar_eventos(), (0, 0))
+
+    def test_despachadores_concurrentes_no_duplican(self):
+        """Test: Un evento que otro despachador ya reclamó no se vuelve a procesar."""
+        from unittest import mock
+        from . import outbox_service
+        from .models import EventoReserva
+        from .reserva_service import reservar_cupo
+
+        self.clase.cupos_totales = 2
+        self.clase.save()
+        reservar_cupo(self.socio, self.clase)
+        reservar_cupo(self.en_espera, self.clase)
+        procesados = []
+
+        def manejador(evento):
+            procesados.append(evento.id)
+            # Otro despachador lee los mismos pendientes mientras este procesa el primero
+            if len(procesados) == 1:
+                self.assertEqual(outbox_service.despachar_eventos(), (1, 0))
+
+        with mock.patch.dict(outbox_service.MANEJADORES, {EventoReserva.RESERVA_CREADA: manejador}):
+            self.assertEqual(outbox_service.despachar_eventos(), (1, 0))
+
+        self.assertEqual(sorted(procesados), list(EventoReserva.objects.values_list('id', flat=True).order_by('id')))
+        self.assertFalse(EventoReserva.objects.filter(estado=EventoReserva.PENDIENTE).exists())
+
+    def test_despacho_inmediato_solo_sus_eventos(self):
+        """Test: Con despacho inmediato cada transacción despacha solo los eventos que registró."""
+        from django.test import override_settings
+        from .models import EventoReserva
+        from .outbox_service import registrar_evento
+        from .reserva_service import reservar_cupo
+
+        _, reserva = reservar_cupo(self.socio, self.clase)
+        ajeno = EventoReserva.objects.get()
+
+        with override_settings(OUTBOX_DESPACHO_INMEDIATO=True):
+            with self.captureOnCommitCallbacks(execute=True):
+                propio = registrar_evento(EventoReserva.RESERVA_CREADA, reserva)
+
+        propio.refresh_from_db()
+        ajeno.refresh_from_db()
+        self.assertEqual(propio.estado, EventoReserva.PROCESADO)
+        self.assertEqual(ajeno.estado, EventoReserva.PENDIENTE)
+
+
+class CancelacionClasesTest(TestCase):
+    """Tests para la cancelación de clases en cascada."""
+    
+    def setUp(self):
+        """Crear instructor, clases de mañana con socios reservados y en lista de espera."""
+        usuario_instructor = Usuario.objects.create_user(
+            username='instructor_cancela',
+            email='instructor_cancela@gimnasio.com',
+            rol=Usuario.INSTRUCTOR
+        )
+        self.instructor = Instructor.objects.create(usuario=usuario_instructor)
+        self.socios = [
+            Usuario.objects.create_user(
+                username=f'socio_cancela_{i}',
+                email=f'cancela{i}@gimnasio.com',
+                rol=Usuario.SOCIO,
+                estado_membresia=Usuario.ACTIVA
+            )
+            for i in range(4)
+        ]
+        self.manana = date.today() + timedelta(days=1)
+        self.clases = [self.crear_clase(f'Spinning {i}', 8 + i * 2) for i in range(2)]
+    
+    def crear_clase(self, nombre, hora, socios=2):
+        """Clase con `socios` reservas confirmadas y el siguiente socio en espera."""
+        from lista_espera.models import ListaEspera
+        
+        clase = Clase.objects.create(
+            nombre=nombre,
+            tipo=Clase.SPINNING,
+            instructor=self.instructor,
+            fecha=self.manana,
+            hora_inicio=time(hora, 0),
+            hora_fin=time(hora + 1, 0),
+            cupos_totales=socios,
+            cupos_ocupados=socios,
+            estado=Clase.ACTIVA
+        )
+        for socio in self.socios[:socios]:
+            Reserva.objects.create(socio=socio, clase=clase, estado=Reserva.CONFIRMADA)
+        ListaEspera.objects.create(socio=self.socios[socios], clase=clase)
+        return clase
+    
+    def test_cancelacion_en_cascada(self):
+        """Test: Cancela reservas y espera, libera cupos, vacía agendas y avisa; no repite."""
+        from lista_espera.models import ListaEspera
+        from notificaciones.models import Notificacion
+        from .cancelacion_service import cancelar_clases
+        from .models import AgendaSocio
+        
+        resultado = cancelar_clases([clase.id for clase in self.clases], motivo='Mantención')
+        self.assertEqual(resultado, {'clases': 2, 'reservas': 4, 'lista_espera': 2, 'notificaciones': 8})
+        
+        self.assertFalse(Reserva.objects.filter(estado=Reserva.CONFIRMADA).exists())
+        self.assertFalse(Reserva.objects.filter(fecha_cancelacion__isnull=True).exists())
+        self.assertFalse(ListaEspera.objects.filter(estado=ListaEspera.ESPERANDO).exists())
+        for clase in self.clases:
+            clase.refresh_from_db()
+            self.assertEqual((clase.estado, clase.cupos_ocupados), (Clase.CANCELADA, 0))
+        for agenda in AgendaSocio.objects.all():
+            self.assertEqual((agenda.reservas, agenda.listas_espera), ({}, {}))
+        
+        # Emails en cola para el envío por lotes, no enviados dentro de la transacción
+        emails = Notificacion.objects.filter(tipo=Notificacion.CLASE_CANCELADA, canal=Notificacion.EMAIL)
+        self.assertEqual(emails.count(), 4)
+        self.assertTrue(all(n.estado == Notificacion.PENDIENTE for n in emails))
+        self.assertIn('Mantención', emails.first().mensaje)
+        
+        resultado = cancelar_clases([clase.id for clase in self.clases])
+        self.assertEqual(resultado['clases'], 0)
+        self.assertEqual(Notificacion.objects.filter(tipo=Notificacion.CLASE_CANCELADA).count(), 8)
+    
+    def test_consultas_no_crecen_con_las_reservas(self):
+        """Test: Cancelar un lote usa las mismas consultas con 2 o con 3 reservas por clase."""
+        from .cancelacion_service import cancelar_clases
+        
+        otras = [self.crear_clase(f'Yoga {i}', 14 + i * 2, socios=3) for i in range(2)]
+        with CaptureQueriesContext(connection) as pocas:
+            cancelar_clases([clase.id for clase in self.clases])
+        with CaptureQueriesContext(connection) as muchas:
+            cancelar_clases([clase.id for clase in otras])
+        self.assertEqual(len(pocas), len(muchas))
+    
+    def test_guardar_como_cancelada_cancela_en_cascada(self):
+        """Test: Guardar la clase como cancelada (admin, PATCH) también cancela sus reservas."""
+        clase = self.clases[0]
+        clase.estado = Clase.CANCELADA
+        clase.save()
+        
+        self.assertEqual(Reserva.objects.filter(clase=clase, estado=Reserva.CANCELADA).count(), 2)
+        self.assertEqual(Reserva.objects.filter(clase=self.clases[1], estado=Reserva.CONFIRMADA).count(), 2)
+        clase.refresh_from_db()
+        self.assertEqual(clase.cupos_ocupados, 0)
+    
+    def test_api_cancelar_lote_por_rango(self):
+        """Test: Solo administradores cancelan en bloque; el rango toma las clases activas."""
+        admin = Usuario.objects.create_user(
+            username='admin_cancela',
+            email='admin_cancela@gimnasio.com',
+            rol=Usuario.ADMINISTRADOR
+        )
+        client = APIClient()
+        datos = {'desde': self.manana.isoformat(), 'hasta': self.manana.isoformat()}
+        
+        client.force_authenticate(user=self.socios[0])
+        respuesta = client.post('/api/clases/cancelar-lote/', datos, format='json')
+        self.assertEqual(respuesta.status_code, 403)
+        
+        client.force_authenticate(user=admin)
+        respuesta = client.post('/api/clases/cancelar-lote/', {**datos, 'clases': [1]}, format='json')
+        self.assertEqual(respuesta.status_code, 400)
+        respuesta = client.post('/api/clases/cancelar-lote/', datos, format='json')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()['clases'], 2)
+        self.assertEqual(respuesta.json()['reservas'], 4)
+
+
+class FeedCalendarioTest(TestCase):
+    """Tests para los feeds iCalendar de socios e instructores."""
+    
+    def setUp(self):
+        """Crear socio con una reserva e instructor con su clase; caché vacía."""
+        from django.core.cache import cache
+        cache.clear()
+        usuario_instructor = Usuario.objects.create_user(
+            username='instructor_ics',
+            email='instructor_ics@gimnasio.com',
+            first_name='Ana',
+            last_name='Pérez',
+            rol=Usuario.INSTRUCTOR
+        )
+        self.instructor = Instructor.objects.create(usuario=usuario_instructor)
+        self.socio = Usuario.objects.create_user(
+            username='socio_ics',
+            email='socio_ics@gimnasio.com',
+            rol=Usuario.SOCIO,
+            estado_membresia=Usuario.ACTIVA
+        )
+        manana = date.today() + timedelta(days=1)
+        self.clases = [
+            Clase.objects.create(
+                nombre=f'Yoga, nivel {i}',
+                tipo=Clase.YOGA,
+                instructor=self.instructor,
+                fecha=manana,
+                hora_inicio=time(8 + i * 2, 0),
+                hora_fin=time(9 + i * 2, 0),
+                cupos_totales=10,
+                estado=Clase.ACTIVA
+            )
+            for i in range(2)
+        ]
+        Reserva.objects.create(socio=self.socio, clase=self.clases[0], estado=Reserva.CONFIRMADA)
+        self.client_api = APIClient()
+    
+    def url_feed(self, usuario):
+        """Ruta del feed del usuario, obtenida desde la API."""
+        from urllib.parse import urlparse
+        self.client_api.force_authenticate(user=usuario)
+        respuesta = self.client_api.get('/api/usuarios/calendario-ics/')
+        self.assertEqual(respuesta.status_code, 200)
+        return urlparse(respuesta.json()['url']).path
+    
+    def test_feed_socio_y_sondeo_sin_base_de_datos(self):
+        """Test: El feed trae las reservas; los sondeos siguientes no consultan la base."""
+        url = self.url_feed(self.socio)
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta['Content-Type'], 'text/calendar; charset=utf-8')
+        contenido = respuesta.content.decode()
+        self.assertIn('BEGIN:VCALENDAR', contenido)
+        self.assertEqual(contenido.count('BEGIN:VEVENT'), 1)
+        self.assertIn('SUMMARY:Yoga\\, nivel 0', contenido)
+        
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).status_code, 200)
+            respuesta = self.client.get(url, HTTP_IF_NONE_MATCH=respuesta['ETag'])
+            self.assertEqual(respuesta.status_code, 304)
+        
+        # Una reserva nueva cambia la agenda del socio: el feed se regenera
+        with self.captureOnCommitCallbacks(execute=True):
+            Reserva.objects.create(socio=self.socio, clase=self.clases[1], estado=Reserva.CONFIRMADA)
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta.content.decode().count('BEGIN:VEVENT'), 2)
+    
+    def test_feed_instructor_se_invalida_solo_con_sus_clases(self):
+        """Test: Editar la clase regenera el feed del instructor; un cambio de cupos no."""
+        url = self.url_feed(self.instructor.usuario)
+        contenido = self.client.get(url).content.decode()
+        self.assertEqual(contenido.count('BEGIN:VEVENT'), 2)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.clases[1].incrementar_cupo()
+        with self.assertNumQueries(0):
+            self.client.get(url)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.clases[1].estado = Clase.CANCELADA
+            self.clases[1].save()
+        self.assertIn('STATUS:CANCELLED', self.client.get(url).content.decode())
+    
+    def test_regenerar_token_invalida_url_anterior(self):
+        """Test: Tras regenerar el token, la URL anterior responde 404."""
+        url = self.url_feed(self.socio)
+        self.assertEqual(self.client.get(url).status_code, 200)
+        creada = SuscripcionCalendario.objects.get(usuario=self.socio).fecha_creacion
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            respuesta = self.client_api.post('/api/usuarios/calendario-ics/')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(SuscripcionCalendario.objects.get(usuario=self.socio).fecha_creacion, creada)
+        self.assertEqual(self.client.get('/api/calendario/no-existe.ics').status_code, 404)
@@ -5,15 +5,26 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from django.http import Http404, HttpResponse
 from django.utils import timezone
+from django.utils.http import http_date
+from django.views.decorators.http import require_GET
 from datetime import datetime, timedelta
 import logging
 
-from .models import Reserva
+from clases.models import Clase
+from .models import Reserva, SolicitudReserva
 from .serializers import (
     ReservaSerializer, ReservaDetalleSerializer,
-    ReservaCrearSerializer, ReservaCancelarSerializer
+    ReservaCrearSerializer, ReservaCancelarSerializer,
+    ReservaSerieSerializer, SolicitudReservaSerializer
 )
+from reportes.estadisticas_service import invalidar_fechas
+from . import agenda_service
+from .reserva_service import (
+    cancelar_reserva, encolar_solicitud, reservar_serie, SERIE_RESERVADA
+)
+from backend.pagination import ReservaKeysetPagination
 from backend.custom_exceptions import (
     ReservaNoDisponibleException,
     CuposAgotadosException,
@@ -26,19 +37,25 @@ from backend.custom_exceptions import (
 # Logger para este módulo
 logger = logging.getLogger('reservas')
 
+# Segundos que el cliente espera antes de volver a consultar un ticket pendiente
+# (cabecera Retry-After); el servidor no retiene la petición mientras tanto
+REINTENTO_SOLICITUD = 1
+
 
 class ReservaViewSet(viewsets.ModelViewSet):
     """
     ViewSet para gestionar reservas.
     """
     permission_classes = [IsAuthenticated]
+    pagination_class = ReservaKeysetPagination
     
     def get_queryset(self):
         """Retorna las reservas según el rol del usuario."""
         # Los administradores pueden ver todas las reservas
+        queryset = Reserva.objects.para_listado()
         if self.request.user.is_staff:
-            return Reserva.objects.all().order_by('-fecha_reserva')
-        return Reserva.objects.filter(socio=self.request.user).order_by('-fecha_reserva')
+            return queryset.order_by('-fecha_reserva')
+        return queryset.filter(socio=self.request.user).order_by('-fecha_reserva')
     
     def get_serializer_class(self):
         """Retorna el serializer apropiado según la acción."""
@@ -48,6 +65,8 @@ class ReservaViewSet(viewsets.ModelViewSet):
             return ReservaCrearSerializer
         elif self.action == 'cancelar':
             return ReservaCancelarSerializer
+        elif self.action == 'serie':
+            return ReservaSerieSerializer
         return ReservaSerializer
     
     def create(self, request, *args, **kwargs):
@@ -56,6 +75,11 @@ class ReservaViewSet(viewsets.ModelViewSet):
         POST /api/reservas/
         """
         try:
+            # Clases con admisión en cola: solo se registra el ticket
+            clase_id = request.data.get('clase')
+            if str(clase_id).isdigit() and Clase.objects.filter(pk=clase_id, admision_en_cola=True).exists():
+                return self.encolar_reserva(request, clase_id)
+            
             serializer = self.get_serializer(data=request.data, context={'request': request})
             serializer.is_valid(raise_exception=True)
             reserva = serializer.save()
@@ -67,28 +91,6 @@ class ReservaViewSet(viewsets.ModelViewSet):
                 f'para {reserva.clase.fecha} {reserva.clase.hora_inicio}'
             )
             
-            # Crear notificaciones
-            from notificaciones.models import Notificacion
-            # Notificación para el socio
-            Notificacion.crear_notificacion_reserva(
-                socio=request.user,
-                clase=reserva.clase,
-                tipo=Notificacion.RESERVA_CONFIRMADA
-            )
-            # Notificación para el instructor
-            logger.info(f'Intentando notificar al instructor de la clase {reserva.clase.nombre}')
-            logger.info(f'Clase tiene instructor: {reserva.clase.instructor}')
-            if reserva.clase.instructor:
-                logger.info(f'Usuario del instructor: {reserva.clase.instructor.usuario}')
-            notif_instructor = Notificacion.notificar_instructor_nueva_reserva(
-                clase=reserva.clase,
-                socio=request.user
-            )
-            if notif_instructor:
-                logger.info(f'Notificación creada para instructor: ID {notif_instructor.id}')
-            else:
-                logger.warning('No se pudo crear notificación para el instructor')
-            
             return Response({
                 'message': 'Reserva creada exitosamente',
                 'reserva': ReservaDetalleSerializer(reserva).data
@@ -102,6 +104,71 @@ class ReservaViewSet(viewsets.ModelViewSet):
             )
             raise
     
+    @action(detail=False, methods=['post'])
+    def serie(self, request):
+        """
+        Reserva la misma clase semanal durante varias semanas.
+        POST /api/reservas/serie/
+        Body: {"clase": 1, "semanas": 8}
+        Devuelve el resultado por fecha (reservada, llena, duplicada, no_disponible, sin_clase, conflicto).
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        resultados = reservar_serie(
+            request.user,
+            serializer.validated_data['clase'],
+            serializer.validated_data['semanas']
+        )
+        reservadas = sum(1 for r in resultados if r['resultado'] == SERIE_RESERVADA)
+        
+        return Response({
+            'message': f'{reservadas} de {len(resultados)} clases reservadas',
+            'reservadas': reservadas,
+            'resultados': resultados
+        }, status=status.HTTP_201_CREATED if reservadas else status.HTTP_200_OK)
+    
+    def encolar_reserva(self, request, clase_id):
+        """
+        Registra un ticket de reserva para una clase con admisión en cola.
+        El cupo lo otorga el consumidor `procesar_solicitudes_reserva`.
+        """
+        clase = Clase.objects.get(pk=clase_id)
+        solicitud = encolar_solicitud(request.user, clase, notas=request.data.get('notas', ''))
+        
+        logger.info(
+            f'Solicitud encolada: Usuario {request.user.username} (ID: {request.user.id}) '
+            f'ticket #{solicitud.id} para clase {clase.id}'
+        )
+        
+        return Response({
+            'message': 'Solicitud recibida. Consulta el ticket para conocer el resultado.',
+            'solicitud': SolicitudReservaSerializer(solicitud).data
+        }, status=status.HTTP_202_ACCEPTED, headers={'Retry-After': str(REINTENTO_SOLICITUD)})
+    
+    @action(detail=False, methods=['get'], url_path=r'solicitudes/(?P<solicitud_id>[0-9]+)')
+    def solicitud(self, request, solicitud_id=None):
+        """
+        Consulta el estado de un ticket de reserva encolado.
+        GET /api/reservas/solicitudes/{id}/
+        Mientras está pendiente responde 202 con Retry-After: el cliente vuelve
+        a consultar; no se retiene un worker esperando al consumidor.
+        """
+        solicitud = SolicitudReserva.objects.filter(pk=solicitud_id, socio=request.user).first()
+        if solicitud is None:
+            return Response(
+                {'error': 'Solicitud no encontrada'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        datos = SolicitudReservaSerializer(solicitud).data
+        if solicitud.estado == SolicitudReserva.PENDIENTE:
+            return Response(
+                datos, status=status.HTTP_202_ACCEPTED,
+                headers={'Retry-After': str(REINTENTO_SOLICITUD)}
+            )
+        return Response(datos)
+    
     def destroy(self, request, pk=None):
         """
         Elimina una reserva del historial.
@@ -180,29 +247,16 @@ class ReservaViewSet(viewsets.ModelViewSet):
             )
             raise CancelacionTardiaException(mensaje)
         
-        # Intentar cancelar
-        if reserva.cancelar():
+        # Intentar cancelar; notificación al instructor y lista de espera van por el outbox
+        if cancelar_reserva(reserva, procesar_lista_espera=not clase_paso):
             logger.info(
                 f'Reserva cancelada: Usuario {request.user.username} canceló reserva {pk} '
                 f'para clase {reserva.clase.nombre} del {reserva.clase.fecha}'
             )
             
-            # Notificar al instructor sobre la cancelación
-            from notificaciones.models import Notificacion
-            Notificacion.notificar_instructor_cancelacion(
-                clase=reserva.clase,
-                socio=request.user
-            )
-            logger.info(f'Notificación de cancelación enviada al instructor de {reserva.clase.nombre}')
-            
-            # Solo procesar lista de espera si la clase no ha pasado
             mensaje = 'Reserva cancelada exitosamente'
             if not clase_paso:
-                from lista_espera.models import ListaEspera
-                siguiente_reserva = ListaEspera.procesar_siguiente_en_lista(reserva.clase)
-                
-                if siguiente_reserva:
-                    mensaje += '. Se asignó el cupo al siguiente en lista de espera.'
+                mensaje += '. El cupo se ofrecerá al siguiente en lista de espera, si lo hay.'
             else:
                 mensaje += '. La clase ya había pasado, pero se ha registrado la cancelación en tu historial.'
             
@@ -226,12 +280,12 @@ class ReservaViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def historial(self, request):
         """
-        Retorna el historial completo de reservas del usuario.
-        GET /api/reservas/historial/
+        Retorna el historial de reservas del usuario, paginado por cursor.
+        GET /api/reservas/historial/?cursor=...&page_size=...&sin_total=1
         """
-        reservas = self.get_queryset()
+        reservas = self.paginate_queryset(self.get_queryset())
         serializer = ReservaSerializer(reservas, many=True)
-        return Response(serializer.data)
+        return self.get_paginated_response(serializer.data)
     
     @action(detail=False, methods=['get'])
     def proximas(self, request):
@@ -341,18 +395,9 @@ class ReservaViewSet(viewsets.ModelViewSet):
         
         # Crear notificación de advertencia
         from notificaciones.models import Notificacion
-        mensaje = f"Se registró tu inasistencia a {reserva.clase.nombre}."
-        if socio.noshow_mes_actual >= 3:
-            mensaje += " Tu cuenta ha sido suspendida temporalmente por 30 días."
-        elif socio.noshow_mes_actual == 2:
-            mensaje += " ADVERTENCIA: Un no-show más y serás bloqueado por 30 días."
-        
-        Notificacion.objects.create(
-            usuario=socio,
-            tipo=Notificacion.OTROS,
-            titulo='⚠️ No-Show Registrado',
-            mensaje=mensaje
-        )
+        Notificacion.construir_advertencia_noshow(
+            socio, reserva.clase, socio.noshow_mes_actual
+        ).save()
         
         return Response({
             'message': f'No-show registrado. Total del mes: {socio.noshow_mes_actual}',
@@ -391,8 +436,17 @@ class ReservaViewSet(viewsets.ModelViewSet):
         if not marcar_todas and reservas_ids:
             reservas = reservas.filter(id__in=reservas_ids)
         
-        # Marcar como completadas
+        # Marcar como completadas (update() no emite post_save, se ajustan agenda y reportes aparte)
+        afectadas = list(reservas.values_list('socio_id', 'id'))
         count = reservas.update(estado=Reserva.COMPLETADA)
+        if count:
+            invalidar_fechas(Clase.objects.filter(pk=clase_id).values_list('fecha', flat=True))
+        
+        por_socio = {}
+        for socio_id, reserva_id in afectadas:
+            por_socio.setdefault(socio_id, []).append(reserva_id)
+        for socio_id, reserva_ids in por_socio.items():
+            agenda_service.quitar_reservas(socio_id, reserva_ids)
         
         return Response({
             'message': f'{count} asistencias marcadas exitosamente',
@@ -414,9 +468,35 @@ class ReservaViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        reservas = Reserva.objects.filter(
+        reservas = Reserva.objects.para_listado().filter(
             clase_id=clase_id
-        ).select_related('socio', 'clase').order_by('socio__first_name')
+        ).order_by('socio__first_name')
         
         serializer = ReservaDetalleSerializer(reservas, many=True)
         return Response(serializer.data)
+
+
+@require_GET
+def feed_calendario(request, token):
+    """
+    Feed iCalendar (.ics) de un socio o instructor, identificado por su token.
+    GET /api/calendario/{token}.ics
+    
+    Sin autenticación: lo consultan las apps de calendario. Se sirve desde la
+    caché con ETag y Last-Modified; un sondeo sin cambios recibe 304.
+    """
+    from django.utils.cache import get_conditional_response
+    from .ics_service import obtener_feed
+    
+    feed = obtener_feed(token)
+    if feed is None:
+        raise Http404('Calendario no encontrado')
+    
+    modificado = int(feed['modificado'].timestamp())
+    respuesta = get_conditional_response(request, etag=feed['etag'], last_modified=modificado)
+    if respuesta is None:
+        respuesta = HttpResponse(feed['contenido'], content_type='text/calendar; charset=utf-8')
+    respuesta['ETag'] = feed['etag']
+    respuesta['Last-Modified'] = http_date(modificado)
+    respuesta['Cache-Control'] = 'private, no-cache'
+    return respuesta
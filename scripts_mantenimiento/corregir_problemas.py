@@ -110,7 +110,7 @@ usuarios_asignados = 0
 with transaction.atomic():
     lista_espera_activa = ListaEspera.objects.filter(
         estado=ListaEspera.ESPERANDO
-    ).select_related('clase', 'socio').order_by('clase', 'posicion')
+    ).select_related('clase', 'socio').order_by('clase', 'id')
     
     clases_procesadas = set()
     
@@ -128,7 +128,7 @@ with transaction.atomic():
             usuarios_en_espera = ListaEspera.objects.filter(
                 clase=entrada.clase,
                 estado=ListaEspera.ESPERANDO
-            ).order_by('posicion')[:cupos_disponibles]
+            ).order_by('id')[:cupos_disponibles]
             
             for usuario_espera in usuarios_en_espera:
                 # Verificar que el usuario no tenga ya una reserva para esta clase
@@ -33,6 +33,10 @@ class Usuario(AbstractUser):
         (SUSPENDIDA, 'Suspendida'),
     ]
     
+    # Regla de bloqueo por no-shows
+    MAX_NOSHOW_MES = 3
+    DIAS_BLOQUEO_NOSHOW = 30
+    
     # Campos adicionales
     rol = models.CharField(
         max_length=20,
@@ -125,9 +129,9 @@ class Usuario(AbstractUser):
         self.total_noshow += 1
         self.noshow_mes_actual += 1
         
-        # Bloquear si alcanza 3 no-shows en el mes
-        if self.noshow_mes_actual >= 3:
-            self.bloqueado_hasta = timezone.now() + timedelta(days=30)
+        # Bloquear si alcanza MAX_NOSHOW_MES no-shows en el mes
+        if self.noshow_mes_actual >= self.MAX_NOSHOW_MES:
+            self.bloqueado_hasta = timezone.now() + timedelta(days=self.DIAS_BLOQUEO_NOSHOW)
             self.estado_membresia = self.SUSPENDIDA
         
         self.save()
@@ -8,6 +8,8 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from django.contrib.auth import update_session_auth_hash
 import logging
 
+from busqueda.filters import BusquedaFilter
+from busqueda.models import DocumentoBusqueda
 from .models import Usuario, Instructor
 from .serializers import (
     UsuarioSerializer, UsuarioDetalleSerializer, UsuarioRegistroSerializer,
@@ -221,15 +223,45 @@ class UsuarioViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def mis_reservas(self, request):
         """
-        Endpoint para obtener reservas del usuario actual.
-        GET /api/usuarios/mis_reservas/
+        Endpoint para obtener reservas del usuario actual, paginado por cursor.
+        GET /api/usuarios/mis_reservas/?cursor=...&page_size=...&sin_total=1
         """
         from reservas.models import Reserva
         from reservas.serializers import ReservaDetalleSerializer
+        from backend.pagination import ReservaKeysetPagination
         
-        reservas = Reserva.objects.filter(socio=request.user).order_by('-fecha_reserva')
+        paginador = ReservaKeysetPagination()
+        reservas = paginador.paginate_queryset(
+            Reserva.objects.para_listado().filter(socio=request.user), request, view=self
+        )
         serializer = ReservaDetalleSerializer(reservas, many=True)
-        return Response(serializer.data)
+        return paginador.get_paginated_response(serializer.data)
+    
+    @action(detail=False, methods=['get'])
+    def agenda(self, request):
+        """
+        Endpoint con la agenda del usuario actual: próximas reservas y
+        listas de espera activas, servidas desde el modelo de lectura AgendaSocio.
+        GET /api/usuarios/agenda/
+        """
+        from reservas.agenda_service import obtener_agenda
+        
+        return Response(obtener_agenda(request.user))
+    
+    @action(detail=False, methods=['get', 'post'], url_path='calendario-ics')
+    def calendario_ics(self, request):
+        """
+        URL del feed iCalendar con el horario del usuario (reservas del socio
+        o clases del instructor), para suscribirse desde una app de calendario.
+        GET /api/usuarios/calendario-ics/
+        POST /api/usuarios/calendario-ics/  (genera una URL nueva; la anterior deja de funcionar)
+        """
+        from django.urls import reverse
+        from reservas.ics_service import obtener_suscripcion
+        
+        suscripcion = obtener_suscripcion(request.user, regenerar=request.method == 'POST')
+        url = request.build_absolute_uri(reverse('calendario_ics', args=[suscripcion.token]))
+        return Response({'url': url})
     
     @action(detail=False, methods=['get'])
     def mis_listas_espera(self, request):
@@ -240,10 +272,10 @@ class UsuarioViewSet(viewsets.ModelViewSet):
         from lista_espera.models import ListaEspera
         from lista_espera.serializers import ListaEsperaDetalleSerializer
         
-        listas = ListaEspera.objects.filter(
+        listas = ListaEspera.objects.para_listado().filter(
             socio=request.user,
-            estado=ListaEspera.ESPERANDO
-        ).order_by('posicion')
+            estado__in=ListaEspera.ESTADOS_ACTIVOS
+        ).con_posicion().order_by('id')
         serializer = ListaEsperaDetalleSerializer(listas, many=True)
         return Response(serializer.data)
 
@@ -256,12 +288,15 @@ class InstructorViewSet(viewsets.ModelViewSet):
     queryset = Instructor.objects.all()
     serializer_class = InstructorSerializer
     permission_classes = [IsAuthenticated]
+    filter_backends = [BusquedaFilter]
+    tipo_busqueda = DocumentoBusqueda.INSTRUCTOR
     
     def get_queryset(self):
         """Filtra instructores activos para usuarios regulares."""
+        queryset = Instructor.objects.select_related('usuario')
         if self.request.user.rol == 'administrador':
-            return Instructor.objects.all()
-        return Instructor.objects.filter(activo=True)
+            return queryset
+        return queryset.filter(activo=True)
     
     @action(detail=False, methods=['get'], url_path='mi-perfil')
     def mi_perfil(self, request):
@@ -289,7 +324,7 @@ class InstructorViewSet(viewsets.ModelViewSet):
         from clases.serializers import ClaseSerializer
         
         instructor = self.get_object()
-        clases = Clase.objects.filter(
+        clases = Clase.objects.para_listado().filter(
             instructor=instructor,
             estado=Clase.ACTIVA
         ).order_by('fecha', 'hora_inicio')